@@ -1,23 +1,253 @@
 import os
+import re
 import json
-from typing import Dict, Any
+import time
+import fnmatch
+import mimetypes
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from agentmx.core.artifacts import read_artifacts
+from agentmx.core.hashing import hash_file
+from agentmx.autonomy import tasks as taskq
+from agentmx.memory import store as mem
 
-def evaluate(run_workdir: str, verification: Dict[str, Any]) -> Dict[str, Any]:
+# Verification specs. expect_artifacts lists artifact names (globs allowed),
+# or dicts naming one with checks:
+#   {"name": "receipt.txt", "min_size": 1, "max_size": 4096, "sha256": "...",
+#    "mime": "text/*", "regex": "Receipt: \\w+", "line": "Receipt: OK",
+#    "min_lines": 1, "max_lines": 10}
+# An entry counts when the artifact was recorded and every check passes; the
+# score is the fraction of entries that count. Size, hash and type come from
+# the memory store while the file's size and mtime_ns still match what was
+# recorded, so unchanged files aren't read. Content checks (regex/line are
+# matched line by line) stream the file once per distinct content.
+
+CONTENT_CHECKS = ("regex", "line", "min_lines", "max_lines")
+READ_CHUNK = 1024 * 1024
+CONTENT_CACHE_SIZE = 4096
+RESCORED_STATUSES = ("completed", "failed")
+
+# files read to hash or scan them; stored hashes that were used instead
+STATS = {"hashed": 0, "scanned": 0, "stored": 0}
+_content: "OrderedDict[tuple, dict]" = OrderedDict()
+_content_lock = threading.Lock()
+
+class _Artifact:
+    def __init__(self, record: Dict[str, Any], workdir: str):
+        path = record.get("path") or record.get("name") or ""
+        self.path = path if os.path.isabs(path) else os.path.join(workdir, path)
+        self.record = record
+        try:
+            self.st = os.stat(self.path)
+        except OSError:
+            self.st = None
+        # the stored size/hash/mime still describe the file on disk
+        self.fresh = (self.st is not None and record.get("mtime_ns") is not None
+                      and record.get("size") == self.st.st_size and record.get("mtime_ns") == self.st.st_mtime_ns)
+        self._sha: Optional[str] = None
+
+    def size(self) -> int:
+        return self.st.st_size if self.st is not None else int(self.record.get("size") or 0)
+
+    def sha256(self) -> Optional[str]:
+        if self._sha is None:
+            if self.st is None or (self.fresh and self.record.get("sha256")):
+                self._sha = self.record.get("sha256")
+                STATS["stored"] += 1
+            else:
+                self._sha = hash_file(self.path)
+                STATS["hashed"] += 1
+        return self._sha
+
+    def mime(self) -> Optional[str]:
+        if self.record.get("mime") and (self.fresh or self.st is None):
+            return self.record["mime"]
+        return mimetypes.guess_type(self.path)[0] or self.record.get("mime")
+
+    def content_key(self):
+        # same bytes, same answers: unchanged files share scans by hash
+        if self.fresh and self.record.get("sha256"):
+            return self.record["sha256"]
+        return (self.path, self.st.st_size, self.st.st_mtime_ns, self.st.st_ino)
+
+def _scan(path: str, regex: Optional[str], line: Optional[str]) -> Dict[str, Any]:
+    rx = re.compile(regex.encode(), re.MULTILINE) if regex else None
+    lx = re.compile(b"^" + re.escape(line.encode()) + b"\r?$", re.MULTILINE) if line is not None else None
+    found_rx = found_line = False
+    lines = 0
+    tail = b""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                block, tail = tail, b""
+                if block:
+                    lines += 1
+            else:
+                buf = tail + chunk
+                cut = buf.rfind(b"\n") + 1
+                block, tail = buf[:cut], buf[cut:]
+                lines += block.count(b"\n")
+            if block:
+                found_rx = found_rx or (rx is not None and rx.search(block) is not None)
+                found_line = found_line or (lx is not None and lx.search(block) is not None)
+            if not chunk:
+                break
+    STATS["scanned"] += 1
+    return {"regex": found_rx, "line": found_line, "lines": lines}
+
+def _content_facts(art: _Artifact, regex: Optional[str], line: Optional[str]) -> Optional[Dict[str, Any]]:
+    if art.st is None:
+        return None
+    key = (art.content_key(), regex, line)
+    with _content_lock:
+        hit = _content.get(key)
+        if hit is not None:
+            _content.move_to_end(key)
+            return hit
+    try:
+        facts = _scan(art.path, regex, line)
+    except (OSError, re.error):
+        return None
+    with _content_lock:
+        _content[key] = facts
+        while len(_content) > CONTENT_CACHE_SIZE:
+            _content.popitem(last=False)
+    return facts
+
+def _failed_checks(entry: Dict[str, Any], art: _Artifact) -> List[str]:
+    failed = []
+    if "min_size" in entry and art.size() < entry["min_size"]:
+        failed.append("min_size")
+    if "max_size" in entry and art.size() > entry["max_size"]:
+        failed.append("max_size")
+    if "mime" in entry and not fnmatch.fnmatchcase(art.mime() or "", entry["mime"]):
+        failed.append("mime")
+    if "sha256" in entry and (art.sha256() or "") != str(entry["sha256"]).lower():
+        failed.append("sha256")
+    wanted = [k for k in CONTENT_CHECKS if k in entry]
+    if wanted:
+        facts = _content_facts(art, entry.get("regex"), entry.get("line"))
+        if facts is None:
+            return failed + wanted
+        if "regex" in entry and not facts["regex"]:
+            failed.append("regex")
+        if "line" in entry and not facts["line"]:
+            failed.append("line")
+        if "min_lines" in entry and facts["lines"] < entry["min_lines"]:
+            failed.append("min_lines")
+        if "max_lines" in entry and facts["lines"] > entry["max_lines"]:
+            failed.append("max_lines")
+    return failed
+
+def evaluate(run_workdir: str, verification: Dict[str, Any], artifacts: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+    # artifacts: the run's rows from the memory store; without them the
+    # workdir manifest is used
     score = 0.0
     details = {}
-    try:
-        arts_path = os.path.join(run_workdir, "artifacts.json")
-        with open(arts_path, "r", encoding="utf-8") as f:
-            arts = json.load(f)
-    except Exception:
-        arts = []
+    arts = artifacts or read_artifacts(run_workdir)
+    by_name = {}
+    for a in arts:
+        by_name[os.path.basename(a.get("path") or a.get("name") or "")] = a
     expected = verification.get("expect_artifacts") or []
-    found = set(os.path.basename(a.get("path","")) for a in arts)
-    hit = sum(1 for name in expected if name in found)
+    checks = {}
+    hit = 0
+    for entry in expected:
+        if isinstance(entry, str):
+            entry = {"name": entry}
+        pattern = entry.get("name", "")
+        names = [n for n in by_name if fnmatch.fnmatchcase(n, pattern)] if any(c in pattern for c in "*?[") else \
+            ([pattern] if pattern in by_name else [])
+        if not names:
+            checks[pattern] = ["missing"]
+            continue
+        failed = _failed_checks(entry, _Artifact(by_name[names[0]], run_workdir))
+        if failed:
+            checks[pattern] = failed
+        else:
+            hit += 1
     if expected:
         score = hit / float(len(expected))
     else:
         score = 1.0
-    details["found"] = list(found)
+    details["found"] = list(by_name)
     details["expected"] = expected
+    details["failed"] = checks
     return {"score": score, "details": details}
+
+def threshold_for(cfg, task_type: Optional[str]) -> float:
+    default = float(cfg.get("autonomy.thresholds.default", 0.8))
+    fallback = 1.0 if task_type == "bootstrap_demo" else default
+    return float(cfg.get(f"autonomy.thresholds.{task_type}", fallback)) if task_type else default
+
+def parse_since(value: str, now: Optional[float] = None) -> float:
+    # "7d", "12h", "30m", an ISO date/time (UTC unless it has an offset) or
+    # epoch seconds
+    now = time.time() if now is None else now
+    value = value.strip()
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+    if value[-1:] in units and value[:-1].replace(".", "", 1).isdigit():
+        return now - float(value[:-1]) * units[value[-1]]
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise ValueError(f"can't parse --since {value!r}; use e.g. 7d, 12h, 2024-05-01 or epoch seconds")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def rescore(cfg, conn, since: float = 0.0, workers: int = 4, batch_size: int = 500, dry_run: bool = False,
+            tasks_conn=None) -> Dict[str, Any]:
+    # Re-evaluates every run with a stored verification spec against the
+    # current config and writes changed score/status rows in batches. Runs
+    # whose plan failed stay at 0. With tasks_conn, the tasks that produced
+    # re-statused runs follow them.
+    t0 = time.perf_counter()
+    runs = [r for r in mem.runs_with_verification(conn, since) if r["status"] in RESCORED_STATUSES]
+    arts = mem.artifacts_by_run(conn, [r["id"] for r in runs])
+
+    def one(run):
+        if run.get("exec_ok") == 0:
+            return 0.0
+        try:
+            spec = json.loads(run["verification"])
+        except ValueError:
+            return None
+        return evaluate(cfg.workdir_for(run["id"]), spec, arts.get(run["id"]))["score"]
+
+    pending, written, status_changed, restatused = [], 0, 0, []
+    with ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="agentmx-eval") as pool:
+        for run, score in zip(runs, pool.map(one, runs)):
+            if score is None:
+                continue
+            status = "completed" if score >= threshold_for(cfg, run["task_type"]) else "failed"
+            if score == run["score"] and status == run["status"]:
+                continue
+            if status != run["status"]:
+                status_changed += 1
+                restatused.append((status, run["id"]))
+            pending.append((score, status, run["id"]))
+            if len(pending) >= batch_size and not dry_run:
+                mem.update_scores(conn, pending)
+                written += len(pending)
+                pending = []
+    changed = written + len(pending)
+    if pending and not dry_run:
+        mem.update_scores(conn, pending)
+        written += len(pending)
+    if tasks_conn is not None and restatused and not dry_run:
+        taskq.sync_run_statuses(tasks_conn, restatused)
+    return {
+        "runs": len(runs),
+        "changed": changed,
+        "status_changed": status_changed,
+        "written": written,
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
@@ -1,24 +1,425 @@
+import os
+import re
 import time
-from typing import Dict, Any, List, Optional
+import uuid
+import threading
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from multiprocessing.connection import wait as wait_ready
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from agentmx.core.runner import AgentRunner
+from agentmx.autonomy.step_cache import StepCache
+from agentmx.safety import cancel
 
-def execute_steps(cfg, steps: List[Dict[str, Any]], run_id: Optional[str] = None) -> Dict[str, Any]:
-    results = {}
+# A plan is a list of steps {"action": ..., "args": {...}} with optional
+# "id" (default step_<index>), "needs" (ids of steps that must succeed
+# first) and "timeout" (seconds). Once any step declares needs, the plan runs
+# as a DAG: ready steps start as soon as their dependencies succeed, up to
+# max_workers at a time, on threads or (mode=process) one child process per
+# step. Plans without needs run the old way: one step at a time, in order,
+# every step whatever happened before it.
+# On a failure fail_fast cancels the running steps and skips the rest;
+# continue only skips the failed step's dependents. Every step gets a cancel
+# token that fires on the kill switch, its timeout and fail-fast; threads
+# have to notice it, step processes are terminated.
+# A string arg "${step_id.key}" takes that key from a dependency's result.
+# Successful CACHEABLE steps are memoized (see step_cache); a hit links the
+# cached outputs into the run instead of running the step.
+# When a plan has several run_demo steps each runs as <run_id>-<step id>, with
+# its own workdir, audit chain and cancel token; several upload steps each
+# save into a subdirectory of the downloads dir named after the step.
+
+MODES = ("thread", "process")
+POLICIES = ("fail_fast", "continue")
+RESERVED_IDS = ("run_id", "summary")
+# actions that work in the run's workdir and so need a run id
+NEEDS_RUN_ID = ("run_demo", "upload")
+# actions whose results are memoized, with the modules whose source goes
+# into the cache key next to the action function's own
+CACHEABLE: Dict[str, Tuple[str, ...]] = {
+    "run_demo": ("agentmx.core.runner", "agentmx.skills.gui.notepad", "agentmx.skills.browser.upload_receipt",
+                 "agentmx.skills.browser.async_engine"),
+    "normalize": ("agentmx.skills.generated.text_normalize",),
+    "upload": ("agentmx.skills.browser.upload_receipt",),
+}
+# top-level config sections that shape a cacheable action's output; they go
+# into its cache key so a config change doesn't serve stale results
+CACHE_CONFIG: Dict[str, Tuple[str, ...]] = {
+    "run_demo": ("mode", "execution", "browser", "network", "policy", "skills", "gui", "artifacts"),
+    "upload": ("browser", "network"),
+}
+# how long cancelled steps get to wind down before the plan returns
+CANCEL_GRACE = 5.0
+
+_REF = re.compile(r"^\$\{([^.}]+)\.([^}]+)\}$")
+
+class StepContext:
+    def __init__(self, cfg, run_id: Optional[str], token: cancel.CancelToken, subdir: Optional[str] = None):
+        self.cfg = cfg
+        self.run_id = run_id
+        self.token = token
+        # the step's own corner of shared output dirs
+        self.subdir = subdir
+
+    @property
+    def workdir(self) -> Optional[str]:
+        return os.path.abspath(self.cfg.workdir_for(self.run_id)) if self.run_id else None
+
+def _noop(ctx: StepContext, args: Dict[str, Any]) -> Dict[str, Any]:
+    if ctx.token.wait(float(args.get("seconds", 1))):
+        return {"ok": False, "error": "stopped"}
+    return {"ok": True}
+
+def _run_demo(ctx: StepContext, args: Dict[str, Any]) -> Dict[str, Any]:
+    # the runner picks up the run's registered token, which follows the step
+    cancel.register(ctx.run_id).link(ctx.token)
+    r = AgentRunner(ctx.cfg, run_id=ctx.run_id, net_enabled=True, allow_safety_edit=False)
+    ok = r.execute(args.get("task", "demo"), timeout=int(args.get("timeout", 3600)))
+    return {"ok": ok, "workdir": r.workdir}
+
+def _normalize(ctx: StepContext, args: Dict[str, Any]) -> Dict[str, Any]:
+    from agentmx.skills.registry import SkillRegistry
+    ctx.token.check()
+    return {"ok": True, "path": SkillRegistry().text_normalize()().run(args["path"])}
+
+def _upload(ctx: StepContext, args: Dict[str, Any]) -> Dict[str, Any]:
+    from agentmx.safety.network import NetworkPolicy
+    from agentmx.skills.browser import pool as browser_pool
+    from agentmx.skills.registry import SkillRegistry
+    downloads = args.get("downloads_dir") or os.path.abspath(ctx.cfg.downloads_dir.format(run_id=ctx.run_id))
+    if ctx.subdir:
+        downloads = os.path.join(downloads, ctx.subdir)
+    skill = SkillRegistry().browser_upload_receipt()(downloads, pool=browser_pool.shared_pool(ctx.cfg), token=ctx.token,
+                                                     network=NetworkPolicy.from_config(ctx.cfg))
+    return dict(skill.run(args["path"]), ok=True)
+
+ACTIONS: Dict[str, Callable[[StepContext, Dict[str, Any]], Dict[str, Any]]] = {
+    "noop": _noop,
+    "run_demo": _run_demo,
+    "normalize": _normalize,
+    "upload": _upload,
+}
+
+def _call(action: str, ctx: StepContext, args: Dict[str, Any]) -> Dict[str, Any]:
+    fn = ACTIONS.get(action)
+    if fn is None:
+        return {"ok": False, "error": f"unknown action {action}"}
+    try:
+        out = fn(ctx, args)
+    except cancel.Stopped:
+        return {"ok": False, "error": "stopped"}
+    except Exception as e:
+        return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    return out if isinstance(out, dict) else {"ok": bool(out)}
+
+def _child_main(conn, action: str, cfg, run_id: Optional[str], subdir: Optional[str], args: Dict[str, Any]):
+    conn.send(_call(action, StepContext(cfg, run_id, cancel.CancelToken(), subdir), args))
+    conn.close()
+
+def _call_in_process(action: str, ctx: StepContext, args: Dict[str, Any]) -> Dict[str, Any]:
+    recv, send = multiprocessing.Pipe(duplex=False)
+    proc = multiprocessing.Process(target=_child_main, args=(send, action, ctx.cfg, ctx.run_id, ctx.subdir, args),
+                                   name=f"agentmx-step-{action}", daemon=True)
+    proc.start()
+    send.close()
+    unbind = ctx.token.on_cancel(proc.terminate)
+    try:
+        wait_ready([recv, proc.sentinel])
+        try:
+            if recv.poll():
+                return recv.recv()
+        except (EOFError, OSError):
+            pass
+        if ctx.token.cancelled:
+            return {"ok": False, "error": "stopped"}
+        return {"ok": False, "error": f"step process exited with code {proc.exitcode}"}
+    finally:
+        unbind()
+        proc.join(1.0)
+        if proc.is_alive():
+            proc.kill()
+            proc.join()
+        recv.close()
+
+def validate_plan(steps: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    # Returns the steps with ids/needs filled in and a topological order;
+    # raises ValueError on duplicate or unknown ids and on cycles.
+    plan, ids = [], set()
     for i, st in enumerate(steps):
-        act = st.get("action")
-        if act == "run_demo":
-            rid = run_id or results.get("run_id")
-            if not rid:
-                import uuid as _uuid
-                rid = _uuid.uuid4().hex
-            r = AgentRunner(cfg, run_id=rid, net_enabled=True, allow_safety_edit=False)
-            results["run_id"] = r.run_id
-            ok = r.execute("demo", timeout=3600)
-            results[f"step_{i}"] = {"ok": ok, "workdir": r.workdir}
-        elif act == "noop":
-            seconds = int(st.get("args", {}).get("seconds", 1))
-            time.sleep(seconds)
-            results[f"step_{i}"] = {"ok": True}
-        else:
-            results[f"step_{i}"] = {"ok": False, "error": f"unknown action {act}"}
-    return results
+        sid = str(st.get("id") or f"step_{i}")
+        if sid in ids or sid in RESERVED_IDS:
+            raise ValueError(f"duplicate or reserved step id {sid!r}")
+        ids.add(sid)
+        plan.append(dict(st, id=sid, needs=[str(n) for n in st.get("needs") or []]))
+    indegree, dependents = {}, {}
+    for st in plan:
+        for n in st["needs"]:
+            if n not in ids:
+                raise ValueError(f"step {st['id']!r} needs unknown step {n!r}")
+            dependents.setdefault(n, []).append(st["id"])
+        indegree[st["id"]] = len(st["needs"])
+    ready = [sid for sid, d in indegree.items() if d == 0]
+    order = []
+    while ready:
+        sid = ready.pop()
+        order.append(sid)
+        for d in dependents.get(sid, ()):
+            indegree[d] -= 1
+            if indegree[d] == 0:
+                ready.append(d)
+    if len(order) != len(plan):
+        raise ValueError("step dependencies form a cycle: " + ", ".join(sorted(s for s, d in indegree.items() if d)))
+    return plan, order
+
+def _resolve(args: Dict[str, Any], needs: List[str], results: Dict[str, Any]) -> Dict[str, Any]:
+    out = {}
+    for k, v in args.items():
+        m = _REF.match(v) if isinstance(v, str) else None
+        if m is not None:
+            if m.group(1) not in needs:
+                raise ValueError(f"arg {k}={v} refers to a step that isn't in needs")
+            if m.group(2) not in results[m.group(1)]:
+                raise ValueError(f"arg {k}={v}: step {m.group(1)} returned no {m.group(2)!r}")
+            v = results[m.group(1)][m.group(2)]
+        out[k] = v
+    return out
+
+def _critical_path(plan: List[Dict[str, Any]], order: List[str], results: Dict[str, Any]) -> Tuple[List[str], float]:
+    # the longest chain of step durations: the best wall time any number of
+    # workers could reach
+    by_id = {st["id"]: st for st in plan}
+    best: Dict[str, Tuple[float, List[str]]] = {}
+    for sid in order:
+        prev = max((best[n] for n in by_id[sid]["needs"]), default=(0.0, []), key=lambda b: (b[0], len(b[1])))
+        best[sid] = (prev[0] + results[sid]["duration"], prev[1] + [sid])
+    if not best:
+        return [], 0.0
+    total, path = max(best.values(), key=lambda b: (b[0], len(b[1])))
+    return path, round(total, 4)
+
+class DagExecutor:
+    def __init__(self, cfg, run_id: Optional[str] = None, max_workers: int = 4, mode: str = "thread",
+                 policy: str = "fail_fast", step_timeout: Optional[float] = None,
+                 token: Optional[cancel.CancelToken] = None, cache: Optional[StepCache] = None):
+        if mode not in MODES:
+            raise ValueError(f"unknown executor mode {mode!r}")
+        if policy not in POLICIES:
+            raise ValueError(f"unknown failure policy {policy!r}")
+        self.cfg = cfg
+        self.run_id = run_id
+        self.max_workers = max(1, int(max_workers))
+        self.mode = mode
+        self.policy = policy
+        self.step_timeout = step_timeout or None
+        self.token = token
+        self.cache = cache
+
+    def _cached_call(self, action: str, ctx: StepContext, args: Dict[str, Any]) -> Dict[str, Any]:
+        call = _call_in_process if self.mode == "process" else _call
+        if self.cache is None or action not in CACHEABLE or action not in ACTIONS:
+            return call(action, ctx, args)
+        workdir = ctx.workdir
+        config = {name: ctx.cfg.raw.get(name) for name in CACHE_CONFIG.get(action, ())}
+        if ctx.subdir:
+            config["subdir"] = ctx.subdir
+        key = self.cache.key(action, ACTIONS[action], CACHEABLE[action], args, workdir, config)
+        if key is None:
+            return call(action, ctx, args)
+        hit = self.cache.lookup(key, ctx.run_id, workdir)
+        if hit is not None:
+            return hit
+        mark = self.cache.mark(workdir)
+        res = call(action, ctx, args)
+        if res.get("ok"):
+            self.cache.store(key, action, res, workdir, mark)
+        return res
+
+    def run(self, steps: List[Dict[str, Any]]) -> Dict[str, Any]:
+        plan, topo = validate_plan(steps)
+        dag = any("needs" in st for st in steps)
+        workers = self.max_workers if dag else 1
+        policy = self.policy if dag else "continue"
+        by_id = {st["id"]: st for st in plan}
+        order = [st["id"] for st in plan]
+        dependents: Dict[str, List[str]] = {}
+        for st in plan:
+            for n in st["needs"]:
+                dependents.setdefault(n, []).append(st["id"])
+
+        results: Dict[str, Any] = {}
+        run_id = self.run_id
+        if any(st.get("action") in NEEDS_RUN_ID for st in plan):
+            run_id = results["run_id"] = run_id or uuid.uuid4().hex
+        counts: Dict[str, int] = {}
+        for st in plan:
+            counts[st.get("action")] = counts.get(st.get("action"), 0) + 1
+
+        def context(sid: str, step_token: cancel.CancelToken) -> StepContext:
+            action = by_id[sid].get("action")
+            if counts[action] > 1 and action == "run_demo":
+                return StepContext(self.cfg, f"{run_id}-{sid}", step_token)
+            if counts[action] > 1 and action == "upload":
+                return StepContext(self.cfg, run_id, step_token, subdir=sid)
+            return StepContext(self.cfg, run_id, step_token)
+
+        token = cancel.CancelToken()
+        token.link(cancel.global_token(self.cfg.kill_switch_file))
+        if self.token is not None:
+            token.link(self.token)
+        # wakes the scheduling wait as soon as the plan is cancelled
+        stop: Future = Future()
+        token.on_cancel(lambda: stop.done() or stop.set_result(None))
+
+        waiting = {sid: set(by_id[sid]["needs"]) for sid in order}
+        running: Dict[Future, str] = {}
+        tokens: Dict[str, cancel.CancelToken] = {}
+        deadlines: Dict[str, float] = {}
+        started: Dict[str, float] = {}
+        ended: Dict[str, Dict[str, Any]] = {}
+        lock = threading.Lock()
+        concurrency = [0, 0]  # now, max
+        failed = False
+        t0 = time.monotonic()
+
+        def execute(sid: str, args: Dict[str, Any], step_token: cancel.CancelToken) -> Dict[str, Any]:
+            with lock:
+                concurrency[0] += 1
+                concurrency[1] = max(concurrency)
+            started[sid] = time.monotonic()
+            try:
+                return self._cached_call(by_id[sid].get("action"), context(sid, step_token), args)
+            finally:
+                with lock:
+                    concurrency[0] -= 1
+
+        def finish(sid: str, res: Dict[str, Any], status: Optional[str] = None):
+            nonlocal failed
+            now = time.monotonic()
+            begin = started.get(sid)
+            res = dict(res)
+            res["status"] = status or ("ok" if res.get("ok") else "failed")
+            res["ok"] = res["status"] == "ok"
+            res["action"] = by_id[sid].get("action")
+            res["started"] = None if begin is None else round(begin - t0, 4)
+            res["finished"] = round(now - t0, 4)
+            res["duration"] = 0.0 if begin is None else round(now - begin, 4)
+            ended[sid] = res
+            waiting.pop(sid, None)
+            deadlines.pop(sid, None)
+            step_token = tokens.pop(sid, None)
+            if step_token is not None:
+                step_token.close()
+            if res["ok"]:
+                for d in dependents.get(sid, ()):
+                    if d in waiting:
+                        waiting[d].discard(sid)
+                return
+            failed = True
+            for d in dependents.get(sid, ()):
+                if d in waiting:
+                    finish(d, {"error": f"dependency {sid} {res['status']}"}, "skipped")
+
+        def cancelled_status(step_token: Optional[cancel.CancelToken]) -> Optional[str]:
+            if step_token is None or not step_token.cancelled:
+                return None
+            return {"timeout": "timeout", "fail_fast": "cancelled"}.get(step_token.reason, "stopped")
+
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agentmx-step")
+        try:
+            while len(ended) < len(plan):
+                if token.cancelled or (failed and policy == "fail_fast"):
+                    break
+                for sid in order:
+                    if len(running) >= workers:
+                        break
+                    if sid not in waiting or waiting[sid]:
+                        continue
+                    del waiting[sid]
+                    st = by_id[sid]
+                    try:
+                        args = _resolve(st.get("args") or {}, st["needs"], ended)
+                    except ValueError as e:
+                        finish(sid, {"error": str(e)})
+                        continue
+                    tokens[sid] = token.child()
+                    timeout = st.get("timeout") or self.step_timeout
+                    if timeout:
+                        deadlines[sid] = time.monotonic() + float(timeout)
+                    running[pool.submit(execute, sid, args, tokens[sid])] = sid
+                if (failed and policy == "fail_fast") or len(ended) == len(plan) or not running:
+                    continue
+                timeout = None
+                if deadlines:
+                    timeout = max(0.0, min(deadlines.values()) - time.monotonic())
+                done, _ = wait(list(running) + [stop], timeout=timeout, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    if fut is stop:
+                        continue
+                    sid = running.pop(fut)
+                    # a step that timed out already has its result
+                    if sid not in ended:
+                        res = fut.result()
+                        finish(sid, res, None if res.get("ok") else cancelled_status(tokens.get(sid)))
+                now = time.monotonic()
+                for sid, deadline in list(deadlines.items()):
+                    if now >= deadline:
+                        # a thread keeps its pool slot until it notices; a
+                        # step process is killed right away
+                        tokens[sid].cancel("timeout")
+                        timeout = by_id[sid].get("timeout") or self.step_timeout
+                        finish(sid, {"error": f"timed out after {timeout}s"}, "timeout")
+
+            if len(ended) < len(plan):
+                reason = "fail_fast" if failed and not token.cancelled else (token.reason or "stopped")
+                status = "cancelled" if reason == "fail_fast" else "stopped"
+                for sid in order:
+                    if sid in waiting:
+                        finish(sid, {"error": reason}, "skipped")
+                left = {fut: sid for fut, sid in running.items() if sid not in ended}
+                for sid in left.values():
+                    tokens[sid].cancel(reason)
+                done, _ = wait(list(left), timeout=CANCEL_GRACE)
+                for fut, sid in left.items():
+                    res = fut.result() if fut in done else {"ok": False, "error": "did not stop in time"}
+                    finish(sid, res, None if res.get("ok") else status)
+        finally:
+            # steps that overran their timeout on a thread are left behind
+            pool.shutdown(wait=False)
+            for step_token in tokens.values():
+                step_token.close()
+            token.close()
+
+        for sid in order:
+            results[sid] = ended[sid]
+        wall = time.monotonic() - t0
+        busy = sum(ended[sid]["duration"] for sid in order)
+        path, path_time = _critical_path(plan, topo, ended)
+        results["summary"] = {
+            "ok": all(ended[sid]["ok"] for sid in order),
+            "stopped": token.cancelled,
+            "wall": round(wall, 4),
+            "busy": round(busy, 4),
+            "parallelism": round(busy / wall, 2) if wall > 0 else 0.0,
+            "max_concurrency": concurrency[1],
+            "workers": workers,
+            "mode": self.mode,
+            "policy": policy,
+            "critical_path": path,
+            "critical_path_time": path_time,
+            "cached": sum(1 for sid in order if ended[sid].get("cached")),
+        }
+        return results
+
+def execute_steps(cfg, steps: List[Dict[str, Any]], run_id: Optional[str] = None,
+                  token: Optional[cancel.CancelToken] = None, use_cache: bool = True) -> Dict[str, Any]:
+    step_timeout = float(cfg.get("autonomy.executor.step_timeout", 0))
+    return DagExecutor(
+        cfg,
+        run_id=run_id,
+        max_workers=int(cfg.get("autonomy.executor.max_workers", 4)),
+        mode=cfg.get("autonomy.executor.mode", "thread"),
+        policy=cfg.get("autonomy.executor.policy", "fail_fast"),
+        step_timeout=step_timeout if step_timeout > 0 else None,
+        token=token,
+        cache=StepCache.from_config(cfg) if use_cache else None,
+    ).run(steps)
@@ -0,0 +1,104 @@
+import os
+import select
+import socket
+import time
+import itertools
+from typing import Optional
+
+_SEQ = itertools.count()
+
+def _unix_dgram_supported() -> bool:
+    return hasattr(socket, "AF_UNIX") and os.name != "nt"
+
+class WakeListener:
+    # Each waiting scheduler binds its own datagram socket inside the wake
+    # directory; notify() sends one byte to every socket found there. When
+    # Unix sockets are unavailable wait() degrades to a plain sleep.
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path: Optional[str] = None
+        self.sock: Optional[socket.socket] = None
+        if not _unix_dgram_supported():
+            return
+        try:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{os.getpid()}-{next(_SEQ)}.sock")
+            if os.path.exists(path):
+                os.unlink(path)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.bind(path)
+            sock.setblocking(False)
+            self.sock, self.path = sock, path
+        except OSError:
+            self.sock, self.path = None, None
+
+    @property
+    def available(self) -> bool:
+        return self.sock is not None
+
+    def _drain(self):
+        try:
+            while self.sock.recv(64):
+                pass
+        except OSError:
+            pass
+
+    def wait(self, timeout: float) -> bool:
+        if self.sock is None:
+            time.sleep(timeout)
+            return False
+        r, _, _ = select.select([self.sock], [], [], timeout)
+        if r:
+            self._drain()
+            return True
+        return False
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def notify(directory: str) -> int:
+    if not _unix_dgram_supported():
+        return 0
+    try:
+        entries = [e.path for e in os.scandir(directory) if e.name.endswith(".sock")]
+    except OSError:
+        return 0
+    sent = 0
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    try:
+        for path in entries:
+            try:
+                sock.sendto(b"1", path)
+                sent += 1
+            except BlockingIOError:
+                # Receiver already has pending wake-ups queued.
+                sent += 1
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Listener died without cleaning up its socket.
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except OSError:
+                pass
+    finally:
+        sock.close()
+    return sent
@@ -13,4 +13,12 @@ def plan(task_type: str, payload: Dict[str, Any]) -> Tuple[List[Dict[str, Any]],
         ]
         verification = {"expect_artifacts": ["notepad_output.txt.norm.txt"]}
         return steps, verification
+    if task_type == "normalize_upload":
+        # each file is normalized, then uploaded; files don't wait on each other
+        steps = []
+        for i, path in enumerate(payload.get("paths") or []):
+            steps.append({"id": f"normalize_{i}", "action": "normalize", "args": {"path": path}, "needs": []})
+            steps.append({"id": f"upload_{i}", "action": "upload", "args": {"path": f"${{normalize_{i}.path}}"},
+                          "needs": [f"normalize_{i}"]})
+        return steps, {"expect_artifacts": []}
     return [{"action": "noop", "args": {"seconds": 1}}], {"expect_artifacts": []}
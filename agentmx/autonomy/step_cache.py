@@ -0,0 +1,165 @@
+import os
+import json
+import hashlib
+import inspect
+import importlib.util
+from typing import Dict, Any, List, Optional, Callable, Iterable
+from loguru import logger
+from agentmx.core.artifacts import ArtifactManifest, read_artifacts
+from agentmx.core.cas import BlobStore, DEFAULT_ROOT as DEFAULT_CAS_ROOT, is_within
+from agentmx.core.hashing import get_hasher
+from agentmx.memory import store as mem
+
+# Memoized plan steps. The key covers the action, its args (file args by
+# SHA-256, and relative to the run workdir when inside it), the source of
+# the code that runs it and the config sections that shape its output. An
+# entry keeps the step's result and its output files: files named in the
+# result plus artifacts it added to the run manifest. Files are stored in
+# the blob store and put back on a hit, after the blob is checked against
+# its hash: into the new run's workdir when they were in the old one's,
+# otherwise to the path they were written to. They are always separate files
+# (reflink or copy), so editing one never reaches the blob. Entries are
+# evicted least recently used first once autonomy.cache.max_entries or
+# max_bytes is exceeded.
+
+# bump when the key or the entry layout changes
+CACHE_VERSION = 2
+
+def source_hash(fn: Callable, modules: Iterable[str] = ()) -> str:
+    # files are hashed through the shared hasher, so unchanged sources are
+    # only read once per process
+    hasher = get_hasher()
+    h = hashlib.sha256()
+    paths = [inspect.getsourcefile(fn)]
+    for name in modules:
+        spec = importlib.util.find_spec(name)
+        paths.append(spec.origin if spec is not None else None)
+    for path in paths:
+        h.update(f"{path and os.path.basename(path)}:{path and hasher.hash(path)}\n".encode())
+    return h.hexdigest()
+
+class StepCache:
+    def __init__(self, blobs: BlobStore, db_path: Optional[str] = None, max_entries: int = 1000, max_bytes: int = 0):
+        self.blobs = blobs
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hasher = get_hasher()
+
+    @classmethod
+    def from_config(cls, cfg) -> Optional["StepCache"]:
+        if not cfg.get("autonomy.cache.enabled", True):
+            return None
+        return cls(
+            BlobStore(cfg.get("artifacts.cas_dir", DEFAULT_CAS_ROOT)),
+            max_entries=int(cfg.get("autonomy.cache.max_entries", 1000)),
+            max_bytes=int(cfg.get("autonomy.cache.max_bytes", 1024 ** 3)),
+        )
+
+    def key(self, action: str, fn: Callable, modules: Iterable[str], args: Dict[str, Any],
+            workdir: Optional[str], config: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        try:
+            norm = {}
+            for k in sorted(args):
+                v = args[k]
+                if isinstance(v, str) and os.path.isfile(v):
+                    path = os.path.abspath(v)
+                    inside = workdir is not None and is_within(path, workdir)
+                    v = {"file": os.path.relpath(path, workdir) if inside else path, "in_workdir": inside,
+                         "sha256": self.hasher.hash(path)}
+                norm[k] = v
+            payload = {"version": CACHE_VERSION, "action": action, "args": norm, "source": source_hash(fn, modules),
+                       "config": config or {}}
+            return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+        except Exception as e:
+            logger.warning(f"step cache key for {action} failed: {e}")
+            return None
+
+    def mark(self, workdir: Optional[str]) -> int:
+        # manifest length before the step, so its own artifacts can be told
+        # apart afterwards
+        return len(read_artifacts(workdir)) if workdir else 0
+
+    def lookup(self, key: str, run_id: Optional[str], workdir: Optional[str]) -> Optional[Dict[str, Any]]:
+        conn = mem.connect(self.db_path)
+        entry = mem.step_cache_get(conn, key)
+        if entry is not None:
+            try:
+                result = self._materialize(entry, run_id, workdir)
+            except Exception as e:
+                logger.warning(f"step cache entry {key[:12]} is unusable, dropping it: {e}")
+                mem.step_cache_delete(conn, key)
+                result = None
+            if result is not None:
+                mem.step_cache_hit(conn, key)
+                return result
+        mem.step_cache_count(conn, "misses")
+        return None
+
+    def _materialize(self, entry: Dict[str, Any], run_id: Optional[str], workdir: Optional[str]) -> Optional[Dict[str, Any]]:
+        outputs = json.loads(entry["outputs"])
+        files = outputs["files"]
+        if any(f.get("rel") is not None for f in files) and workdir is None:
+            return None
+        for f in files:
+            blob = self.blobs.blob_path(f["sha256"])
+            if not os.path.isfile(blob):
+                raise FileNotFoundError(f"output blob {f['sha256'][:12]} missing")
+            # the hasher's stat cache makes this a read only when the blob
+            # changed since it was last checked
+            if self.hasher.hash(blob) != f["sha256"]:
+                raise ValueError(f"output blob {f['sha256'][:12]} no longer matches its hash")
+        result = json.loads(entry["result"])
+        for k, v in result.items():
+            if workdir is not None and v == outputs.get("workdir"):
+                result[k] = workdir
+        added = []
+        for f in files:
+            dest = os.path.join(workdir, f["rel"]) if f.get("rel") is not None else f["path"]
+            if not (os.path.isfile(dest) and self.hasher.hash(dest) == f["sha256"]):
+                self.blobs.link_into(f["sha256"], dest)
+            if f.get("key"):
+                result[f["key"]] = dest
+            if f.get("manifest") is not None:
+                st = os.stat(dest)
+                added.append(dict(f["manifest"], path=dest, name=os.path.basename(dest), size=st.st_size,
+                                  mtime_ns=st.st_mtime_ns, sha256=f["sha256"], cas=True))
+        if added:
+            # outputs may all live outside the workdir, which then doesn't exist yet
+            os.makedirs(workdir, exist_ok=True)
+            manifest = ArtifactManifest(workdir)
+            try:
+                manifest.append(added)
+            finally:
+                manifest.close()
+            mem.record_artifacts(mem.connect(self.db_path), run_id, added)
+        result["cached"] = True
+        return result
+
+    def store(self, key: str, action: str, result: Dict[str, Any], workdir: Optional[str], mark: int = 0):
+        try:
+            files: List[Dict[str, Any]] = []
+            by_path: Dict[str, Dict[str, Any]] = {}
+            if workdir:
+                for a in read_artifacts(workdir)[mark:]:
+                    path = a.get("path")
+                    if path and os.path.isfile(path) and path not in by_path:
+                        by_path[path] = {"path": path, "sha256": a.get("sha256"), "manifest": a}
+            for k, v in result.items():
+                if isinstance(v, str) and os.path.isfile(v):
+                    path = os.path.abspath(v)
+                    by_path.setdefault(path, {"path": path})["key"] = k
+            blobs = {}
+            for path, f in by_path.items():
+                inside = workdir is not None and is_within(path, workdir)
+                f["rel"] = os.path.relpath(path, workdir) if inside else None
+                f["sha256"] = f.get("sha256") or self.hasher.hash(path)
+                self.blobs.put(path, f["sha256"], adopt=inside)
+                blobs[f["sha256"]] = os.path.getsize(path)
+                files.append(f)
+            conn = mem.connect(self.db_path)
+            outputs = json.dumps({"workdir": workdir, "files": files})
+            mem.step_cache_put(conn, key, action, json.dumps(result), outputs, list(blobs.items()))
+            mem.step_cache_evict(conn, self.max_entries, self.max_bytes)
+        except Exception as e:
+            logger.warning(f"caching the {action} step failed: {e}")
@@ -2,7 +2,11 @@ import os
 import sqlite3
 import json
 import time
+import threading
 from typing import Optional, Tuple, Dict, Any
+from agentmx.memory import migrations
+from agentmx.autonomy import notify
+from agentmx.safety import cancel
 
 DEFAULT_DB = ".agentmx/tasks.db"
 
@@ -11,11 +15,7 @@ def _ensure_dir(path: str):
     if d and not os.path.exists(d):
         os.makedirs(d, exist_ok=True)
 
-def connect(db_path: Optional[str] = None) -> sqlite3.Connection:
-    path = db_path or DEFAULT_DB
-    _ensure_dir(path)
-    conn = sqlite3.connect(path)
-    conn.execute("PRAGMA journal_mode=WAL;")
+def _m001_base(conn: sqlite3.Connection):
     conn.execute(
         "CREATE TABLE IF NOT EXISTS tasks ("
         "id INTEGER PRIMARY KEY AUTOINCREMENT,"
@@ -27,7 +27,27 @@ def connect(db_path: Optional[str] = None) -> sqlite3.Connection:
         "created_at REAL NOT NULL DEFAULT (strftime('%s','now'))"
         ");"
     )
-    conn.commit()
+
+def _m002_leases(conn: sqlite3.Connection):
+    conn.execute("ALTER TABLE tasks ADD COLUMN lease_owner TEXT")
+    conn.execute("ALTER TABLE tasks ADD COLUMN lease_expires REAL")
+    conn.execute("ALTER TABLE tasks ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+    # Tasks left 'running' by schedulers without leases are reclaimable.
+    conn.execute("UPDATE tasks SET lease_expires=0 WHERE status='running'")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks(status, priority DESC, created_at, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_lease ON tasks(status, lease_expires)")
+
+MIGRATIONS = [
+    _m001_base,
+    _m002_leases,
+]
+
+def connect(db_path: Optional[str] = None) -> sqlite3.Connection:
+    path = db_path or DEFAULT_DB
+    _ensure_dir(path)
+    conn = sqlite3.connect(path, timeout=30.0)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    migrations.migrate(conn, MIGRATIONS)
     return conn
 
 def enqueue(conn: sqlite3.Connection, ttype: str, payload: Dict[str, Any], priority: int = 0) -> int:
@@ -37,8 +57,17 @@ def enqueue(conn: sqlite3.Connection, ttype: str, payload: Dict[str, Any], prior
         (ttype, json.dumps(payload), "queued", priority),
     )
     conn.commit()
+    notify.notify(wake_dir(conn))
     return int(cur.lastrowid)
 
+def wake_dir(conn_or_path) -> str:
+    if isinstance(conn_or_path, sqlite3.Connection):
+        row = conn_or_path.execute("PRAGMA database_list").fetchone()
+        path = row[2] if row and row[2] else DEFAULT_DB
+    else:
+        path = conn_or_path or DEFAULT_DB
+    return os.path.abspath(path) + ".wake"
+
 def next_task(conn: sqlite3.Connection) -> Optional[Tuple[int, str, Dict[str, Any]]]:
     cur = conn.cursor()
     cur.execute(
@@ -54,10 +83,110 @@ def mark_running(conn: sqlite3.Connection, task_id: int, run_id: str):
     cur.execute("UPDATE tasks SET status='running', run_id=? WHERE id=?", (run_id, task_id))
     conn.commit()
 
-def mark_status(conn: sqlite3.Connection, task_id: int, status: str):
+def mark_status(conn: sqlite3.Connection, task_id: int, status: str, owner: Optional[str] = None) -> bool:
+    # With owner, only while that worker still holds the lease; a worker
+    # whose lease expired must not overwrite the new holder's outcome.
     cur = conn.cursor()
-    cur.execute("UPDATE tasks SET status=? WHERE id=?", (status, task_id))
+    if owner is None:
+        cur.execute("UPDATE tasks SET status=?, lease_owner=NULL, lease_expires=NULL WHERE id=?", (status, task_id))
+    else:
+        cur.execute("UPDATE tasks SET status=?, lease_owner=NULL, lease_expires=NULL WHERE id=? AND lease_owner=?",
+                    (status, task_id, owner))
     conn.commit()
+    return cur.rowcount == 1
+
+def sync_run_statuses(conn: sqlite3.Connection, updates):
+    # (status, run_id) rows from re-scoring; only finished tasks follow
+    conn.executemany(
+        "UPDATE tasks SET status=? WHERE run_id=? AND status IN ('completed','failed')", list(updates)
+    )
+    conn.commit()
+
+def _reclaim(conn: sqlite3.Connection, now: float, max_attempts: int) -> int:
+    cur = conn.execute(
+        "UPDATE tasks SET status=CASE WHEN attempts>=? THEN 'failed' ELSE 'queued' END, lease_owner=NULL, lease_expires=NULL "
+        "WHERE status='running' AND lease_expires IS NOT NULL AND lease_expires<?",
+        (max_attempts, now),
+    )
+    return cur.rowcount
+
+def reclaim_expired(conn: sqlite3.Connection, max_attempts: int = 3) -> int:
+    n = _reclaim(conn, time.time(), max_attempts)
+    conn.commit()
+    return n
+
+def claim_task(conn: sqlite3.Connection, owner: str, run_id: Optional[str] = None, lease_seconds: float = 60.0, max_attempts: int = 3) -> Optional[Tuple[int, str, Dict[str, Any]]]:
+    # Reclaiming expired leases and taking the next task happen under one
+    # write lock, so two workers can never claim the same row.
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        now = time.time()
+        _reclaim(conn, now, max_attempts)
+        row = conn.execute(
+            "UPDATE tasks SET status='running', run_id=COALESCE(?, run_id), lease_owner=?, lease_expires=?, attempts=attempts+1 "
+            "WHERE id=(SELECT id FROM tasks WHERE status='queued' ORDER BY priority DESC, created_at ASC, id ASC LIMIT 1) "
+            "RETURNING id, type, payload",
+            (run_id, owner, now + lease_seconds),
+        ).fetchone()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if not row:
+        return None
+    return int(row[0]), str(row[1]), json.loads(row[2])
+
+def heartbeat(conn: sqlite3.Connection, task_id: int, owner: str, lease_seconds: float = 60.0) -> bool:
+    cur = conn.execute(
+        "UPDATE tasks SET lease_expires=? WHERE id=? AND lease_owner=? AND status='running'",
+        (time.time() + lease_seconds, task_id, owner),
+    )
+    conn.commit()
+    return cur.rowcount == 1
+
+class LeaseKeeper:
+    def __init__(self, db_path: Optional[str], task_id: int, owner: str, lease_seconds: float = 60.0):
+        self.db_path = db_path
+        self.task_id = task_id
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        # cancelled when the lease is lost, to stop the work it covers
+        self.token = cancel.CancelToken()
+        self._stop = threading.Event()
+        self._t = None
+
+    def _loop(self):
+        conn = connect(self.db_path)
+        try:
+            while not self._stop.wait(max(0.05, self.lease_seconds / 3.0)):
+                try:
+                    if not heartbeat(conn, self.task_id, self.owner, self.lease_seconds):
+                        self.lost = True
+                        self.token.cancel("lease_lost")
+                        return
+                except sqlite3.Error:
+                    pass
+        finally:
+            conn.close()
+
+    def start(self):
+        self._t = threading.Thread(target=self._loop, name=f"lease-{self.task_id}", daemon=True)
+        self._t.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._t:
+            self._t.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
 
 def is_empty(conn: sqlite3.Connection) -> bool:
     cur = conn.cursor()
@@ -4,16 +4,17 @@ import uuid
 import time
 import argparse
 import json
-from loguru import logger
-from agentmx.core.config import load_config
-from agentmx.core.runner import AgentRunner
-from agentmx.autonomy import tasks as taskq
-from agentmx.autonomy import planner as planner_mod
-from agentmx.autonomy import executor as executor_mod
-from agentmx.autonomy import evaluator as evaluator_mod
-from agentmx.memory import store as mem
+import socket
+import threading
+from typing import Optional
+
+# Only the standard library is imported at module level; each subcommand
+# imports what it needs so `agentmx submit` and `--help` start fast.
 
 def cmd_run(args):
+    from loguru import logger
+    from agentmx.core.config import load_config
+    from agentmx.core.runner import AgentRunner
     cfg = load_config()
     run_id = str(uuid.uuid4())
     logger.info(f"Starting run {run_id} task='{args.task}'")
@@ -54,79 +55,218 @@ def _append_sched_log(line: str):
         pass
     _rotate_log(SCHED_LOG)
 
-def cmd_scheduler(args):
-    cfg = load_config()
-    poll_interval = int(cfg.get("autonomy.poll_interval", 10))
-    conn = taskq.connect()
-    if taskq.is_empty(conn):
-        taskq.enqueue(conn, "bootstrap_demo", {})
-    health = {"queue_depth": 0, "last_tick": None, "poll_interval": poll_interval, "last_success_ts": None, "last_error_count": 0}
-    while True:
+class _Health:
+    def __init__(self, poll_interval: int, workers: int):
+        self._lock = threading.Lock()
+        self.data = {"queue_depth": 0, "last_tick": None, "poll_interval": poll_interval, "last_success_ts": None, "last_error_count": 0, "workers": workers}
+
+    def update(self, **kw):
+        with self._lock:
+            self.data.update(kw)
+            self._write()
+
+    def error(self):
+        with self._lock:
+            self.data["last_error_count"] = int(self.data.get("last_error_count") or 0) + 1
+            self._write()
+
+    def _write(self):
         try:
-            health["last_tick"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-            try:
-                cur = taskq.connect()
-                health["queue_depth"] = int(cur.execute("SELECT COUNT(1) FROM tasks WHERE status='queued'").fetchone()[0])
-            except Exception:
-                health["queue_depth"] = 0
             os.makedirs(SCHED_DIR, exist_ok=True)
-            with open(SCHED_HEALTH, "w", encoding="utf-8") as f:
-                json.dump(health, f)
-            nxt = taskq.next_task(conn)
-            if not nxt:
-                _append_sched_log(f"{int(time.time())} idle queue_depth={health['queue_depth']}")
-                time.sleep(poll_interval)
-                continue
-            task_id, ttype, payload = nxt
-            run_id = uuid.uuid4().hex
-            start_ts = time.time()
-            _append_sched_log(f"{int(start_ts)} picked task_id={task_id} type={ttype} run_id={run_id}")
+            tmp = f"{SCHED_HEALTH}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.data, f)
+            os.replace(tmp, SCHED_HEALTH)
+        except Exception:
+            pass
+
+def _process_task(cfg, conn, task, run_id: str, health: "_Health", use_cache: bool = True, lease=None):
+    from agentmx.core.artifacts import read_artifacts
+    from agentmx.autonomy import tasks as taskq
+    from agentmx.autonomy import planner as planner_mod
+    from agentmx.autonomy import executor as executor_mod
+    from agentmx.autonomy import evaluator as evaluator_mod
+    from agentmx.memory import store as mem
+    task_id, ttype, payload = task
+    start_ts = time.time()
+    steps, verification = planner_mod.plan(ttype, payload)
+    exec_res = executor_mod.execute_steps(cfg, steps, run_id=run_id, use_cache=use_cache,
+                                          token=lease.token if lease is not None else None)
+    if lease is not None and lease.lost:
+        # another worker has the task now; its run is the one that counts
+        _append_sched_log(f"{int(time.time())} lease lost task_id={task_id} run_id={run_id}, result discarded")
+        return
+    workdir = cfg.workdir_for(run_id)
+    mconn = mem.connect()
+    eval_res = evaluator_mod.evaluate(workdir, verification, mem.artifacts_by_run(mconn, [run_id]).get(run_id))
+    # a plan whose steps failed doesn't pass on its artifacts alone
+    exec_ok = bool(exec_res["summary"]["ok"])
+    score = float(eval_res.get("score") or 0.0) if exec_ok else 0.0
+    threshold = evaluator_mod.threshold_for(cfg, ttype)
+    status = "completed" if score >= threshold else "failed"
+    if not taskq.mark_status(conn, task_id, status, owner=lease.owner if lease is not None else None):
+        _append_sched_log(f"{int(time.time())} lease lost task_id={task_id} run_id={run_id}, result discarded")
+        return
+    duration = max(0.0, time.time() - start_ts)
+    mem.record_run(mconn, run_id, status, duration, score)
+    mem.set_run_verification(mconn, run_id, ttype, verification, exec_ok=exec_ok)
+    mem.record_artifacts(mconn, run_id, read_artifacts(workdir))
+    if status != "completed":
+        from agentmx.skills.factory import SkillFactory
+        from agentmx.skills.registry import SkillRegistry
+        sf = SkillFactory(SkillRegistry(), max_new=1)
+        learn_res = sf.maybe_learn(run_id, threshold, score)
+        if learn_res.get("learned"):
+            mem.record_skill(mconn, learn_res["name"], learn_res["test_path"])
+    health.update(last_success_ts=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
+    _append_sched_log(f"{int(time.time())} finished task_id={task_id} status={status} score={score:.3f} duration={duration:.3f}s")
+
+def _worker_loop(cfg, worker_id: int, health: "_Health", stop: Optional[threading.Event] = None, use_cache: bool = True):
+    from agentmx.autonomy import tasks as taskq
+    from agentmx.autonomy import notify as notify_mod
+    poll_interval = int(cfg.get("autonomy.poll_interval", 10))
+    lease_seconds = float(cfg.get("autonomy.lease_seconds", 60))
+    max_attempts = int(cfg.get("autonomy.max_attempts", 3))
+    owner = f"{socket.gethostname()}:{os.getpid()}:{worker_id}"
+    conn = taskq.connect()
+    waker = notify_mod.WakeListener(taskq.wake_dir(conn))
+    if not waker.available:
+        _append_sched_log(f"{int(time.time())} wake channel unavailable worker={worker_id}, polling every {poll_interval}s")
+    try:
+        while not (stop and stop.is_set()):
             try:
-                taskq.mark_running(conn, task_id, run_id)
-                steps, verification = planner_mod.plan(ttype, payload)
-                executor_mod.execute_steps(cfg, steps, run_id=run_id)
-                workdir = cfg.get("execution.working_dir", f".agentmx/work/{run_id}").format(run_id=run_id)
-                eval_res = evaluator_mod.evaluate(workdir, verification)
-                score = float(eval_res.get("score") or 0.0)
-                default_thresh = float(cfg.get("autonomy.thresholds.default", 0.8))
-                threshold = float(cfg.get("autonomy.thresholds.bootstrap_demo", 1.0)) if ttype == "bootstrap_demo" else default_thresh
-                status = "completed" if score >= threshold else "failed"
-                taskq.mark_status(conn, task_id, status)
-                duration = max(0.0, time.time() - start_ts)
-                mconn = mem.connect()
-                mem.record_run(mconn, run_id, status, duration, score)
                 try:
-                    with open(os.path.join(workdir, "artifacts.json"), "r", encoding="utf-8") as f:
-                        arts = json.load(f)
+                    depth = int(conn.execute("SELECT COUNT(1) FROM tasks WHERE status='queued'").fetchone()[0])
                 except Exception:
-                    arts = []
-                mem.record_artifacts(mconn, run_id, arts)
-                if status != "completed":
-                    from agentmx.skills.factory import SkillFactory
-                    from agentmx.skills.registry import SkillRegistry
-                    sf = SkillFactory(SkillRegistry(), max_new=1)
-                    learn_res = sf.maybe_learn(run_id, threshold, score)
-                    if learn_res.get("learned"):
-                        mem.record_skill(mconn, learn_res["name"], learn_res["test_path"])
-                health["last_success_ts"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-                with open(SCHED_HEALTH, "w", encoding="utf-8") as f:
-                    json.dump(health, f)
-                _append_sched_log(f"{int(time.time())} finished task_id={task_id} status={status} score={score:.3f} duration={duration:.3f}s")
+                    depth = 0
+                health.update(last_tick=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), queue_depth=depth)
+                run_id = uuid.uuid4().hex
+                nxt = taskq.claim_task(conn, owner, run_id=run_id, lease_seconds=lease_seconds, max_attempts=max_attempts)
+                if not nxt:
+                    _append_sched_log(f"{int(time.time())} idle worker={worker_id} queue_depth={depth}")
+                    # Sleep until enqueue() signals or the poll interval
+                    # elapses (which also catches expiring leases).
+                    waker.wait(poll_interval)
+                    continue
+                task_id, ttype, _ = nxt
+                _append_sched_log(f"{int(time.time())} picked task_id={task_id} type={ttype} run_id={run_id} worker={worker_id}")
+                try:
+                    with taskq.LeaseKeeper(None, task_id, owner, lease_seconds) as lease:
+                        _process_task(cfg, conn, nxt, run_id, health, use_cache=use_cache, lease=lease)
+                except Exception as e:
+                    health.error()
+                    _append_sched_log(f"{int(time.time())} error task_id={task_id} err={e}")
             except Exception as e:
-                health["last_error_count"] = int(health.get("last_error_count") or 0) + 1
-                with open(SCHED_HEALTH, "w", encoding="utf-8") as f:
-                    json.dump(health, f)
-                _append_sched_log(f"{int(time.time())} error task_id={task_id} err={e}")
-            time.sleep(poll_interval)
-        except Exception as e:
-            health["last_error_count"] = int(health.get("last_error_count") or 0) + 1
-            try:
-                with open(SCHED_HEALTH, "w", encoding="utf-8") as f:
-                    json.dump(health, f)
-            except Exception:
-                pass
-            _append_sched_log(f"{int(time.time())} loop_error err={e}")
-            time.sleep(poll_interval)
+                health.error()
+                _append_sched_log(f"{int(time.time())} loop_error worker={worker_id} err={e}")
+                time.sleep(poll_interval)
+    finally:
+        waker.close()
+
+def _process_worker_main(worker_id: int, workers: int, use_cache: bool = True):
+    from agentmx.core.config import load_config
+    from agentmx.skills.browser import pool as browser_pool
+    cfg = load_config()
+    health = _Health(int(cfg.get("autonomy.poll_interval", 10)), workers)
+    browser_pool.warm_up_async(cfg)
+    _worker_loop(cfg, worker_id, health, use_cache=use_cache)
+
+def cmd_scheduler(args):
+    from agentmx.core.config import load_config
+    from agentmx.autonomy import tasks as taskq
+    from agentmx.skills.browser import pool as browser_pool
+    cfg = load_config()
+    poll_interval = int(cfg.get("autonomy.poll_interval", 10))
+    workers = max(1, int(args.workers or cfg.get("autonomy.workers", 1)))
+    mode = args.worker_mode or cfg.get("autonomy.worker_mode", "thread")
+    conn = taskq.connect()
+    if taskq.is_empty(conn):
+        taskq.enqueue(conn, "bootstrap_demo", {})
+    conn.close()
+    if mode != "process":
+        browser_pool.warm_up_async(cfg)
+    if workers == 1:
+        _worker_loop(cfg, 0, _Health(poll_interval, workers), use_cache=not args.no_cache)
+        return
+    if mode == "process":
+        import multiprocessing
+        procs = [multiprocessing.Process(target=_process_worker_main, args=(i, workers, not args.no_cache), daemon=True) for i in range(workers)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        return
+    health = _Health(poll_interval, workers)
+    threads = [threading.Thread(target=_worker_loop, args=(cfg, i, health, None, not args.no_cache), name=f"scheduler-{i}", daemon=True) for i in range(workers)]
+    for t in threads:
+        t.start()
+    try:
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(timeout=1.0)
+    except KeyboardInterrupt:
+        pass
+
+def cmd_gc(args):
+    import shutil
+    from loguru import logger
+    from agentmx.core.config import load_config
+    from agentmx.core.cas import BlobStore, DEFAULT_ROOT
+    from agentmx.memory import store as mem
+    cfg = load_config()
+    conn = mem.connect()
+    for run_id in args.forget_run or []:
+        n = mem.forget_run_artifacts(conn, run_id)
+        workdir = cfg.workdir_for(run_id)
+        if args.purge_workdir and os.path.isdir(workdir):
+            shutil.rmtree(workdir, ignore_errors=True)
+        logger.info(f"forgot {n} artifacts of run {run_id}")
+    removed = BlobStore(cfg.get("artifacts.cas_dir", DEFAULT_ROOT)).gc(conn, grace=args.grace)
+    logger.info(f"removed {len(removed)} unreferenced blobs")
+
+def cmd_evaluate(args):
+    from agentmx.core.config import load_config
+    from agentmx.autonomy import evaluator as evaluator_mod
+    from agentmx.autonomy import tasks as taskq
+    from agentmx.memory import store as mem
+    cfg = load_config()
+    try:
+        since = evaluator_mod.parse_since(args.since) if args.since else 0.0
+    except ValueError as e:
+        print(f"agentmx: {e}", file=sys.stderr)
+        sys.exit(2)
+    tasks_conn = taskq.connect()
+    try:
+        res = evaluator_mod.rescore(cfg, mem.connect(), since=since, workers=args.workers, batch_size=args.batch,
+                                    dry_run=args.dry_run, tasks_conn=tasks_conn)
+    finally:
+        tasks_conn.close()
+    print(json.dumps(res))
+
+def cmd_submit(args):
+    from agentmx.client import Client, ClientError, TERMINAL_STATUSES
+    client = Client(args.api_url)
+    deadline = time.monotonic() + args.timeout
+    try:
+        run_id = client.submit(args.task, deadline=deadline)
+        print(f"run_id={run_id}", file=sys.stderr, flush=True)
+        if args.no_follow:
+            print(run_id)
+            sys.exit(0)
+        for _, record in client.follow(run_id, deadline=deadline):
+            print(record, flush=True)
+        st = client.status(run_id)
+    except ClientError as e:
+        print(f"agentmx: {e}", file=sys.stderr)
+        sys.exit(2)
+    except KeyboardInterrupt:
+        # the run keeps going on the server
+        sys.exit(130)
+    print(json.dumps(st), file=sys.stderr)
+    sys.exit(0 if st.get("status") == "completed" else 1 if st.get("status") in TERMINAL_STATUSES else 2)
+
+def _add_client_args(p):
+    p.add_argument("--api-url", default=None, help="API base URL (default: $AGENTMX_API_URL or http://127.0.0.1:8937)")
 
 def main():
     parser = argparse.ArgumentParser(prog="agentmx", description="AgentM-X runner")
@@ -137,13 +277,54 @@ def main():
     runp.add_argument("--timeout", type=int, default=3600)
     runp.add_argument("--net", choices=["on","off"], default="on")
     runp.add_argument("--allow-safety-edit", choices=["yes","no"], default="no")
+    runp.add_argument("--via-api", action="store_true", help="submit to a running local API and stream its log")
+    _add_client_args(runp)
+
+    subp = sub.add_parser("submit", help="submit a task to a running local API and stream its log")
+    subp.add_argument("task", type=str)
+    subp.add_argument("--timeout", type=int, default=3600)
+    subp.add_argument("--no-follow", action="store_true", help="print the run id and return")
+    _add_client_args(subp)
+
+    schedp = sub.add_parser("scheduler")
+    schedp.add_argument("--workers", type=int, default=None)
+    schedp.add_argument("--worker-mode", choices=["thread","process"], default=None)
+    schedp.add_argument("--no-cache", action="store_true", help="run every plan step, ignoring memoized results")
 
-    sub.add_parser("scheduler")
+    gcp = sub.add_parser("gc")
+    gcp.add_argument("--forget-run", action="append", default=[])
+    gcp.add_argument("--purge-workdir", action="store_true")
+    gcp.add_argument("--grace", type=float, default=3600.0)
+
+    evalp = sub.add_parser("evaluate", help="re-score past runs against the current config")
+    evalp.add_argument("--since", default=None, help="only runs created since: 7d, 12h, 2024-05-01 or epoch seconds")
+    evalp.add_argument("--workers", type=int, default=4)
+    evalp.add_argument("--batch", type=int, default=500, help="score updates per transaction")
+    evalp.add_argument("--dry-run", action="store_true", help="report what would change without writing")
 
     args = parser.parse_args()
-    if args.cmd == "run":
-        cmd_run(args)
-    elif args.cmd == "scheduler":
-        cmd_scheduler(args)
-    else:
-        parser.print_help()
+    if args.cmd == "run" and args.via_api:
+        # the API decides these for the runs it starts
+        if args.net != "on" or args.allow_safety_edit != "no":
+            parser.error("--net and --allow-safety-edit can't be combined with --via-api")
+        args.no_follow = False
+        args.cmd = "submit"
+    if args.cmd == "submit":
+        cmd_submit(args)
+        return
+    from loguru import logger
+    from agentmx.core.config import ConfigError
+    try:
+        if args.cmd == "run":
+            cmd_run(args)
+        elif args.cmd == "scheduler":
+            cmd_scheduler(args)
+        elif args.cmd == "gc":
+            cmd_gc(args)
+        elif args.cmd == "evaluate":
+            cmd_evaluate(args)
+        else:
+            parser.print_help()
+    except ConfigError as e:
+        logger.error(f"invalid configuration: {e}")
+        sys.exit(2)
@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import http.client
+import urllib.error
+import urllib.request
+from typing import Dict, Iterator, Optional, Tuple
+
+# Thin client for a running local API (agentmx submit / agentmx run --via-api).
+# Standard library only, so scripted callers don't pay for importing the
+# runner, the store or the browser stack.
+
+DEFAULT_URL = "http://127.0.0.1:8937"
+URL_ENV = "AGENTMX_API_URL"
+KEY_ENV = "AGENTMX_API_KEY"
+# same as agentmx.core.events, which pulls in asyncio
+TERMINAL_STATUSES = ("completed", "aborted", "failed")
+
+class ClientError(Exception):
+    pass
+
+class Client:
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None, timeout: float = 30.0):
+        self.base_url = (base_url or os.environ.get(URL_ENV) or DEFAULT_URL).rstrip("/")
+        self.api_key = api_key if api_key is not None else os.environ.get(KEY_ENV)
+        # per-socket-operation timeout; the log stream pings every ~12s
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, body: Optional[Dict] = None, headers: Optional[Dict] = None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            req.add_header("Content-Type", "application/json")
+        if self.api_key:
+            req.add_header("X-API-Key", self.api_key)
+        for k, v in (headers or {}).items():
+            req.add_header(k, v)
+        try:
+            return urllib.request.urlopen(req, timeout=self.timeout)
+        except urllib.error.HTTPError:
+            raise
+        except (urllib.error.URLError, OSError) as e:
+            raise ClientError(f"cannot reach {self.base_url}: {getattr(e, 'reason', e)}")
+
+    def _json(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, Dict, Dict]:
+        try:
+            with self._request(method, path, body) as resp:
+                return resp.status, json.loads(resp.read() or b"{}"), dict(resp.headers)
+        except urllib.error.HTTPError as e:
+            try:
+                payload = json.loads(e.read() or b"{}")
+            except ValueError:
+                payload = {}
+            return e.code, payload, dict(e.headers or {})
+
+    def submit(self, task: str, deadline: Optional[float] = None) -> str:
+        # Waits out 429s (honouring Retry-After) until the deadline.
+        while True:
+            code, payload, headers = self._json("POST", "/run", {"task": task})
+            if code == 200 and payload.get("run_id"):
+                return payload["run_id"]
+            if code == 429:
+                try:
+                    wait = float(headers.get("Retry-After", 1))
+                except ValueError:
+                    wait = 1.0
+                if deadline is None or time.monotonic() + wait < deadline:
+                    time.sleep(wait)
+                    continue
+            raise ClientError(f"POST /run failed ({code}): {payload.get('detail', payload)}")
+
+    def status(self, run_id: str) -> Dict:
+        code, payload, _ = self._json("GET", f"/runs/{run_id}/status")
+        if code != 200:
+            raise ClientError(f"GET /runs/{run_id}/status failed ({code}): {payload.get('detail', payload)}")
+        return payload
+
+    def _stream_once(self, run_id: str, after: int) -> Iterator[Tuple[int, str]]:
+        headers = {"Accept": "text/event-stream", "Last-Event-ID": str(after)}
+        try:
+            resp = self._request("GET", f"/runs/{run_id}/logs/stream", headers=headers)
+        except urllib.error.HTTPError as e:
+            raise ClientError(f"GET /runs/{run_id}/logs/stream failed ({e.code})")
+        with resp:
+            seq, data = None, []
+            for raw in resp:
+                line = raw.decode("utf-8").rstrip("\r\n")
+                if line.startswith("id: "):
+                    seq = int(line[4:])
+                elif line.startswith("data: "):
+                    data.append(line[6:])
+                elif not line:
+                    if seq is not None and data:
+                        yield seq, "\n".join(data)
+                    seq, data = None, []
+
+    def follow(self, run_id: str, deadline: Optional[float] = None) -> Iterator[Tuple[int, str]]:
+        # Yields (seq, audit record) from the first record on, reconnecting
+        # with Last-Event-ID until the run reaches a terminal status.
+        after = 0
+        while True:
+            try:
+                for seq, record in self._stream_once(run_id, after):
+                    after = seq
+                    yield seq, record
+            except (OSError, http.client.HTTPException):
+                # dropped or idle connection; resume after the last seq
+                pass
+            if self.status(run_id).get("status") in TERMINAL_STATUSES:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                raise ClientError(f"timed out waiting for run {run_id}")
+            time.sleep(0.2)
@@ -0,0 +1,76 @@
+import threading
+from typing import List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor, wait as futures_wait
+
+class QueueFull(Exception):
+    pass
+
+class RunPool:
+    def __init__(self, max_concurrent: int = 4, max_queued: int = 32):
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_queued = max(0, int(max_queued))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="agentmx-run")
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        # future -> submitted args, until it finishes or is cancelled
+        self._pending = {}
+
+    def _wrap(self, fn, args, kwargs):
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _done(self, fut: Future):
+        with self._lock:
+            self._admitted -= 1
+            self._pending.pop(fut, None)
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._admitted >= self.max_concurrent + self.max_queued:
+                raise QueueFull()
+            self._admitted += 1
+        try:
+            fut = self._executor.submit(self._wrap, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._admitted -= 1
+            raise
+        with self._lock:
+            self._pending[fut] = args
+        fut.add_done_callback(self._done)
+        return fut
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self._running,
+                "queued": max(0, self._admitted - self._running),
+                "max_concurrent": self.max_concurrent,
+                "max_queued": self.max_queued,
+            }
+
+    def running(self) -> List[tuple]:
+        # args of the submissions executing right now
+        with self._lock:
+            return [args for fut, args in self._pending.items() if fut.running()]
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        # True once every admitted submission has finished
+        with self._lock:
+            pending = list(self._pending)
+        return not futures_wait(pending, timeout=timeout).not_done
+
+    def shutdown(self, wait: bool = False) -> List[tuple]:
+        # Queued submissions are cancelled; their args are returned so the
+        # caller can settle whatever it recorded for them.
+        with self._lock:
+            pending = list(self._pending.items())
+        cancelled = [args for fut, args in pending if fut.cancel()]
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        return cancelled
@@ -0,0 +1,53 @@
+import os
+import json
+import threading
+from typing import Any, Dict, Iterable, List
+
+MANIFEST_NAME = "artifacts.jsonl"
+LEGACY_MANIFEST_NAME = "artifacts.json"
+
+class ArtifactManifest:
+    # One JSON object per line, appended and flushed per batch. A crash can
+    # at worst leave a torn last line, which read_artifacts() skips. The
+    # file is opened on the first append, so a manifest that is never
+    # written to (or never closed) holds no file handle.
+    def __init__(self, workdir: str):
+        self.path = os.path.join(workdir, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self._f = None
+
+    def append(self, entries: Iterable[Dict[str, Any]]):
+        data = b"".join(json.dumps(e).encode() + b"\n" for e in entries)
+        if not data:
+            return
+        with self._lock:
+            if self._f is None:
+                self._f = open(self.path, "ab")
+            self._f.write(data)
+            self._f.flush()
+
+    def close(self):
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+
+def read_artifacts(workdir: str) -> List[Dict[str, Any]]:
+    path = os.path.join(workdir, MANIFEST_NAME)
+    if os.path.exists(path):
+        out = []
+        with open(path, "rb") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    out.append(json.loads(raw))
+                except ValueError:
+                    continue
+        return out
+    try:
+        with open(os.path.join(workdir, LEGACY_MANIFEST_NAME), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, list) else []
+    except Exception:
+        return []
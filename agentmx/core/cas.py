@@ -0,0 +1,204 @@
+import os
+import shutil
+import sqlite3
+import stat
+import sys
+import threading
+import time
+from typing import List
+
+DEFAULT_ROOT = ".agentmx/cas"
+_FICLONE = 0x40049409
+# below this a reflink saves nothing over a copy, so it isn't tried
+REFLINK_MIN = 64 * 1024
+
+def _reflink(src: str, dst: str) -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        import fcntl
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        return True
+    except (OSError, ImportError):
+        try:
+            os.unlink(dst)
+        except OSError:
+            pass
+        return False
+
+def _tmp_name(path: str) -> str:
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+def _clone(src: str, dst: str) -> str:
+    if os.path.getsize(src) >= REFLINK_MIN and _reflink(src, dst):
+        return "reflink"
+    shutil.copyfile(src, dst)
+    return "copy"
+
+def _materialize(src: str, dst: str) -> str:
+    # Puts a copy of src at dst atomically. Never a hardlink: dst is a path
+    # writers may rewrite in place, which would change the blob (and every
+    # other run linked to it). A reflink shares blocks copy-on-write.
+    tmp = _tmp_name(dst)
+    method = _clone(src, tmp)
+    try:
+        os.replace(tmp, dst)
+    except OSError:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return method
+
+class BlobStore:
+    # Files keyed by SHA-256 under root/ab/cdef.... Blobs are read-only and
+    # share an inode with a workdir file only once seal() says that file is
+    # final; reference counts live in the memory store's blobs table and are
+    # kept in step with the artifacts table by triggers.
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = os.path.abspath(root)
+        # fan-out directories known to exist
+        self._dirs: set = set()
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:])
+
+    def has(self, sha256: str) -> bool:
+        return os.path.exists(self.blob_path(sha256))
+
+    def put(self, path: str, sha256: str, adopt: bool = False) -> str:
+        # adopt=True means the caller owns path (e.g. a file in the run
+        # workdir): when the blob already exists and the filesystem can
+        # reflink, path is replaced by a reflink of it so the blocks are
+        # stored once. Either way path stays a separate, writable file.
+        dst = self.blob_path(sha256)
+        if os.path.exists(dst):
+            # a fresh ctime keeps gc from collecting a blob whose artifact
+            # rows the caller hasn't recorded yet
+            _touch(dst)
+            if adopt and not _same_file(path, dst):
+                _relink(dst, path)
+            return dst
+        parent = os.path.dirname(dst)
+        if parent not in self._dirs:
+            os.makedirs(parent, exist_ok=True)
+            self._dirs.add(parent)
+        tmp = _tmp_name(dst)
+        try:
+            _clone(path, tmp)
+        except OSError:
+            _unlink_quiet(tmp)
+            raise
+        os.chmod(tmp, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        if os.path.exists(dst):
+            os.unlink(tmp)
+            _touch(dst)
+            if adopt and not _same_file(path, dst):
+                _relink(dst, path)
+        else:
+            os.replace(tmp, dst)
+        return dst
+
+    def seal(self, path: str, sha256: str) -> str:
+        # For files that won't be written again (a finished run's
+        # artifacts): path becomes the blob itself, so its bytes are stored
+        # once. A reflink where the filesystem has one, else a hardlink,
+        # which shares the blob's read-only mode. Different filesystems
+        # keep the copy.
+        blob = self.blob_path(sha256)
+        if _same_file(path, blob):
+            return "link"
+        tmp = _tmp_name(path)
+        if os.path.getsize(blob) >= REFLINK_MIN and _reflink(blob, tmp):
+            method = "reflink"
+        else:
+            try:
+                os.link(blob, tmp)
+            except OSError:
+                return "copy"
+            method = "link"
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            _unlink_quiet(tmp)
+            raise
+        return method
+
+    def link_into(self, sha256: str, dest: str) -> str:
+        os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+        return _materialize(self.blob_path(sha256), dest)
+
+    def gc(self, conn: sqlite3.Connection, grace: float = 3600.0) -> List[str]:
+        # Deletes blobs whose refcount dropped to zero, plus files that
+        # never got a blobs row (abandoned puts), once untouched for grace
+        # seconds: put() refreshes a blob's ctime before its artifact rows
+        # are recorded.
+        removed = []
+        cutoff = time.time() - grace
+        dead = [r[0] for r in conn.execute("SELECT sha256 FROM blobs WHERE refcount<=0").fetchall()]
+        for sha in dead:
+            try:
+                if os.stat(self.blob_path(sha)).st_ctime >= cutoff:
+                    continue
+                os.unlink(self.blob_path(sha))
+                removed.append(sha)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            conn.execute("DELETE FROM blobs WHERE sha256=? AND refcount<=0", (sha,))
+        conn.commit()
+        if os.path.isdir(self.root):
+            for sub in os.scandir(self.root):
+                if not sub.is_dir():
+                    continue
+                for entry in os.scandir(sub.path):
+                    sha = sub.name + entry.name
+                    if entry.name.endswith(".tmp") or len(sha) != 64:
+                        if entry.stat().st_ctime < cutoff:
+                            _unlink_quiet(entry.path)
+                        continue
+                    if entry.stat().st_ctime >= cutoff:
+                        continue
+                    if conn.execute("SELECT 1 FROM blobs WHERE sha256=? AND refcount>0", (sha,)).fetchone() is None:
+                        _unlink_quiet(entry.path)
+                        removed.append(sha)
+        return removed
+
+def _touch(path: str):
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def _relink(blob: str, path: str):
+    # share the blob's blocks only where that stays copy-on-write
+    if os.path.getsize(blob) < REFLINK_MIN:
+        return
+    tmp = _tmp_name(path)
+    if _reflink(blob, tmp):
+        try:
+            os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+            os.replace(tmp, path)
+        except OSError:
+            _unlink_quiet(tmp)
+
+def _same_file(a: str, b: str) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+def _unlink_quiet(path: str):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+def is_within(path: str, directory: str) -> bool:
+    try:
+        return os.path.commonpath([os.path.abspath(path), os.path.abspath(directory)]) == os.path.abspath(directory)
+    except ValueError:
+        return False
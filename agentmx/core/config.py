@@ -1,26 +1,252 @@
 import os
+import copy
+import threading
 import yaml
-from dataclasses import dataclass
-from typing import Any, Dict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from loguru import logger
 
 CONFIG_PATHS = ["config.yaml", "config.yml", "config.example.yaml"]
 
-@dataclass
+class ConfigError(ValueError):
+    pass
+
+def _flatten(data: Dict[str, Any], prefix: str, out: Dict[str, Any]) -> Dict[str, Any]:
+    # every dotted path, including intermediate mappings, so get() is a
+    # single dict lookup
+    for k, v in data.items():
+        key = f"{prefix}{k}"
+        out[key] = v
+        if isinstance(v, dict):
+            _flatten(v, key + ".", out)
+    return out
+
+def _bool(v):
+    if not isinstance(v, bool):
+        return "must be true or false"
+
+def _str(v):
+    if not isinstance(v, str) or not v:
+        return "must be a non-empty string"
+
+def _template(v):
+    if not isinstance(v, str) or not v:
+        return "must be a non-empty string"
+    try:
+        v.format(run_id="x")
+    except (KeyError, IndexError, ValueError):
+        return "may only use the {run_id} placeholder"
+
+def _int(minimum: int):
+    def check(v):
+        if isinstance(v, bool) or not isinstance(v, int):
+            return "must be an integer"
+        if v < minimum:
+            return f"must be >= {minimum}"
+    return check
+
+def _number(minimum: float, exclusive: bool = False):
+    def check(v):
+        if isinstance(v, bool) or not isinstance(v, (int, float)):
+            return "must be a number"
+        if v < minimum or (exclusive and v == minimum):
+            return f"must be {'>' if exclusive else '>='} {minimum}"
+    return check
+
+def _choice(*options):
+    def check(v):
+        if v not in options:
+            return f"must be one of {', '.join(options)}"
+    return check
+
+def _policy_rules(v):
+    if not isinstance(v, list):
+        return "must be a list of rules"
+    from agentmx.safety.policy import parse_rule
+    for rule in v:
+        try:
+            parse_rule(rule)
+        except ValueError as e:
+            return str(e)
+
+def _network_patterns(v):
+    if not isinstance(v, list):
+        return "must be a list of patterns"
+    from agentmx.safety.network import parse_pattern
+    for pattern in v:
+        try:
+            parse_pattern(pattern)
+        except ValueError as e:
+            return str(e)
+
+# Keys the code reads, checked whenever they are present. Unknown keys are
+# left alone.
+RULES: Dict[str, Callable[[Any], Optional[str]]] = {
+    "approvals.api_key_required": _bool,
+    "execution.working_dir": _template,
+    "execution.kill_switch_file": _str,
+    "skills.max_new_skill_per_run": _int(0),
+    "browser.downloads_dir": _template,
+    "browser.pool.enabled": _bool,
+    "browser.pool.size": _int(0),
+    "browser.pool.acquire_timeout": _number(0, exclusive=True),
+    "browser.pool.recycle_after": _int(0),
+    "browser.pool.warm_up": _bool,
+    "browser.async.enabled": _bool,
+    "browser.async.max_pages": _int(1),
+    "browser.async.page_timeout": _number(0, exclusive=True),
+    "api.max_concurrent_runs": _int(1),
+    "api.max_queued_runs": _int(0),
+    "api.retry_after_seconds": _number(0),
+    "api.shutdown_grace_seconds": _number(0),
+    "api.config_reload_interval": _number(0),
+    "audit.durability": _choice("none", "flush", "fsync"),
+    "audit.flush_bytes": _int(1),
+    "audit.flush_interval_ms": _number(0),
+    "artifacts.db_batch": _int(1),
+    "artifacts.cas": _bool,
+    "artifacts.cas_dir": _str,
+    "artifacts.hash_workers": _int(0),
+    "autonomy.poll_interval": _number(0, exclusive=True),
+    "autonomy.workers": _int(1),
+    "autonomy.worker_mode": _choice("thread", "process"),
+    "autonomy.lease_seconds": _number(0, exclusive=True),
+    "autonomy.max_attempts": _int(1),
+    "autonomy.executor.max_workers": _int(1),
+    "autonomy.executor.mode": _choice("thread", "process"),
+    "autonomy.executor.policy": _choice("fail_fast", "continue"),
+    "autonomy.executor.step_timeout": _number(0),
+    "autonomy.cache.enabled": _bool,
+    "autonomy.cache.max_entries": _int(0),
+    "autonomy.cache.max_bytes": _int(0),
+    "policy.commands.deny": _policy_rules,
+    "policy.commands.allow": _policy_rules,
+    "policy.cache_size": _int(0),
+    "network.default": _choice("allow", "deny"),
+    "network.deny_patterns": _network_patterns,
+    "network.allow_patterns": _network_patterns,
+    "network.dns_pinning": _bool,
+    "network.dns_ttl": _number(0),
+    "network.cache_size": _int(0),
+}
+PREFIX_RULES: Dict[str, Callable[[Any], Optional[str]]] = {
+    "autonomy.thresholds.": _number(0),
+}
+
+def validate(flat: Dict[str, Any]) -> List[str]:
+    errors = []
+    for key, value in flat.items():
+        check = RULES.get(key)
+        if check is None:
+            for prefix, rule in PREFIX_RULES.items():
+                if key.startswith(prefix):
+                    check = rule
+                    break
+        if check is not None:
+            msg = check(value)
+            if msg:
+                errors.append(f"{key} {msg} (got {value!r})")
+    return errors
+
+@dataclass(frozen=True)
 class Config:
     raw: Dict[str, Any]
+    path: Optional[str] = None
+    mtime_ns: int = 0
+    _flat: Dict[str, Any] = field(init=False, repr=False, compare=False)
+    # read on every request or run; precomputed with the same defaults the
+    # call sites used
+    api_key_required: bool = field(init=False, repr=False, compare=False)
+    working_dir: str = field(init=False, repr=False, compare=False)
+    kill_switch_file: str = field(init=False, repr=False, compare=False)
+    downloads_dir: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if not isinstance(self.raw, dict):
+            raise ConfigError(f"{self.path or 'config'}: top level must be a mapping")
+        raw = copy.deepcopy(self.raw)
+        flat = _flatten(raw, "", {})
+        errors = validate(flat)
+        if errors:
+            raise ConfigError(f"{self.path or 'config'}: " + "; ".join(errors))
+        setattr_ = object.__setattr__
+        setattr_(self, "raw", raw)
+        setattr_(self, "_flat", flat)
+        setattr_(self, "api_key_required", flat.get("approvals.api_key_required", True))
+        setattr_(self, "working_dir", flat.get("execution.working_dir", ".agentmx/work/{run_id}"))
+        setattr_(self, "kill_switch_file", flat.get("execution.kill_switch_file", ".agentmx/STOP"))
+        setattr_(self, "downloads_dir", flat.get("browser.downloads_dir", ".agentmx/work/{run_id}/browser"))
 
     def get(self, path: str, default=None):
-        cur = self.raw
-        for part in path.split("."):
-            if not isinstance(cur, dict) or part not in cur:
-                return default
-            cur = cur[part]
-        return cur
+        return self._flat.get(path, default)
 
-def load_config() -> Config:
+    def workdir_for(self, run_id: str) -> str:
+        return self.working_dir.format(run_id=run_id)
+
+def find_config_path() -> Optional[str]:
     for p in CONFIG_PATHS:
         if os.path.exists(p):
-            with open(p, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f) or {}
-            return Config(raw=data)
-    return Config(raw={})
+            return os.path.abspath(p)
+    return None
+
+def load_config_file(path: str) -> Config:
+    try:
+        st = os.stat(path)
+        with open(path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+    except yaml.YAMLError as e:
+        raise ConfigError(f"{path}: invalid YAML: {e}")
+    return Config(raw=data if data is not None else {}, path=path, mtime_ns=st.st_mtime_ns)
+
+def load_config() -> Config:
+    path = find_config_path()
+    if path is None:
+        return Config(raw={})
+    return load_config_file(path)
+
+class ConfigWatcher:
+    # Polls the config file's mtime and hands a freshly validated Config to
+    # on_change. A file that fails to load or validate is logged and the
+    # current config stays in place.
+    def __init__(self, on_change: Callable[[Config], None], current: Optional[Config] = None, interval: float = 2.0):
+        self.on_change = on_change
+        self.interval = interval
+        self._seen = (current.path, current.mtime_ns) if current is not None else (None, 0)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> bool:
+        path = find_config_path()
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns if path else 0
+        except OSError:
+            return False
+        if (path, mtime_ns) == self._seen:
+            return False
+        self._seen = (path, mtime_ns)
+        try:
+            new = load_config_file(path) if path else Config(raw={})
+        except (ConfigError, OSError) as e:
+            logger.error(f"config not reloaded: {e}")
+            return False
+        self.on_change(new)
+        return True
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.warning(f"config watcher error: {e}")
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="agentmx-config-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set
+
+TERMINAL_STATUSES = ("completed", "aborted", "failed")
+
+class Subscription:
+    def __init__(self, broadcaster: "Broadcaster", run_id: str, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.broadcaster = broadcaster
+        self.run_id = run_id
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        # Set when an event had to be dropped; the reader must catch up from
+        # the audit file before trusting the queue again.
+        self.overflowed = False
+
+    def _offer(self, event: Dict[str, Any]):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broadcaster.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Broadcaster:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: Dict[str, Set[Subscription]] = {}
+        self._active: Dict[str, int] = {}
+        self._flushers: Dict[str, List[Callable[[], None]]] = {}
+
+    def open(self, run_id: str, flush: Optional[Callable[[], None]] = None):
+        with self._lock:
+            self._active[run_id] = self._active.get(run_id, 0) + 1
+            if flush is not None:
+                self._flushers.setdefault(run_id, []).append(flush)
+
+    def close(self, run_id: str, flush: Optional[Callable[[], None]] = None):
+        with self._lock:
+            n = self._active.get(run_id, 0) - 1
+            if n > 0:
+                self._active[run_id] = n
+            else:
+                self._active.pop(run_id, None)
+            if flush is not None and flush in self._flushers.get(run_id, ()):
+                self._flushers[run_id].remove(flush)
+                if not self._flushers[run_id]:
+                    self._flushers.pop(run_id)
+
+    def flush(self, run_id: str):
+        # Producers may buffer writes; readers about to go to disk call this
+        # so everything already published is visible in the file.
+        for fn in list(self._flushers.get(run_id, ())):
+            try:
+                fn()
+            except Exception:
+                pass
+
+    def is_active(self, run_id: str) -> bool:
+        return run_id in self._active
+
+    def subscribe(self, run_id: str, maxsize: int = 1000) -> Subscription:
+        sub = Subscription(self, run_id, asyncio.get_running_loop(), maxsize)
+        with self._lock:
+            self._subs.setdefault(run_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            subs = self._subs.get(sub.run_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    self._subs.pop(sub.run_id, None)
+
+    def subscribers(self, run_id: str) -> int:
+        with self._lock:
+            return len(self._subs.get(run_id, ()))
+
+    def publish(self, run_id: str, event: Dict[str, Any]):
+        subs = self._subs.get(run_id)
+        if not subs:
+            return
+        with self._lock:
+            targets = list(subs)
+        for sub in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub._offer, event)
+            except RuntimeError:
+                # Subscriber's loop is gone.
+                self.unsubscribe(sub)
+
+BROADCASTER = Broadcaster()
@@ -0,0 +1,144 @@
+import os
+import mmap
+import hashlib
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from agentmx.core.spans import timed
+
+MMAP_THRESHOLD = 4 * 1024 * 1024
+MMAP_WINDOW = 64 * 1024 * 1024
+READ_BUFFER = 1024 * 1024
+# Below this, dispatching to the pool costs more than hashing in place.
+INLINE_THRESHOLD = 64 * 1024
+
+CacheKey = Tuple[str, int, int, int]
+
+@timed("artifact.hash")
+def hash_file(path: str) -> str:
+    # hashlib drops the GIL while digesting large buffers, so several of
+    # these can run in parallel on a thread pool.
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            try:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    view = memoryview(m)
+                    try:
+                        for off in range(0, size, MMAP_WINDOW):
+                            h.update(view[off:off + MMAP_WINDOW])
+                    finally:
+                        view.release()
+                return h.hexdigest()
+            except (OSError, ValueError):
+                f.seek(0)
+                h = hashlib.sha256()
+        if size < READ_BUFFER:
+            h.update(f.read())
+            return h.hexdigest()
+        buf = bytearray(READ_BUFFER)
+        mv = memoryview(buf)
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(mv[:n])
+    return h.hexdigest()
+
+def _done(value) -> Future:
+    fut = Future()
+    fut.set_result(value)
+    return fut
+
+class Hasher:
+    # Thread-pooled SHA-256 with a cache keyed on (path, size, mtime_ns,
+    # inode): re-registering an unchanged file returns immediately, and
+    # concurrent requests for the same file share one computation.
+    def __init__(self, max_workers: Optional[int] = None, cache_size: int = 4096):
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.cache_size = cache_size
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="agentmx-hash")
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[CacheKey, str]" = OrderedDict()
+        self._inflight: Dict[CacheKey, Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(path: str, st: os.stat_result) -> CacheKey:
+        return (path, st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def _remember(self, key: CacheKey, sha: str):
+        self._cache[key] = sha
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def prime(self, path: str, sha256: str):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            self._remember(self._key(os.path.abspath(path), st), sha256)
+
+    def submit(self, path: str) -> "Future[Optional[str]]":
+        path = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return _done(None)
+        key = self._key(path, st)
+        with self._lock:
+            sha = self._cache.get(key)
+            if sha is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return _done(sha)
+            fut = self._inflight.get(key)
+            if fut is not None:
+                self.hits += 1
+                return fut
+            self.misses += 1
+            if st.st_size >= INLINE_THRESHOLD:
+                # in the caller's context, so the hash_file span counts
+                # towards the run that asked for it
+                fut = self._executor.submit(contextvars.copy_context().run, hash_file, path)
+                self._inflight[key] = fut
+        if fut is not None:
+            fut.add_done_callback(lambda f, k=key: self._finish(k, f))
+            return fut
+        try:
+            sha = hash_file(path)
+        except OSError:
+            return _done(None)
+        with self._lock:
+            self._remember(key, sha)
+        return _done(sha)
+
+    def _finish(self, key: CacheKey, fut: Future):
+        with self._lock:
+            self._inflight.pop(key, None)
+            if not fut.cancelled() and fut.exception() is None:
+                self._remember(key, fut.result())
+
+    def hash(self, path: str) -> Optional[str]:
+        return self.submit(path).result()
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+_DEFAULT: Optional[Hasher] = None
+_DEFAULT_LOCK = threading.Lock()
+
+def get_hasher(max_workers: Optional[int] = None) -> Hasher:
+    # The pool is shared process-wide; max_workers only applies on first use.
+    global _DEFAULT
+    if _DEFAULT is None:
+        with _DEFAULT_LOCK:
+            if _DEFAULT is None:
+                _DEFAULT = Hasher(max_workers=max_workers)
+    return _DEFAULT
@@ -2,97 +2,271 @@ import os
 import json
 import time
 import sys
-import hashlib
 import mimetypes
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait
 from datetime import datetime
 from loguru import logger
 from typing import Optional
 from agentmx.safety.runner import StopFileGuard
+from agentmx.safety import cancel
 from agentmx.safety.policy import SafetyPolicy
+from agentmx.safety.network import NetworkPolicy
 from agentmx.safety.audit import AuditLog
 from agentmx.exec.sandbox import Sandbox
 from agentmx.skills.registry import SkillRegistry
+from agentmx.skills.browser import pool as browser_pool
 from agentmx.memory import store as mem
+from agentmx.core.events import BROADCASTER
+from agentmx.core.artifacts import ArtifactManifest
+from agentmx.core.hashing import INLINE_THRESHOLD, get_hasher
+from agentmx.core.spans import SpanRecorder, span, timed
+from agentmx.core.cas import BlobStore, DEFAULT_ROOT as DEFAULT_CAS_ROOT, is_within
 
 class AgentRunner:
     def __init__(self, config, run_id: str, net_enabled: bool, allow_safety_edit: bool):
+        self.spans = SpanRecorder(run_id)
         self.config = config
         self.run_id = run_id
         self.net_enabled = net_enabled
         self.allow_safety_edit = allow_safety_edit
-        self.workdir = os.path.abspath(self.config.get("execution.working_dir", f".agentmx/work/{run_id}").format(run_id=run_id))
+        self.workdir = os.path.abspath(self.config.workdir_for(run_id))
         os.makedirs(self.workdir, exist_ok=True)
-        self.downloads_dir = os.path.abspath(self.config.get("browser.downloads_dir", f".agentmx/work/{run_id}/browser").format(run_id=run_id))
+        self.downloads_dir = os.path.abspath(self.config.downloads_dir.format(run_id=run_id))
         os.makedirs(self.downloads_dir, exist_ok=True)
         self.status_path = os.path.join(self.workdir, "status.json")
-        self.artifacts_path = os.path.join(self.workdir, "artifacts.json")
+        self.timings_path = os.path.join(self.workdir, "timings.json")
         self._write_json(self.status_path, {"status": "initialized", "run_id": self.run_id})
-        self._write_json(self.artifacts_path, [])
-        self.stop_guard = StopFileGuard(self.config.get("execution.kill_switch_file", ".agentmx/STOP"))
-        self.policy = SafetyPolicy()
-        self.audit = AuditLog(self.workdir)
+        self.manifest = ArtifactManifest(self.workdir)
+        self.artifacts_path = self.manifest.path
+        self._pending_artifacts = []
+        # workdir artifacts in the blob store, sealed once the run is final
+        self._adopted = []
+        self._hashing = deque()
+        self._artifacts_lock = threading.Lock()
+        self._finish_lock = threading.RLock()
+        # blob copies, manifest and DB writes for pool-hashed artifacts run
+        # here, so they never hold up a hash pool thread
+        self._finisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="agentmx-artifacts")
+        self.hasher = get_hasher(int(self.config.get("artifacts.hash_workers", 0)) or None)
+        self.artifact_db_batch = max(1, int(self.config.get("artifacts.db_batch", 64)))
+        self.blobs = BlobStore(self.config.get("artifacts.cas_dir", DEFAULT_CAS_ROOT)) if self.config.get("artifacts.cas", True) else None
+        self.cancel_token = cancel.run_token(
+            run_id,
+            stop_path=self.config.kill_switch_file,
+            run_stop_file=os.path.join(self.workdir, cancel.RUN_STOP_FILE),
+        )
+        self.stop_guard = StopFileGuard(self.config.kill_switch_file, token=self.cancel_token)
+        self.policy = SafetyPolicy.from_config(self.config)
+        self.network = NetworkPolicy.from_config(self.config)
+        self.audit = AuditLog(
+            self.workdir,
+            run_id=self.run_id,
+            durability=self.config.get("audit.durability", "flush"),
+            flush_bytes=int(self.config.get("audit.flush_bytes", 64 * 1024)),
+            flush_interval=float(self.config.get("audit.flush_interval_ms", 200)) / 1000.0,
+        )
+        self.stop_guard.on_stop.append(self.audit.flush)
         self.sandbox = Sandbox(self.stop_guard, self.audit)
         self.skills = SkillRegistry(max_new=self.config.get("skills.max_new_skill_per_run", 1))
+        self.spans.record("run.init", self.spans.origin)
 
     def _write_json(self, path: str, obj):
         with open(path, "w", encoding="utf-8") as f:
             json.dump(obj, f)
 
-    def _read_json(self, path: str, default):
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return default
-
+    @timed("run.set_status")
     def set_status(self, status: str, extra: Optional[dict] = None):
         data = {"status": status, "run_id": self.run_id}
         if extra:
             data.update(extra)
         self._write_json(self.status_path, data)
+        BROADCASTER.publish(self.run_id, {"type": "status", "status": status})
 
-    def add_artifact(self, path: str, kind: str = "file"):
+    def _artifact_meta(self, path: str, kind: str) -> dict:
+        path_abs = os.path.abspath(path)
+        try:
+            st = os.stat(path_abs)
+            size, mtime_ns = st.st_size, st.st_mtime_ns
+        except OSError:
+            size, mtime_ns = 0, None
+        mime, _ = mimetypes.guess_type(path_abs)
+        return {
+            "path": path_abs,
+            "type": kind,
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "sha256": None,
+            "mime": mime or "application/octet-stream",
+            "created_at": datetime.utcnow().isoformat() + "Z",
+            "name": os.path.basename(path_abs),
+        }
+
+    def _store_blob(self, meta: dict):
+        if self.blobs is None or not meta.get("sha256"):
+            return
         try:
-            path_abs = os.path.abspath(path)
-            size = os.path.getsize(path_abs) if os.path.exists(path_abs) else 0
-            sha256 = None
-            if os.path.exists(path_abs):
-                h = hashlib.sha256()
-                with open(path_abs, "rb") as f:
-                    for chunk in iter(lambda: f.read(8192), b""):
-                        h.update(chunk)
-                sha256 = h.hexdigest()
-            mime, _ = mimetypes.guess_type(path_abs)
-            meta = {
-                "path": path_abs,
-                "type": kind,
-                "size": size,
-                "sha256": sha256,
-                "mime": mime or "application/octet-stream",
-                "created_at": datetime.utcnow().isoformat() + "Z",
-                "name": os.path.basename(path_abs),
-            }
-            arr = self._read_json(self.artifacts_path, [])
-            arr.append(meta)
-            self._write_json(self.artifacts_path, arr)
+            adopt = is_within(meta["path"], self.workdir)
+            self.blobs.put(meta["path"], meta["sha256"], adopt=adopt)
+            meta["cas"] = True
+            if adopt:
+                self.hasher.prime(meta["path"], meta["sha256"])
+                self._adopted.append(meta)
+        except OSError as e:
+            logger.warning(f"storing {meta['path']} in the blob store failed: {e}")
+
+    def _seal_artifacts(self):
+        # Until the run ends its workdir files are separate copies that
+        # skills may still rewrite; after that each one becomes its blob so
+        # the bytes are stored once. A file changed since it was recorded
+        # keeps its own copy.
+        with self._finish_lock:
+            adopted, self._adopted = self._adopted, []
+        for meta in adopted:
+            path, sha = meta["path"], meta["sha256"]
             try:
-                conn = mem.connect()
-                mem.add_artifact(conn, self.run_id, {
-                    "path": meta["path"],
-                    "name": meta["name"],
-                    "size": meta["size"],
-                    "sha256": meta["sha256"],
-                    "mime": meta["mime"],
-                })
-                mem.commit(conn)
-            except Exception:
-                pass
-            return meta
+                if self.hasher.hash(path) != sha:
+                    continue
+                self.blobs.seal(path, sha)
+                self.hasher.prime(path, sha)
+            except OSError as e:
+                logger.warning(f"sealing {path} failed: {e}")
+
+    def _finish_artifacts(self):
+        # Hashes complete out of order; artifacts are finalized strictly in
+        # the order they were added so the manifest order is stable.
+        with self._finish_lock:
+            ready = []
+            with self._artifacts_lock:
+                while self._hashing and self._hashing[0][1].done():
+                    ready.append(self._hashing.popleft())
+            if not ready:
+                return
+            metas = []
+            for meta, fut in ready:
+                try:
+                    meta["sha256"] = fut.result()
+                except Exception as e:
+                    logger.warning(f"hashing {meta['path']} failed: {e}")
+                metas.append(meta)
+            self._record_artifacts(metas)
+
+    def _record_artifacts(self, metas):
+        # caller holds _finish_lock
+        for meta in metas:
+            self._store_blob(meta)
+        self.manifest.append(metas)
+        with self._artifacts_lock:
+            self._pending_artifacts.extend(metas)
+            due = len(self._pending_artifacts) >= self.artifact_db_batch
+        if due:
+            self._flush_db()
+
+    def _schedule_finish(self, _fut):
+        try:
+            self._finisher.submit(contextvars.copy_context().run, self._finish_artifacts)
+        except RuntimeError:
+            # finisher already shut down (run finalized): finish here
+            self._finish_artifacts()
+
+    def _flush_db(self):
+        with self._artifacts_lock:
+            batch, self._pending_artifacts = self._pending_artifacts, []
+        if not batch:
+            return
+        try:
+            mem.record_artifacts(mem.connect(), self.run_id, batch)
+        except Exception as e:
+            logger.warning(f"recording {len(batch)} artifacts for run {self.run_id} failed: {e}")
+
+    @timed("run.wait_artifacts")
+    def wait_artifacts(self, timeout: Optional[float] = None):
+        with self._artifacts_lock:
+            futures = [f for _, f in self._hashing]
+        futures_wait(futures, timeout=timeout)
+        self._finish_artifacts()
+
+    def flush_artifacts(self):
+        self.wait_artifacts()
+        self._flush_db()
+
+    def _drain_artifacts(self):
+        # Every artifact is hashed, in the manifest and in the DB before a
+        # terminal status goes out, so whoever sees it can read them all.
+        try:
+            self.flush_artifacts()
+            self._finisher.shutdown(wait=True)
+            self._seal_artifacts()
+        except Exception as e:
+            logger.warning(f"finishing artifacts for run {self.run_id} failed: {e}")
+
+    def _submit_artifact(self, path: str, kind: str) -> dict:
+        meta = self._artifact_meta(path, kind)
+        if meta["size"] < INLINE_THRESHOLD:
+            # small files are hashed and recorded in place, unless earlier
+            # artifacts are still hashing and must be recorded first
+            with self._finish_lock:
+                with self._artifacts_lock:
+                    behind = bool(self._hashing)
+                if not behind:
+                    meta["sha256"] = self.hasher.hash(meta["path"])
+                    self._record_artifacts([meta])
+                    return meta
+        fut = self.hasher.submit(meta["path"])
+        with self._artifacts_lock:
+            self._hashing.append((meta, fut))
+        fut.add_done_callback(self._schedule_finish)
+        return meta
+
+    @timed("run.add_artifact")
+    def add_artifact(self, path: str, kind: str = "file"):
+        # Small files come back hashed and recorded. Larger ones return
+        # right away; sha256 is filled in (and the artifact written to the
+        # manifest) once the background hash completes.
+        try:
+            return self._submit_artifact(path, kind)
         except Exception as e:
             logger.exception(e)
             return {"path": path, "type": kind, "error": str(e)}
 
+    @timed("run.add_artifacts")
+    def add_artifacts(self, paths, kind: str = "file"):
+        results = []
+        for path in paths:
+            try:
+                results.append(self._submit_artifact(path, kind))
+            except Exception as e:
+                logger.exception(e)
+                results.append({"path": path, "type": kind, "error": str(e)})
+        self.flush_artifacts()
+        return results
+
     def execute(self, task: str, timeout: int = 3600) -> bool:
+        BROADCASTER.open(self.run_id, flush=self.audit.flush)
+        token = self.spans.activate()
+        try:
+            with span("run.execute"):
+                return self._execute(task, timeout)
+        finally:
+            with span("run.finalize"):
+                self._drain_artifacts()
+                self.manifest.close()
+                self.audit.close()
+            SpanRecorder.deactivate(token)
+            self._save_timings()
+            cancel.release(self.run_id)
+            BROADCASTER.close(self.run_id, flush=self.audit.flush)
+
+    def _save_timings(self):
+        try:
+            self.spans.write(self.timings_path)
+            mem.record_spans(mem.connect(), self.run_id, self.spans.summary())
+        except Exception as e:
+            logger.warning(f"saving timings for run {self.run_id} failed: {e}")
+
+    def _execute(self, task: str, timeout: int) -> bool:
         start = time.time()
         self.audit.record("run_start", {"task": task, "run_id": self.run_id})
         try:
@@ -109,27 +283,35 @@ class AgentRunner:
                 desktop = os.path.join(os.path.expanduser("~"), "Desktop")
                 os.makedirs(desktop, exist_ok=True)
                 note_path = os.path.join(desktop, "notepad_output.txt")
-                if sys.platform.startswith("win"):
-                    NoteCls = self.skills.notepad()
-                    note = NoteCls()
-                    note.open()
-                    note.type_text("hello from agentmx")
-                    note.save_as(note_path)
-                    note.close()
-                else:
-                    with open(note_path, "w", encoding="utf-8") as f:
-                        f.write("hello from agentmx")
+                with span("skill.notepad"):
+                    if sys.platform.startswith("win"):
+                        NoteCls = self.skills.notepad()
+                        note = NoteCls(stop_guard=self.stop_guard)
+                        note.open()
+                        note.type_text("hello from agentmx")
+                        note.save_as(note_path)
+                        note.close()
+                    else:
+                        with open(note_path, "w", encoding="utf-8") as f:
+                            f.write("hello from agentmx")
                 self.add_artifact(note_path, "note")
                 self.stop_guard.check()
-                BrowserCls = self.skills.browser_upload_receipt()
-                br = BrowserCls(self.downloads_dir)
-                res = br.run(note_path)
+                if self.config.get("browser.async.enabled", False):
+                    from agentmx.skills.browser.async_engine import shared_engine
+                    BrowserCls = self.skills.browser_upload_receipt_async()
+                    br = BrowserCls(self.downloads_dir, shared_engine(self.config), token=self.cancel_token,
+                                   network=self.network)
+                else:
+                    BrowserCls = self.skills.browser_upload_receipt()
+                    br = BrowserCls(self.downloads_dir, pool=browser_pool.shared_pool(self.config), token=self.cancel_token,
+                                   network=self.network)
+                with span("skill.browser_upload_receipt"):
+                    res = br.run(note_path)
                 self.add_artifact(res["path"], "receipt")
             else:
-                while time.time() - start < min(3, timeout):
-                    self.stop_guard.check()
-                    time.sleep(0.2)
+                self.stop_guard.sleep(min(3, timeout) - (time.time() - start))
             self.audit.record("run_end", {"status": "completed"})
+            self._drain_artifacts()
             try:
                 conn = mem.connect()
                 duration = max(0.0, time.time() - start)
@@ -140,6 +322,7 @@ class AgentRunner:
             return True
         except StopFileGuard.Stopped:
             self.audit.record("run_end", {"status": "aborted"})
+            self._drain_artifacts()
             try:
                 conn = mem.connect()
                 duration = max(0.0, time.time() - start)
@@ -151,6 +334,7 @@ class AgentRunner:
         except Exception as e:
             logger.exception(e)
             self.audit.record("run_end", {"status": "failed", "error": str(e)})
+            self._drain_artifacts()
             try:
                 conn = mem.connect()
                 duration = max(0.0, time.time() - start)
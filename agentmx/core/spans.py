@@ -0,0 +1,188 @@
+import json
+import threading
+import functools
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# Cheap timing spans. Every span feeds a process-wide latency histogram
+# keyed by name; spans entered while a run's SpanRecorder is active are
+# also kept per run (timings.json in the workdir and run_spans in the DB).
+
+BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000, 30000)
+MAX_RECORDED = 5000
+
+_RECORDER: ContextVar[Optional["SpanRecorder"]] = ContextVar("agentmx_span_recorder", default=None)
+
+# Histograms are kept per thread so the hot path takes no lock; readers
+# merge them. Each entry is [count, sum_ms, max_ms, bucket counts...].
+# Tables of threads that have exited are folded into _RETIRED when the next
+# thread registers, so short-lived threads don't pile up.
+_local = threading.local()
+_THREAD_TABLES: List[Tuple[threading.Thread, Dict[str, list]]] = []
+_RETIRED: Dict[str, list] = {}
+_LOCK = threading.Lock()
+
+def _merge(into: Dict[str, list], table: Dict[str, list]):
+    for name, h in list(table.items()):
+        agg = into.get(name)
+        if agg is None:
+            into[name] = list(h)
+            continue
+        agg[0] += h[0]
+        agg[1] += h[1]
+        agg[2] = max(agg[2], h[2])
+        for i in range(3, len(h)):
+            agg[i] += h[i]
+
+def _table() -> Dict[str, list]:
+    t = getattr(_local, "table", None)
+    if t is None:
+        t = _local.table = {}
+        with _LOCK:
+            alive = []
+            for thread, table in _THREAD_TABLES:
+                if thread.is_alive():
+                    alive.append((thread, table))
+                else:
+                    _merge(_RETIRED, table)
+            alive.append((threading.current_thread(), t))
+            _THREAD_TABLES[:] = alive
+    return t
+
+def _observe(name: str, ms: float):
+    t = getattr(_local, "table", None) or _table()
+    h = t.get(name)
+    if h is None:
+        h = t[name] = [0, 0.0, 0.0] + [0] * (len(BUCKETS_MS) + 1)
+    h[0] += 1
+    h[1] += ms
+    if ms > h[2]:
+        h[2] = ms
+    h[3 + bisect_left(BUCKETS_MS, ms)] += 1
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    # Non-cumulative bucket counts; the last one is above BUCKETS_MS[-1].
+    merged: Dict[str, list] = {}
+    with _LOCK:
+        _merge(merged, _RETIRED)
+        tables = [t for _, t in _THREAD_TABLES]
+    for t in tables:
+        _merge(merged, t)
+    return {name: {"count": h[0], "sum_ms": h[1], "max_ms": h[2], "buckets": h[3:]} for name, h in merged.items()}
+
+def reset():
+    with _LOCK:
+        _RETIRED.clear()
+        for _, t in _THREAD_TABLES:
+            t.clear()
+
+class SpanRecorder:
+    def __init__(self, run_id: str, max_recorded: int = MAX_RECORDED):
+        self.run_id = run_id
+        self.max_recorded = max_recorded
+        self.origin = perf_counter()
+        self.spans: List[tuple] = []
+        self.dropped = 0
+        # totals of spans past max_recorded, so summary() stays complete
+        self._overflow: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, seconds: float):
+        # steps and hash workers of one run add concurrently; the cap check
+        # and the append go together
+        with self._lock:
+            if len(self.spans) < self.max_recorded:
+                self.spans.append((name, start, seconds * 1000.0, threading.get_ident()))
+                return
+            self.dropped += 1
+            s = self._overflow.setdefault(name, [0, 0.0, 0.0])
+            s[0] += 1
+            s[1] += seconds * 1000.0
+            s[2] = max(s[2], seconds * 1000.0)
+
+    def record(self, name: str, start: float):
+        # for phases that can't be wrapped in a with block
+        dt = perf_counter() - start
+        _observe(name, dt * 1000.0)
+        self.add(name, start, dt)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            totals = {n: list(v) for n, v in self._overflow.items()}
+            spans = list(self.spans)
+        for name, _, ms, _ in spans:
+            s = totals.get(name)
+            if s is None:
+                totals[name] = [1, ms, ms]
+            else:
+                s[0] += 1
+                s[1] += ms
+                if ms > s[2]:
+                    s[2] = ms
+        return {n: {"count": int(c), "total_ms": round(t, 3), "max_ms": round(m, 3)} for n, (c, t, m) in totals.items()}
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = list(self.spans)
+            dropped = self.dropped
+        threads: Dict[int, int] = {}
+        return {
+            "run_id": self.run_id,
+            "spans": [
+                {"name": n, "start_ms": round((t0 - self.origin) * 1000.0, 3), "duration_ms": round(ms, 3),
+                 "thread": threads.setdefault(tid, len(threads))}
+                for n, t0, ms, tid in spans
+            ],
+            "dropped": dropped,
+            "summary": self.summary(),
+        }
+
+    def write(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    def activate(self):
+        return _RECORDER.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _RECORDER.reset(token)
+
+def current() -> Optional[SpanRecorder]:
+    return _RECORDER.get()
+
+class span:
+    __slots__ = ("name", "_t0", "_rec")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self._rec = _RECORDER.get()
+        self._t0 = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        dt = perf_counter() - self._t0
+        _observe(self.name, dt * 1000.0)
+        if self._rec is not None:
+            self._rec.add(self.name, self._t0, dt)
+        return False
+
+def timed(name: str):
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            rec = _RECORDER.get()
+            t0 = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                dt = perf_counter() - t0
+                _observe(name, dt * 1000.0)
+                if rec is not None:
+                    rec.add(name, t0, dt)
+        return wrapper
+    return deco
@@ -1,4 +1,3 @@
-import time
 from agentmx.safety.runner import StopFileGuard
 from agentmx.safety.audit import AuditLog
 
@@ -8,7 +7,4 @@ class Sandbox:
         self.audit = audit
 
     def loop(self, seconds: float):
-        end = time.time() + seconds
-        while time.time() < end:
-            self.stop_guard.check()
-            time.sleep(0.2)
+        self.stop_guard.sleep(seconds)
@@ -0,0 +1,30 @@
+import sqlite3
+from typing import Callable, List
+
+Migration = Callable[[sqlite3.Connection], None]
+
+def user_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+def migrate(conn: sqlite3.Connection, migrations: List[Migration]) -> int:
+    # Migration N (1-based) moves the database to user_version N. Each step
+    # runs in its own write transaction so concurrent processes serialize on
+    # the lock and re-check the version before applying anything.
+    target = len(migrations)
+    if user_version(conn) >= target:
+        return user_version(conn)
+    if conn.in_transaction:
+        conn.commit()
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = user_version(conn)
+            if current >= target:
+                conn.commit()
+                return current
+            migrations[current](conn)
+            conn.execute(f"PRAGMA user_version={current + 1}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
@@ -2,7 +2,11 @@ import os
 import sqlite3
 import json
 import time
+import threading
+import itertools
 from typing import Optional, Dict, Any, List, Tuple
+from agentmx.memory import migrations
+from agentmx.core.spans import timed
 
 DEFAULT_DB = ".agentmx/memory/runs.sqlite"
 
@@ -11,28 +15,381 @@ def _ensure_dir(path: str):
     if d and not os.path.exists(d):
         os.makedirs(d, exist_ok=True)
 
-def connect(db_path: Optional[str] = None) -> sqlite3.Connection:
-    path = db_path or DEFAULT_DB
-    _ensure_dir(path)
-    conn = sqlite3.connect(path)
-    conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL;")
+_NOW = "((julianday('now') - 2440587.5) * 86400.0)"
+
+def _m001_base(conn: sqlite3.Connection):
     conn.execute("CREATE TABLE IF NOT EXISTS runs (id TEXT PRIMARY KEY, status TEXT, duration REAL, score REAL, created_at REAL)")
     conn.execute("CREATE TABLE IF NOT EXISTS artifacts (run_id TEXT, name TEXT, size INTEGER, sha256 TEXT, mime TEXT)")
-    try:
-        cols = {r[1] for r in conn.execute("PRAGMA table_info(artifacts)").fetchall()}
-        if "path" not in cols:
-            conn.execute("ALTER TABLE artifacts ADD COLUMN path TEXT")
-        if "created_at" not in cols:
-            conn.execute("ALTER TABLE artifacts ADD COLUMN created_at REAL")
-    except Exception:
-        pass
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(artifacts)").fetchall()}
+    if "path" not in cols:
+        conn.execute("ALTER TABLE artifacts ADD COLUMN path TEXT")
+    if "created_at" not in cols:
+        conn.execute("ALTER TABLE artifacts ADD COLUMN created_at REAL")
     conn.execute("CREATE TABLE IF NOT EXISTS skills_learned (name TEXT, test_path TEXT, created_at REAL)")
-    conn.commit()
-    return conn
+
+def _m002_typed_tables(conn: sqlite3.Connection):
+    # Rebuild the tables with typed, non-null timestamps. Older rows stored
+    # created_at as strftime('%s') text; artifacts had no key and collected
+    # duplicates when both the runner and the scheduler recorded a run.
+    conn.execute(
+        "CREATE TABLE runs_v2 ("
+        "id TEXT PRIMARY KEY,"
+        "status TEXT NOT NULL DEFAULT 'queued',"
+        "duration REAL NOT NULL DEFAULT 0,"
+        "score REAL,"
+        f"created_at REAL NOT NULL DEFAULT {_NOW}"
+        ")"
+    )
+    conn.execute(
+        "INSERT INTO runs_v2(id,status,duration,score,created_at) "
+        f"SELECT id, COALESCE(status,'unknown'), COALESCE(duration,0), score, COALESCE(CAST(created_at AS REAL), {_NOW}) FROM runs"
+    )
+    conn.execute("DROP TABLE runs")
+    conn.execute("ALTER TABLE runs_v2 RENAME TO runs")
+    conn.execute(
+        "CREATE TABLE artifacts_v2 ("
+        "id INTEGER PRIMARY KEY,"
+        "run_id TEXT NOT NULL,"
+        "name TEXT,"
+        "size INTEGER NOT NULL DEFAULT 0,"
+        "sha256 TEXT,"
+        "mime TEXT,"
+        "path TEXT NOT NULL,"
+        f"created_at REAL NOT NULL DEFAULT {_NOW},"
+        "UNIQUE(run_id, path)"
+        ")"
+    )
+    conn.execute(
+        "INSERT OR REPLACE INTO artifacts_v2(run_id,name,size,sha256,mime,path,created_at) "
+        f"SELECT run_id, name, COALESCE(size,0), sha256, mime, COALESCE(path,name,''), COALESCE(CAST(created_at AS REAL), {_NOW}) "
+        "FROM artifacts WHERE run_id IS NOT NULL ORDER BY rowid"
+    )
+    conn.execute("DROP TABLE artifacts")
+    conn.execute("ALTER TABLE artifacts_v2 RENAME TO artifacts")
+    conn.execute(
+        "CREATE TABLE skills_learned_v2 ("
+        "name TEXT NOT NULL,"
+        "test_path TEXT,"
+        f"created_at REAL NOT NULL DEFAULT {_NOW}"
+        ")"
+    )
+    conn.execute(
+        "INSERT INTO skills_learned_v2(name,test_path,created_at) "
+        f"SELECT COALESCE(name,''), test_path, COALESCE(CAST(created_at AS REAL), {_NOW}) FROM skills_learned ORDER BY rowid"
+    )
+    conn.execute("DROP TABLE skills_learned")
+    conn.execute("ALTER TABLE skills_learned_v2 RENAME TO skills_learned")
+
+def _m003_indexes(conn: sqlite3.Connection):
+    # list_runs/latest_run and the score histogram read newest-first.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs(created_at, score)")
+    # metrics() counts by status over a created_at range.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_status_created_at ON runs(status, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_run_created_at ON artifacts(run_id, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_skills_learned_created_at ON skills_learned(created_at)")
+
+def _m004_blob_refcounts(conn: sqlite3.Connection):
+    # blobs.refcount always equals the number of artifact rows carrying that
+    # sha256; the triggers keep it that way for inserts, upserts and deletes.
+    conn.execute(
+        "CREATE TABLE blobs ("
+        "sha256 TEXT PRIMARY KEY,"
+        "size INTEGER NOT NULL DEFAULT 0,"
+        "refcount INTEGER NOT NULL DEFAULT 0,"
+        f"created_at REAL NOT NULL DEFAULT {_NOW}"
+        ")"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_sha256 ON artifacts(sha256)")
+    conn.execute(
+        "INSERT INTO blobs(sha256,size,refcount) "
+        "SELECT sha256, MAX(size), COUNT(1) FROM artifacts WHERE sha256 IS NOT NULL GROUP BY sha256"
+    )
+    conn.execute(
+        "CREATE TRIGGER trg_artifacts_blob_insert AFTER INSERT ON artifacts WHEN NEW.sha256 IS NOT NULL BEGIN "
+        "INSERT INTO blobs(sha256,size,refcount) VALUES(NEW.sha256, NEW.size, 1) "
+        "ON CONFLICT(sha256) DO UPDATE SET refcount=refcount+1; "
+        "END"
+    )
+    conn.execute(
+        "CREATE TRIGGER trg_artifacts_blob_delete AFTER DELETE ON artifacts WHEN OLD.sha256 IS NOT NULL BEGIN "
+        "UPDATE blobs SET refcount=refcount-1 WHERE sha256=OLD.sha256; "
+        "END"
+    )
+    conn.execute(
+        "CREATE TRIGGER trg_artifacts_blob_update AFTER UPDATE OF sha256 ON artifacts "
+        "WHEN OLD.sha256 IS NOT NEW.sha256 BEGIN "
+        "UPDATE blobs SET refcount=refcount-1 WHERE OLD.sha256 IS NOT NULL AND sha256=OLD.sha256; "
+        "INSERT INTO blobs(sha256,size,refcount) SELECT NEW.sha256, NEW.size, 1 WHERE NEW.sha256 IS NOT NULL "
+        "ON CONFLICT(sha256) DO UPDATE SET refcount=refcount+1; "
+        "END"
+    )
+
+ROLLUP_GRANULARITIES = (3600, 86400)
+# Upper bounds (seconds) of the duration histogram; the last column of the
+# rollup counts everything above the final bound.
+DURATION_BUCKETS = (1, 5, 15, 60, 300, 900, 3600)
+SCORE_BUCKETS = ("0-0.2", "0.2-0.4", "0.4-0.6", "0.6-0.8", "0.8-1.0", "1.0")
+
+def _rollup_columns(row: str) -> List[Tuple[str, str]]:
+    # (column, expression over NEW/OLD) pairs for one runs row
+    d = f"{row}.duration"
+    cols = [("runs", "1"), ("duration_sum", f"COALESCE({d},0)"), ("duration_count", f"({d} IS NOT NULL)")]
+    lo = None
+    for i, hi in enumerate(DURATION_BUCKETS):
+        cond = f"{d}<={hi}" if lo is None else f"{d}>{lo} AND {d}<={hi}"
+        cols.append((f"d{i}", f"COALESCE({cond},0)"))
+        lo = hi
+    cols.append((f"d{len(DURATION_BUCKETS)}", f"COALESCE({d}>{lo},0)"))
+    sc = f"{row}.score"
+    score_conds = [f"{sc}<0.2", f"{sc}>=0.2 AND {sc}<0.4", f"{sc}>=0.4 AND {sc}<0.6",
+                   f"{sc}>=0.6 AND {sc}<0.8", f"{sc}>=0.8 AND {sc}<>1.0", f"{sc}=1.0"]
+    cols += [(f"s{i}", f"COALESCE({cond},0)") for i, cond in enumerate(score_conds)]
+    return cols
+
+_ROLLUP_VALUE_COLUMNS = [c for c, _ in _rollup_columns("NEW")]
+
+def _rollup_delta(row: str, sign: int, granularity: int) -> str:
+    cols = _rollup_columns(row)
+    values = ", ".join(f"{sign}*({expr})" for _, expr in cols)
+    updates = ", ".join(f"{c}={c}+excluded.{c}" for c, _ in cols)
+    return (
+        f"INSERT INTO run_rollup(granularity,bucket,status,{','.join(c for c, _ in cols)}) "
+        f"VALUES({granularity}, CAST({row}.created_at/{granularity} AS INTEGER)*{granularity}, COALESCE({row}.status,'unknown'), {values}) "
+        f"ON CONFLICT(granularity,bucket,status) DO UPDATE SET {updates}; "
+    )
+
+def _m005_run_rollups(conn: sqlite3.Connection):
+    # Per-hour and per-day aggregates of runs by status, kept current by
+    # triggers in the same transaction as every write to runs, so metrics()
+    # never scans the runs table.
+    value_cols = ",".join(f"{c} {'REAL' if c == 'duration_sum' else 'INTEGER'} NOT NULL DEFAULT 0" for c in _ROLLUP_VALUE_COLUMNS)
+    conn.execute(
+        "CREATE TABLE run_rollup ("
+        "granularity INTEGER NOT NULL,"
+        "bucket INTEGER NOT NULL,"
+        "status TEXT NOT NULL,"
+        f"{value_cols},"
+        "PRIMARY KEY(granularity, bucket, status)"
+        ") WITHOUT ROWID"
+    )
+    cols = _rollup_columns("runs")
+    for g in ROLLUP_GRANULARITIES:
+        conn.execute(
+            f"INSERT INTO run_rollup(granularity,bucket,status,{','.join(c for c, _ in cols)}) "
+            f"SELECT {g}, CAST(created_at/{g} AS INTEGER)*{g}, COALESCE(status,'unknown'), "
+            + ", ".join(f"SUM({expr})" for _, expr in cols)
+            + " FROM runs GROUP BY 2, 3"
+        )
+    add_new = "".join(_rollup_delta("NEW", 1, g) for g in ROLLUP_GRANULARITIES)
+    sub_old = "".join(_rollup_delta("OLD", -1, g) for g in ROLLUP_GRANULARITIES)
+    drop_empty = "".join(
+        f"DELETE FROM run_rollup WHERE granularity={g} AND bucket=CAST(OLD.created_at/{g} AS INTEGER)*{g} "
+        "AND status=COALESCE(OLD.status,'unknown') AND runs=0; "
+        for g in ROLLUP_GRANULARITIES
+    )
+    conn.execute(f"CREATE TRIGGER trg_runs_rollup_insert AFTER INSERT ON runs BEGIN {add_new}END")
+    conn.execute(f"CREATE TRIGGER trg_runs_rollup_delete AFTER DELETE ON runs BEGIN {sub_old}{drop_empty}END")
+    conn.execute(
+        "CREATE TRIGGER trg_runs_rollup_update AFTER UPDATE OF status,duration,score,created_at ON runs "
+        f"BEGIN {sub_old}{add_new}{drop_empty}END"
+    )
+
+def _m006_run_spans(conn: sqlite3.Connection):
+    # Per-run span totals; the full span list lives in the workdir.
+    conn.execute(
+        "CREATE TABLE run_spans ("
+        "run_id TEXT NOT NULL,"
+        "name TEXT NOT NULL,"
+        "count INTEGER NOT NULL,"
+        "total_ms REAL NOT NULL,"
+        "max_ms REAL NOT NULL,"
+        "PRIMARY KEY(run_id, name)"
+        ") WITHOUT ROWID"
+    )
+
+def _m007_evaluation_inputs(conn: sqlite3.Connection):
+    # mtime_ns tells the evaluator whether a stored hash still describes the
+    # file; task_type/verification let past runs be re-scored.
+    conn.execute("ALTER TABLE artifacts ADD COLUMN mtime_ns INTEGER")
+    conn.execute("ALTER TABLE runs ADD COLUMN task_type TEXT")
+    conn.execute("ALTER TABLE runs ADD COLUMN verification TEXT")
+
+def _m008_step_cache(conn: sqlite3.Connection):
+    # Memoized plan step results. Their output files live in the blob store;
+    # step_cache_blobs rows count towards blobs.refcount like artifact rows,
+    # so gc keeps cached outputs until the entry is evicted.
+    conn.execute(
+        "CREATE TABLE step_cache ("
+        "key TEXT PRIMARY KEY,"
+        "action TEXT NOT NULL,"
+        "result TEXT NOT NULL,"
+        "outputs TEXT NOT NULL,"
+        "size INTEGER NOT NULL DEFAULT 0,"
+        "hits INTEGER NOT NULL DEFAULT 0,"
+        f"created_at REAL NOT NULL DEFAULT {_NOW},"
+        f"last_used REAL NOT NULL DEFAULT {_NOW}"
+        ")"
+    )
+    conn.execute("CREATE INDEX idx_step_cache_last_used ON step_cache(last_used)")
+    conn.execute(
+        "CREATE TABLE step_cache_blobs ("
+        "key TEXT NOT NULL,"
+        "sha256 TEXT NOT NULL,"
+        "size INTEGER NOT NULL DEFAULT 0,"
+        "PRIMARY KEY(key, sha256)"
+        ") WITHOUT ROWID"
+    )
+    conn.execute(
+        "CREATE TRIGGER trg_step_cache_blob_insert AFTER INSERT ON step_cache_blobs BEGIN "
+        "INSERT INTO blobs(sha256,size,refcount) VALUES(NEW.sha256, NEW.size, 1) "
+        "ON CONFLICT(sha256) DO UPDATE SET refcount=refcount+1; "
+        "END"
+    )
+    conn.execute(
+        "CREATE TRIGGER trg_step_cache_blob_delete AFTER DELETE ON step_cache_blobs BEGIN "
+        "UPDATE blobs SET refcount=refcount-1 WHERE sha256=OLD.sha256; "
+        "END"
+    )
+    conn.execute(
+        "CREATE TRIGGER trg_step_cache_delete AFTER DELETE ON step_cache BEGIN "
+        "DELETE FROM step_cache_blobs WHERE key=OLD.key; "
+        "END"
+    )
+    # hits/misses/stores/evictions, shared by every process using the store
+    conn.execute("CREATE TABLE step_cache_counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID")
+
+def _m009_run_outcome(conn: sqlite3.Connection):
+    # whether the run's plan executed cleanly; re-scoring keeps runs whose
+    # steps failed at 0 however their artifacts look (NULL: not recorded)
+    conn.execute("ALTER TABLE runs ADD COLUMN exec_ok INTEGER")
+
+MIGRATIONS = [
+    _m001_base,
+    _m002_typed_tables,
+    _m003_indexes,
+    _m004_blob_refcounts,
+    _m005_run_rollups,
+    _m006_run_spans,
+    _m007_evaluation_inputs,
+    _m008_step_cache,
+    _m009_run_outcome,
+]
+
+def _init_schema(conn: sqlite3.Connection):
+    conn.execute("PRAGMA journal_mode=WAL;")
+    migrations.migrate(conn, MIGRATIONS)
+
+_MEMORY_DBS = itertools.count()
+
+class ConnectionManager:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._conns: Dict[int, sqlite3.Connection] = {}
+        self._initialized = False
+        # ":memory:" would give every thread its own empty database; threads
+        # share one named in-memory database instead, which lives as long as
+        # the manager's own connection to it
+        self._memory_uri = f"file:agentmx-mem-{next(_MEMORY_DBS)}?mode=memory&cache=shared" if db_path == ":memory:" else None
+        self._keepalive: Optional[sqlite3.Connection] = None
+
+    def _open(self) -> sqlite3.Connection:
+        if self._memory_uri is not None:
+            conn = sqlite3.connect(self._memory_uri, uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # WAL + NORMAL only syncs at checkpoints; commits stay cheap.
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _prune(self):
+        alive = {t.ident for t in threading.enumerate()}
+        for ident in [i for i in self._conns if i not in alive]:
+            try:
+                self._conns.pop(ident).close()
+            except Exception:
+                pass
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        conn = self._open()
+        with self._lock:
+            if not self._initialized:
+                if self._memory_uri is not None and self._keepalive is None:
+                    self._keepalive = self._open()
+                _init_schema(conn)
+                self._initialized = True
+            self._prune()
+            # an entry under this ident is a dead thread's whose ident was reused
+            old = self._conns.pop(threading.get_ident(), None)
+            if old is not None:
+                try:
+                    old.close()
+                except Exception:
+                    pass
+            self._conns[threading.get_ident()] = conn
+        self._local.conn = conn
+        return conn
+
+    def close(self):
+        with self._lock:
+            conns = list(self._conns.values())
+            if self._keepalive is not None:
+                conns.append(self._keepalive)
+                self._keepalive = None
+            self._conns.clear()
+            self._local = threading.local()
+            self._initialized = False
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+_MANAGERS: Dict[str, ConnectionManager] = {}
+_MANAGERS_LOCK = threading.Lock()
+
+def _db_key(db_path: Optional[str]) -> str:
+    path = db_path or DEFAULT_DB
+    return path if path == ":memory:" else os.path.abspath(path)
+
+def get_manager(db_path: Optional[str] = None) -> ConnectionManager:
+    key = _db_key(db_path)
+    mgr = _MANAGERS.get(key)
+    if mgr is None:
+        with _MANAGERS_LOCK:
+            mgr = _MANAGERS.get(key)
+            if mgr is None:
+                if key != ":memory:":
+                    _ensure_dir(key)
+                mgr = ConnectionManager(key)
+                _MANAGERS[key] = mgr
+    return mgr
+
+def connect(db_path: Optional[str] = None) -> sqlite3.Connection:
+    return get_manager(db_path).connection()
+
+def close(db_path: Optional[str] = None):
+    key = _db_key(db_path)
+    with _MANAGERS_LOCK:
+        mgr = _MANAGERS.pop(key, None)
+    if mgr is not None:
+        mgr.close()
+
+def close_all():
+    with _MANAGERS_LOCK:
+        mgrs = list(_MANAGERS.values())
+        _MANAGERS.clear()
+    for mgr in mgrs:
+        mgr.close()
 
 def begin(conn: sqlite3.Connection):
-    conn.execute("BEGIN")
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
 
 def commit(conn: sqlite3.Connection):
     conn.commit()
@@ -43,27 +400,84 @@ def rollback(conn: sqlite3.Connection):
     except Exception:
         pass
 
+_UPSERT_RUN = (
+    "INSERT INTO runs(id,status,duration,score,created_at) VALUES(?,?,?,?,?) "
+    "ON CONFLICT(id) DO UPDATE SET status=excluded.status, duration=excluded.duration, score=excluded.score"
+)
+
+_UPSERT_ARTIFACT = (
+    "INSERT INTO artifacts(run_id,name,size,sha256,mime,path,created_at,mtime_ns) VALUES(?,?,?,?,?,?,?,?) "
+    "ON CONFLICT(run_id,path) DO UPDATE SET name=excluded.name, size=excluded.size, sha256=excluded.sha256, mime=excluded.mime, "
+    "mtime_ns=excluded.mtime_ns"
+)
+
+@timed("store.record_run")
 def record_run(conn: sqlite3.Connection, run_id: str, status: str, duration: float, score: float):
-    conn.execute("INSERT OR REPLACE INTO runs(id,status,duration,score,created_at) VALUES(?,?,?,?,COALESCE((SELECT created_at FROM runs WHERE id=?),strftime('%s','now')))", (run_id, status, duration, score, run_id))
+    conn.execute(_UPSERT_RUN, (run_id, status, duration, score, time.time()))
     conn.commit()
 
+@timed("store.queue_run")
+def queue_run(conn: sqlite3.Connection, run_id: str):
+    # Never downgrade a run whose worker already reported progress.
+    conn.execute("INSERT INTO runs(id,status,duration,score,created_at) VALUES(?,'queued',0,0,?) ON CONFLICT(id) DO NOTHING", (run_id, time.time()))
+    conn.commit()
+
+@timed("store.abort_queued_runs")
+def abort_queued_runs(conn: sqlite3.Connection, run_ids: List[str]):
+    # Runs that never left the queue; a run that already started keeps its
+    # status, and a row the API hasn't written yet can't come back as queued.
+    now = time.time()
+    conn.executemany(
+        "INSERT INTO runs(id,status,duration,score,created_at) VALUES(?,'aborted',0,0,?) "
+        "ON CONFLICT(id) DO UPDATE SET status='aborted' WHERE runs.status='queued'",
+        [(rid, now) for rid in run_ids],
+    )
+    conn.commit()
+
+@timed("store.upsert_run")
 def upsert_run(conn: sqlite3.Connection, run_id: str, status: str, duration: float, score: float):
-    conn.execute("INSERT OR REPLACE INTO runs(id,status,duration,score,created_at) VALUES(?,?,?,?,COALESCE((SELECT created_at FROM runs WHERE id=?),strftime('%s','now')))", (run_id, status, duration, score, run_id))
+    conn.execute(_UPSERT_RUN, (run_id, status, duration, score, time.time()))
+
+def _artifact_row(run_id: str, artifact: Dict[str, Any], now: float):
+    path = artifact.get("path") or artifact.get("name") or ""
+    name = os.path.basename(path) or artifact.get("name", "")
+    return (run_id, name, int(artifact.get("size") or 0), artifact.get("sha256"), artifact.get("mime"), path, now,
+            artifact.get("mtime_ns"))
 
+@timed("store.add_artifact")
 def add_artifact(conn: sqlite3.Connection, run_id: str, artifact: Dict[str, Any]):
-    name = os.path.basename(artifact.get("path","")) or artifact.get("name","")
-    conn.execute("INSERT INTO artifacts(run_id,name,size,sha256,mime,path,created_at) VALUES(?,?,?,?,?,?,?)",
-                 (run_id, name, int(artifact.get("size") or 0), artifact.get("sha256"), artifact.get("mime"), artifact.get("path"), time.time()))
+    conn.execute(_UPSERT_ARTIFACT, _artifact_row(run_id, artifact, time.time()))
 
+@timed("store.record_artifacts")
 def record_artifacts(conn: sqlite3.Connection, run_id: str, artifacts):
-    cur = conn.cursor()
-    for a in artifacts or []:
-        cur.execute("INSERT INTO artifacts(run_id,name,size,sha256,mime,path,created_at) VALUES(?,?,?,?,?,?,?)",
-                    (run_id, os.path.basename(a.get('path','')), int(a.get('size') or 0), a.get('sha256'), a.get('mime'), a.get('path'), time.time()))
+    now = time.time()
+    conn.executemany(_UPSERT_ARTIFACT, [_artifact_row(run_id, a, now) for a in artifacts or []])
+    conn.commit()
+
+def forget_run_artifacts(conn: sqlite3.Connection, run_id: str) -> int:
+    cur = conn.execute("DELETE FROM artifacts WHERE run_id=?", (run_id,))
+    conn.commit()
+    return cur.rowcount
+
+def blob_refcount(conn: sqlite3.Connection, sha256: str) -> int:
+    row = conn.execute("SELECT refcount FROM blobs WHERE sha256=?", (sha256,)).fetchone()
+    return int(row[0]) if row else 0
+
+def record_spans(conn: sqlite3.Connection, run_id: str, summary: Dict[str, Dict[str, float]]):
+    conn.executemany(
+        "INSERT INTO run_spans(run_id,name,count,total_ms,max_ms) VALUES(?,?,?,?,?) "
+        "ON CONFLICT(run_id,name) DO UPDATE SET count=excluded.count, total_ms=excluded.total_ms, max_ms=excluded.max_ms",
+        [(run_id, name, int(v["count"]), float(v["total_ms"]), float(v["max_ms"])) for name, v in summary.items()],
+    )
     conn.commit()
 
+def get_spans(conn: sqlite3.Connection, run_id: str) -> Dict[str, Dict[str, float]]:
+    rows = conn.execute("SELECT name,count,total_ms,max_ms FROM run_spans WHERE run_id=? ORDER BY total_ms DESC", (run_id,)).fetchall()
+    return {r[0]: {"count": r[1], "total_ms": r[2], "max_ms": r[3]} for r in rows}
+
+@timed("store.record_skill")
 def record_skill(conn: sqlite3.Connection, name: str, test_path: str):
-    conn.execute("INSERT INTO skills_learned(name,test_path,created_at) VALUES(?,?,strftime('%s','now'))", (name, test_path))
+    conn.execute("INSERT INTO skills_learned(name,test_path,created_at) VALUES(?,?,?)", (name, test_path, time.time()))
     conn.commit()
 
 def get_run(conn: sqlite3.Connection, run_id: str) -> Optional[Dict[str, Any]]:
@@ -82,36 +496,176 @@ def list_artifacts(conn: sqlite3.Connection, run_id: str) -> List[Dict[str, Any]
     rows = conn.execute("SELECT run_id,name,size,sha256,mime,path,created_at FROM artifacts WHERE run_id=? ORDER BY created_at", (run_id,)).fetchall()
     return [dict(r) for r in rows]
 
-def _score_histogram(rows: List[Tuple[float]]) -> Dict[str, int]:
-    buckets = {"0-0.2":0, "0.2-0.4":0, "0.4-0.6":0, "0.6-0.8":0, "0.8-1.0":0, "1.0":0}
-    for (s,) in rows:
-        if s is None:
-            continue
-        if s == 1.0:
-            buckets["1.0"] += 1
-        elif s < 0.2:
-            buckets["0-0.2"] += 1
-        elif s < 0.4:
-            buckets["0.2-0.4"] += 1
-        elif s < 0.6:
-            buckets["0.4-0.6"] += 1
-        elif s < 0.8:
-            buckets["0.6-0.8"] += 1
-        else:
-            buckets["0.8-1.0"] += 1
-    return buckets
+def set_run_verification(conn: sqlite3.Connection, run_id: str, task_type: Optional[str], verification: Dict[str, Any],
+                         exec_ok: Optional[bool] = None):
+    conn.execute("UPDATE runs SET task_type=?, verification=?, exec_ok=? WHERE id=?",
+                 (task_type, json.dumps(verification), None if exec_ok is None else int(exec_ok), run_id))
+    conn.commit()
+
+def runs_with_verification(conn: sqlite3.Connection, since: float = 0.0) -> List[Dict[str, Any]]:
+    rows = conn.execute(
+        "SELECT id,status,score,task_type,verification,exec_ok FROM runs WHERE verification IS NOT NULL AND created_at>=? ORDER BY created_at",
+        (since,),
+    ).fetchall()
+    return [dict(r) for r in rows]
+
+def artifacts_by_run(conn: sqlite3.Connection, run_ids: List[str], chunk: int = 500) -> Dict[str, List[Dict[str, Any]]]:
+    # one query per chunk of runs instead of one per run
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    for i in range(0, len(run_ids), chunk):
+        ids = run_ids[i:i + chunk]
+        rows = conn.execute(
+            f"SELECT run_id,name,size,sha256,mime,path,mtime_ns FROM artifacts WHERE run_id IN ({','.join('?' * len(ids))}) "
+            "ORDER BY created_at",
+            ids,
+        ).fetchall()
+        for r in rows:
+            out.setdefault(r[0], []).append(dict(r))
+    return out
+
+@timed("store.update_scores")
+def update_scores(conn: sqlite3.Connection, updates: List[Tuple[float, str, str]]):
+    # (score, status, run_id) rows in one transaction
+    begin(conn)
+    try:
+        conn.executemany("UPDATE runs SET score=?, status=? WHERE id=?", updates)
+        commit(conn)
+    except Exception:
+        rollback(conn)
+        raise
+
+_BUMP_COUNTER = (
+    "INSERT INTO step_cache_counters(name,value) VALUES(?,?) "
+    "ON CONFLICT(name) DO UPDATE SET value=value+excluded.value"
+)
+STEP_CACHE_COUNTERS = ("hits", "misses", "stores", "evictions")
+
+def step_cache_get(conn: sqlite3.Connection, key: str) -> Optional[Dict[str, Any]]:
+    row = conn.execute("SELECT * FROM step_cache WHERE key=?", (key,)).fetchone()
+    return dict(row) if row else None
+
+def step_cache_count(conn: sqlite3.Connection, name: str, n: int = 1):
+    conn.execute(_BUMP_COUNTER, (name, n))
+    conn.commit()
+
+def step_cache_hit(conn: sqlite3.Connection, key: str):
+    conn.execute("UPDATE step_cache SET hits=hits+1, last_used=? WHERE key=?", (time.time(), key))
+    conn.execute(_BUMP_COUNTER, ("hits", 1))
+    conn.commit()
+
+@timed("store.step_cache_put")
+def step_cache_put(conn: sqlite3.Connection, key: str, action: str, result: str, outputs: str,
+                   blobs: List[Tuple[str, int]]):
+    # blobs: (sha256, size) of the entry's output files
+    begin(conn)
+    try:
+        # a plain delete, so the trigger releases the old entry's blobs
+        # (REPLACE only fires delete triggers with recursive_triggers on)
+        conn.execute("DELETE FROM step_cache WHERE key=?", (key,))
+        conn.execute(
+            "INSERT INTO step_cache(key,action,result,outputs,size,created_at,last_used) VALUES(?,?,?,?,?,?,?)",
+            (key, action, result, outputs, sum(size for _, size in blobs), time.time(), time.time()),
+        )
+        conn.executemany("INSERT OR IGNORE INTO step_cache_blobs(key,sha256,size) VALUES(?,?,?)",
+                         [(key, sha, size) for sha, size in blobs])
+        conn.execute(_BUMP_COUNTER, ("stores", 1))
+        commit(conn)
+    except Exception:
+        rollback(conn)
+        raise
+
+def step_cache_delete(conn: sqlite3.Connection, key: str):
+    conn.execute("DELETE FROM step_cache WHERE key=?", (key,))
+    conn.commit()
+
+def step_cache_evict(conn: sqlite3.Connection, max_entries: int = 0, max_bytes: int = 0) -> int:
+    # Drops least recently used entries until both limits hold (0 = none).
+    entries, size = conn.execute("SELECT COUNT(1), COALESCE(SUM(size),0) FROM step_cache").fetchone()
+    if (not max_entries or entries <= max_entries) and (not max_bytes or size <= max_bytes):
+        return 0
+    victims = []
+    for key, n in conn.execute("SELECT key, size FROM step_cache ORDER BY last_used").fetchall():
+        if (not max_entries or entries <= max_entries) and (not max_bytes or size <= max_bytes):
+            break
+        victims.append((key,))
+        entries -= 1
+        size -= n
+    begin(conn)
+    try:
+        conn.executemany("DELETE FROM step_cache WHERE key=?", victims)
+        conn.execute(_BUMP_COUNTER, ("evictions", len(victims)))
+        commit(conn)
+    except Exception:
+        rollback(conn)
+        raise
+    return len(victims)
+
+def step_cache_stats(conn: sqlite3.Connection) -> Dict[str, Any]:
+    out: Dict[str, Any] = {name: 0 for name in STEP_CACHE_COUNTERS}
+    out.update({r[0]: int(r[1]) for r in conn.execute("SELECT name, value FROM step_cache_counters").fetchall()})
+    entries, size = conn.execute("SELECT COUNT(1), COALESCE(SUM(size),0) FROM step_cache").fetchone()
+    out["entries"] = int(entries)
+    out["bytes"] = int(size)
+    lookups = out["hits"] + out["misses"]
+    out["hit_ratio"] = round(out["hits"] / lookups, 4) if lookups else 0.0
+    return out
+
+def success_since(conn: sqlite3.Connection, since: float) -> int:
+    # Whole days come from the daily rollup and the whole hours before the
+    # first of them from the hourly one, so the cost follows the window in
+    # days, not the runs in it. Only the partial first hour is counted from
+    # runs, through idx_runs_status_created_at.
+    first_full = (int(since) // 3600 + 1) * 3600
+    first_day = -(-first_full // 86400) * 86400
+    rolled = conn.execute(
+        "SELECT COALESCE(SUM(runs),0) FROM run_rollup WHERE status='completed' AND "
+        "((granularity=3600 AND bucket>=? AND bucket<?) OR (granularity=86400 AND bucket>=?))",
+        (first_full, first_day, first_day),
+    ).fetchone()[0]
+    partial = conn.execute(
+        "SELECT COUNT(1) FROM runs WHERE status='completed' AND created_at>=? AND created_at<?",
+        (since, first_full),
+    ).fetchone()[0]
+    return int(rolled) + int(partial)
+
+def rollup_totals(conn: sqlite3.Connection) -> Dict[str, Dict[str, Any]]:
+    # All-time aggregates per status, summed from the daily rollup.
+    cols = _ROLLUP_VALUE_COLUMNS
+    rows = conn.execute(
+        f"SELECT status, {', '.join(f'SUM({c})' for c in cols)} FROM run_rollup WHERE granularity=86400 GROUP BY status"
+    ).fetchall()
+    return {r[0]: dict(zip(cols, r[1:])) for r in rows}
+
+def score_histogram(totals: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+    return {name: int(sum(t[f"s{i}"] for t in totals.values())) for i, name in enumerate(SCORE_BUCKETS)}
+
+def rollup_series(conn: sqlite3.Connection, start: float, end: float, step: int) -> List[Dict[str, Any]]:
+    # Rollup rows regrouped into step-sized buckets in [start, end). step
+    # must be a multiple of an hour; whole days use the daily rollup.
+    granularity = 86400 if step % 86400 == 0 else 3600
+    cols = _ROLLUP_VALUE_COLUMNS
+    rows = conn.execute(
+        f"SELECT (bucket/{step})*{step} AS b, status, {', '.join(f'SUM({c})' for c in cols)} FROM run_rollup "
+        "WHERE granularity=? AND bucket>=? AND bucket<? GROUP BY b, status ORDER BY b",
+        (granularity, int(start), int(end)),
+    ).fetchall()
+    return [dict(zip(["bucket", "status"] + cols, r)) for r in rows]
 
+@timed("store.metrics")
 def metrics(conn: sqlite3.Connection) -> Dict[str, Any]:
-    cur = conn.cursor()
-    cur.execute("SELECT COUNT(1) FROM runs WHERE status='completed' AND created_at>=strftime('%s','now','-7 days')")
-    s7 = cur.fetchone()[0]
-    cur.execute("SELECT COUNT(1) FROM runs WHERE status='completed' AND created_at>=strftime('%s','now','-30 days')")
-    s30 = cur.fetchone()[0]
-    cur.execute("SELECT AVG(duration) FROM runs WHERE duration IS NOT NULL")
-    avg_dur = cur.fetchone()[0] or 0
-    cur.execute("SELECT name,test_path,created_at FROM skills_learned ORDER BY created_at DESC LIMIT 10")
-    skills = [{"name": r[0], "test_path": r[1], "created_at": r[2]} for r in cur.fetchall()]
-    cur.execute("SELECT score FROM runs ORDER BY created_at DESC LIMIT 1000")
-    score_rows = cur.fetchall()
-    hist = _score_histogram(score_rows)
-    return {"success_7d": s7, "success_30d": s30, "avg_duration": avg_dur, "recent_skills": skills, "score_histogram": hist}
+    now = time.time()
+    totals = rollup_totals(conn)
+    dur_sum = sum(t["duration_sum"] for t in totals.values())
+    dur_count = sum(t["duration_count"] for t in totals.values())
+    skills = [
+        {"name": r[0], "test_path": r[1], "created_at": r[2]}
+        for r in conn.execute("SELECT name,test_path,created_at FROM skills_learned ORDER BY created_at DESC LIMIT 10").fetchall()
+    ]
+    return {
+        "success_7d": success_since(conn, now - 7 * 86400),
+        "success_30d": success_since(conn, now - 30 * 86400),
+        "avg_duration": (dur_sum / dur_count) if dur_count else 0,
+        "recent_skills": skills,
+        "score_histogram": score_histogram(totals),
+        "step_cache": step_cache_stats(conn),
+    }
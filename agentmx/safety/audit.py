@@ -1,24 +1,312 @@
 import os
 import json
+import time
 import hashlib
+import threading
+import struct
+import weakref
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, List, Optional
+from agentmx.core.events import BROADCASTER
+from agentmx.core.spans import timed
+from agentmx.safety.secrets import REDACTOR
+
+try:
+    import fcntl
+except ImportError:  # Windows: no writer lock, logs are still one per run
+    fcntl = None
+
+DURABILITY_MODES = ("none", "flush", "fsync")
+GENESIS_HASH = "0"*64
 
 class AuditLog:
-    def __init__(self, workdir: str):
+    # Records are serialized once (sorted keys); the hash is taken over that
+    # body and appended as the last field, so hash == sha256(line minus the
+    # trailing hash field). Lines are batched and written by size or age:
+    #   none  - written only when flush_bytes is reached, flush() or close()
+    #   flush - also written once the oldest pending record is flush_interval old
+    #   fsync - like flush, plus fsync after every batch
+    # Secrets are masked in the serialized body before hashing, so they
+    # never reach the file or the live stream and the chain still verifies.
+    # A log has one writer at a time: it holds an exclusive lock on the file
+    # while open, and only then repairs a torn tail left by a crash and picks
+    # the chain up from the last record.
+    def __init__(self, workdir: str, run_id: Optional[str] = None, durability: str = "flush", flush_bytes: int = 64 * 1024, flush_interval: float = 0.2,
+                 redactor=REDACTOR):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"unknown audit durability mode: {durability}")
         self.path = os.path.join(workdir, "audit.log")
-        self.last_hash = "0"*64
+        self.run_id = run_id
+        self.durability = durability
+        self.flush_bytes = int(flush_bytes)
+        self.flush_interval = float(flush_interval)
+        self.redactor = redactor
+        self.index = AuditIndex(self.path)
+        self._f = open(self.path, "ab", buffering=0)
+        if not _lock_exclusive(self._f):
+            self._f.close()
+            raise RuntimeError(f"audit log {self.path} is open by another writer")
+        self.seq = self.index.repair()
+        self.last_hash = self.index.last_hash(self.seq)
+        self._lock = threading.RLock()
+        self._idx_f = None
+        self._offset = 0
+        self._buf: List[bytes] = []
+        self._buf_bytes = 0
+        self._buf_since = 0.0
+        if durability != "none":
+            _FLUSHER.register(self)
 
+    @timed("audit.record")
     def record(self, event: str, data: dict):
-        rec = {
-            "ts": datetime.utcnow().isoformat() + "Z",
-            "event": event,
-            "data": data or {},
-            "prev": self.last_hash,
-        }
-        payload = json.dumps(rec, sort_keys=True).encode()
-        h = hashlib.sha256(payload).hexdigest()
-        rec["hash"] = h
-        with open(self.path, "a", encoding="utf-8") as f:
-            f.write(json.dumps(rec) + "\n")
-        self.last_hash = h
+        with self._lock:
+            rec = {
+                "ts": datetime.utcnow().isoformat() + "Z",
+                "event": event,
+                "data": data or {},
+                "prev": self.last_hash,
+            }
+            body = json.dumps(rec, sort_keys=True)
+            if self.redactor is not None:
+                body = self.redactor.redact(body)
+            h = hashlib.sha256(body.encode()).hexdigest()
+            line = f'{body[:-1]}, "hash": "{h}"}}'
+            raw = line.encode() + b"\n"
+            if not self._buf:
+                self._buf_since = time.monotonic()
+            self._buf.append(raw)
+            self._buf_bytes += len(raw)
+            self.last_hash = h
+            self.seq += 1
+            seq = self.seq
+            if self._buf_bytes >= self.flush_bytes:
+                self._write_batch()
+        if self.run_id:
+            BROADCASTER.publish(self.run_id, {"type": "audit", "seq": seq, "line": line})
+
+    def _write_batch(self):
+        if not self._buf:
+            return
+        if self._idx_f is None:
+            self._idx_f = open(self.index.idx_path, "ab", buffering=0)
+            self._offset = self._f.seek(0, os.SEEK_END)
+        offsets = []
+        off = self._offset
+        for raw in self._buf:
+            offsets.append(off)
+            off += len(raw)
+        data = b"".join(self._buf)
+        self._buf.clear()
+        self._buf_bytes = 0
+        _write_all(self._f, data)
+        self._offset = off
+        # The index is written after the records it points at, so it can
+        # lag the log after a crash but never point past it.
+        _write_all(self._idx_f, struct.pack(f"<{len(offsets)}Q", *offsets))
+        if self.durability == "fsync":
+            os.fsync(self._f.fileno())
+
+    def flush(self):
+        with self._lock:
+            self._write_batch()
+
+    def _flush_if_due(self, now: float):
+        if not self._buf or now - self._buf_since < self.flush_interval:
+            return
+        with self._lock:
+            if self._buf and now - self._buf_since >= self.flush_interval:
+                self._write_batch()
+
+    def close(self):
+        with self._lock:
+            try:
+                self._write_batch()
+            finally:
+                _FLUSHER.unregister(self)
+                if self._f is not None:
+                    self._f.close()
+                    self._f = None
+                if self._idx_f is not None:
+                    self._idx_f.close()
+                    self._idx_f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class _Flusher:
+    # One daemon thread flushes every open log whose oldest pending record
+    # has waited flush_interval, so idle runs still reach disk promptly.
+    def __init__(self, tick: float = 0.05):
+        self.tick = tick
+        self._logs = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._t = None
+
+    def register(self, log: AuditLog):
+        with self._lock:
+            self._logs.add(log)
+            if self._t is None or not self._t.is_alive():
+                self._t = threading.Thread(target=self._loop, name="audit-flusher", daemon=True)
+                self._t.start()
+
+    def unregister(self, log: AuditLog):
+        with self._lock:
+            self._logs.discard(log)
+
+    def _loop(self):
+        while True:
+            time.sleep(self.tick)
+            with self._lock:
+                logs = list(self._logs)
+            now = time.monotonic()
+            for log in logs:
+                try:
+                    log._flush_if_due(now)
+                except Exception:
+                    pass
+
+_FLUSHER = _Flusher()
+
+def _lock_exclusive(f) -> bool:
+    # held until f is closed
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+def _write_all(f, data: bytes):
+    view = memoryview(data)
+    while view:
+        n = f.write(view)
+        view = view[n:]
+
+def index_path(log_path: str) -> str:
+    return os.path.splitext(log_path)[0] + ".idx"
+
+class AuditIndex:
+    # Sidecar next to audit.log holding one little-endian uint64 per record:
+    # entry i is the byte offset where record seq i+1 starts. Records past
+    # the last entry (index lagging after a crash, or logs written before
+    # the index existed) are found by scanning forward from the last entry.
+    ENTRY = struct.Struct("<Q")
+
+    def __init__(self, log_path: str):
+        self.log_path = log_path
+        self.idx_path = index_path(log_path)
+
+    def _indexed(self) -> int:
+        try:
+            return os.path.getsize(self.idx_path) // self.ENTRY.size
+        except OSError:
+            return 0
+
+    def _entry(self, i: int) -> int:
+        with open(self.idx_path, "rb") as f:
+            f.seek(i * self.ENTRY.size)
+            return self.ENTRY.unpack(f.read(self.ENTRY.size))[0]
+
+    def _line_ends(self, start: int) -> Iterator[int]:
+        try:
+            f = open(self.log_path, "rb")
+        except OSError:
+            return
+        with f:
+            f.seek(start)
+            pos = start
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                i = chunk.find(b"\n")
+                while i >= 0:
+                    yield pos + i + 1
+                    i = chunk.find(b"\n", i + 1)
+                pos += len(chunk)
+
+    def _base(self):
+        n = self._indexed()
+        if n == 0:
+            return 0, 0
+        return n - 1, self._entry(n - 1)
+
+    def count(self) -> int:
+        base_seq, base_off = self._base()
+        return base_seq + sum(1 for _ in self._line_ends(base_off))
+
+    def offset_of(self, seq: int) -> int:
+        # Byte offset where record `seq` (1-based) starts; for seq past the
+        # end, the end of the last complete record.
+        if seq <= 1:
+            return 0
+        n = self._indexed()
+        if seq <= n:
+            return self._entry(seq - 1)
+        base_seq, off = self._base()
+        for end in self._line_ends(off):
+            base_seq += 1
+            off = end
+            if base_seq + 1 == seq:
+                break
+        return off
+
+    def repair(self) -> int:
+        # Writer-side, under the writer lock: append entries for unindexed
+        # records and drop a torn trailing line. Returns the number of records.
+        if not os.path.exists(self.log_path):
+            return 0
+        n = self._indexed()
+        seq, cur = self._base()
+        missing = []
+        for end in self._line_ends(cur):
+            seq += 1
+            if seq > n:
+                missing.append(cur)
+            cur = end
+        if os.path.getsize(self.log_path) > cur:
+            with open(self.log_path, "r+b") as f:
+                f.truncate(cur)
+        if missing:
+            with open(self.idx_path, "ab") as f:
+                f.write(struct.pack(f"<{len(missing)}Q", *missing))
+        return seq
+
+    def last_hash(self, seq: int) -> str:
+        # hash of record seq, the last one after repair(); the chain's next prev
+        if seq <= 0:
+            return GENESIS_HASH
+        with open(self.log_path, "rb") as f:
+            f.seek(self.offset_of(seq))
+            line = f.readline()
+        try:
+            return json.loads(line)["hash"]
+        except (ValueError, KeyError):
+            # a legacy record without a hash starts a new chain
+            return GENESIS_HASH
+
+def count_records(path: str) -> int:
+    return AuditIndex(path).count()
+
+def verify(path: str) -> int:
+    # Returns the number of records whose hash chain checks out; raises
+    # ValueError at the first broken record.
+    prev = GENESIS_HASH
+    n = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            rec = json.loads(line)
+            h = rec.pop("hash", None)
+            if rec.get("prev") != prev:
+                raise ValueError(f"record {n + 1}: prev does not match previous hash")
+            cut = line.rfind(', "hash": "')
+            body = line[:cut] + "}" if cut >= 0 else ""
+            if hashlib.sha256(body.encode()).hexdigest() != h:
+                # Older writers emitted fields in insertion order.
+                if hashlib.sha256(json.dumps(rec, sort_keys=True).encode()).hexdigest() != h:
+                    raise ValueError(f"record {n + 1}: hash mismatch")
+            prev = h
+            n += 1
+    return n
@@ -0,0 +1,371 @@
+import os
+import sys
+import select
+import struct
+import threading
+from typing import Callable, Dict, List, Optional, Set
+from loguru import logger
+
+# Cancellation tokens. Every run gets a token linked to the global token of
+# its kill-switch file; a single watcher thread per process turns STOP
+# files into token cancellations (inotify on Linux, polling elsewhere), so
+# checking a token is a flag read and waiting on one wakes up immediately.
+
+RUN_STOP_FILE = "STOP"  # per-run kill switch, inside the run's workdir
+POLL_INTERVAL = 0.1
+
+class Stopped(Exception):
+    pass
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        self._next = 0
+        self._cleanup: List[Callable[[], None]] = []
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: Optional[str] = "cancelled") -> bool:
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = list(self._callbacks.values()), {}
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception as e:
+                logger.warning(f"cancel callback failed: {e}")
+        return True
+
+    def on_cancel(self, fn: Callable[[], None]) -> Callable[[], None]:
+        # Runs fn once on cancellation (right away if already cancelled) and
+        # returns a function that unregisters it.
+        with self._lock:
+            if not self._event.is_set():
+                key = self._next
+                self._next += 1
+                self._callbacks[key] = fn
+                def remove():
+                    with self._lock:
+                        self._callbacks.pop(key, None)
+                return remove
+        fn()
+        return lambda: None
+
+    def link(self, parent: "CancelToken"):
+        self._cleanup.append(parent.on_cancel(lambda: self.cancel(parent.reason)))
+
+    def child(self) -> "CancelToken":
+        t = CancelToken()
+        t.link(self)
+        return t
+
+    def close(self):
+        # drop links to parents and watched files
+        cleanup, self._cleanup = self._cleanup, []
+        for fn in cleanup:
+            try:
+                fn()
+            except Exception:
+                pass
+
+    def check(self):
+        if self._event.is_set():
+            raise Stopped()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._event.wait(timeout)
+
+    def sleep(self, seconds: float):
+        if self._event.wait(max(0.0, seconds)):
+            raise Stopped()
+
+    def bind_task(self, task) -> Callable[[], None]:
+        # cancel an asyncio task (from any thread) when the token fires
+        loop = task.get_loop()
+        return self.on_cancel(lambda: loop.call_soon_threadsafe(task.cancel))
+
+    def bind_process(self, proc) -> Callable[[], None]:
+        # terminate a subprocess.Popen when the token fires
+        def terminate():
+            if proc.poll() is None:
+                proc.terminate()
+        return self.on_cancel(terminate)
+
+# inotify(7) flags
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_IGNORED = 0x8000
+_DIR_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+_GONE = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED
+_EVENT = struct.Struct("iIII")
+
+class _Inotify:
+    def __init__(self):
+        import ctypes
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add(self, directory: str) -> int:
+        return self._libc.inotify_add_watch(self.fd, os.fsencode(directory), _DIR_MASK)
+
+    def remove(self, wd: int):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self):
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        i = 0
+        while i + _EVENT.size <= len(buf):
+            wd, mask, _, length = _EVENT.unpack_from(buf, i)
+            name = buf[i + _EVENT.size:i + _EVENT.size + length].rstrip(b"\0")
+            i += _EVENT.size + length
+            yield wd, mask, os.fsdecode(name)
+
+    def close(self):
+        os.close(self.fd)
+
+class StopWatcher:
+    # One thread watches any number of files and calls their handlers with
+    # True/False whenever a file appears/disappears. Directories that can't
+    # be watched (or platforms without inotify) are polled.
+    def __init__(self, poll_interval: float = POLL_INTERVAL, use_inotify: bool = True):
+        self.poll_interval = poll_interval
+        self._lock = threading.RLock()
+        self._handlers: Dict[str, List[Callable[[bool], None]]] = {}
+        self._present: Dict[str, bool] = {}
+        self._wd_dir: Dict[int, str] = {}
+        self._dir_wd: Dict[str, int] = {}
+        self._inotify: Optional[_Inotify] = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+            except Exception as e:
+                logger.warning(f"inotify unavailable, polling stop files: {e}")
+        # select() only takes pipes on POSIX; without inotify an Event wakes
+        # the polling loop instead
+        self._wakeup = threading.Event()
+        self._pipe = os.pipe() if self._inotify is not None else None
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="agentmx-stop-watcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify is not None else "poll"
+
+    def _watch_dir(self, directory: str) -> bool:
+        if self._inotify is None:
+            return False
+        if directory in self._dir_wd:
+            return True
+        wd = self._inotify.add(directory)
+        if wd < 0:
+            return False
+        self._dir_wd[directory] = wd
+        self._wd_dir[wd] = directory
+        return True
+
+    def watch(self, path: str, handler: Callable[[bool], None]):
+        # The handler is called right away if the file already exists.
+        path = os.path.abspath(path)
+        with self._lock:
+            self._handlers.setdefault(path, []).append(handler)
+            self._watch_dir(os.path.dirname(path))
+            present = os.path.exists(path)
+            self._present[path] = present
+        if present:
+            handler(True)
+        self._wake()
+
+    def unwatch(self, path: str, handler: Callable[[bool], None]):
+        path = os.path.abspath(path)
+        with self._lock:
+            handlers = self._handlers.get(path, [])
+            if handler in handlers:
+                handlers.remove(handler)
+            if handlers:
+                return
+            self._handlers.pop(path, None)
+            self._present.pop(path, None)
+            directory = os.path.dirname(path)
+            if directory in self._dir_wd and not any(os.path.dirname(p) == directory for p in self._handlers):
+                wd = self._dir_wd.pop(directory)
+                self._wd_dir.pop(wd, None)
+                self._inotify.remove(wd)
+
+    def _wake(self):
+        self._wakeup.set()
+        if self._pipe is not None:
+            try:
+                os.write(self._pipe[1], b"x")
+            except OSError:
+                pass
+
+    def _rescan(self, paths):
+        changed = []
+        with self._lock:
+            for path in paths:
+                if path not in self._handlers:
+                    continue
+                present = os.path.exists(path)
+                if present != self._present.get(path):
+                    self._present[path] = present
+                    changed.append((path, present, list(self._handlers[path])))
+        for path, present, handlers in changed:
+            for fn in handlers:
+                try:
+                    fn(present)
+                except Exception as e:
+                    logger.warning(f"stop file handler for {path} failed: {e}")
+
+    def _unwatched(self) -> List[str]:
+        # Paths to stat on this pass: those in directories we can't watch,
+        # plus those whose directory just became watchable (the file may
+        # have appeared before the watch did).
+        with self._lock:
+            out = []
+            for path in self._handlers:
+                directory = os.path.dirname(path)
+                if directory not in self._dir_wd:
+                    self._watch_dir(directory)
+                    out.append(path)
+            return out
+
+    def _wait(self, timeout: Optional[float]) -> Set[str]:
+        touched: Set[str] = set()
+        if self._pipe is None:
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            return touched
+        ready, _, _ = select.select([self._pipe[0], self._inotify.fd], [], [], timeout)
+        if self._pipe[0] in ready:
+            os.read(self._pipe[0], 4096)
+        if self._inotify.fd in ready:
+            with self._lock:
+                for wd, mask, name in self._inotify.read():
+                    directory = self._wd_dir.get(wd)
+                    if directory is None:
+                        continue
+                    if mask & _GONE:
+                        # the directory went away; poll until it is back
+                        self._wd_dir.pop(wd, None)
+                        self._dir_wd.pop(directory, None)
+                        touched.update(p for p in self._handlers if os.path.dirname(p) == directory)
+                    elif name:
+                        touched.add(os.path.join(directory, name))
+        return touched
+
+    def _loop(self):
+        while not self._closed:
+            polled = self._unwatched()
+            if polled:
+                self._rescan(polled)
+            try:
+                touched = self._wait(self.poll_interval if polled else None)
+            except Exception as e:
+                if self._closed:
+                    return
+                logger.warning(f"stop watcher error: {e}")
+                self._wakeup.wait(self.poll_interval)
+                with self._lock:
+                    touched = set(self._handlers)
+            if touched:
+                self._rescan(touched)
+
+    def close(self):
+        self._closed = True
+        self._wake()
+        self._thread.join(5)
+        for fd in self._pipe or ():
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        if self._inotify is not None:
+            self._inotify.close()
+
+_LOCK = threading.RLock()
+_WATCHER: Optional[StopWatcher] = None
+_ROOTS: Dict[str, CancelToken] = {}
+_RUNS: Dict[str, CancelToken] = {}
+
+def watcher() -> StopWatcher:
+    global _WATCHER
+    with _LOCK:
+        if _WATCHER is None:
+            _WATCHER = StopWatcher()
+        return _WATCHER
+
+def global_token(stop_path: str) -> CancelToken:
+    # Cancelled while the kill-switch file exists. Tokens are one-shot, so
+    # removing the file installs a fresh one for runs that start later.
+    path = os.path.abspath(stop_path)
+    with _LOCK:
+        tok = _ROOTS.get(path)
+        if tok is not None:
+            return tok
+        _ROOTS[path] = CancelToken()
+
+        def on_change(present: bool):
+            with _LOCK:
+                if present:
+                    _ROOTS[path].cancel(f"stop file {path}")
+                elif _ROOTS[path].cancelled:
+                    _ROOTS[path] = CancelToken()
+
+        watcher().watch(path, on_change)
+        return _ROOTS[path]
+
+def register(run_id: str) -> CancelToken:
+    # Create (or return) the run's token before the run starts, so queued
+    # runs can be cancelled too.
+    with _LOCK:
+        tok = _RUNS.get(run_id)
+        if tok is None:
+            tok = _RUNS[run_id] = CancelToken()
+        return tok
+
+def run_token(run_id: str, stop_path: Optional[str] = None, run_stop_file: Optional[str] = None) -> CancelToken:
+    tok = register(run_id)
+    if stop_path:
+        tok.link(global_token(stop_path))
+    if run_stop_file:
+        def on_change(present: bool):
+            if present:
+                tok.cancel(f"stop file {run_stop_file}")
+        w = watcher()
+        w.watch(run_stop_file, on_change)
+        tok._cleanup.append(lambda: w.unwatch(run_stop_file, on_change))
+    return tok
+
+def cancel_run(run_id: str, reason: str = "cancel requested") -> bool:
+    with _LOCK:
+        tok = _RUNS.get(run_id)
+    if tok is None:
+        return False
+    tok.cancel(reason)
+    return True
+
+def release(run_id: str):
+    with _LOCK:
+        tok = _RUNS.pop(run_id, None)
+    if tok is not None:
+        tok.close()
@@ -0,0 +1,326 @@
+import re
+import time
+import asyncio
+import socket
+import fnmatch
+import ipaddress
+import threading
+import functools
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+from loguru import logger
+
+# Network policy for browser traffic. Patterns (network.deny_patterns /
+# network.allow_patterns) are one of:
+#   "10.0.0.0/8", "fd00::/8", "1.2.3.4"   CIDR block or single address
+#   "10.*.*.*", "192.168.*"               IPv4 wildcard, trailing octets only
+#   "example.com"                         exact host
+#   "*.onion"                             any subdomain of onion
+#   "ads*.example.*"                      any other host glob
+# Addresses go through a binary prefix trie (IPv4 and IPv6 separately),
+# hosts through a trie of reversed labels; the rare free-form globs are
+# compiled into one regex. Verdicts are cached per host. With dns_pinning
+# a hostname is also resolved and checked by address, and the answer is
+# kept for dns_ttl seconds. This is a check, not a pin: the browser resolves
+# the name again itself, so a host that rebinds between the two lookups
+# isn't caught.
+
+CHECKED_SCHEMES = {"http", "https", "ws", "wss", "ftp"}
+CACHE_SIZE = 4096
+DNS_TTL = 60.0
+
+_WILDCARD_IP = re.compile(r"^(\d{1,3}|\*)(\.(\d{1,3}|\*)){0,3}$")
+
+def _wildcard_network(pattern: str):
+    parts = pattern.split(".")
+    fixed = []
+    for p in parts:
+        if p == "*":
+            break
+        fixed.append(p)
+    # "10.*.1.*" isn't a prefix and has no CIDR form
+    if any(p != "*" for p in parts[len(fixed):]):
+        raise ValueError(f"only trailing octets may be wildcards: {pattern!r}")
+    if len(parts) < 4 and parts[-1] != "*":
+        raise ValueError(f"incomplete address: {pattern!r}")
+    addr = ".".join(fixed + ["0"] * (4 - len(fixed)))
+    return ipaddress.ip_network(f"{addr}/{8 * len(fixed)}")
+
+def parse_pattern(pattern: str) -> Tuple[str, object]:
+    # -> ("net", ip_network) | ("host", str) | ("glob", str); raises ValueError
+    if not isinstance(pattern, str) or not pattern.strip():
+        raise ValueError(f"network pattern must be a non-empty string: {pattern!r}")
+    p = pattern.strip().lower().rstrip(".")
+    if _WILDCARD_IP.match(p) and any(c.isdigit() for c in p):
+        if "*" in p:
+            return "net", _wildcard_network(p)
+        try:
+            return "net", ipaddress.ip_network(p)
+        except ValueError:
+            raise ValueError(f"bad address in network pattern {pattern!r}")
+    if "/" in p or ":" in p:
+        try:
+            return "net", ipaddress.ip_network(p, strict=False)
+        except ValueError as e:
+            raise ValueError(f"bad network pattern {pattern!r}: {e}")
+    if not any(c in p for c in "?[") and ("*" not in p or (p.startswith("*.") and "*" not in p[2:])):
+        return "host", p
+    return "glob", p
+
+class _CidrTrie:
+    # one bit per level; a node is [zero, one, rule]
+    def __init__(self, bits: int):
+        self.bits = bits
+        self.root: List = [None, None, None]
+        self.size = 0
+
+    def add(self, net, rule: str):
+        value = int(net.network_address)
+        node = self.root
+        for i in range(net.prefixlen):
+            bit = (value >> (self.bits - 1 - i)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        if node[2] is None:
+            node[2] = rule
+            self.size += 1
+
+    def match(self, value: int) -> Optional[str]:
+        # shortest covering prefix wins, which is the first one on the path
+        node = self.root
+        shift = self.bits - 1
+        while node is not None:
+            if node[2] is not None:
+                return node[2]
+            node = node[(value >> shift) & 1]
+            shift -= 1
+        return None
+
+class _HostTrie:
+    # reversed labels: "*.onion" is stored under onion -> "*"
+    def __init__(self):
+        self.root: Dict = {}
+
+    def add(self, host: str, rule: str):
+        labels = host.split(".")
+        wildcard = labels[0] == "*"
+        node = self.root
+        for label in reversed(labels[1:] if wildcard else labels):
+            node = node.setdefault(label, {})
+        node.setdefault("*" if wildcard else "", rule)
+
+    def match(self, host: str) -> Optional[str]:
+        labels = host.split(".")
+        node = self.root
+        for i in range(len(labels) - 1, -1, -1):
+            node = node.get(labels[i])
+            if node is None:
+                return None
+            if i and "*" in node:
+                return node["*"]
+        return node.get("")
+
+class PatternSet:
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns = list(dict.fromkeys(patterns))
+        self._v4 = _CidrTrie(32)
+        self._v6 = _CidrTrie(128)
+        self._hosts = _HostTrie()
+        globs: List[Tuple[str, str]] = []
+        for pattern in self.patterns:
+            kind, value = parse_pattern(pattern)
+            if kind == "net":
+                (self._v4 if value.version == 4 else self._v6).add(value, pattern)
+            elif kind == "host":
+                self._hosts.add(value, pattern)
+            else:
+                globs.append((pattern, value))
+        self._globs = globs
+        self._glob = re.compile("|".join(f"(?:{fnmatch.translate(g)})" for _, g in globs)) if globs else None
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def match_ip(self, ip) -> Optional[str]:
+        if ip.version == 6 and ip.ipv4_mapped is not None:
+            ip = ip.ipv4_mapped
+        return (self._v4 if ip.version == 4 else self._v6).match(int(ip))
+
+    def match_host(self, host: str) -> Optional[str]:
+        rule = self._hosts.match(host)
+        if rule is None and self._glob is not None and self._glob.match(host):
+            for pattern, g in self._globs:
+                if fnmatch.fnmatchcase(host, g):
+                    return pattern
+        return rule
+
+@functools.lru_cache(maxsize=8)
+def _compile(patterns: Tuple[str, ...]) -> PatternSet:
+    return PatternSet(patterns)
+
+def _ip(host: str):
+    try:
+        return ipaddress.ip_address(host)
+    except ValueError:
+        return None
+
+def _getaddrinfo(host: str) -> List[str]:
+    return sorted({info[4][0] for info in socket.getaddrinfo(host, None)})
+
+class NetworkPolicy:
+    def __init__(self, deny: Optional[Iterable[str]] = None, allow: Optional[Iterable[str]] = None,
+                 default: str = "allow", dns_pinning: bool = False, dns_ttl: float = DNS_TTL,
+                 cache_size: int = CACHE_SIZE, resolver: Optional[Callable[[str], List[str]]] = None):
+        if default not in ("allow", "deny"):
+            raise ValueError(f"network default must be allow or deny, got {default!r}")
+        self.default = default
+        self.deny = _compile(tuple(deny or []))
+        self.allow = _compile(tuple(allow or []))
+        self.dns_pinning = bool(dns_pinning)
+        self.dns_ttl = float(dns_ttl)
+        self.cache_size = max(0, int(cache_size))
+        self.resolver = resolver or _getaddrinfo
+        # host -> (blocking rule or None, expires at or None)
+        self._verdicts: "OrderedDict[str, Tuple[Optional[str], Optional[float]]]" = OrderedDict()
+        self._pins: Dict[str, Tuple[List[str], float]] = {}
+        self._lock = threading.Lock()
+        self.counters = {"checked": 0, "blocked": 0, "cache_hits": 0, "resolves": 0}
+
+    @classmethod
+    def from_config(cls, cfg) -> "NetworkPolicy":
+        # runs with the same settings share one policy and its caches
+        return _shared(
+            tuple(cfg.get("network.deny_patterns") or []),
+            tuple(cfg.get("network.allow_patterns") or []),
+            cfg.get("network.default", "allow"),
+            bool(cfg.get("network.dns_pinning", False)),
+            float(cfg.get("network.dns_ttl", DNS_TTL)),
+            int(cfg.get("network.cache_size", CACHE_SIZE)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        # nothing to enforce: callers can skip request interception entirely
+        return self.default == "deny" or len(self.deny) > 0
+
+    def pinned(self, host: str) -> List[str]:
+        # resolved addresses for host, re-resolved once dns_ttl has passed
+        now = time.monotonic()
+        pin = self._pins.get(host)
+        if pin is not None and pin[1] > now:
+            return pin[0]
+        try:
+            addrs = list(self.resolver(host))
+        except Exception as e:
+            logger.debug(f"resolving {host} failed: {e}")
+            addrs = []
+        self.counters["resolves"] += 1
+        with self._lock:
+            if len(self._pins) >= max(self.cache_size, 1):
+                self._pins.clear()
+            self._pins[host] = (addrs, now + self.dns_ttl)
+        return addrs
+
+    def _evaluate(self, host: str) -> Tuple[Optional[str], Optional[float]]:
+        ip = _ip(host)
+        if ip is not None:
+            rule, allowed = self.deny.match_ip(ip), self.allow.match_ip(ip) is not None
+            expires = None
+        else:
+            rule, allowed = self.deny.match_host(host), self.allow.match_host(host) is not None
+            expires = None
+            if self.dns_pinning and rule is None and not allowed:
+                # a permitted name that resolves into a denied range
+                for addr in self.pinned(host):
+                    rule = self.deny.match_ip(ipaddress.ip_address(addr))
+                    if rule is not None:
+                        break
+                expires = time.monotonic() + self.dns_ttl
+        if allowed:
+            return None, expires
+        if rule is None and self.default == "deny":
+            rule = "default:deny"
+        return rule, expires
+
+    def check_host(self, host: str) -> Optional[str]:
+        # the pattern that blocks host, or None if it's allowed
+        host = host.lower().rstrip(".")
+        hit = self._verdicts.get(host)
+        if hit is not None and (hit[1] is None or hit[1] > time.monotonic()):
+            self.counters["cache_hits"] += 1
+            return hit[0]
+        verdict = self._evaluate(host)
+        if self.cache_size:
+            with self._lock:
+                self._verdicts[host] = verdict
+                if len(self._verdicts) > self.cache_size:
+                    self._verdicts.popitem(last=False)
+        return verdict[0]
+
+    def denied_by(self, url: str) -> Optional[str]:
+        self.counters["checked"] += 1
+        try:
+            parts = urlsplit(url)
+            host = parts.hostname
+        except ValueError:
+            return "invalid-url"
+        if parts.scheme not in CHECKED_SCHEMES or not host:
+            return None
+        rule = self.check_host(host)
+        if rule is not None:
+            self.counters["blocked"] += 1
+        return rule
+
+    def is_denied(self, url: str) -> bool:
+        return self.denied_by(url) is not None
+
+    def stats(self) -> dict:
+        out = dict(self.counters)
+        out.update(cached=len(self._verdicts), pinned=len(self._pins))
+        return out
+
+@functools.lru_cache(maxsize=8)
+def _shared(deny, allow, default, dns_pinning, dns_ttl, cache_size) -> NetworkPolicy:
+    return NetworkPolicy(deny, allow, default=default, dns_pinning=dns_pinning, dns_ttl=dns_ttl, cache_size=cache_size)
+
+# Playwright hooks: every request of a context is checked before it leaves
+# the browser. Interception costs a round trip per request, so it's only
+# installed when the policy has something to enforce.
+
+def install(context, policy: Optional[NetworkPolicy]) -> bool:
+    if policy is None or not policy.enabled:
+        return False
+
+    def handle(route):
+        url = route.request.url
+        rule = policy.denied_by(url)
+        if rule is None:
+            route.continue_()
+        else:
+            logger.warning(f"blocked {url} ({rule})")
+            route.abort("blockedbyclient")
+
+    context.route("**/*", handle)
+    return True
+
+async def install_async(context, policy: Optional[NetworkPolicy]) -> bool:
+    if policy is None or not policy.enabled:
+        return False
+
+    async def handle(route):
+        url = route.request.url
+        if policy.dns_pinning:
+            # may resolve the host, which blocks; keep it off the event loop
+            rule = await asyncio.get_running_loop().run_in_executor(None, policy.denied_by, url)
+        else:
+            rule = policy.denied_by(url)
+        if rule is None:
+            await route.continue_()
+        else:
+            logger.warning(f"blocked {url} ({rule})")
+            await route.abort("blockedbyclient")
+
+    await context.route("**/*", handle)
+    return True
@@ -1,16 +1,264 @@
-from typing import List
+import re
+import fnmatch
+import functools
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Command policy. Rules are strings, optionally prefixed with their kind:
+#   "rm -rf"              literal, case-insensitive substring (default)
+#   "glob:shutdown */f*"  glob over the whole command
+#   "re:\bdel\s+/s\b"     regular expression, searched
+#   "cmd:rm -r -f"        token-aware: program rm with flags r and f in any
+#                         order or combination (-rf, -fr, -r -f); "a|b"
+#                         accepts either flag, other words must appear as
+#                         arguments (globs allowed)
+# A command is denied when a deny rule matches and no allow rule does. All
+# literal/glob/regex rules of a list are compiled into one regex (literals
+# as a prefix trie) and token rules are indexed by program name. Regexes
+# that can't share one (inline global flags, named groups, backreferences)
+# are compiled and tried on their own.
+
+DEFAULT_DENY = [
+    "format",
+    "cipher /w",
+    "rm -rf",
+    "diskpart",
+    "reg delete HKLM\\SYSTEM",
+    "shutdown /f",
+]
+KINDS = ("lit", "glob", "re", "cmd")
+CACHE_SIZE = 4096
+
+_SEGMENTS = re.compile(r"&&|\|\||[;&|\n]")
+# prefixes that run the next word as the actual program
+_WRAPPERS = {"sudo", "doas", "nohup", "time", "env", "nice", "exec", "command", "xargs", "call", "start"}
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+def parse_rule(rule: str) -> Tuple[str, str]:
+    # -> (kind, body); raises ValueError for unusable rules
+    if not isinstance(rule, str) or not rule.strip():
+        raise ValueError(f"policy rule must be a non-empty string: {rule!r}")
+    kind, sep, body = rule.partition(":")
+    if not sep or kind not in KINDS:
+        kind, body = "lit", rule
+    if not body.strip():
+        raise ValueError(f"empty {kind} policy rule: {rule!r}")
+    if kind == "re":
+        try:
+            re.compile(body)
+        except re.error as e:
+            raise ValueError(f"bad regex in policy rule {rule!r}: {e}")
+    return kind, body
+
+_ESCAPES = re.compile(r"\\.")
+
+def _needs_ignorecase(pattern: str) -> bool:
+    # Commands are lowercased before matching; only patterns with uppercase
+    # letters (outside escapes like \S) need IGNORECASE, which makes a
+    # combined regex several times slower.
+    return any(c.isupper() for c in _ESCAPES.sub("", pattern))
+
+# group references that would point into another rule once combined
+_GROUP_REFS = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+
+def _combinable(pattern: str) -> bool:
+    if _GROUP_REFS.search(pattern):
+        return False
+    try:
+        return not re.compile(f"(?:{pattern})").groupindex
+    except re.error:
+        # e.g. "(?i)" after the start, as wrapping puts it
+        return False
+
+def _program(token: str) -> str:
+    name = token.strip("\"'").replace("\\", "/").rsplit("/", 1)[-1]
+    return name[:-4] if name.endswith(".exe") else name
+
+def _split_flags(token: str) -> List[str]:
+    if token.startswith("--"):
+        return [token.split("=", 1)[0]] if len(token) > 2 else []
+    if token.startswith("-") and len(token) > 1:
+        return ["-" + ch for ch in token[1:]]
+    if token.startswith("/") and len(token) > 1 and "/" not in token[1:]:
+        return [token]
+    return []
+
+def _commands(command: str):
+    # (program, flags, positional args) for each chained command
+    for segment in _SEGMENTS.split(command):
+        words = [w.strip("\"'") for w in segment.split()]
+        while words and (words[0] in _WRAPPERS or ("=" in words[0] and not words[0].startswith(("-", "/")))):
+            words.pop(0)
+        if not words:
+            continue
+        flags, args = set(), []
+        for i, w in enumerate(words[1:]):
+            if w == "--":
+                args.extend(words[i + 2:])
+                break
+            split = _split_flags(w)
+            if split:
+                flags.update(split)
+            else:
+                args.append(w)
+        yield _program(words[0]), flags, args
+
+class _TokenRule:
+    def __init__(self, rule: str, body: str):
+        self.rule = rule
+        words = _normalize(body).split()
+        self.program = _program(words[0])
+        # each entry is a set of alternatives; one of them must be present
+        self.flags: List[set] = []
+        self.args: List[str] = []
+        for w in words[1:]:
+            alts = w.split("|")
+            expanded = [_split_flags(a) for a in alts]
+            if all(expanded):
+                if len(alts) == 1:
+                    # "-rf" means both -r and -f
+                    self.flags.extend({f} for f in expanded[0])
+                else:
+                    self.flags.append({f for e in expanded for f in e})
+            else:
+                self.args.append(w)
+
+    def matches(self, flags: set, args: List[str]) -> bool:
+        if not all(alts & flags for alts in self.flags):
+            return False
+        return all(any(fnmatch.fnmatchcase(a, pat) for a in args) for pat in self.args)
+
+def _trie_regex(words: Iterable[str], prefixes: bool = True) -> str:
+    # One alternation sharing common prefixes. With prefixes=True (substring
+    # search) a word that is a prefix of another makes the longer redundant.
+    trie: Dict = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node) -> str:
+        if "" in node and (prefixes or len(node) == 1):
+            return ""
+        alts, leaves = [], []
+        for ch in sorted(k for k in node if k):
+            sub = build(node[ch])
+            if sub:
+                alts.append(re.escape(ch) + sub)
+            else:
+                leaves.append(re.escape(ch))
+        if leaves:
+            alts.append(leaves[0] if len(leaves) == 1 else "[" + "".join(leaves) + "]")
+        out = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if "" in node:
+            out = f"(?:{out})?"
+        return out
+
+    return build(trie) if trie else ""
+
+class RuleSet:
+    def __init__(self, rules: Iterable[str]):
+        self.rules = list(dict.fromkeys(rules))
+        self._literals: Dict[str, str] = {}
+        self._regexes: List[Tuple[str, str]] = []
+        self._regexes_i: List[Tuple[str, str]] = []
+        self._alone: List[Tuple[str, "re.Pattern"]] = []
+        self._globs: List[Tuple[str, str]] = []
+        self._tokens: Dict[str, List[_TokenRule]] = {}
+        for rule in self.rules:
+            kind, body = parse_rule(rule)
+            if kind == "lit":
+                self._literals.setdefault(_normalize(body), rule)
+            elif kind == "glob":
+                self._globs.append((rule, fnmatch.translate(_normalize(body))))
+            elif kind == "re" and not _combinable(body):
+                self._alone.append((rule, re.compile(body, re.IGNORECASE if _needs_ignorecase(body) else 0)))
+            elif kind == "re":
+                (self._regexes_i if _needs_ignorecase(body) else self._regexes).append((rule, body))
+            else:
+                tr = _TokenRule(rule, body)
+                self._tokens.setdefault(tr.program, []).append(tr)
+        parts = []
+        if self._literals:
+            parts.append(f"(?P<lit>{_trie_regex(self._literals)})")
+        if self._regexes:
+            parts.append("(?P<re>" + "|".join(f"(?:{p})" for _, p in self._regexes) + ")")
+        self._search = re.compile("|".join(parts)) if parts else None
+        self._search_i = re.compile("|".join(f"(?:{p})" for _, p in self._regexes_i), re.IGNORECASE) if self._regexes_i else None
+        # globs cover the whole command, so they are tried at position 0 only
+        self._match = re.compile("|".join(f"(?:{p})" for _, p in self._globs)) if self._globs else None
+        # token rules are only parsed out when one of their programs appears
+        self._programs = None
+        if self._tokens:
+            self._programs = re.compile(r"(?:^|[\s;&|/\\\"'])" + _trie_regex(self._tokens, prefixes=False) + r"(?:\.exe)?(?=$|[\s;&|\"'])")
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _which(self, rules: List[Tuple[str, str]], command: str, match: bool) -> Optional[str]:
+        # only on a hit: find the rule behind a combined match
+        for rule, p in rules:
+            rx = re.compile(p, re.IGNORECASE)
+            if (rx.match if match else rx.search)(command):
+                return rule
+        return None
+
+    def match(self, command: str) -> Optional[str]:
+        # command is already normalized; returns the first matching rule
+        if self._search is not None:
+            m = self._search.search(command)
+            if m is not None:
+                if m.lastgroup == "lit":
+                    return self._literals[m.group("lit")]
+                return self._which(self._regexes, command, False)
+        if self._search_i is not None and self._search_i.search(command):
+            return self._which(self._regexes_i, command, False)
+        for rule, rx in self._alone:
+            if rx.search(command):
+                return rule
+        if self._match is not None and self._match.match(command):
+            return self._which(self._globs, command, True)
+        if self._programs is not None and self._programs.search(command):
+            for program, flags, args in _commands(command):
+                for tr in self._tokens.get(program, ()):
+                    if tr.matches(flags, args):
+                        return tr.rule
+        return None
+
+@functools.lru_cache(maxsize=8)
+def _compile(rules: Tuple[str, ...]) -> RuleSet:
+    # runs share the compiled rule sets of an unchanged config
+    return RuleSet(rules)
 
 class SafetyPolicy:
-    def __init__(self):
-        self.deny = [
-            "format",
-            "cipher /w",
-            "rm -rf",
-            "diskpart",
-            "reg delete HKLM\\SYSTEM",
-            "shutdown /f",
-        ]
+    def __init__(self, deny: Optional[Iterable[str]] = None, allow: Optional[Iterable[str]] = None,
+                 cache_size: int = CACHE_SIZE):
+        self.deny = list(DEFAULT_DENY if deny is None else deny)
+        self.allow = list(allow or [])
+        self._deny = _compile(tuple(self.deny))
+        self._allow = _compile(tuple(self.allow))
+        self._verdict = functools.lru_cache(maxsize=cache_size)(self._evaluate) if cache_size else self._evaluate
+
+    @classmethod
+    def from_config(cls, cfg) -> "SafetyPolicy":
+        return cls(
+            deny=cfg.get("policy.commands.deny"),
+            allow=cfg.get("policy.commands.allow"),
+            cache_size=int(cfg.get("policy.cache_size", CACHE_SIZE)),
+        )
+
+    def _evaluate(self, command: str) -> Optional[str]:
+        c = _normalize(command)
+        rule = self._deny.match(c)
+        if rule is None or self._allow.match(c) is not None:
+            return None
+        return rule
+
+    def denied_by(self, command: str) -> Optional[str]:
+        # the deny rule that blocks command, or None if it's allowed
+        return self._verdict(command or "")
 
     def is_denied(self, command: str) -> bool:
-        c = (command or "").lower()
-        return any(pat in c for pat in (s.lower() for s in self.deny))
+        return self._verdict(command or "") is not None
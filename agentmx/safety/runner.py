@@ -1,13 +1,46 @@
 import os
 import time
+from typing import Optional
+from agentmx.safety.cancel import CancelToken, Stopped
 
 class StopFileGuard:
-    class Stopped(Exception):
-        pass
+    Stopped = Stopped
 
-    def __init__(self, stop_path: str):
+    def __init__(self, stop_path: str, token: Optional[CancelToken] = None):
+        # With a token, the stop file is watched by agentmx.safety.cancel
+        # and check() is a flag read; without one it stats the file.
         self.stop_path = stop_path
+        self.token = token
+        self.on_stop = []
+
+    def _stopped(self) -> bool:
+        if self.token is not None:
+            return self.token.cancelled
+        return os.path.exists(self.stop_path)
+
+    def _raise(self):
+        for fn in list(self.on_stop):
+            try:
+                fn()
+            except Exception:
+                pass
+        raise StopFileGuard.Stopped()
 
     def check(self):
-        if os.path.exists(self.stop_path):
-            raise StopFileGuard.Stopped()
+        if self._stopped():
+            self._raise()
+
+    def sleep(self, seconds: float):
+        # Returns after `seconds`, or raises Stopped as soon as the run is
+        # cancelled.
+        if self.token is not None:
+            if self.token.wait(max(0.0, seconds)):
+                self._raise()
+            return
+        end = time.monotonic() + seconds
+        while True:
+            self.check()
+            left = end - time.monotonic()
+            if left <= 0:
+                return
+            time.sleep(min(0.2, left))
@@ -1,12 +1,178 @@
 import re
+from typing import Iterable, Iterator, Optional, Union
+
+# Secret redaction. All patterns run as one combined regex, so overlapping
+# secrets are handled in a single left-to-right pass. The secret is the
+# pattern's first group (or the whole match) and is replaced by MASK; the
+# rest of the match (e.g. "api_key=") is kept.
+#
+# triggers names characters every match contains. Only lines holding one
+# are searched, which keeps plain text at memchr speed. With triggers set,
+# patterns must not match across newlines; StreamRedactor relies on that
+# to redact chunked input line by line.
 
 SECRET_PATTERNS = [
-    re.compile(r"(?i)api[_-]?key\s*=\s*([A-Za-z0-9\-\._]+)"),
-    re.compile(r"(?i)token\s*=\s*([A-Za-z0-9\-\._]+)"),
+    re.compile(r"(?i)api[_-]?key[ \t]*=[ \t]*([A-Za-z0-9\-\._]+)"),
+    re.compile(r"(?i)token[ \t]*=[ \t]*([A-Za-z0-9\-\._]+)"),
 ]
+SECRET_TRIGGERS = "="
+MASK = "****"
+# a trigger within this many characters after a trigger line joins its block
+BLOCK_GAP = 128
+# longest line StreamRedactor buffers before cutting it
+MAX_LINE = 1024 * 1024
+
+Text = Union[str, bytes]
+
+_INLINE_FLAGS = re.compile(r"^\(\?([aiLmsux]+)\)")
+
+def _parts(pattern) -> tuple:
+    # -> (pattern text without leading inline flags, flags, group count)
+    p = pattern if isinstance(pattern, re.Pattern) else re.compile(pattern)
+    return _INLINE_FLAGS.sub("", p.pattern), p.flags & ~re.UNICODE, p.groups
+
+class Redactor:
+    def __init__(self, patterns: Iterable = SECRET_PATTERNS, triggers: Optional[str] = SECRET_TRIGGERS,
+                 mask: str = MASK):
+        parts = [_parts(p) for p in patterns]
+        if not parts:
+            raise ValueError("Redactor needs at least one pattern")
+        self.mask = mask
+        # each pattern is wrapped in a group; lastindex names the wrapper,
+        # which maps to the group holding the secret
+        self._secret = {}
+        index = 1
+        for _, _, groups in parts:
+            self._secret[index] = index + 1 if groups else index
+            index += groups + 1
+        flags = {f for _, f, _ in parts}
+        if len(flags) == 1:
+            joined = "|".join(f"({body})" for body, _, _ in parts)
+            common = flags.pop()
+        else:
+            scoped = []
+            for body, f, _ in parts:
+                letters = "".join(c for flag, c in ((re.I, "i"), (re.M, "m"), (re.S, "s"), (re.X, "x")) if f & flag)
+                scoped.append(f"((?{letters}:{body}))" if letters else f"({body})")
+            joined, common = "|".join(scoped), 0
+        self._rx = re.compile(joined, common)
+        self._trigger = re.compile(f"[{re.escape(triggers)}]") if triggers else None
+        try:
+            self._rxb = re.compile(joined.encode("ascii"), common)
+            self._triggerb = re.compile(self._trigger.pattern.encode("ascii")) if triggers else None
+        except UnicodeEncodeError:
+            self._rxb = self._triggerb = None
+        self._subs = {}
+
+    def _sub(self, binary: bool, keep_length: bool):
+        key = (binary, keep_length)
+        fn = self._subs.get(key)
+        if fn is None:
+            secret = self._secret
+            mask = self.mask.encode() if binary else self.mask
+            star = b"*" if binary else "*"
+
+            def fn(m):
+                g = secret[m.lastindex]
+                s = m.start()
+                whole = m.group(0)
+                hidden = star * (m.end(g) - m.start(g)) if keep_length else mask
+                return whole[:m.start(g) - s] + hidden + whole[m.end(g) - s:]
+
+            self._subs[key] = fn
+        return fn
+
+    def _regexes(self, binary: bool):
+        if not binary:
+            return self._rx, self._trigger
+        if self._rxb is None:
+            raise ValueError("patterns aren't ASCII; redact decoded text instead")
+        return self._rxb, self._triggerb
+
+    def redact(self, text: Text, keep_length: bool = False) -> Text:
+        # keep_length masks with one "*" per character so byte offsets
+        # (ranges, index offsets) stay valid
+        if not text:
+            return text
+        binary = not isinstance(text, str)
+        rx, trigger = self._regexes(binary)
+        sub = self._sub(binary, keep_length)
+        if trigger is None:
+            return rx.sub(sub, text)
+        m = trigger.search(text)
+        if m is None:
+            return text
+        nl = b"\n" if binary else "\n"
+        out = []
+        pos = 0
+        while m is not None:
+            start = max(pos, text.rfind(nl, pos, m.start()) + 1)
+            # lines with a trigger close to each other are searched as one
+            # block; per-line calls cost more than the regex on dense text
+            while True:
+                end = text.find(nl, m.end())
+                if end < 0:
+                    end = len(text)
+                m = trigger.search(text, end, end + BLOCK_GAP)
+                if m is None:
+                    break
+            out.append(text[pos:start])
+            out.append(rx.sub(sub, text[start:end]))
+            pos = end
+            m = trigger.search(text, end)
+        out.append(text[pos:])
+        return text[:0].join(out)
+
+    def safe_cut(self, text: Text, keep: int) -> int:
+        # A cut about keep characters from the end that doesn't fall inside
+        # a match, so a long unterminated line can be flushed in pieces.
+        cut = max(0, len(text) - keep)
+        rx, _ = self._regexes(not isinstance(text, str))
+        for m in rx.finditer(text):
+            if m.start() >= cut:
+                break
+            if m.end() > cut:
+                return m.start()
+        return cut
+
+    def stream(self, keep_length: bool = False, max_line: int = MAX_LINE) -> "StreamRedactor":
+        return StreamRedactor(self, keep_length, max_line)
+
+class StreamRedactor:
+    # Redacts chunked input (file reads, socket data) without missing
+    # secrets split across chunks: only complete lines are released and
+    # the unterminated tail waits for the next feed().
+    def __init__(self, redactor: Redactor, keep_length: bool = False, max_line: int = MAX_LINE):
+        self.redactor = redactor
+        self.keep_length = keep_length
+        self.max_line = max(2, int(max_line))
+        self._tail: Optional[Text] = None
+
+    def feed(self, chunk: Text) -> Text:
+        buf = chunk if not self._tail else self._tail + chunk
+        cut = buf.rfind(b"\n" if not isinstance(buf, str) else "\n") + 1
+        if cut == 0 and len(buf) > self.max_line:
+            cut = self.redactor.safe_cut(buf, self.max_line // 2)
+        self._tail = buf[cut:]
+        return self.redactor.redact(buf[:cut], self.keep_length)
+
+    def close(self) -> Text:
+        rest, self._tail = self._tail, None
+        return self.redactor.redact(rest, self.keep_length) if rest else ""
+
+    def wrap(self, chunks: Iterable[Text]) -> Iterator[Text]:
+        for chunk in chunks:
+            out = self.feed(chunk)
+            if out:
+                yield out
+        rest = self.close()
+        if rest:
+            yield rest
+
+REDACTOR = Redactor()
 
 def mask(text: str) -> str:
-    s = text or ""
-    for pat in SECRET_PATTERNS:
-        s = pat.sub(lambda m: s.replace(m.group(1), "****"), s)
-    return s
+    return REDACTOR.redact(text or "")
+
+def redact_stream(chunks: Iterable[Text], keep_length: bool = False) -> Iterator[Text]:
+    return REDACTOR.stream(keep_length).wrap(chunks)
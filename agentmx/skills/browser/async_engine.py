@@ -0,0 +1,196 @@
+import os
+import asyncio
+import threading
+from typing import Callable, Dict, List, Optional
+from loguru import logger
+from agentmx.safety import cancel
+from agentmx.safety import network as netpolicy
+from agentmx.safety.runner import StopFileGuard
+from agentmx.skills.browser.upload_receipt import RECEIPT_PAGE
+
+# One event loop thread and one browser drive many upload pages at once.
+# Callers stay synchronous: upload()/upload_many() block on the loop. Each
+# page's task is bound to a cancel token (the run's, or the global token of
+# stop_file), so STOP or a cancelled run aborts in-flight pages at once.
+
+class AsyncBrowserEngine:
+    def __init__(self, headless: bool = True, max_pages: int = 32, page_timeout: float = 60.0,
+                 stop_file: Optional[str] = None, launcher: Optional[Callable] = None):
+        self.headless = headless
+        self.max_pages = max(1, int(max_pages))
+        self.page_timeout = float(page_timeout)
+        self.stop_file = stop_file
+        self.launcher = launcher
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="agentmx-browser-loop", daemon=True)
+        self._thread.start()
+        self._pw = None
+        self._browser = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+        self._pages: Optional[asyncio.Semaphore] = None
+        self._reserved: set = set()
+        self._closed = False
+
+    def _call(self, coro, timeout: Optional[float] = None):
+        if self._closed:
+            coro.close()
+            raise RuntimeError("browser engine is closed")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    # loop-side
+
+    async def _ensure_browser(self):
+        if self._launch_lock is None:
+            self._launch_lock = asyncio.Lock()
+            self._pages = asyncio.Semaphore(self.max_pages)
+        async with self._launch_lock:
+            connected = False
+            if self._browser is not None:
+                try:
+                    connected = self._browser.is_connected()
+                except Exception:
+                    connected = False
+            if not connected:
+                if self.launcher is not None:
+                    self._browser = await self.launcher()
+                else:
+                    if self._pw is None:
+                        from playwright.async_api import async_playwright
+                        self._pw = await async_playwright().start()
+                    self._browser = await self._pw.chromium.launch(headless=self.headless)
+        return self._browser
+
+    def _token(self, token: Optional[cancel.CancelToken]) -> Optional[cancel.CancelToken]:
+        if token is None and self.stop_file:
+            return cancel.global_token(self.stop_file)
+        return token
+
+    def _reserve(self, downloads_dir: str, name: str) -> str:
+        # concurrent uploads all suggest "receipt.txt"; give each its own file
+        stem, ext = os.path.splitext(name)
+        path = os.path.join(downloads_dir, name)
+        n = 1
+        while path in self._reserved or os.path.exists(path):
+            path = os.path.join(downloads_dir, f"{stem}-{n}{ext}")
+            n += 1
+        self._reserved.add(path)
+        return path
+
+    async def _flow(self, page, file_path: str, downloads_dir: str, url: Optional[str]) -> Dict:
+        await page.goto(url or "data:text/html," + RECEIPT_PAGE)
+        await page.set_input_files("#f", file_path)
+        async with page.expect_download() as dl:
+            await page.click("#ok")
+        download = await dl.value
+        save_to = self._reserve(downloads_dir, download.suggested_filename)
+        try:
+            await download.save_as(save_to)
+        finally:
+            self._reserved.discard(save_to)
+        return {"path": save_to, "type": "receipt", "size": os.path.getsize(save_to)}
+
+    async def upload_async(self, file_path: str, downloads_dir: str, url: Optional[str] = None,
+                           token: Optional[cancel.CancelToken] = None, network=None) -> Dict:
+        token = self._token(token)
+        if token is not None and token.cancelled:
+            raise StopFileGuard.Stopped()
+        unbind = token.bind_task(asyncio.current_task()) if token is not None else None
+        try:
+            browser = await self._ensure_browser()
+            async with self._pages:
+                context = await browser.new_context(accept_downloads=True)
+                try:
+                    await netpolicy.install_async(context, network)
+                    page = await context.new_page()
+                    return await asyncio.wait_for(self._flow(page, file_path, downloads_dir, url), self.page_timeout)
+                finally:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+        except asyncio.CancelledError:
+            if token is not None and token.cancelled:
+                raise StopFileGuard.Stopped()
+            raise
+        finally:
+            if unbind is not None:
+                unbind()
+
+    async def _upload_many(self, file_paths: List[str], downloads_dir: str, url: Optional[str], token, network):
+        return await asyncio.gather(*(self.upload_async(p, downloads_dir, url, token, network) for p in file_paths),
+                                    return_exceptions=True)
+
+    # caller-side
+
+    def upload(self, file_path: str, downloads_dir: str, url: Optional[str] = None,
+               token: Optional[cancel.CancelToken] = None, network=None) -> Dict:
+        os.makedirs(downloads_dir, exist_ok=True)
+        return self._call(self.upload_async(file_path, downloads_dir, url, token, network))
+
+    def upload_many(self, file_paths: List[str], downloads_dir: str, url: Optional[str] = None,
+                    token: Optional[cancel.CancelToken] = None, network=None) -> List:
+        # results line up with file_paths; failed uploads come back as the
+        # exception instead of a dict
+        os.makedirs(downloads_dir, exist_ok=True)
+        return self._call(self._upload_many(list(file_paths), downloads_dir, url, token, network))
+
+    def warm_up(self):
+        self._call(self._ensure_browser())
+
+    async def _shutdown(self):
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+        if self._pw is not None:
+            try:
+                await self._pw.stop()
+            except Exception:
+                pass
+
+    def close(self):
+        if self._closed:
+            return
+        try:
+            self._call(self._shutdown(), timeout=30)
+        except Exception as e:
+            logger.warning(f"closing browser engine failed: {e}")
+        self._closed = True
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+class AsyncUploadReceiptSkill:
+    # Same interface as BrowserUploadReceiptSkill, backed by the shared engine.
+    def __init__(self, downloads_dir: str, engine: AsyncBrowserEngine, token: Optional[cancel.CancelToken] = None,
+                 network=None):
+        self.downloads_dir = downloads_dir
+        self.engine = engine
+        self.token = token
+        self.network = network
+        os.makedirs(self.downloads_dir, exist_ok=True)
+
+    def run(self, file_path: str) -> Dict:
+        return self.engine.upload(file_path, self.downloads_dir, token=self.token, network=self.network)
+
+_ENGINE: Optional[AsyncBrowserEngine] = None
+_ENGINE_LOCK = threading.Lock()
+
+def shared_engine(cfg) -> AsyncBrowserEngine:
+    global _ENGINE
+    if _ENGINE is None:
+        with _ENGINE_LOCK:
+            if _ENGINE is None:
+                _ENGINE = AsyncBrowserEngine(
+                    max_pages=int(cfg.get("browser.async.max_pages", 32)),
+                    page_timeout=float(cfg.get("browser.async.page_timeout", 60)),
+                    stop_file=cfg.kill_switch_file,
+                )
+    return _ENGINE
+
+def close_engine():
+    global _ENGINE
+    with _ENGINE_LOCK:
+        engine, _ENGINE = _ENGINE, None
+    if engine is not None:
+        engine.close()
@@ -0,0 +1,247 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+from loguru import logger
+from agentmx.safety.cancel import Stopped
+
+# A process-wide set of pre-launched browsers. Every run still gets a fresh
+# BrowserContext (its own cookies, storage and downloads), so
+# browser.profile_per_run holds; only the driver and browser process are
+# shared. Playwright's sync API is bound to the thread that started it, so
+# each browser lives on its own thread and jobs are executed there.
+
+# how long run() waits for a free browser unless told otherwise
+ACQUIRE_TIMEOUT = 300.0
+# how often a caller waiting for a browser checks its cancel token
+ACQUIRE_SLICE = 0.1
+
+class _Slot:
+    def __init__(self, pool: "BrowserPool", index: int):
+        self.pool = pool
+        self.index = index
+        self.contexts = 0
+        self._jobs: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pw = None
+        self._browser = None
+
+    def call(self, fn: Callable[[], Any], token=None) -> Any:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name=f"agentmx-browser-{self.index}", daemon=True)
+            self._thread.start()
+        fut: Future = Future()
+        self._jobs.put((fn, fut))
+        if token is None:
+            return fut.result()
+        # Playwright's sync API can't be interrupted from another thread, so
+        # a cancelled caller stops waiting and the job finishes (or times
+        # out) on the slot thread; jobs that haven't started are skipped.
+        done = threading.Event()
+        fut.add_done_callback(lambda _f: done.set())
+        unbind = token.on_cancel(done.set)
+        try:
+            done.wait()
+        finally:
+            unbind()
+        if fut.done():
+            return fut.result()
+        fut.cancel()
+        raise Stopped()
+
+    def stop(self, timeout: float = 10.0):
+        if self._thread is None:
+            return
+        self._jobs.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _loop(self):
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                self._close_browser()
+                if self._pw is not None:
+                    try:
+                        self._pw.stop()
+                    except Exception:
+                        pass
+                    self._pw = None
+                return
+            fn, fut = item
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                fut.set_result(fn())
+            except BaseException as e:
+                fut.set_exception(e)
+
+    # the methods below only run on the slot thread
+
+    def _launch(self):
+        if self.pool.launcher is not None:
+            return self.pool.launcher()
+        if self._pw is None:
+            from playwright.sync_api import sync_playwright
+            self._pw = sync_playwright().start()
+        return self._pw.chromium.launch(headless=self.pool.headless)
+
+    def _healthy(self) -> bool:
+        try:
+            return self._browser is not None and self._browser.is_connected()
+        except Exception:
+            return False
+
+    def ensure_browser(self):
+        if not self._healthy():
+            if self._browser is not None:
+                logger.warning(f"browser slot {self.index} unhealthy, relaunching")
+                self._close_browser()
+            self._browser = self._launch()
+            self.contexts = 0
+            self.pool._count("launches")
+        return self._browser
+
+    def _close_browser(self):
+        if self._browser is None:
+            return
+        try:
+            self._browser.close()
+        except Exception:
+            pass
+        self._browser = None
+
+    def with_context(self, job: Callable[[Any], Any], options: dict) -> Any:
+        browser = self.ensure_browser()
+        try:
+            context = browser.new_context(**options)
+        except Exception:
+            # one retry on a fresh browser: the old one may have died
+            # between the health check and now
+            self._close_browser()
+            context = self.ensure_browser().new_context(**options)
+        try:
+            return job(context)
+        finally:
+            try:
+                context.close()
+            except Exception:
+                pass
+            self.contexts += 1
+            self.pool._count("contexts")
+            if self.pool.recycle_after and self.contexts >= self.pool.recycle_after:
+                self._close_browser()
+                self.pool._count("recycles")
+
+class BrowserPool:
+    def __init__(self, size: int = 1, recycle_after: int = 50, headless: bool = True,
+                 launcher: Optional[Callable[[], Any]] = None, context_options: Optional[dict] = None,
+                 acquire_timeout: float = ACQUIRE_TIMEOUT):
+        self.size = max(1, int(size))
+        self.acquire_timeout = acquire_timeout
+        self.recycle_after = max(0, int(recycle_after))
+        self.headless = headless
+        self.launcher = launcher
+        self.context_options = {"accept_downloads": True} if context_options is None else dict(context_options)
+        self._slots = [_Slot(self, i) for i in range(self.size)]
+        self._idle: "queue.Queue[_Slot]" = queue.Queue()
+        for slot in self._slots:
+            self._idle.put(slot)
+        self._lock = threading.Lock()
+        self._counters = {"launches": 0, "contexts": 0, "recycles": 0}
+        self._closed = False
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._counters)
+        out.update(size=self.size, idle=self._idle.qsize())
+        return out
+
+    def run(self, job: Callable[[Any], Any], timeout: Optional[float] = None, token=None, **context_options) -> Any:
+        # job(context) runs on the browser's thread with a new context that
+        # is closed afterwards. A cancelled token raises Stopped right away.
+        # Waiting for a free browser is bounded by acquire_timeout and ends
+        # early when the token is cancelled.
+        if self._closed:
+            raise RuntimeError("browser pool is shut down")
+        options = dict(self.context_options)
+        options.update(context_options)
+        slot = self._acquire(self.acquire_timeout if timeout is None else timeout, token)
+        try:
+            return slot.call(lambda: slot.with_context(job, options), token=token)
+        finally:
+            self._idle.put(slot)
+
+    def _acquire(self, wait: float, token=None) -> _Slot:
+        deadline = time.monotonic() + wait
+        while True:
+            if token is not None:
+                token.check()
+            left = deadline - time.monotonic()
+            try:
+                return self._idle.get(timeout=max(0.0, min(left, ACQUIRE_SLICE) if token is not None else left))
+            except queue.Empty:
+                if time.monotonic() >= deadline:
+                    raise TimeoutError("no browser available in the pool")
+
+    def warm_up(self):
+        for slot in self._slots:
+            try:
+                slot.call(slot.ensure_browser)
+            except Exception as e:
+                logger.warning(f"browser warm-up failed: {e}")
+                return False
+        return True
+
+    def shutdown(self):
+        self._closed = True
+        for slot in self._slots:
+            slot.stop()
+
+_POOL: Optional[BrowserPool] = None
+_POOL_LOCK = threading.Lock()
+
+def pool_size(cfg) -> int:
+    # browser.pool.size 0: one browser per run that can be going at once
+    size = int(cfg.get("browser.pool.size", 0))
+    if size > 0:
+        return size
+    return max(1, int(cfg.get("api.max_concurrent_runs", 1)), int(cfg.get("autonomy.workers", 1)))
+
+def shared_pool(cfg) -> Optional[BrowserPool]:
+    global _POOL
+    if not cfg.get("browser.pool.enabled", True):
+        return None
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = BrowserPool(
+                    size=pool_size(cfg),
+                    recycle_after=int(cfg.get("browser.pool.recycle_after", 50)),
+                    acquire_timeout=float(cfg.get("browser.pool.acquire_timeout", ACQUIRE_TIMEOUT)),
+                )
+    return _POOL
+
+def warm_up_async(cfg) -> Optional[threading.Thread]:
+    # Launch the pool's browsers in the background so startup isn't held
+    # up by browser launch (or by a missing browser install).
+    if not cfg.get("browser.pool.warm_up", False):
+        return None
+    pool = shared_pool(cfg)
+    if pool is None:
+        return None
+    t = threading.Thread(target=pool.warm_up, name="agentmx-browser-warmup", daemon=True)
+    t.start()
+    return t
+
+def shutdown_pool():
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.shutdown()
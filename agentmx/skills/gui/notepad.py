@@ -34,6 +34,13 @@ class NotepadSkill:
         if self.stop_guard:
             self.stop_guard.check()
 
+    def _pause(self, seconds: float):
+        # GUI settle time; wakes up early (and raises) when the run is stopped
+        if self.stop_guard is not None and hasattr(self.stop_guard, "sleep"):
+            self.stop_guard.sleep(seconds)
+        else:
+            time.sleep(seconds)
+
     def open(self):
         if not IS_WINDOWS:
             raise RuntimeError("NotepadSkill works only on Windows")
@@ -69,7 +76,7 @@ class NotepadSkill:
             path = desktop_default_path()
         self._check_stop()
         send_keys("^s")
-        time.sleep(0.5)
+        self._pause(0.5)
         dlg = self.app.window(title_re=".*Notepad")
         file_name = dlg.child_window(auto_id="1001", control_type="Edit")
         file_name.wait("exists", timeout=self.timeout)
@@ -80,7 +87,7 @@ class NotepadSkill:
         save_btn.wait("enabled", timeout=self.timeout)
         self._check_stop()
         save_btn.click()
-        time.sleep(0.5)
+        self._pause(0.5)
         if self.app.window(title_re="Confirm Save As").exists():
             self.app.window(title_re="Confirm Save As").child_window(title="Yes", control_type="Button").click()
         self._check_stop()
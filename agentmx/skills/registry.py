@@ -19,6 +19,10 @@ class SkillRegistry:
         from agentmx.skills.browser.upload_receipt import BrowserUploadReceiptSkill
         return BrowserUploadReceiptSkill
 
+    def browser_upload_receipt_async(self):
+        from agentmx.skills.browser.async_engine import AsyncUploadReceiptSkill
+        return AsyncUploadReceiptSkill
+
     def text_normalize(self):
         from agentmx.skills.generated.text_normalize import TextNormalizeSkill
         return TextNormalizeSkill
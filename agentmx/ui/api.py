@@ -3,16 +3,25 @@ import sys
 import uuid
 import json
 import mimetypes
-import threading
 import asyncio
 import datetime
+import time
 from typing import Optional
 from loguru import logger
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse, PlainTextResponse, FileResponse, StreamingResponse
-from agentmx.core.config import load_config
+from agentmx.core.config import Config, ConfigWatcher, load_config
 from agentmx.core.runner import AgentRunner
+from agentmx.core.admission import RunPool, QueueFull
+from agentmx.core.events import BROADCASTER, TERMINAL_STATUSES
+from agentmx.core.artifacts import MANIFEST_NAME
+from agentmx.core import spans
+from agentmx.core.cas import BlobStore, DEFAULT_ROOT as DEFAULT_CAS_ROOT
+from agentmx.safety.audit import AuditIndex
+from agentmx.safety import cancel
+from agentmx.safety.secrets import REDACTOR, MAX_LINE, redact_stream
 from agentmx.memory import store as mem
+from agentmx.skills.browser import pool as browser_pool
 
 app = FastAPI()
 cfg = load_config()
@@ -31,22 +40,32 @@ def _iso(ts):
 API_KEY_ENV = "AGENTMX_API_KEY"
 RUNS = {}
 HOTKEY_THREAD = None
+RUN_POOL: Optional[RunPool] = None
+CONFIG_WATCHER: Optional[ConfigWatcher] = None
+
+def _swap_config(new: Config):
+    # Requests read the module-level cfg, so rebinding it is atomic; runs
+    # already in flight keep the Config they were started with.
+    global cfg
+    cfg = new
+    logger.info(f"config reloaded from {new.path}")
 
 def run_paths(run_id: Optional[str] = None):
     base = None
     if run_id:
-        base = os.path.abspath(cfg.get("execution.working_dir", f".agentmx/work/{run_id}").format(run_id=run_id))
+        base = os.path.abspath(cfg.workdir_for(run_id))
     return {
         "workdir": base,
         "status": os.path.join(base, "status.json") if base else None,
-        "artifacts": os.path.join(base, "artifacts.json") if base else None,
+        "artifacts": os.path.join(base, MANIFEST_NAME) if base else None,
         "audit": os.path.join(base, "audit.log") if base else None,
+        "timings": os.path.join(base, "timings.json") if base else None,
     }
 
 @app.on_event("startup")
 async def _startup():
-    global HOTKEY_THREAD
-    stop_path = cfg.get("execution.kill_switch_file", ".agentmx/STOP")
+    global HOTKEY_THREAD, CONFIG_WATCHER
+    stop_path = cfg.kill_switch_file
     if sys.platform.startswith("win"):
         try:
             from agentmx.safety.hotkey import start_hotkey
@@ -56,20 +75,48 @@ async def _startup():
         except Exception as e:
             HOTKEY_THREAD = None
             logger.warning(f"Windows hotkey not available: {e}")
+    browser_pool.warm_up_async(cfg)
+    interval = float(cfg.get("api.config_reload_interval", 2.0))
+    if interval > 0 and cfg.path and CONFIG_WATCHER is None:
+        CONFIG_WATCHER = ConfigWatcher(_swap_config, current=cfg, interval=interval).start()
 
 @app.on_event("shutdown")
 async def _shutdown():
-    global HOTKEY_THREAD
+    global HOTKEY_THREAD, CONFIG_WATCHER
+    if CONFIG_WATCHER is not None:
+        CONFIG_WATCHER.stop()
+        CONFIG_WATCHER = None
     if HOTKEY_THREAD and hasattr(HOTKEY_THREAD, "stop"):
         try:
             HOTKEY_THREAD.stop()
         except Exception:
             pass
+    if RUN_POOL is not None:
+        # runs still waiting for a slot will never start
+        aborted = [args[0] for args in RUN_POOL.shutdown(wait=False)]
+        if aborted:
+            try:
+                mem.abort_queued_runs(mem.connect(), aborted)
+            except Exception as e:
+                logger.warning(f"marking {len(aborted)} queued runs aborted failed: {e}")
+            for run_id in aborted:
+                cancel.release(run_id)
+        # running ones are cancelled and get a bounded time to wind down
+        # before the browsers and the store go away under them
+        for args in RUN_POOL.running():
+            cancel.cancel_run(args[0], "API shutting down")
+        grace = float(cfg.get("api.shutdown_grace_seconds", 30))
+        if not await asyncio.get_running_loop().run_in_executor(None, RUN_POOL.wait, grace):
+            logger.warning(f"runs still active {grace:g}s after shutdown was requested")
+    browser_pool.shutdown_pool()
+    engine_mod = sys.modules.get("agentmx.skills.browser.async_engine")
+    if engine_mod is not None:
+        engine_mod.close_engine()
+    mem.close_all()
 
 @app.middleware("http")
 async def api_key_guard(request: Request, call_next):
-    require_key = cfg.get("approvals.api_key_required", True)
-    if require_key:
+    if cfg.api_key_required:
         key = request.headers.get("X-API-Key")
         expected = os.environ.get(API_KEY_ENV)
         if not expected or key != expected:
@@ -96,21 +143,47 @@ async def scheduler_health():
         "last_error_count": int(data.get("last_error_count")) if data.get("last_error_count") is not None else 0,
     }
 
+def _run_pool() -> RunPool:
+    global RUN_POOL
+    if RUN_POOL is None:
+        RUN_POOL = RunPool(
+            max_concurrent=int(cfg.get("api.max_concurrent_runs", 4)),
+            max_queued=int(cfg.get("api.max_queued_runs", 32)),
+        )
+    return RUN_POOL
+
+def _execute_run(run_id: str, task: str):
+    try:
+        try:
+            runner = AgentRunner(cfg, run_id=run_id, net_enabled=True, allow_safety_edit=False)
+        except Exception as e:
+            logger.exception(e)
+            try:
+                mem.record_run(mem.connect(), run_id, "failed", 0.0, 0.0)
+            except Exception:
+                pass
+            return False
+        return runner.execute(task, timeout=3600)
+    finally:
+        cancel.release(run_id)
+
 @app.post("/run")
 async def run_task(payload: dict):
     task = payload.get("task")
     if not task:
         raise HTTPException(400, "task required")
     run_id = str(uuid.uuid4())
-    runner = AgentRunner(cfg, run_id=run_id, net_enabled=True, allow_safety_edit=False)
-    t = threading.Thread(target=runner.execute, args=(task,), kwargs={"timeout": 3600}, daemon=True)
-    t.start()
-    RUNS[run_id] = {"task": task, "workdir": runner.workdir}
+    cancel.register(run_id)
+    try:
+        _run_pool().submit(_execute_run, run_id, task)
+    except QueueFull:
+        cancel.release(run_id)
+        retry_after = int(cfg.get("api.retry_after_seconds", 5))
+        return JSONResponse(status_code=429, content={"detail": "run queue full"}, headers={"Retry-After": str(retry_after)})
+    RUNS[run_id] = {"task": task, "workdir": run_paths(run_id)["workdir"]}
     conn = mem.connect()
     try:
-        mem.begin(conn)
-        mem.upsert_run(conn, run_id, "running", 0.0, 0.0)
-        mem.commit(conn)
+        mem.queue_run(conn, run_id)
     except Exception:
         mem.rollback(conn)
     return JSONResponse({"accepted": True, "run_id": run_id, "task": task})
@@ -123,18 +196,177 @@ async def run_status(run_id: str):
         raise HTTPException(404, "run not found")
     return {"run_id": row["id"], "status": row["status"], "score": row.get("score"), "duration": row.get("duration"), "created_at": _iso(row.get("created_at"))}
 
-@app.get("/runs/{run_id}/logs")
-async def run_logs(run_id: str):
-    info = RUNS.get(run_id)
-    if not info:
+@app.post("/runs/{run_id}/cancel")
+async def run_cancel(run_id: str):
+    conn = mem.connect()
+    row = mem.get_run(conn, run_id)
+    if not row:
         raise HTTPException(404, "run not found")
-    p = run_paths(run_id)
+    if row["status"] in TERMINAL_STATUSES:
+        return JSONResponse(status_code=409, content={"detail": f"run already {row['status']}"})
+    if cancel.cancel_run(run_id, "cancelled via API"):
+        via = "token"
+    else:
+        # Not running in this process (e.g. a scheduler run); its runner
+        # watches a STOP file in the workdir.
+        workdir = run_paths(run_id)["workdir"]
+        os.makedirs(workdir, exist_ok=True)
+        with open(os.path.join(workdir, cancel.RUN_STOP_FILE), "w", encoding="utf-8") as f:
+            f.write("cancelled via API")
+        via = "stop_file"
+    return {"run_id": run_id, "cancelling": True, "via": via}
+
+_LOG_CHUNK = 64 * 1024
+
+def _iter_file(path: str, start: int, end: Optional[int] = None):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = None if end is None else max(0, end - start)
+        while remaining is None or remaining > 0:
+            chunk = f.read(_LOG_CHUNK if remaining is None else min(_LOG_CHUNK, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+def _iter_event_lines(path: str, start: int, event: str):
+    # Cheap byte probe first; only candidate lines are parsed.
+    probe = json.dumps(event).encode()
+    with open(path, "rb") as f:
+        f.seek(start)
+        for raw in f:
+            if probe in raw and raw.endswith(b"\n"):
+                try:
+                    if json.loads(raw).get("event") == event:
+                        yield raw
+                except ValueError:
+                    pass
+
+def _line_bounds(path: str, start: int, end: int):
+    # -> (start of the line holding start, end of the line holding end - 1),
+    # looking at most MAX_LINE bytes either way as StreamRedactor does
+    with open(path, "rb") as f:
+        lo = start
+        while lo > 0 and start - lo < MAX_LINE:
+            step = min(_LOG_CHUNK, lo)
+            f.seek(lo - step)
+            nl = f.read(step).rfind(b"\n")
+            if nl >= 0:
+                lo = lo - step + nl + 1
+                break
+            lo -= step
+        hi = end
+        f.seek(hi)
+        while hi - end < MAX_LINE:
+            chunk = f.read(_LOG_CHUNK)
+            if not chunk:
+                break
+            nl = chunk.find(b"\n")
+            if nl >= 0:
+                hi += nl + 1
+                break
+            hi += len(chunk)
+    return max(lo, start - MAX_LINE), hi
+
+def _iter_range_redacted(path: str, start: int, end: int):
+    # Secrets are matched on whole lines, so a range that starts just after
+    # "token=" or ends inside a secret must be redacted with its lines
+    # around it; length-preserving masks let the window be cut back after.
+    lo, hi = _line_bounds(path, start, end)
+    skip = start - lo
+    left = end - start
+    for chunk in redact_stream(_iter_file(path, lo, hi), keep_length=True):
+        if skip:
+            drop = min(skip, len(chunk))
+            chunk = chunk[drop:]
+            skip -= drop
+        chunk = chunk[:left]
+        if chunk:
+            left -= len(chunk)
+            yield chunk
+        if not left:
+            break
+
+def _parse_range(header: str, size: int):
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
     try:
-        with open(p["audit"], "r", encoding="utf-8") as f:
-            lines = f.read()
-        return PlainTextResponse(lines)
-    except Exception:
+        if first == "":
+            n = int(last)
+            if n <= 0:
+                return None
+            return max(0, size - n), size - 1
+        start = int(first)
+        stop = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or stop < start:
+        return None
+    return start, min(stop, size - 1)
+
+@app.get("/runs/{run_id}/logs")
+async def run_logs(run_id: str, request: Request, since_seq: Optional[int] = None, tail: Optional[int] = None, event: Optional[str] = None):
+    if not mem.get_run(mem.connect(), run_id):
+        raise HTTPException(404, "run not found")
+    path = run_paths(run_id)["audit"]
+    BROADCASTER.flush(run_id)
+    if not os.path.exists(path):
         return PlainTextResponse("")
+    range_header = request.headers.get("range")
+    if range_header and since_seq is None and tail is None and event is None:
+        size = os.path.getsize(path)
+        rng = _parse_range(range_header, size)
+        if rng is None:
+            return PlainTextResponse("", status_code=416, headers={"Content-Range": f"bytes */{size}"})
+        start, stop = rng
+        headers = {"Content-Range": f"bytes {start}-{stop}/{size}", "Accept-Ranges": "bytes", "Content-Length": str(stop - start + 1)}
+        return StreamingResponse(_iter_range_redacted(path, start, stop + 1), status_code=206, media_type="text/plain", headers=headers)
+    index = AuditIndex(path)
+    start = 0
+    if tail is not None:
+        total = index.count()
+        first = max(total - max(0, tail), since_seq or 0)
+        start = index.offset_of(first + 1)
+    elif since_seq is not None:
+        start = index.offset_of(since_seq + 1)
+    body = _iter_event_lines(path, start, event) if event else _iter_file(path, start)
+    return StreamingResponse(redact_stream(body), media_type="text/plain", headers={"Accept-Ranges": "bytes"})
+
+def _read_audit_from(path: str, pos: int, seq: int, after_seq: Optional[int]):
+    # Yields (seq, line, end_pos) for complete lines starting at byte pos;
+    # a partially written trailing line is left for the next read.
+    try:
+        with open(path, "rb") as f:
+            f.seek(pos)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                pos += len(raw)
+                seq += 1
+                if after_seq is None or seq > after_seq:
+                    yield seq, raw.decode("utf-8", "replace").rstrip(), pos
+                else:
+                    yield seq, None, pos
+    except OSError:
+        return
+
+def _audit_end(path: str):
+    index = AuditIndex(path)
+    n = index.count()
+    return index.offset_of(n + 1), n
+
+def _sse(seq: int, line: str) -> str:
+    return f"id: {seq}\ndata: {REDACTOR.redact(line)}\n\n"
+
+def _last_event_id(request: Request) -> Optional[int]:
+    raw = request.headers.get("last-event-id")
+    try:
+        return int(raw) if raw is not None else None
+    except ValueError:
+        return None
 
 @app.get("/runs/{run_id}/logs/stream")
 async def run_logs_stream(run_id: str, request: Request):
@@ -142,41 +374,73 @@ async def run_logs_stream(run_id: str, request: Request):
     row = mem.get_run(conn, run_id)
     if not row:
         raise HTTPException(404, "run not found")
+    resume_after = _last_event_id(request)
     async def _sse_gen():
-        p = run_paths(run_id)
-        path = p["audit"]
-        pos = 0
-        last_ping = 0.0
+        path = run_paths(run_id)["audit"]
+        # Runs executing in this process publish audit records and status
+        # changes in-process; anything else (e.g. scheduler runs) is tailed
+        # from disk.
+        live = BROADCASTER.is_active(run_id) or run_id in RUNS
+        sub = BROADCASTER.subscribe(run_id) if live else None
+        BROADCASTER.flush(run_id)
         try:
-            with open(path, "r", encoding="utf-8") as f:
-                f.seek(0, os.SEEK_END)
-                pos = f.tell()
-        except Exception:
-            pos = 0
-        while True:
-            if await request.is_disconnected():
-                break
-            try:
-                with open(path, "r", encoding="utf-8") as f:
-                    f.seek(pos)
-                    for line in f:
-                        pos = f.tell()
-                        yield f"data: {line.rstrip()}\n\n"
-            except Exception:
-                pass
-            try:
-                cur = mem.get_run(mem.connect(), run_id)
-                st = (cur or {}).get("status") or "unknown"
-            except Exception:
-                st = "unknown"
-            now = asyncio.get_event_loop().time()
-            if now - last_ping >= 12.0:
-                yield "event: ping\ndata: {}\n\n"
-                last_ping = now
-            if st in ("completed", "aborted", "failed"):
-                break
-            await asyncio.sleep(0.2)
+            if resume_after is None:
+                pos, seq = _audit_end(path)
+            else:
+                index = AuditIndex(path)
+                seq = min(max(0, resume_after), index.count())
+                pos = index.offset_of(seq + 1)
+                for seq, line, pos in _read_audit_from(path, pos, seq, None):
+                    yield _sse(seq, line)
+            last_ping = asyncio.get_event_loop().time()
+            st = (mem.get_run(mem.connect(), run_id) or {}).get("status")
+            while st not in TERMINAL_STATUSES:
+                if await request.is_disconnected():
+                    break
+                if sub is not None:
+                    ev = await sub.get(timeout=1.0)
+                    if sub.overflowed:
+                        sub.overflowed = False
+                        BROADCASTER.flush(run_id)
+                        for seq, line, pos in _read_audit_from(path, pos, seq, seq):
+                            yield _sse(seq, line)
+                    while ev is not None:
+                        if ev["type"] == "audit" and ev["seq"] > seq:
+                            seq = ev["seq"]
+                            pos += len(ev["line"].encode("utf-8")) + 1
+                            yield _sse(seq, ev["line"])
+                        elif ev["type"] == "status":
+                            st = ev["status"]
+                        try:
+                            ev = sub.queue.get_nowait()
+                        except asyncio.QueueEmpty:
+                            ev = None
+                    if ev is None and not BROADCASTER.is_active(run_id) and st not in TERMINAL_STATUSES:
+                        st = (mem.get_run(mem.connect(), run_id) or {}).get("status")
+                else:
+                    for seq, line, pos in _read_audit_from(path, pos, seq, seq):
+                        yield _sse(seq, line)
+                    try:
+                        st = (mem.get_run(mem.connect(), run_id) or {}).get("status") or "unknown"
+                    except Exception:
+                        st = "unknown"
+                    if st not in TERMINAL_STATUSES:
+                        await asyncio.sleep(0.2)
+                now = asyncio.get_event_loop().time()
+                if now - last_ping >= 12.0:
+                    yield "event: ping\ndata: {}\n\n"
+                    last_ping = now
+            if st in TERMINAL_STATUSES:
+                # Pick up records that landed between the last read and the
+                # final status change.
+                BROADCASTER.flush(run_id)
+                for seq, line, pos in _read_audit_from(path, pos, seq, seq):
+                    yield _sse(seq, line)
+        finally:
+            if sub is not None:
+                sub.close()
     return StreamingResponse(_sse_gen(), media_type="text/event-stream")
+
 @app.get("/runs")
 async def list_runs(limit: int = 50, offset: int = 0):
     conn = mem.connect()
@@ -209,11 +473,174 @@ async def run_detail(run_id: str):
 
 
 
+def _span_stats():
+    out = {}
+    for name, h in sorted(spans.snapshot().items()):
+        out[name] = {"count": h["count"], "avg_ms": round(h["sum_ms"] / h["count"], 3) if h["count"] else 0,
+                     "max_ms": round(h["max_ms"], 3), "p50_ms": _bucket_quantile(h, 0.5), "p95_ms": _bucket_quantile(h, 0.95)}
+    return out
+
+def _bucket_quantile(h: dict, q: float):
+    # upper bound of the bucket holding the q-th observation
+    target = q * h["count"]
+    seen = 0
+    for bound, n in zip(list(spans.BUCKETS_MS) + [None], h["buckets"]):
+        seen += n
+        if seen >= target and n:
+            return bound if bound is not None else round(h["max_ms"], 3)
+    return 0
+
 @app.get("/metrics")
 async def metrics():
     conn = mem.connect()
-    return mem.metrics(conn)
+    data = mem.metrics(conn)
+    data["spans"] = _span_stats()
+    return data
 
+def _prom_line(name: str, value, labels: Optional[dict] = None) -> str:
+    if labels:
+        inner = ",".join(f'{k}="{v}"' for k, v in labels.items())
+        name = f"{name}{{{inner}}}"
+    return f"{name} {value}"
+
+def _prometheus_text(conn) -> str:
+    totals = mem.rollup_totals(conn)
+    now = time.time()
+    lines = [
+        "# HELP agentmx_runs Runs by current status.",
+        "# TYPE agentmx_runs gauge",
+    ]
+    for status, t in sorted(totals.items()):
+        lines.append(_prom_line("agentmx_runs", int(t["runs"]), {"status": status}))
+    lines += [
+        "# HELP agentmx_runs_succeeded Completed runs created in the trailing window.",
+        "# TYPE agentmx_runs_succeeded gauge",
+        _prom_line("agentmx_runs_succeeded", mem.success_since(conn, now - 7 * 86400), {"window": "7d"}),
+        _prom_line("agentmx_runs_succeeded", mem.success_since(conn, now - 30 * 86400), {"window": "30d"}),
+        "# HELP agentmx_run_duration_seconds Run duration.",
+        "# TYPE agentmx_run_duration_seconds histogram",
+    ]
+    cumulative = 0
+    for i, bound in enumerate(list(mem.DURATION_BUCKETS) + ["+Inf"]):
+        cumulative += sum(int(t[f"d{i}"]) for t in totals.values())
+        lines.append(_prom_line("agentmx_run_duration_seconds_bucket", cumulative, {"le": bound}))
+    lines.append(_prom_line("agentmx_run_duration_seconds_sum", sum(t["duration_sum"] for t in totals.values())))
+    lines.append(_prom_line("agentmx_run_duration_seconds_count", sum(int(t["duration_count"]) for t in totals.values())))
+    lines += [
+        "# HELP agentmx_run_score Runs by score range.",
+        "# TYPE agentmx_run_score gauge",
+    ]
+    for name, n in mem.score_histogram(totals).items():
+        lines.append(_prom_line("agentmx_run_score", n, {"range": name}))
+    snap = spans.snapshot()
+    if snap:
+        lines += [
+            "# HELP agentmx_span_duration_seconds Latency of instrumented code paths.",
+            "# TYPE agentmx_span_duration_seconds histogram",
+        ]
+        for name, h in sorted(snap.items()):
+            cumulative = 0
+            for bound, n in zip(list(spans.BUCKETS_MS) + [None], h["buckets"]):
+                cumulative += n
+                le = "+Inf" if bound is None else f"{bound / 1000.0:g}"
+                lines.append(_prom_line("agentmx_span_duration_seconds_bucket", cumulative, {"span": name, "le": le}))
+            lines.append(_prom_line("agentmx_span_duration_seconds_sum", h["sum_ms"] / 1000.0, {"span": name}))
+            lines.append(_prom_line("agentmx_span_duration_seconds_count", h["count"], {"span": name}))
+    cache = mem.step_cache_stats(conn)
+    lines += [
+        "# HELP agentmx_step_cache_lookups_total Plan step cache lookups by result.",
+        "# TYPE agentmx_step_cache_lookups_total counter",
+        _prom_line("agentmx_step_cache_lookups_total", cache["hits"], {"result": "hit"}),
+        _prom_line("agentmx_step_cache_lookups_total", cache["misses"], {"result": "miss"}),
+        "# HELP agentmx_step_cache_evictions_total Plan step cache entries evicted.",
+        "# TYPE agentmx_step_cache_evictions_total counter",
+        _prom_line("agentmx_step_cache_evictions_total", cache["evictions"]),
+        "# HELP agentmx_step_cache_entries Plan step cache entries.",
+        "# TYPE agentmx_step_cache_entries gauge",
+        _prom_line("agentmx_step_cache_entries", cache["entries"]),
+        "# HELP agentmx_step_cache_bytes Size of cached step outputs.",
+        "# TYPE agentmx_step_cache_bytes gauge",
+        _prom_line("agentmx_step_cache_bytes", cache["bytes"]),
+    ]
+    if RUN_POOL is not None:
+        st = RUN_POOL.stats()
+        lines += [
+            "# HELP agentmx_api_runs_running Runs executing in the API worker pool.",
+            "# TYPE agentmx_api_runs_running gauge",
+            _prom_line("agentmx_api_runs_running", st["running"]),
+            "# HELP agentmx_api_runs_queued Runs admitted and waiting for a worker.",
+            "# TYPE agentmx_api_runs_queued gauge",
+            _prom_line("agentmx_api_runs_queued", st["queued"]),
+        ]
+    return "\n".join(lines) + "\n"
+
+@app.get("/metrics/prometheus")
+async def metrics_prometheus():
+    return PlainTextResponse(_prometheus_text(mem.connect()), media_type="text/plain; version=0.0.4")
+
+def _parse_time(value: Optional[str], default: float) -> float:
+    if value is None or value == "":
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        dt = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(400, f"invalid time: {value}")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+_STEP_NAMES = {"hour": 3600, "1h": 3600, "day": 86400, "1d": 86400}
+MAX_TIMESERIES_POINTS = 5000
+
+@app.get("/metrics/timeseries")
+async def metrics_timeseries(request: Request, step: str = "hour", to: Optional[str] = None):
+    # "from" is a Python keyword, so it is read from the query string.
+    end = _parse_time(to, time.time())
+    start = _parse_time(request.query_params.get("from"), end - 86400)
+    try:
+        step_s = _STEP_NAMES.get(step) or int(step)
+    except ValueError:
+        raise HTTPException(400, "step must be hour, day or a number of seconds")
+    if step_s < 3600 or step_s % 3600:
+        raise HTTPException(400, "step must be a whole number of hours")
+    first = int(start) // step_s * step_s
+    if end <= first or (end - first) / step_s > MAX_TIMESERIES_POINTS:
+        raise HTTPException(400, "invalid or too large time range")
+    points = {}
+    for b in range(first, int(end), step_s):
+        points[b] = {"ts": b, "time": _iso(b), "runs": {}, "duration_sum": 0.0, "duration_count": 0,
+                     "score_histogram": {name: 0 for name in mem.SCORE_BUCKETS}}
+    for row in mem.rollup_series(mem.connect(), first, end, step_s):
+        p = points.get(row["bucket"])
+        if p is None:
+            continue
+        p["runs"][row["status"]] = int(row["runs"])
+        p["duration_sum"] += row["duration_sum"]
+        p["duration_count"] += int(row["duration_count"])
+        for i, name in enumerate(mem.SCORE_BUCKETS):
+            p["score_histogram"][name] += int(row[f"s{i}"])
+    out = []
+    for p in points.values():
+        p["avg_duration"] = (p["duration_sum"] / p["duration_count"]) if p["duration_count"] else 0
+        out.append(p)
+    return {"from": first, "to": end, "step": step_s, "points": out}
+
+
+@app.get("/runs/{run_id}/timings")
+async def run_timings(run_id: str):
+    conn = mem.connect()
+    if not mem.get_run(conn, run_id) and run_id not in RUNS:
+        raise HTTPException(404, "run not found")
+    try:
+        with open(run_paths(run_id)["timings"], "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    return {"run_id": run_id, "spans": [], "summary": mem.get_spans(conn, run_id)}
 
 @app.get("/runs/{run_id}/artifacts")
 async def run_artifacts(run_id: str):
@@ -239,8 +666,12 @@ async def run_artifact_download(run_id: str, name: str):
         ap = a.get("path", "")
         if a.get("name") == name or os.path.basename(ap) == name:
             target = ap
+            if a.get("sha256"):
+                blob = BlobStore(cfg.get("artifacts.cas_dir", DEFAULT_CAS_ROOT)).blob_path(a["sha256"])
+                if os.path.exists(blob):
+                    target = blob
             break
     if not target or not os.path.exists(target):
         raise HTTPException(404, "artifact not found")
-    ctype, _ = mimetypes.guess_type(target)
+    ctype, _ = mimetypes.guess_type(name)
     return FileResponse(path=target, media_type=ctype or "application/octet-stream", filename=name)
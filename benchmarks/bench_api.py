@@ -0,0 +1,164 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+import httpx
+from agentmx.core.config import Config
+from agentmx.core.events import BROADCASTER
+from agentmx.memory import store as mem
+from agentmx.safety.audit import AuditLog
+from agentmx.ui import api
+
+# API latency through an in-process ASGI client (no sockets, no server):
+# POST /run admission, GET /runs and /metrics over a populated store, and
+# SSE delivery latency from AuditLog.record to the client:
+#   python -m benchmarks.bench_api --requests 200 --runs 5000
+
+KEY = "bench"
+
+def _ms(samples):
+    samples = sorted(samples)
+    return {
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+    }
+
+async def _timed_get(client, path: str, n: int):
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        r = await client.get(path, headers={"X-API-Key": KEY})
+        samples.append(time.perf_counter() - t0)
+        r.raise_for_status()
+    return _ms(samples)
+
+async def _post_runs(client, n: int):
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        r = await client.post("/run", json={"task": "bench"}, headers={"X-API-Key": KEY})
+        samples.append(time.perf_counter() - t0)
+        if r.status_code not in (200, 429):
+            r.raise_for_status()
+    return _ms(samples)
+
+async def _sse_latency(workdir: str, events: int, interval: float):
+    # httpx's ASGI transport buffers whole responses, so the stream is read
+    # by calling the app directly and timestamping each body chunk.
+    run_id = "bench-sse"
+    mem.record_run(mem.connect(), run_id, "running", 0.0, 0.0)
+    os.makedirs(os.path.join(workdir, run_id), exist_ok=True)
+    log = AuditLog(os.path.join(workdir, run_id), run_id=run_id)
+    BROADCASTER.open(run_id, flush=log.flush)
+    sent = {}
+    received = {}
+    path = f"/runs/{run_id}/logs/stream"
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"x-api-key", KEY.encode())], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    request_sent = False
+    disconnect = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            now = time.perf_counter()
+            for line in message.get("body", b"").decode().splitlines():
+                if line.startswith("id: "):
+                    received[int(line[4:])] = now
+
+    def writer():
+        while not BROADCASTER.subscribers(run_id):
+            time.sleep(0.005)
+        for i in range(events):
+            sent[i + 1] = time.perf_counter()
+            log.record("bench", {"i": i})
+            time.sleep(interval)
+        mem.record_run(mem.connect(), run_id, "completed", 1.0, 1.0)
+        log.close()
+        BROADCASTER.publish(run_id, {"type": "status", "status": "completed"})
+        BROADCASTER.close(run_id, flush=log.flush)
+
+    t = threading.Thread(target=writer, daemon=True)
+    t.start()
+    try:
+        await asyncio.wait_for(api.app(scope, receive, send), timeout=60)
+    finally:
+        disconnect.set()
+        t.join(10)
+    lat = [received[s] - sent[s] for s in sent if s in received]
+    res = _ms(lat) if lat else {}
+    res["delivered"] = len(lat)
+    return res
+
+async def _bench(td: str, requests: int, runs: int, sse_events: int):
+    conn = mem.connect()
+    for i in range(runs):
+        mem.upsert_run(conn, f"bench-{i}", "completed" if i % 4 else "failed", float(i % 100), (i % 10) / 10.0)
+    conn.commit()
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        res = {
+            "get_runs": await _timed_get(client, "/runs?limit=50", requests),
+            "get_metrics": await _timed_get(client, "/metrics", requests),
+            "post_run": await _post_runs(client, min(requests, 50)),
+        }
+    res["sse"] = await _sse_latency(os.path.join(td, "work"), sse_events, 0.002)
+    return res
+
+def run(requests: int = 200, runs: int = 5000, sse_events: int = 200):
+    cwd = os.getcwd()
+    saved_cfg, saved_key = api.cfg, os.environ.get(api.API_KEY_ENV)
+    with tempfile.TemporaryDirectory() as td:
+        os.chdir(td)
+        stop = os.path.join(td, "STOP")
+        # Runs admitted by POST /run see the kill switch and abort at their
+        # first check, so the benchmark measures admission, not run time.
+        with open(stop, "w") as f:
+            f.write("bench")
+        api.cfg = Config(raw={
+            "execution": {"working_dir": os.path.join(td, "work", "{run_id}"), "kill_switch_file": stop},
+            "browser": {"downloads_dir": os.path.join(td, "work", "{run_id}", "browser"), "pool": {"enabled": False}},
+            "artifacts": {"cas_dir": os.path.join(td, "cas")},
+            "api": {"max_queued_runs": 1000},
+        })
+        os.environ[api.API_KEY_ENV] = KEY
+        try:
+            res = asyncio.run(_bench(td, requests, runs, sse_events))
+        finally:
+            if api.RUN_POOL is not None:
+                api.RUN_POOL.shutdown(wait=True)
+                api.RUN_POOL = None
+            api.RUNS.clear()
+            api.cfg = saved_cfg
+            if saved_key is None:
+                os.environ.pop(api.API_KEY_ENV, None)
+            else:
+                os.environ[api.API_KEY_ENV] = saved_key
+            mem.close_all()
+            os.chdir(cwd)
+    return {"benchmark": "api", "requests": requests, "runs": runs, "results": res}
+
+def main():
+    ap = argparse.ArgumentParser(description="API latency through an in-process ASGI client")
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--runs", type=int, default=5000, help="runs stored before measuring")
+    ap.add_argument("--sse-events", type=int, default=200)
+    args = ap.parse_args()
+    print(json.dumps(run(args.requests, args.runs, args.sse_events), indent=2))
+
+if __name__ == "__main__":
+    main()
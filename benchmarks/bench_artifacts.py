@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from agentmx.core.config import Config
+from agentmx.core.runner import AgentRunner
+from agentmx.memory import store as mem
+
+# AgentRunner.add_artifact cost by file size: the call itself (small files
+# are hashed and recorded inside it, larger ones return before hashing) and
+# the time until the artifact is hashed, stored in the blob store and
+# recorded in the DB:
+#   python -m benchmarks.bench_artifacts --sizes 1K,1M,16M --count 20
+
+def _parse_size(s: str) -> int:
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    s = s.strip().upper()
+    return int(float(s[:-1]) * units[s[-1]]) if s and s[-1] in units else int(s)
+
+def run(sizes=("1K", "1M", "16M"), count: int = 20):
+    results = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as td:
+        os.chdir(td)
+        try:
+            cfg = Config(raw={
+                "execution": {"working_dir": os.path.join(td, "work", "{run_id}"), "kill_switch_file": os.path.join(td, "STOP")},
+                "browser": {"downloads_dir": os.path.join(td, "work", "{run_id}", "browser"), "pool": {"enabled": False}},
+                "artifacts": {"cas_dir": os.path.join(td, "cas")},
+            })
+            for label in sizes:
+                size = _parse_size(label)
+                runner = AgentRunner(cfg, f"bench-{label}", net_enabled=False, allow_safety_edit=False)
+                paths = []
+                for i in range(count):
+                    p = os.path.join(runner.workdir, f"a{i}.bin")
+                    with open(p, "wb") as f:
+                        f.write(os.urandom(min(size, 1024 * 1024)) * max(1, size // (1024 * 1024)))
+                    paths.append(p)
+                calls = []
+                t0 = time.perf_counter()
+                for p in paths:
+                    c0 = time.perf_counter()
+                    runner.add_artifact(p)
+                    calls.append(time.perf_counter() - c0)
+                runner.flush_artifacts()
+                total = time.perf_counter() - t0
+                runner.manifest.close()
+                runner.audit.close()
+                results.append({
+                    "size": label,
+                    "count": count,
+                    "add_call_median_us": round(statistics.median(calls) * 1e6, 1),
+                    "artifacts_per_sec": round(count / total, 1),
+                })
+        finally:
+            mem.close_all()
+            os.chdir(cwd)
+    return {"benchmark": "artifacts", "results": results}
+
+def main():
+    ap = argparse.ArgumentParser(description="add_artifact latency by file size")
+    ap.add_argument("--sizes", default="1K,1M,16M")
+    ap.add_argument("--count", type=int, default=20)
+    args = ap.parse_args()
+    print(json.dumps(run([s for s in args.sizes.split(",") if s], args.count), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from agentmx.safety.audit import AuditLog, DURABILITY_MODES
+
+# Records per second for AuditLog.record in each durability mode, next to
+# the previous reopen-per-record writer:
+#   python -m benchmarks.bench_audit --records 20000
+
+class _ReopenPerRecordLog:
+    def __init__(self, workdir: str):
+        self.path = os.path.join(workdir, "audit.log")
+        self.last_hash = "0"*64
+
+    def record(self, event: str, data: dict):
+        rec = {"ts": datetime.utcnow().isoformat() + "Z", "event": event, "data": data or {}, "prev": self.last_hash}
+        h = hashlib.sha256(json.dumps(rec, sort_keys=True).encode()).hexdigest()
+        rec["hash"] = h
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec) + "\n")
+        self.last_hash = h
+
+    def close(self):
+        pass
+
+def _measure(make, records: int) -> float:
+    with tempfile.TemporaryDirectory() as td:
+        log = make(td)
+        payload = {"step": "click", "selector": "#ok", "attempt": 1}
+        t0 = time.perf_counter()
+        for _ in range(records):
+            log.record("action", payload)
+        log.close()
+        return records / (time.perf_counter() - t0)
+
+def run(records: int = 20000, fsync_records: int = 2000):
+    res = {"reopen_per_record": round(_measure(_ReopenPerRecordLog, records))}
+    for mode in DURABILITY_MODES:
+        n = fsync_records if mode == "fsync" else records
+        res[mode] = round(_measure(lambda td, m=mode: AuditLog(td, durability=m), n))
+    # fsync with one batch per record: worst case for small, durable logs.
+    res["fsync_per_record"] = round(_measure(lambda td: AuditLog(td, durability="fsync", flush_bytes=1), fsync_records))
+    return {"benchmark": "audit", "records_per_sec": res}
+
+def main():
+    ap = argparse.ArgumentParser(description="AuditLog.record throughput per durability mode")
+    ap.add_argument("--records", type=int, default=20000)
+    ap.add_argument("--fsync-records", type=int, default=2000)
+    args = ap.parse_args()
+    print(json.dumps(run(args.records, args.fsync_records), indent=2))
+
+if __name__ == "__main__":
+    main()
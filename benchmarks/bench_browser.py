@@ -0,0 +1,49 @@
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from agentmx.skills.browser.pool import BrowserPool
+from agentmx.skills.browser.upload_receipt import BrowserUploadReceiptSkill
+
+# Per-run latency of BrowserUploadReceiptSkill with a fresh browser per run
+# (the previous behaviour) and with a warm pool, on the same data: page.
+# Needs installed browsers (python -m playwright install chromium):
+#   python -m benchmarks.bench_browser --runs 20
+
+def _measure(skill: BrowserUploadReceiptSkill, src: str, runs: int):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        skill.run(src)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {"median_ms": round(statistics.median(samples), 1), "max_ms": round(max(samples), 1)}
+
+def run(runs: int = 10, size: int = 1, recycle_after: int = 50):
+    with tempfile.TemporaryDirectory() as td:
+        src = os.path.join(td, "note.txt")
+        with open(src, "w", encoding="utf-8") as f:
+            f.write("hello from agentmx")
+        res = {"cold": _measure(BrowserUploadReceiptSkill(os.path.join(td, "cold")), src, runs)}
+        pool = BrowserPool(size=size, recycle_after=recycle_after)
+        try:
+            t0 = time.perf_counter()
+            pool.warm_up()
+            res["warm_up_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            res["pooled"] = _measure(BrowserUploadReceiptSkill(os.path.join(td, "pooled"), pool=pool), src, runs)
+            res["pool"] = pool.stats()
+        finally:
+            pool.shutdown()
+    return {"benchmark": "browser", "runs": runs, "results": res}
+
+def main():
+    ap = argparse.ArgumentParser(description="upload-receipt latency with and without the browser pool")
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--size", type=int, default=1)
+    ap.add_argument("--recycle-after", type=int, default=50)
+    args = ap.parse_args()
+    print(json.dumps(run(args.runs, args.size, args.recycle_after), indent=2))
+
+if __name__ == "__main__":
+    main()
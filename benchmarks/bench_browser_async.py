@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from agentmx.skills.browser.async_engine import AsyncBrowserEngine
+
+# Uploads per second through AsyncBrowserEngine against a local stand-in
+# for the upload site (a multipart form that answers with a receipt
+# download), at several page concurrencies:
+#   python -m benchmarks.bench_browser_async --uploads 64 --concurrency 1 8 32
+# Needs installed browsers (python -m playwright install chromium).
+
+UPLOAD_FORM = b'<form method="post" action="/upload" enctype="multipart/form-data"><input type="file" name="f" id="f"><button id="ok">Upload</button></form>'
+
+class _UploadSite(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(UPLOAD_FORM)))
+        self.end_headers()
+        self.wfile.write(UPLOAD_FORM)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        body = b"Receipt: OK"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Disposition", 'attachment; filename="receipt.txt"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def run(uploads: int = 64, concurrency=(1, 8, 32)):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _UploadSite)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as td:
+            src = os.path.join(td, "note.txt")
+            with open(src, "w", encoding="utf-8") as f:
+                f.write("hello from agentmx")
+            for c in concurrency:
+                engine = AsyncBrowserEngine(max_pages=c)
+                try:
+                    engine.warm_up()
+                    t0 = time.perf_counter()
+                    res = engine.upload_many([src] * uploads, os.path.join(td, f"c{c}"), url=url)
+                    elapsed = time.perf_counter() - t0
+                finally:
+                    engine.close()
+                failed = sum(1 for r in res if isinstance(r, BaseException))
+                results.append({"concurrency": c, "uploads": uploads, "failed": failed,
+                                "uploads_per_sec": round((uploads - failed) / elapsed, 1)})
+    finally:
+        server.shutdown()
+    return {"benchmark": "browser_async", "results": results}
+
+def main():
+    ap = argparse.ArgumentParser(description="AsyncBrowserEngine upload throughput")
+    ap.add_argument("--uploads", type=int, default=64)
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = ap.parse_args()
+    print(json.dumps(run(args.uploads, args.concurrency), indent=2))
+
+if __name__ == "__main__":
+    main()
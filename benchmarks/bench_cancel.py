@@ -0,0 +1,86 @@
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from agentmx.safety.cancel import CancelToken, StopWatcher
+from agentmx.safety.runner import StopFileGuard
+
+# Cost of a stop check (file stat vs token flag) and the latency from a STOP
+# file appearing to a sleeping waiter waking up, for the legacy 200ms polling
+# loop and the token watcher in inotify and polling mode:
+#   python -m benchmarks.bench_cancel --trials 20
+
+def _check_ns(guard: StopFileGuard, iterations: int) -> float:
+    t0 = time.perf_counter_ns()
+    for _ in range(iterations):
+        guard.check()
+    return (time.perf_counter_ns() - t0) / iterations
+
+def _latency_ms(td: str, name: str, trials: int, make_guard):
+    samples = []
+    for i in range(trials):
+        stop = os.path.join(td, f"STOP-{name}-{i}")
+        guard, cleanup = make_guard(stop)
+        woke = threading.Event()
+        out = []
+
+        def sleeper():
+            try:
+                guard.sleep(30)
+            except StopFileGuard.Stopped:
+                out.append(time.perf_counter())
+            woke.set()
+
+        t = threading.Thread(target=sleeper)
+        t.start()
+        # land at a random point in the legacy poll cycle
+        time.sleep(0.05 + (i % 7) * 0.021)
+        t0 = time.perf_counter()
+        with open(stop, "w") as f:
+            f.write("stop")
+        woke.wait(5)
+        t.join(5)
+        cleanup()
+        if out:
+            samples.append((out[0] - t0) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(samples[-1], 3),
+    }
+
+def run(trials: int = 20, iterations: int = 200000):
+    res = {}
+    with tempfile.TemporaryDirectory() as td:
+        res["check_stat_ns"] = round(_check_ns(StopFileGuard(os.path.join(td, "none")), iterations), 1)
+        res["check_token_ns"] = round(_check_ns(StopFileGuard("none", token=CancelToken()), iterations), 1)
+        res["legacy_poll"] = _latency_ms(td, "legacy_poll", trials, lambda p: (StopFileGuard(p), lambda: None))
+        for mode, use_inotify in (("inotify", True), ("watcher_poll", False)):
+            w = StopWatcher(use_inotify=use_inotify)
+
+            def make(p, w=w):
+                tok = CancelToken()
+
+                def handler(present):
+                    if present:
+                        tok.cancel()
+
+                w.watch(p, handler)
+                return StopFileGuard(p, token=tok), lambda: w.unwatch(p, handler)
+
+            res[mode] = _latency_ms(td, mode, trials, make)
+            w.close()
+    return {"benchmark": "cancel", "trials": trials, "results": res}
+
+def main():
+    ap = argparse.ArgumentParser(description="stop check cost and stop latency")
+    ap.add_argument("--trials", type=int, default=20)
+    ap.add_argument("--iterations", type=int, default=200000)
+    args = ap.parse_args()
+    print(json.dumps(run(args.trials, args.iterations), indent=2))
+
+if __name__ == "__main__":
+    main()
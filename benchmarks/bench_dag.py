@@ -0,0 +1,50 @@
+import argparse
+import json
+import os
+import tempfile
+from agentmx.autonomy import executor
+from agentmx.core.config import Config
+
+# Wall time of a "normalize N files, then upload each" shaped plan: N
+# independent two-step branches of sleeping noop steps, run one step at a
+# time (the old executor) and as a DAG on threads and processes:
+#   python -m benchmarks.bench_dag --branches 8 --seconds 0.2
+
+def _plan(branches: int, seconds: float):
+    steps = []
+    for i in range(branches):
+        steps.append({"id": f"normalize_{i}", "action": "noop", "args": {"seconds": seconds / 2}, "needs": []})
+        steps.append({"id": f"upload_{i}", "action": "noop", "args": {"seconds": seconds}, "needs": [f"normalize_{i}"]})
+    return steps
+
+def _wall(td: str, steps, **executor_cfg) -> dict:
+    cfg = Config(raw={"execution": {"working_dir": os.path.join(td, "{run_id}"), "kill_switch_file": os.path.join(td, "STOP")},
+                      "autonomy": {"executor": executor_cfg}})
+    return executor.execute_steps(cfg, steps)["summary"]
+
+def run(branches: int = 8, seconds: float = 0.2, workers: int = 8):
+    steps = _plan(branches, seconds)
+    with tempfile.TemporaryDirectory() as td:
+        sequential = _wall(td, steps, max_workers=1)
+        threads = _wall(td, steps, max_workers=workers)
+        processes = _wall(td, steps, max_workers=workers, mode="process")
+    res = {
+        "sequential_wall_s": sequential["wall"],
+        "thread_wall_s": threads["wall"],
+        "process_wall_s": processes["wall"],
+        "critical_path_s": threads["critical_path_time"],
+        "thread_parallelism": threads["parallelism"],
+        "process_parallelism": processes["parallelism"],
+    }
+    return {"benchmark": "dag", "branches": branches, "seconds": seconds, "workers": workers, "results": res}
+
+def main():
+    ap = argparse.ArgumentParser(description="DAG plan executor wall time")
+    ap.add_argument("--branches", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=0.2)
+    ap.add_argument("--workers", type=int, default=8)
+    args = ap.parse_args()
+    print(json.dumps(run(args.branches, args.seconds, args.workers), indent=2))
+
+if __name__ == "__main__":
+    main()
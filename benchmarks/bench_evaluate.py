@@ -0,0 +1,69 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from agentmx.autonomy import evaluator
+from agentmx.core.config import Config
+from agentmx.memory import store as mem
+
+# Bulk re-scoring (agentmx evaluate) of historical runs with one artifact
+# each: hash/size checks answered from stored hashes vs re-reading every file
+# (rows without mtime_ns, as written before it was recorded), and a spec
+# with a content regex at 1 and N workers:
+#   python -m benchmarks.bench_evaluate --runs 2000 --size 65536
+
+def _setup(td: str, runs: int, size: int):
+    db = os.path.join(td, "runs.sqlite")
+    conn = mem.connect(db)
+    cfg = Config(raw={"execution": {"working_dir": os.path.join(td, "work", "{run_id}")}})
+    for i in range(runs):
+        run_id = f"run{i:06d}"
+        wd = cfg.workdir_for(run_id)
+        os.makedirs(wd)
+        path = os.path.join(wd, "receipt.txt")
+        body = (f"Receipt: {i}\n".encode() + b"x" * 63 + b"\n") * max(1, size // 80)
+        with open(path, "wb") as f:
+            f.write(body)
+        st = os.stat(path)
+        mem.record_run(conn, run_id, "completed", 1.0, 0.0)
+        mem.record_artifacts(conn, run_id, [{"path": path, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                                             "sha256": hashlib.sha256(body).hexdigest(), "mime": "text/plain"}])
+    return db, conn, cfg
+
+def _set_spec(conn, spec):
+    conn.execute("UPDATE runs SET verification=?, score=0", (json.dumps(spec),))
+    conn.commit()
+
+def _timed(cfg, conn, workers: int) -> float:
+    evaluator._content.clear()
+    res = evaluator.rescore(cfg, conn, workers=workers, dry_run=True)
+    return round(res["runs"] / max(res["seconds"], 1e-9))
+
+def run(runs: int = 2000, size: int = 64 * 1024, workers: int = 4):
+    with tempfile.TemporaryDirectory() as td:
+        db, conn, cfg = _setup(td, runs, size)
+        res = {}
+        _set_spec(conn, {"expect_artifacts": [{"name": "receipt.txt", "min_size": 1, "mime": "text/plain",
+                                                "sha256": "0" * 64}]})
+        res["hash_stored_runs_s"] = _timed(cfg, conn, 1)
+        conn.execute("UPDATE artifacts SET mtime_ns=NULL")
+        conn.commit()
+        res["hash_reread_runs_s"] = _timed(cfg, conn, 1)
+        res[f"hash_reread_{workers}w_runs_s"] = _timed(cfg, conn, workers)
+        _set_spec(conn, {"expect_artifacts": [{"name": "receipt.txt", "regex": r"^Receipt: 1\d*$", "max_lines": 10 ** 6}]})
+        res["content_runs_s"] = _timed(cfg, conn, 1)
+        res[f"content_{workers}w_runs_s"] = _timed(cfg, conn, workers)
+        mem.close(db)
+    return {"benchmark": "evaluate", "runs": runs, "size": size, "results": res}
+
+def main():
+    ap = argparse.ArgumentParser(description="bulk re-scoring throughput")
+    ap.add_argument("--runs", type=int, default=2000)
+    ap.add_argument("--size", type=int, default=64 * 1024)
+    ap.add_argument("--workers", type=int, default=4)
+    args = ap.parse_args()
+    print(json.dumps(run(args.runs, args.size, args.workers), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import wait
+from agentmx.core.hashing import Hasher
+
+# Artifact hashing throughput: the previous serial 8 KB read loop against
+# the pooled mmap hasher, on batches of files from 1 KB up to --max-size:
+#   python -m benchmarks.bench_hashing --max-size 4G
+
+def _serial_8k(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(8192), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _parse_size(s: str) -> int:
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    s = s.strip().upper()
+    if s and s[-1] in units:
+        return int(float(s[:-1]) * units[s[-1]])
+    return int(s)
+
+def _sizes(max_size: int):
+    size = 1024
+    while size <= max_size:
+        yield size
+        size *= 16
+
+def _make_files(td: str, size: int, count: int):
+    block = os.urandom(min(size, 1024 * 1024))
+    paths = []
+    for i in range(count):
+        p = os.path.join(td, f"f{size}_{i}.bin")
+        with open(p, "wb") as f:
+            left = size
+            while left > 0:
+                f.write(block[:left])
+                left -= len(block)
+        paths.append(p)
+    return paths
+
+def run(max_size: int = 256 * 1024 * 1024, total_bytes: int = 512 * 1024 * 1024, workers: int = 0):
+    results = []
+    for size in _sizes(max_size):
+        count = max(1, min(2000, total_bytes // size))
+        with tempfile.TemporaryDirectory() as td:
+            paths = _make_files(td, size, count)
+            t0 = time.perf_counter()
+            for p in paths:
+                _serial_8k(p)
+            serial = time.perf_counter() - t0
+            hasher = Hasher(max_workers=workers or None)
+            try:
+                t0 = time.perf_counter()
+                wait([hasher.submit(p) for p in paths])
+                pooled = time.perf_counter() - t0
+                t0 = time.perf_counter()
+                wait([hasher.submit(p) for p in paths])
+                cached = time.perf_counter() - t0
+            finally:
+                hasher.shutdown()
+        mb = size * count / (1024 * 1024)
+        results.append({
+            "size": size,
+            "files": count,
+            "workers": hasher.max_workers,
+            "serial_mb_s": round(mb / serial, 1),
+            "pooled_mb_s": round(mb / pooled, 1),
+            "cached_ms": round(cached * 1000, 2),
+        })
+    return {"benchmark": "hashing", "results": results}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--max-size", default="256M")
+    ap.add_argument("--total", default="512M", help="bytes hashed per size step")
+    ap.add_argument("--workers", type=int, default=0)
+    args = ap.parse_args()
+    print(json.dumps(run(_parse_size(args.max_size), _parse_size(args.total), args.workers), indent=2))
+
+if __name__ == "__main__":
+    main()
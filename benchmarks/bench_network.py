@@ -0,0 +1,81 @@
+import argparse
+import fnmatch
+import ipaddress
+import json
+import random
+import time
+from urllib.parse import urlsplit
+from agentmx.safety.network import NetworkPolicy
+
+# Per-request cost of checking a URL against network patterns: a naive scan
+# (fnmatch / ip_network membership per pattern), the compiled tries with the
+# verdict cache off, and with it on (a browser fetches many URLs per host):
+#   python -m benchmarks.bench_network --rules 4 1000 20000
+
+def _naive(patterns):
+    nets, globs = [], []
+    for p in patterns:
+        if "/" in p:
+            nets.append(ipaddress.ip_network(p))
+        else:
+            globs.append(p)
+
+    def denied(url: str) -> bool:
+        host = urlsplit(url).hostname or ""
+        try:
+            ip = ipaddress.ip_address(host)
+        except ValueError:
+            return any(fnmatch.fnmatchcase(host, g) for g in globs)
+        return any(ip in n for n in nets)
+
+    return denied
+
+def _patterns(n: int, rng: random.Random):
+    out = ["*.onion", "10.0.0.0/8", "192.168.0.0/16", "169.254.0.0/16"]
+    while len(out) < n:
+        if rng.random() < 0.5:
+            out.append(f"{rng.randint(11, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.0/24")
+        else:
+            out.append(f"*.h{rng.randint(0, 10 ** 6)}.test")
+    return out[:n]
+
+def _urls(n: int, hosts: int, rng: random.Random):
+    pool = [f"sub.h{rng.randint(0, 10 ** 6)}.test" for _ in range(hosts // 2)]
+    pool += [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}" for _ in range(hosts - len(pool))]
+    return [f"https://{rng.choice(pool)}/asset/{i}.js" for i in range(n)]
+
+def _us_per_check(fn, urls) -> float:
+    t0 = time.perf_counter()
+    for u in urls:
+        fn(u)
+    return (time.perf_counter() - t0) / len(urls) * 1e6
+
+def run(rules=(4, 1000, 20000), urls: int = 5000, hosts: int = 200, seed: int = 1):
+    rng = random.Random(seed)
+    sample = _urls(urls, hosts, rng)
+    res = {}
+    for n in rules:
+        patterns = _patterns(n, rng)
+        naive = _naive(patterns)
+        t0 = time.perf_counter()
+        compiled = NetworkPolicy(deny=patterns, cache_size=0)
+        compile_ms = (time.perf_counter() - t0) * 1000
+        cached = NetworkPolicy(deny=patterns)
+        assert [naive(u) for u in sample[:500]] == [compiled.is_denied(u) for u in sample[:500]]
+        res[f"rules_{n}"] = {
+            "naive_us": round(_us_per_check(naive, sample[:max(20, urls // (1 + n // 50))]), 2),
+            "compiled_us": round(_us_per_check(compiled.is_denied, sample), 2),
+            "cached_us": round(_us_per_check(cached.is_denied, sample), 2),
+            "compile_ms": round(compile_ms, 1),
+        }
+    return {"benchmark": "network", "urls": urls, "hosts": hosts, "results": res}
+
+def main():
+    ap = argparse.ArgumentParser(description="network policy cost per request")
+    ap.add_argument("--rules", type=int, nargs="+", default=[4, 1000, 20000])
+    ap.add_argument("--urls", type=int, default=5000)
+    args = ap.parse_args()
+    print(json.dumps(run(tuple(args.rules), args.urls), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import json
+import random
+import time
+from agentmx.safety.policy import SafetyPolicy
+
+# Command policy throughput against the old implementation (lowercase every
+# pattern and substring-scan them one by one on each call), for growing
+# literal rule lists plus some regex and token rules:
+#   python -m benchmarks.bench_policy --rules 6 100 1000 5000
+
+class LegacyPolicy:
+    def __init__(self, deny):
+        self.deny = list(deny)
+
+    def is_denied(self, command: str) -> bool:
+        c = (command or "").lower()
+        return any(pat in c for pat in (s.lower() for s in self.deny))
+
+def _commands(n: int, rng: random.Random):
+    words = ["git", "status", "ls", "-la", "python", "-m", "pytest", "cp", "src", "dst", "echo", "hello",
+             "curl", "https://example.com", "npm", "install", "--save", "C:\\Users\\me\\file.txt", "|", "grep", "x"]
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(2, 12))) for _ in range(n)]
+
+def _literals(n: int, rng: random.Random):
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    return [f"{''.join(rng.choice(alphabet) for _ in range(rng.randint(4, 10)))} /{rng.choice(alphabet)}" for _ in range(n)]
+
+def _per_sec(fn, commands, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for c in commands:
+            fn(c)
+    return len(commands) * repeat / (time.perf_counter() - t0)
+
+def run(rules=(6, 100, 1000, 5000), commands: int = 2000, seed: int = 1):
+    rng = random.Random(seed)
+    cmds = _commands(commands, rng)
+    res = {}
+    for n in rules:
+        deny = _literals(n, rng)
+        legacy = LegacyPolicy(deny)
+        t0 = time.perf_counter()
+        compiled = SafetyPolicy(deny=deny, cache_size=0)
+        compile_ms = (time.perf_counter() - t0) * 1000
+        cached = SafetyPolicy(deny=deny)
+        # budget the slow legacy scans so large rule lists stay quick
+        repeat = max(1, 20000 // (n * 10))
+        # plus 2% each of regex, glob and token rules
+        extra = max(1, n // 50)
+        names = [w.split()[0] for w in _literals(extra, rng)]
+        mixed = SafetyPolicy(deny=deny + [rf"re:\b{w}\s+/s\b" for w in names] + [f"glob:{w} *| sh" for w in names]
+                             + [f"cmd:{w} -r|--recursive -f|--force" for w in names], cache_size=0)
+        assert [legacy.is_denied(c) for c in cmds] == [compiled.is_denied(c) for c in cmds]
+        res[f"rules_{n}"] = {
+            "legacy_per_sec": round(_per_sec(legacy.is_denied, cmds[:max(50, commands // (1 + n // 100))], 1)),
+            "compiled_per_sec": round(_per_sec(compiled.is_denied, cmds, repeat)),
+            "mixed_per_sec": round(_per_sec(mixed.is_denied, cmds, repeat)),
+            "cached_per_sec": round(_per_sec(cached.is_denied, cmds, repeat + 1)),
+            "compile_ms": round(compile_ms, 3),
+        }
+    return {"benchmark": "policy", "commands": commands, "results": res}
+
+def main():
+    ap = argparse.ArgumentParser(description="command policy throughput")
+    ap.add_argument("--rules", type=int, nargs="+", default=[6, 100, 1000, 5000])
+    ap.add_argument("--commands", type=int, default=2000)
+    args = ap.parse_args()
+    print(json.dumps(run(tuple(args.rules), args.commands), indent=2))
+
+if __name__ == "__main__":
+    main()
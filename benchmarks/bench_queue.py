@@ -0,0 +1,46 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from agentmx.autonomy import tasks as taskq
+
+# Task queue throughput: enqueue (including the wake notification),
+# next_task and lease-based claim_task, each drained to empty:
+#   python -m benchmarks.bench_queue --tasks 5000
+
+def run(tasks: int = 5000):
+    res = {}
+    with tempfile.TemporaryDirectory() as td:
+        conn = taskq.connect(os.path.join(td, "tasks.sqlite"))
+        t0 = time.perf_counter()
+        for i in range(tasks):
+            taskq.enqueue(conn, "bench", {"i": i})
+        res["enqueue_per_sec"] = round(tasks / (time.perf_counter() - t0))
+        t0 = time.perf_counter()
+        n = 0
+        while taskq.claim_task(conn, "bench-worker", run_id=f"r{n}") is not None:
+            n += 1
+        res["claim_task_per_sec"] = round(n / (time.perf_counter() - t0))
+        for i in range(tasks):
+            taskq.enqueue(conn, "bench", {"i": i})
+        t0 = time.perf_counter()
+        n = 0
+        while True:
+            nxt = taskq.next_task(conn)
+            if nxt is None:
+                break
+            taskq.mark_running(conn, nxt[0], f"r{n}")
+            n += 1
+        res["next_task_per_sec"] = round(n / (time.perf_counter() - t0))
+        conn.close()
+    return {"benchmark": "queue", "tasks": tasks, "results": res}
+
+def main():
+    ap = argparse.ArgumentParser(description="task queue throughput")
+    ap.add_argument("--tasks", type=int, default=5000)
+    args = ap.parse_args()
+    print(json.dumps(run(args.tasks), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import json
+import random
+import time
+from agentmx.safety.secrets import REDACTOR, SECRET_PATTERNS
+
+# Secret redaction throughput in MB/s: the old per-pattern mask(), the
+# combined single pass on plain text, on text where every line has a
+# key=value pair (so the trigger prefilter can't skip anything) and with
+# secrets, and the chunked stream mode over 64KB reads:
+#   python -m benchmarks.bench_redact --mb 16
+
+def legacy_mask(text: str) -> str:
+    s = text or ""
+    for pat in SECRET_PATTERNS:
+        s = pat.sub(lambda m: s.replace(m.group(1), "****"), s)
+    return s
+
+_WORDS = ["run", "step", "browser", "upload", "receipt", "status", "ok", "note", "artifact", "sha256",
+          "queued", "completed", "the", "a", "of", "to", "skill", "worker", "lease", "task"]
+
+def _text(mb: float, rng: random.Random, assign: float, secrets: float) -> str:
+    lines, size = [], 0
+    while size < mb * 1024 * 1024:
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(6, 16))]
+        if rng.random() < assign:
+            words.append(f"attempt={rng.randint(1, 9)}")
+        if rng.random() < secrets:
+            words.append(f"token={rng.getrandbits(128):032x}")
+        line = " ".join(words)
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+def _mb_per_sec(fn, text, repeat: int = 3) -> float:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(text)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return len(text) / (1024 * 1024) / best
+
+def _stream(data):
+    s = REDACTOR.stream()
+    for i in range(0, len(data), 65536):
+        s.feed(data[i:i + 65536])
+    s.close()
+
+def run(mb: float = 16, seed: int = 1):
+    rng = random.Random(seed)
+    plain = _text(mb, rng, 0.0, 0.0)
+    dense = _text(mb, rng, 1.0, 0.0)
+    secrets = _text(mb, rng, 0.2, 0.05)
+    small = plain[: 1024 * 1024]
+    res = {
+        "legacy_plain_mb_s": round(_mb_per_sec(legacy_mask, small, 1), 1),
+        "plain_mb_s": round(_mb_per_sec(REDACTOR.redact, plain), 1),
+        "plain_bytes_mb_s": round(_mb_per_sec(REDACTOR.redact, plain.encode()), 1),
+        "dense_mb_s": round(_mb_per_sec(REDACTOR.redact, dense), 1),
+        "secrets_mb_s": round(_mb_per_sec(REDACTOR.redact, secrets), 1),
+        "stream_plain_mb_s": round(_mb_per_sec(_stream, plain.encode()), 1),
+        "stream_secrets_mb_s": round(_mb_per_sec(_stream, secrets.encode()), 1),
+    }
+    return {"benchmark": "redact", "mb": mb, "results": res}
+
+def main():
+    ap = argparse.ArgumentParser(description="secret redaction throughput")
+    ap.add_argument("--mb", type=float, default=16)
+    args = ap.parse_args()
+    print(json.dumps(run(args.mb), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import argparse
+import json
+import time
+from agentmx.core import spans
+
+# Per-call overhead of the span API, with and without an active run
+# recorder, against an empty loop:
+#   python -m benchmarks.bench_spans --iterations 200000
+
+def _loop_ns(fn, iterations: int) -> float:
+    t0 = time.perf_counter_ns()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter_ns() - t0) / iterations
+
+def run(iterations: int = 200000):
+    def noop():
+        pass
+
+    timed_noop = spans.timed("bench.timed")(noop)
+
+    def with_span():
+        with spans.span("bench.span"):
+            pass
+
+    base = _loop_ns(noop, iterations)
+    res = {
+        "baseline_ns": round(base, 1),
+        "span_ns": round(_loop_ns(with_span, iterations) - base, 1),
+        "timed_ns": round(_loop_ns(timed_noop, iterations) - base, 1),
+    }
+    rec = spans.SpanRecorder("bench", max_recorded=iterations)
+    token = rec.activate()
+    try:
+        res["span_recorded_ns"] = round(_loop_ns(with_span, iterations) - base, 1)
+        res["timed_recorded_ns"] = round(_loop_ns(timed_noop, iterations) - base, 1)
+    finally:
+        spans.SpanRecorder.deactivate(token)
+    return {"benchmark": "spans", "iterations": iterations, "overhead": res}
+
+def main():
+    ap = argparse.ArgumentParser(description="span instrumentation overhead")
+    ap.add_argument("--iterations", type=int, default=200000)
+    args = ap.parse_args()
+    print(json.dumps(run(args.iterations), indent=2))
+
+if __name__ == "__main__":
+    main()
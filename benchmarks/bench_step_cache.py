@@ -0,0 +1,58 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from agentmx.autonomy import executor
+from agentmx.core.config import Config
+from agentmx.memory import store as mem
+
+# A recurring plan of independent cacheable steps that each take --seconds
+# and write a --size output into the run workdir: the first run, a repeat
+# served from the step cache and a repeat with the cache off:
+#   python -m benchmarks.bench_step_cache --steps 8 --seconds 0.2 --size 1048576
+
+def _work(ctx, args):
+    time.sleep(args["seconds"])
+    out = os.path.join(ctx.workdir, f"out_{args['n']}.bin")
+    os.makedirs(ctx.workdir, exist_ok=True)
+    with open(out, "wb") as f:
+        f.write(os.urandom(16) * (args["size"] // 16))
+    return {"ok": True, "path": out}
+
+def run(steps: int = 8, seconds: float = 0.2, size: int = 1024 * 1024):
+    executor.ACTIONS["bench_work"] = _work
+    executor.CACHEABLE["bench_work"] = ()
+    plan = [{"id": f"s{i}", "action": "bench_work", "args": {"n": i, "seconds": seconds, "size": size}, "needs": []}
+            for i in range(steps)]
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as td:
+            os.chdir(td)
+            cfg = Config(raw={"execution": {"working_dir": os.path.join(td, "work", "{run_id}"),
+                                            "kill_switch_file": os.path.join(td, "STOP")},
+                              "artifacts": {"cas_dir": os.path.join(td, "cas")}})
+            walls = {}
+            for name, run_id, use_cache in (("first", "r1", True), ("cached", "r2", True), ("no_cache", "r3", False)):
+                t0 = time.perf_counter()
+                res = executor.execute_steps(cfg, plan, run_id=run_id, use_cache=use_cache)
+                walls[name] = (time.perf_counter() - t0, res["summary"]["cached"])
+            mem.close()
+    finally:
+        os.chdir(cwd)
+        executor.ACTIONS.pop("bench_work", None)
+        executor.CACHEABLE.pop("bench_work", None)
+    res = {f"{name}_wall_ms": round(wall * 1000, 1) for name, (wall, _) in walls.items()}
+    res["cached_steps"] = walls["cached"][1]
+    return {"benchmark": "step_cache", "steps": steps, "seconds": seconds, "size": size, "results": res}
+
+def main():
+    ap = argparse.ArgumentParser(description="plan step cache: first run vs cached repeat")
+    ap.add_argument("--steps", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=0.2)
+    ap.add_argument("--size", type=int, default=1024 * 1024)
+    args = ap.parse_args()
+    print(json.dumps(run(args.steps, args.seconds, args.size), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from agentmx.memory import store as mem
+
+# Query latency of the memory store at growing table sizes, by default up to
+# 1M runs / 10M artifacts (about six minutes of loading and a few GB of temp
+# space; --runs picks smaller sizes). With the indexes from the schema
+# migrations the lookups stay roughly flat as the tables grow. metrics()
+# reads the run rollups: the 7d/30d counts sum at most 30 daily and 24 hourly
+# rows, and the all-time totals one row per day and status of history, so it
+# doesn't grow with the number of runs. The generated runs are 0.5s apart,
+# so 1M runs is about six days of history.
+
+def _populate(conn, start: int, stop: int, artifacts_per_run: int, ids):
+    statuses = ("completed", "failed", "aborted", "running")
+    now = time.time()
+    batch = 50_000
+    for lo in range(start, stop, batch):
+        hi = min(stop, lo + batch)
+        runs = []
+        arts = []
+        for i in range(lo, hi):
+            rid = uuid.uuid4().hex
+            ids.append(rid)
+            created = now - (stop - i) * 0.5
+            runs.append((rid, statuses[i % 4], float(i % 97), (i % 11) / 10.0, created))
+            for k in range(artifacts_per_run):
+                arts.append((rid, f"a{k}.txt", 100 + k, None, "text/plain", f"/w/{rid}/a{k}.txt", created))
+        conn.executemany("INSERT INTO runs(id,status,duration,score,created_at) VALUES(?,?,?,?,?)", runs)
+        conn.executemany("INSERT INTO artifacts(run_id,name,size,sha256,mime,path,created_at) VALUES(?,?,?,?,?,?,?)", arts)
+        conn.commit()
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1e6
+
+def _writes(conn, n: int):
+    # committed single-run upserts and batched artifact inserts, as the
+    # runner issues them
+    t0 = time.perf_counter()
+    for i in range(n):
+        mem.record_run(conn, f"bench-w{i}", "completed", 1.0, 1.0)
+    runs = n / (time.perf_counter() - t0)
+    arts = [{"path": f"/w/bench/{i}.txt", "size": i, "sha256": f"{i:064x}", "mime": "text/plain"} for i in range(n)]
+    t0 = time.perf_counter()
+    for i in range(0, n, 64):
+        mem.record_artifacts(conn, "bench-w0", arts[i:i + 64])
+    return {"record_run": round(runs), "record_artifacts": round(n / (time.perf_counter() - t0))}
+
+def run(scales=(10_000, 100_000, 1_000_000), artifacts_per_run: int = 10, repeat: int = 50, db_dir=None):
+    results = []
+    with tempfile.TemporaryDirectory(dir=db_dir) as td:
+        db = os.path.join(td, "runs.sqlite")
+        conn = mem.connect(db)
+        ids = []
+        have = 0
+        for n in sorted(scales):
+            t0 = time.perf_counter()
+            _populate(conn, have, n, artifacts_per_run, ids)
+            load_s = time.perf_counter() - t0
+            have = n
+            probe = [random.choice(ids) for _ in range(repeat)]
+            it = iter(probe * 2)
+            queries = {
+                "get_run": lambda: mem.get_run(conn, next(it)),
+                "list_runs": lambda: mem.list_runs(conn, limit=50),
+                "latest_run": lambda: mem.latest_run(conn),
+                "list_artifacts": lambda: mem.list_artifacts(conn, next(it)),
+                "metrics": lambda: mem.metrics(conn),
+            }
+            res = {"runs": n, "artifacts": n * artifacts_per_run, "load_s": round(load_s, 3), "median_us": {}}
+            for name, fn in queries.items():
+                res["median_us"][name] = round(_time(fn, repeat), 1)
+            results.append(res)
+        res["writes_per_sec"] = _writes(conn, repeat * 10)
+        mem.close(db)
+    return {"benchmark": "store", "results": results}
+
+def main():
+    ap = argparse.ArgumentParser(description="memory.store query latency at scale")
+    ap.add_argument("--runs", default="10000,100000,1000000", help="comma separated run counts")
+    ap.add_argument("--artifacts-per-run", type=int, default=10)
+    ap.add_argument("--repeat", type=int, default=50)
+    ap.add_argument("--db-dir", default=None)
+    args = ap.parse_args()
+    scales = [int(x) for x in args.runs.split(",") if x]
+    print(json.dumps(run(scales, args.artifacts_per_run, args.repeat, args.db_dir), indent=2))
+
+if __name__ == "__main__":
+    main()
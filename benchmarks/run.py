@@ -0,0 +1,173 @@
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+from importlib import import_module
+
+# Runs the benchmark suite and writes one JSON document; with --compare it
+# checks every metric against a saved baseline and exits non-zero when one
+# regressed by more than --threshold. A suite that raises counts as a
+# failure (and as a regression of its metrics), with or without --compare:
+#   python -m benchmarks.run --repeat 3 --out bench.json
+#   python -m benchmarks.run --repeat 3 --compare bench.json
+# Suites needing Playwright browsers only run with --browser.
+
+# name -> (module, quick kwargs, full kwargs, needs browsers)
+SUITES = {
+    "store": ("bench_store", {"scales": (10_000,), "repeat": 30}, {"scales": (10_000, 100_000, 1_000_000)}, False),
+    "queue": ("bench_queue", {"tasks": 2000}, {"tasks": 20000}, False),
+    "audit": ("bench_audit", {"records": 10000, "fsync_records": 500}, {}, False),
+    "artifacts": ("bench_artifacts", {"sizes": ("1K", "1M", "16M"), "count": 10}, {"sizes": ("1K", "1M", "16M", "256M"), "count": 20}, False),
+    "hashing": ("bench_hashing", {"max_size": 16 * 1024 ** 2, "total_bytes": 64 * 1024 ** 2}, {}, False),
+    "spans": ("bench_spans", {"iterations": 50000}, {}, False),
+    "cancel": ("bench_cancel", {"trials": 10, "iterations": 50000}, {}, False),
+    "policy": ("bench_policy", {"rules": (6, 1000), "commands": 500}, {}, False),
+    "network": ("bench_network", {"rules": (4, 1000), "urls": 2000}, {}, False),
+    "redact": ("bench_redact", {"mb": 4}, {}, False),
+    "evaluate": ("bench_evaluate", {"runs": 300, "size": 16384}, {}, False),
+    "dag": ("bench_dag", {"branches": 8, "seconds": 0.1}, {"branches": 32, "seconds": 0.2}, False),
+    "step_cache": ("bench_step_cache", {"steps": 8, "seconds": 0.1, "size": 65536}, {}, False),
+    "api": ("bench_api", {"requests": 100, "runs": 2000, "sse_events": 100}, {}, False),
+    "browser": ("bench_browser", {"runs": 5}, {}, True),
+    "browser_async": ("bench_browser_async", {"uploads": 32}, {}, True),
+}
+
+HIGHER_IS_BETTER = ("per_sec", "mb_s")
+LOWER_IS_BETTER = ("_ms", "_us", "_ns", "_s")
+
+def direction(key: str) -> int:
+    # +1 if bigger is better, -1 if smaller is better, 0 for parameters
+    # such as sizes and counts that are not compared
+    parts = re.split(r"[.\[\]]", key)
+    if any(h in p for p in parts for h in HIGHER_IS_BETTER):
+        return 1
+    if any(p.endswith(s) for p in parts for s in LOWER_IS_BETTER):
+        return -1
+    return 0
+
+def flatten(obj, prefix: str = ""):
+    # results lists are keyed by their identifying parameter where there is
+    # one (size, runs, concurrency), so baselines survive reordering
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            yield from flatten(v, f"{prefix}.{k}" if prefix else str(k))
+    elif isinstance(obj, list):
+        for i, v in enumerate(obj):
+            label = i
+            if isinstance(v, dict):
+                for ident in ("size", "runs", "concurrency"):
+                    if ident in v:
+                        label = f"{ident}={v[ident]}"
+                        break
+            yield from flatten(v, f"{prefix}[{label}]")
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        yield prefix, float(obj)
+
+def errors(results: dict):
+    # suite -> error message for suites that raised
+    return {name: res["error"] for name, res in results.get("benchmarks", {}).items()
+            if isinstance(res, dict) and "error" in res}
+
+def compare(current: dict, baseline: dict, threshold: float):
+    base = dict(flatten(baseline.get("benchmarks", {})))
+    rows = [{"metric": name, "baseline": None, "current": None, "change": None, "regressed": True, "error": msg}
+            for name, msg in errors(current).items()]
+    for key, value in flatten(current.get("benchmarks", {})):
+        d = direction(key)
+        old = base.get(key)
+        if d == 0 or old is None or old == 0:
+            continue
+        change = (value - old) / old
+        regressed = (change < -threshold) if d > 0 else (change > threshold)
+        rows.append({"metric": key, "baseline": old, "current": value, "change": round(change, 4), "regressed": regressed})
+    return rows
+
+def merge_median(samples):
+    # same-shaped results from repeated passes -> per-metric median
+    first = samples[0]
+    if isinstance(first, dict):
+        return {k: merge_median([s[k] for s in samples if isinstance(s, dict) and k in s]) for k in first}
+    if isinstance(first, list):
+        n = min(len(s) for s in samples)
+        return [merge_median([s[i] for s in samples]) for i in range(n)]
+    if isinstance(first, (int, float)) and not isinstance(first, bool):
+        return statistics.median(samples)
+    return first
+
+def run(names, full: bool = False, repeat: int = 1):
+    out = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "mode": "full" if full else "quick",
+            "repeat": repeat,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "benchmarks": {},
+        "seconds": {},
+    }
+    for name in names:
+        module, quick, full_kwargs, _ = SUITES[name]
+        kwargs = full_kwargs if full else quick
+        t0 = time.perf_counter()
+        print(f"running {name} ...", file=sys.stderr, flush=True)
+        try:
+            bench = import_module(f"benchmarks.{module}")
+            res = merge_median([bench.run(**kwargs) for _ in range(max(1, repeat))])
+        except Exception as e:
+            res = {"error": f"{type(e).__name__}: {e}"}
+        out["benchmarks"][name] = res
+        out["seconds"][name] = round(time.perf_counter() - t0, 2)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser(description="run the benchmark suite")
+    ap.add_argument("--only", default="", help="comma separated suites: " + ",".join(SUITES))
+    ap.add_argument("--full", action="store_true", help="larger sizes (slow)")
+    ap.add_argument("--browser", action="store_true", help="include suites that need Playwright browsers")
+    ap.add_argument("--repeat", type=int, default=1, help="passes per suite; metrics are the median (use 3+ for comparisons)")
+    ap.add_argument("--out", default=None, help="write results JSON here")
+    ap.add_argument("--compare", default=None, help="baseline JSON to compare against")
+    ap.add_argument("--threshold", type=float, default=0.25, help="allowed relative change before a metric counts as regressed")
+    args = ap.parse_args()
+    if args.only:
+        names = [n for n in args.only.split(",") if n]
+        unknown = [n for n in names if n not in SUITES]
+        if unknown:
+            ap.error(f"unknown suites: {', '.join(unknown)}")
+    else:
+        names = [n for n, spec in SUITES.items() if args.browser or not spec[3]]
+    results = run(names, args.full, args.repeat)
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.threshold)
+        bad = [r for r in rows if r["regressed"]]
+        for r in rows:
+            if "error" in r:
+                print(f"{'FAILED':9} {r['metric']}: {r['error']}", file=sys.stderr)
+                continue
+            mark = "REGRESSED" if r["regressed"] else "ok"
+            print(f"{mark:9} {r['metric']}: {r['baseline']:g} -> {r['current']:g} ({r['change']:+.1%})", file=sys.stderr)
+        print(f"{len(bad)} of {len(rows)} metrics regressed beyond {args.threshold:.0%}", file=sys.stderr)
+        if bad:
+            sys.exit(1)
+    failed = errors(results)
+    if failed:
+        for name, msg in failed.items():
+            print(f"{name} failed: {msg}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import json
+from fastapi.testclient import TestClient
+from agentmx.ui import api
+from agentmx.core.config import Config
+from agentmx.safety.audit import AuditLog
+from agentmx.memory import store as mem
+
+H = {"X-API-Key": "k"}
+
+def _client(tmp_path, monkeypatch, n=20):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("AGENTMX_API_KEY", "k")
+    monkeypatch.setattr(api, "cfg", Config(raw={"execution": {"working_dir": str(tmp_path / "work" / "{run_id}")}}))
+    wd = tmp_path / "work" / "r1"
+    wd.mkdir(parents=True)
+    log = AuditLog(str(wd))
+    for i in range(n):
+        log.record("even" if i % 2 == 0 else "odd", {"i": i})
+    log.close()
+    mem.record_run(mem.connect(), "r1", "completed", 1.0, 1.0)
+    return TestClient(api.app), log.path
+
+def _is(text):
+    return [json.loads(line)["data"]["i"] for line in text.splitlines()]
+
+def test_logs_found_through_memory_store(tmp_path, monkeypatch):
+    c, _ = _client(tmp_path, monkeypatch)
+    assert "r1" not in api.RUNS
+    r = c.get("/runs/r1/logs", headers=H)
+    assert r.status_code == 200
+    assert _is(r.text) == list(range(20))
+    assert c.get("/runs/missing/logs", headers=H).status_code == 404
+    mem.close()
+
+def test_logs_since_tail_and_event_filters(tmp_path, monkeypatch):
+    c, _ = _client(tmp_path, monkeypatch)
+    assert _is(c.get("/runs/r1/logs?since_seq=15", headers=H).text) == [15, 16, 17, 18, 19]
+    assert _is(c.get("/runs/r1/logs?tail=3", headers=H).text) == [17, 18, 19]
+    assert _is(c.get("/runs/r1/logs?since_seq=10&event=odd", headers=H).text) == [11, 13, 15, 17, 19]
+    assert c.get("/runs/r1/logs?since_seq=99", headers=H).text == ""
+    mem.close()
+
+def test_logs_range_requests(tmp_path, monkeypatch):
+    c, path = _client(tmp_path, monkeypatch)
+    data = open(path, "rb").read()
+    r = c.get("/runs/r1/logs", headers=dict(H, Range="bytes=10-29"))
+    assert r.status_code == 206
+    assert r.content == data[10:30]
+    assert r.headers["content-range"] == f"bytes 10-29/{len(data)}"
+    r = c.get("/runs/r1/logs", headers=dict(H, Range="bytes=-5"))
+    assert r.content == data[-5:]
+    r = c.get("/runs/r1/logs", headers=dict(H, Range=f"bytes={len(data)}-"))
+    assert r.status_code == 416
+    mem.close()
@@ -0,0 +1,63 @@
+import threading
+import time
+from fastapi.testclient import TestClient
+from agentmx.ui import api
+from agentmx.core.config import Config
+from agentmx.core.events import BROADCASTER
+from agentmx.safety.audit import AuditLog
+from agentmx.memory import store as mem
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("AGENTMX_API_KEY", "k")
+    monkeypatch.setattr(api, "cfg", Config(raw={"execution": {"working_dir": str(tmp_path / "work" / "{run_id}")}}))
+    return TestClient(api.app)
+
+def _data_lines(resp):
+    out = []
+    for line in resp.iter_lines():
+        if line.startswith("id: "):
+            out.append(int(line[4:]))
+    return out
+
+def test_stream_resumes_from_last_event_id(tmp_path, monkeypatch):
+    c = _setup(tmp_path, monkeypatch)
+    wd = tmp_path / "work" / "r1"
+    wd.mkdir(parents=True)
+    audit = AuditLog(str(wd))
+    for i in range(5):
+        audit.record("step", {"i": i})
+    audit.close()
+    mem.record_run(mem.connect(), "r1", "completed", 1.0, 1.0)
+    with c.stream("GET", "/runs/r1/logs/stream", headers={"X-API-Key": "k", "Last-Event-ID": "2"}) as r:
+        assert _data_lines(r) == [3, 4, 5]
+    with c.stream("GET", "/runs/r1/logs/stream", headers={"X-API-Key": "k"}) as r:
+        assert _data_lines(r) == []
+    mem.close()
+
+def test_stream_receives_live_events_and_closes_on_status(tmp_path, monkeypatch):
+    c = _setup(tmp_path, monkeypatch)
+    wd = tmp_path / "work" / "r2"
+    wd.mkdir(parents=True)
+    mem.record_run(mem.connect(), "r2", "running", 0.0, 0.0)
+    audit = AuditLog(str(wd), run_id="r2")
+    BROADCASTER.open("r2")
+
+    def produce():
+        time.sleep(0.3)
+        for i in range(3):
+            audit.record("step", {"i": i})
+        audit.close()
+        mem.record_run(mem.connect(), "r2", "completed", 1.0, 1.0)
+        BROADCASTER.publish("r2", {"type": "status", "status": "completed"})
+        BROADCASTER.close("r2")
+
+    t = threading.Thread(target=produce)
+    t.start()
+    t0 = time.time()
+    with c.stream("GET", "/runs/r2/logs/stream", headers={"X-API-Key": "k"}) as r:
+        ids = _data_lines(r)
+    t.join()
+    assert ids == [1, 2, 3]
+    assert time.time() - t0 < 5
+    mem.close()
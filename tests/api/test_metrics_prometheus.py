@@ -0,0 +1,46 @@
+import time
+from fastapi.testclient import TestClient
+from agentmx.ui import api
+from agentmx.memory import store as mem
+
+H = {"X-API-Key": "k"}
+
+def _client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("AGENTMX_API_KEY", "k")
+    conn = mem.connect()
+    day = int(time.time()) // 86400 * 86400 - 86400
+    for i, (status, dur, score) in enumerate([("completed", 0.5, 1.0), ("completed", 20.0, 0.9), ("failed", 7000.0, 0.1)]):
+        mem.record_run(conn, f"r{i}", status, dur, score)
+        conn.execute("UPDATE runs SET created_at=? WHERE id=?", (day + i * 3600 + 10, f"r{i}"))
+    conn.commit()
+    return TestClient(api.app), day
+
+def test_prometheus_exposition(tmp_path, monkeypatch):
+    c, _ = _client(tmp_path, monkeypatch)
+    r = c.get("/metrics/prometheus", headers=H)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    lines = r.text.splitlines()
+    assert 'agentmx_runs{status="completed"} 2' in lines
+    assert 'agentmx_run_duration_seconds_bucket{le="1"} 1' in lines
+    assert 'agentmx_run_duration_seconds_bucket{le="60"} 2' in lines
+    assert 'agentmx_run_duration_seconds_bucket{le="+Inf"} 3' in lines
+    assert "agentmx_run_duration_seconds_count 3" in lines
+    assert 'agentmx_run_score{range="1.0"} 1' in lines
+    assert "# TYPE agentmx_run_duration_seconds histogram" in lines
+
+def test_timeseries_from_rollups(tmp_path, monkeypatch):
+    c, day = _client(tmp_path, monkeypatch)
+    r = c.get("/metrics/timeseries", params={"from": day, "to": day + 4 * 3600, "step": "hour"}, headers=H)
+    assert r.status_code == 200
+    pts = r.json()["points"]
+    assert [p["ts"] for p in pts] == [day + i * 3600 for i in range(4)]
+    assert [p["runs"] for p in pts] == [{"completed": 1}, {"completed": 1}, {"failed": 1}, {}]
+    assert pts[1]["avg_duration"] == 20.0
+    r = c.get("/metrics/timeseries", params={"from": day, "to": day + 86400, "step": "day"}, headers=H)
+    (p,) = r.json()["points"]
+    assert p["runs"] == {"completed": 2, "failed": 1}
+    assert p["score_histogram"]["0.8-1.0"] == 1
+    assert c.get("/metrics/timeseries", params={"step": "60"}, headers=H).status_code == 400
+    assert c.get("/metrics/timeseries", params={"from": "2020-01-01T00:00:00Z", "step": "hour"}, headers=H).status_code == 400
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from agentmx.memory import store as mem
+from agentmx.safety import cancel
+from agentmx.ui import api
+from agentmx.core.admission import RunPool, QueueFull
+
+class _BlockingRunner:
+    gate = threading.Event()
+    started = []
+
+    def __init__(self, cfg, run_id, net_enabled, allow_safety_edit):
+        self.run_id = run_id
+
+    def execute(self, task, timeout=3600):
+        _BlockingRunner.started.append(self.run_id)
+        _BlockingRunner.gate.wait(5)
+        return True
+
+def test_run_pool_bounds_admission():
+    gate = threading.Event()
+    pool = RunPool(max_concurrent=1, max_queued=1)
+    pool.submit(gate.wait, 5)
+    pool.submit(gate.wait, 5)
+    with pytest.raises(QueueFull):
+        pool.submit(gate.wait, 5)
+    assert pool.stats()["running"] == 1
+    gate.set()
+    pool.shutdown(wait=True)
+
+def test_run_returns_429_when_queue_full(monkeypatch):
+    monkeypatch.setenv("AGENTMX_API_KEY", "k")
+    monkeypatch.setattr(api, "AgentRunner", _BlockingRunner)
+    pool = RunPool(max_concurrent=1, max_queued=1)
+    monkeypatch.setattr(api, "RUN_POOL", pool)
+    _BlockingRunner.gate.clear()
+    c = TestClient(api.app)
+    h = {"X-API-Key": "k"}
+    r1 = c.post("/run", headers=h, json={"task": "a"})
+    r2 = c.post("/run", headers=h, json={"task": "b"})
+    r3 = c.post("/run", headers=h, json={"task": "c"})
+    assert r1.status_code == 200 and r2.status_code == 200
+    assert r3.status_code == 429
+    assert int(r3.headers["Retry-After"]) > 0
+    s = c.get(f"/runs/{r2.json()['run_id']}/status", headers=h)
+    assert s.json()["status"] == "queued"
+    _BlockingRunner.gate.set()
+    pool.shutdown(wait=True)
+    assert r1.json()["run_id"] in _BlockingRunner.started
+
+def test_run_ack_does_not_build_runner(monkeypatch):
+    monkeypatch.setenv("AGENTMX_API_KEY", "k")
+    built = []
+    monkeypatch.setattr(api, "AgentRunner", lambda *a, **kw: built.append(threading.current_thread().name) or _BlockingRunner(*a, **kw))
+    pool = RunPool(max_concurrent=1, max_queued=4)
+    monkeypatch.setattr(api, "RUN_POOL", pool)
+    _BlockingRunner.gate.set()
+    c = TestClient(api.app)
+    r = c.post("/run", headers={"X-API-Key": "k"}, json={"task": "a"})
+    assert r.status_code == 200
+    pool.shutdown(wait=True)
+    assert built and all(n.startswith("agentmx-run") for n in built)
+
+class _CancellableRunner(_BlockingRunner):
+    def execute(self, task, timeout=3600):
+        _BlockingRunner.started.append(self.run_id)
+        return not cancel.register(self.run_id).wait(30)
+
+def test_shutdown_aborts_queued_runs_and_cancels_running_ones(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("AGENTMX_API_KEY", "k")
+    monkeypatch.setattr(api, "AgentRunner", _CancellableRunner)
+    pool = RunPool(max_concurrent=1, max_queued=2)
+    monkeypatch.setattr(api, "RUN_POOL", pool)
+    c = TestClient(api.app)
+    running, queued = [c.post("/run", headers={"X-API-Key": "k"}, json={"task": t}).json()["run_id"] for t in "ab"]
+    for _ in range(200):
+        if running in _BlockingRunner.started:
+            break
+        time.sleep(0.01)
+    t0 = time.monotonic()
+    asyncio.run(api._shutdown())
+    assert time.monotonic() - t0 < 5
+    assert pool.wait(timeout=0) and not pool.running()
+    conn = mem.connect()
+    try:
+        assert mem.get_run(conn, queued)["status"] == "aborted"
+        assert queued not in _BlockingRunner.started
+    finally:
+        mem.close()
+
+def test_shutdown_wait_is_bounded():
+    pool = RunPool(max_concurrent=1, max_queued=0)
+    gate = threading.Event()
+    pool.submit(gate.wait, 5)
+    t0 = time.monotonic()
+    assert pool.shutdown(wait=False) == []
+    assert pool.wait(timeout=0.2) is False
+    assert time.monotonic() - t0 < 2
+    gate.set()
+    assert pool.wait(timeout=5)
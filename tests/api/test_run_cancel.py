@@ -0,0 +1,43 @@
+import os
+import time
+from fastapi.testclient import TestClient
+from agentmx.ui import api
+from agentmx.memory import store as mem
+from agentmx.safety import cancel
+
+H = {"X-API-Key": "k"}
+
+def _status(c, run_id):
+    return c.get(f"/runs/{run_id}/status", headers=H).json().get("status")
+
+def test_cancel_running_run(monkeypatch):
+    monkeypatch.setenv("AGENTMX_API_KEY", "k")
+    c = TestClient(api.app)
+    run_id = c.post("/run", headers=H, json={"task": "wait"}).json()["run_id"]
+    for _ in range(200):
+        if _status(c, run_id) == "running":
+            break
+        time.sleep(0.01)
+    t0 = time.monotonic()
+    r = c.post(f"/runs/{run_id}/cancel", headers=H)
+    assert r.status_code == 200 and r.json()["via"] == "token"
+    for _ in range(200):
+        if _status(c, run_id) == "aborted":
+            break
+        time.sleep(0.01)
+    assert _status(c, run_id) == "aborted"
+    assert time.monotonic() - t0 < 2.0
+    assert c.post(f"/runs/{run_id}/cancel", headers=H).status_code == 409
+    assert c.post("/runs/no-such-run/cancel", headers=H).status_code == 404
+
+def test_cancel_out_of_process_run_writes_stop_file(monkeypatch):
+    monkeypatch.setenv("AGENTMX_API_KEY", "k")
+    run_id = "cancel-elsewhere"
+    mem.record_run(mem.connect(), run_id, "running", 0.0, 0.0)
+    c = TestClient(api.app)
+    r = c.post(f"/runs/{run_id}/cancel", headers=H)
+    assert r.status_code == 200 and r.json()["via"] == "stop_file"
+    stop = os.path.join(api.run_paths(run_id)["workdir"], cancel.RUN_STOP_FILE)
+    assert os.path.exists(stop)
+    os.remove(stop)
+    mem.record_run(mem.connect(), run_id, "aborted", 0.0, 0.0)
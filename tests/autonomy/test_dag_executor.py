@@ -0,0 +1,140 @@
+import os
+import time
+import threading
+import pytest
+from agentmx.autonomy import executor, planner
+from agentmx.core.config import Config
+
+def _cfg(tmp_path, **executor_cfg):
+    return Config(raw={
+        "execution": {"working_dir": str(tmp_path / "work" / "{run_id}"), "kill_switch_file": str(tmp_path / "STOP")},
+        "autonomy": {"executor": executor_cfg},
+    })
+
+def _fail(ctx, args):
+    return {"ok": False, "error": "boom"}
+
+def _echo(ctx, args):
+    return dict(args, ok=True, pid=os.getpid())
+
+@pytest.fixture(autouse=True)
+def _actions(monkeypatch):
+    monkeypatch.setitem(executor.ACTIONS, "fail", _fail)
+    monkeypatch.setitem(executor.ACTIONS, "echo", _echo)
+
+def _fan_out(n, seconds):
+    steps = [{"id": "start", "action": "noop", "args": {"seconds": 0}, "needs": []}]
+    for i in range(n):
+        steps.append({"id": f"b{i}", "action": "noop", "args": {"seconds": seconds}, "needs": ["start"]})
+    steps.append({"id": "end", "action": "noop", "args": {"seconds": 0}, "needs": [f"b{i}" for i in range(n)]})
+    return steps
+
+def test_independent_steps_run_in_parallel(tmp_path):
+    res = executor.execute_steps(_cfg(tmp_path, max_workers=4), _fan_out(4, 0.3))
+    summary = res["summary"]
+    assert summary["ok"] and summary["max_concurrency"] == 4
+    assert summary["wall"] < 0.9 and summary["parallelism"] > 2
+    assert summary["critical_path"][0] == "start" and summary["critical_path"][-1] == "end"
+    assert res["end"]["started"] >= max(res[f"b{i}"]["finished"] for i in range(4)) - 0.01
+    assert "run_id" not in res
+
+    capped = executor.execute_steps(_cfg(tmp_path, max_workers=2), _fan_out(4, 0.2))["summary"]
+    assert capped["max_concurrency"] == 2 and capped["wall"] >= 0.4
+
+def test_plans_without_needs_keep_running_in_order(tmp_path):
+    res = executor.execute_steps(_cfg(tmp_path, max_workers=4), [
+        {"action": "fail"}, {"action": "noop", "args": {"seconds": 0}}, {"action": "nope"}])
+    assert [res[f"step_{i}"]["status"] for i in range(3)] == ["failed", "ok", "failed"]
+    assert res["step_2"]["error"] == "unknown action nope"
+    assert res["summary"]["workers"] == 1 and res["summary"]["policy"] == "continue"
+
+def test_fail_fast_cancels_running_steps_and_continue_skips_dependents(tmp_path):
+    steps = [
+        {"id": "bad", "action": "fail", "needs": []},
+        {"id": "slow", "action": "noop", "args": {"seconds": 30}, "needs": []},
+        {"id": "after_bad", "action": "noop", "args": {"seconds": 0}, "needs": ["bad"]},
+        {"id": "after_slow", "action": "noop", "args": {"seconds": 0}, "needs": ["slow"]},
+    ]
+    t0 = time.monotonic()
+    res = executor.execute_steps(_cfg(tmp_path), steps)
+    assert time.monotonic() - t0 < 5
+    assert [res[s]["status"] for s in ("bad", "slow", "after_bad", "after_slow")] == \
+        ["failed", "cancelled", "skipped", "skipped"]
+    assert not res["summary"]["ok"]
+
+    steps[1]["args"]["seconds"] = 0.1
+    res = executor.execute_steps(_cfg(tmp_path, policy="continue"), steps)
+    assert [res[s]["status"] for s in ("bad", "slow", "after_bad", "after_slow")] == \
+        ["failed", "ok", "skipped", "ok"]
+
+def test_step_timeout(tmp_path):
+    steps = [
+        {"id": "slow", "action": "noop", "args": {"seconds": 30}, "needs": [], "timeout": 0.2},
+        {"id": "quick", "action": "noop", "args": {"seconds": 0.1}, "needs": []},
+    ]
+    res = executor.execute_steps(_cfg(tmp_path, policy="continue"), steps)
+    assert res["slow"]["status"] == "timeout" and res["slow"]["duration"] < 2
+    assert res["quick"]["status"] == "ok"
+
+def test_kill_switch_stops_the_plan(tmp_path):
+    cfg = _cfg(tmp_path)
+    steps = [{"id": f"s{i}", "action": "noop", "args": {"seconds": 30}, "needs": []} for i in range(6)]
+    timer = threading.Timer(0.3, lambda: open(cfg.kill_switch_file, "w").close())
+    timer.start()
+    try:
+        t0 = time.monotonic()
+        res = executor.execute_steps(cfg, steps)
+    finally:
+        timer.cancel()
+        os.remove(cfg.kill_switch_file)
+    assert time.monotonic() - t0 < 5
+    assert res["summary"]["stopped"]
+    statuses = [res[f"s{i}"]["status"] for i in range(6)]
+    assert statuses.count("stopped") == 4 and statuses.count("skipped") == 2
+
+def test_process_mode_and_arg_templates(tmp_path):
+    steps = [
+        {"id": "a", "action": "echo", "args": {"path": "x.txt"}, "needs": []},
+        {"id": "b", "action": "echo", "args": {"src": "${a.path}"}, "needs": ["a"]},
+        {"id": "slow", "action": "noop", "args": {"seconds": 30}, "needs": [], "timeout": 0.5},
+    ]
+    res = executor.execute_steps(_cfg(tmp_path, mode="process", policy="continue"), steps)
+    assert res["b"]["src"] == "x.txt" and res["a"]["pid"] != os.getpid()
+    assert res["slow"]["status"] == "timeout"
+    assert res["summary"]["mode"] == "process"
+
+def test_concurrent_run_demo_and_upload_steps_get_their_own_run_and_dir(tmp_path, monkeypatch):
+    seen = {}
+
+    def record(ctx, args):
+        seen[args["n"]] = (ctx.run_id, ctx.subdir)
+        return {"ok": True}
+    monkeypatch.setitem(executor.ACTIONS, "run_demo", record)
+    monkeypatch.setitem(executor.ACTIONS, "upload", record)
+    steps = [{"id": f"{a}_{i}", "action": a, "args": {"n": f"{a}_{i}"}, "needs": []}
+             for a in ("run_demo", "upload") for i in range(2)]
+    res = executor.execute_steps(_cfg(tmp_path), steps, run_id="r", use_cache=False)
+    assert res["summary"]["ok"]
+    assert seen == {"run_demo_0": ("r-run_demo_0", None), "run_demo_1": ("r-run_demo_1", None),
+                    "upload_0": ("r", "upload_0"), "upload_1": ("r", "upload_1")}
+    executor.execute_steps(_cfg(tmp_path), steps[1:3], run_id="r", use_cache=False)
+    assert seen["run_demo_1"] == ("r", None) and seen["upload_0"] == ("r", None)
+
+def test_invalid_plans_are_rejected(tmp_path):
+    cfg = _cfg(tmp_path)
+    with pytest.raises(ValueError, match="cycle"):
+        executor.execute_steps(cfg, [{"id": "a", "action": "noop", "needs": ["b"]},
+                                     {"id": "b", "action": "noop", "needs": ["a"]}])
+    with pytest.raises(ValueError, match="unknown step"):
+        executor.execute_steps(cfg, [{"id": "a", "action": "noop", "needs": ["c"]}])
+    with pytest.raises(ValueError, match="duplicate"):
+        executor.execute_steps(cfg, [{"id": "a", "action": "noop"}, {"id": "a", "action": "noop"}])
+    res = executor.execute_steps(cfg, [{"id": "a", "action": "echo", "needs": []},
+                                       {"id": "b", "action": "echo", "args": {"p": "${a.path}"}, "needs": ["a"]}])
+    assert res["b"]["status"] == "failed" and "no 'path'" in res["b"]["error"]
+
+def test_normalize_upload_plan_branches_per_file():
+    steps, _ = planner.plan("normalize_upload", {"paths": ["a.txt", "b.txt"]})
+    plan, order = executor.validate_plan(steps)
+    assert {st["id"]: st["needs"] for st in plan}["upload_1"] == ["normalize_1"]
+    assert order.index("normalize_0") < order.index("upload_0")
@@ -0,0 +1,116 @@
+import os
+import hashlib
+import pytest
+from agentmx.autonomy import evaluator
+from agentmx.autonomy import tasks as taskq
+from agentmx.core.config import Config
+from agentmx.memory import store as mem
+
+def _artifact(path, body: bytes):
+    with open(path, "wb") as f:
+        f.write(body)
+    st = os.stat(path)
+    return {"path": str(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "sha256": hashlib.sha256(body).hexdigest(), "mime": "text/plain"}
+
+def test_checks_use_stored_hashes_until_the_file_changes(tmp_path):
+    body = b"Receipt: OK\nline two\n"
+    art = _artifact(tmp_path / "receipt.txt", body)
+    spec = {"expect_artifacts": [
+        {"name": "receipt.txt", "min_size": 5, "max_size": 100, "sha256": art["sha256"], "mime": "text/*",
+         "regex": r"Receipt: \w+", "line": "line two", "min_lines": 2, "max_lines": 2},
+        "receipt.txt",
+        "*.txt",
+    ]}
+    before = dict(evaluator.STATS)
+    res = evaluator.evaluate(str(tmp_path), spec, [art])
+    assert res["score"] == 1.0 and res["details"]["failed"] == {}
+    assert evaluator.STATS["hashed"] == before["hashed"]
+    assert evaluator.STATS["stored"] == before["stored"] + 1
+    assert evaluator.STATS["scanned"] == before["scanned"] + 1
+    # same content in another run: the scan is shared through the hash
+    other = tmp_path / "other"
+    other.mkdir()
+    art2 = _artifact(other / "receipt.txt", body)
+    assert evaluator.evaluate(str(other), spec, [art2])["score"] == 1.0
+    assert evaluator.STATS["scanned"] == before["scanned"] + 1
+
+    with open(art["path"], "ab") as f:
+        f.write(b"tampered\n")
+    res = evaluator.evaluate(str(tmp_path), spec, [art])
+    assert evaluator.STATS["hashed"] == before["hashed"] + 1
+    assert res["details"]["failed"] == {"receipt.txt": ["sha256", "max_lines"]}
+    assert res["score"] == pytest.approx(2 / 3)
+
+def test_missing_files_and_legacy_specs(tmp_path):
+    art = _artifact(tmp_path / "a.txt", b"x")
+    os.remove(art["path"])
+    spec = {"expect_artifacts": [{"name": "a.txt", "sha256": art["sha256"], "line": "x"}, "b.txt"]}
+    res = evaluator.evaluate(str(tmp_path), spec, [art])
+    assert res["details"]["failed"] == {"a.txt": ["line"], "b.txt": ["missing"]}
+    assert evaluator.evaluate(str(tmp_path), {}, [])["score"] == 1.0
+
+def test_parse_since():
+    assert evaluator.parse_since("2d", now=1000000.0) == 1000000.0 - 2 * 86400
+    assert evaluator.parse_since("90m", now=10000.0) == 10000.0 - 5400
+    assert evaluator.parse_since("1700000000") == 1700000000.0
+    assert evaluator.parse_since("2024-01-01") == 1704067200.0
+    with pytest.raises(ValueError):
+        evaluator.parse_since("yesterday")
+
+def test_rescore_updates_scores_and_statuses_in_batches(tmp_path):
+    db = str(tmp_path / "runs.sqlite")
+    conn = mem.connect(db)
+    cfg = Config(raw={"execution": {"working_dir": str(tmp_path / "work" / "{run_id}")},
+                      "autonomy": {"thresholds": {"default": 0.5, "strict": 1.0}}})
+    spec = {"expect_artifacts": [{"name": "out.txt", "regex": "^ok$"}, "other.txt"]}
+    for i in range(30):
+        run_id = f"r{i}"
+        wd = cfg.workdir_for(run_id)
+        os.makedirs(wd)
+        art = _artifact(os.path.join(wd, "out.txt"), b"ok\n" if i % 3 else b"bad\n")
+        mem.record_run(conn, run_id, "completed", 1.0, 1.0)
+        mem.record_artifacts(conn, run_id, [art])
+        mem.set_run_verification(conn, run_id, "strict" if i % 2 else "plain", spec)
+    mem.record_run(conn, "aborted-run", "aborted", 1.0, 0.0)
+    mem.set_run_verification(conn, "aborted-run", "plain", spec)
+
+    dry = evaluator.rescore(cfg, conn, workers=4, batch_size=7, dry_run=True)
+    assert dry["runs"] == 30 and dry["changed"] == 30 and dry["written"] == 0
+    assert mem.get_run(conn, "r1")["score"] == 1.0
+
+    res = evaluator.rescore(cfg, conn, workers=4, batch_size=7)
+    assert res["written"] == 30
+    runs = {r["id"]: r for r in mem.list_runs(conn, limit=100)}
+    assert runs["r1"]["score"] == 0.5 and runs["r1"]["status"] == "failed"
+    assert runs["r2"]["score"] == 0.5 and runs["r2"]["status"] == "completed"
+    assert runs["r3"]["score"] == 0.0 and runs["r3"]["status"] == "failed"
+    assert runs["aborted-run"]["status"] == "aborted"
+    # nothing left to change
+    assert evaluator.rescore(cfg, conn, workers=2)["changed"] == 0
+    assert mem.rollup_totals(conn)["failed"]["runs"] == 20
+    mem.close(db)
+
+def test_rescore_keeps_failed_plans_at_zero_and_syncs_tasks(tmp_path):
+    db = str(tmp_path / "runs.sqlite")
+    conn = mem.connect(db)
+    tconn = taskq.connect(str(tmp_path / "tasks.db"))
+    cfg = Config(raw={"execution": {"working_dir": str(tmp_path / "work" / "{run_id}")}})
+    spec = {"expect_artifacts": ["out.txt"]}
+    for run_id, exec_ok in (("broken", False), ("fine", True), ("legacy", None)):
+        wd = cfg.workdir_for(run_id)
+        os.makedirs(wd)
+        mem.record_run(conn, run_id, "failed", 1.0, 0.0)
+        mem.record_artifacts(conn, run_id, [_artifact(os.path.join(wd, "out.txt"), b"ok\n")])
+        mem.set_run_verification(conn, run_id, "plain", spec, exec_ok=exec_ok)
+        task_id = taskq.enqueue(tconn, "plain", {})
+        taskq.claim_task(tconn, "w", run_id=run_id)
+        taskq.mark_status(tconn, task_id, "failed")
+    res = evaluator.rescore(cfg, conn, tasks_conn=tconn)
+    assert res["status_changed"] == 2
+    assert mem.get_run(conn, "broken")["score"] == 0.0 and mem.get_run(conn, "broken")["status"] == "failed"
+    assert mem.get_run(conn, "fine")["status"] == "completed" and mem.get_run(conn, "legacy")["status"] == "completed"
+    statuses = dict(tconn.execute("SELECT run_id, status FROM tasks").fetchall())
+    assert statuses == {"broken": "failed", "fine": "completed", "legacy": "completed"}
+    tconn.close()
+    mem.close(db)
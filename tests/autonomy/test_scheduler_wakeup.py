@@ -0,0 +1,40 @@
+import os
+import threading
+import time
+from agentmx.autonomy import tasks as taskq
+from agentmx.autonomy import notify
+
+def test_enqueue_wakes_listener(tmp_path):
+    db = str(tmp_path / "tasks.db")
+    conn = taskq.connect(db)
+    with notify.WakeListener(taskq.wake_dir(conn)) as w:
+        assert w.available
+        assert w.wait(0.01) is False
+        t = threading.Timer(0.05, lambda: taskq.enqueue(taskq.connect(db), "noop", {}))
+        t.start()
+        t0 = time.time()
+        assert w.wait(5.0) is True
+        assert time.time() - t0 < 2.0
+        t.join()
+        taskq.enqueue(conn, "noop", {})
+        taskq.enqueue(conn, "noop", {})
+        assert w.wait(1.0) is True
+        assert w.wait(0.01) is False
+
+def test_stale_sockets_are_removed(tmp_path):
+    d = str(tmp_path / "wake")
+    w = notify.WakeListener(d)
+    path = w.path
+    w.sock.close()
+    w.sock = None
+    assert notify.notify(d) == 0
+    assert not os.path.exists(path)
+
+def test_falls_back_to_polling(tmp_path, monkeypatch):
+    monkeypatch.setattr(notify, "_unix_dgram_supported", lambda: False)
+    w = notify.WakeListener(str(tmp_path / "wake"))
+    assert not w.available
+    t0 = time.time()
+    assert w.wait(0.05) is False
+    assert time.time() - t0 >= 0.05
+    w.close()
@@ -0,0 +1,137 @@
+import os
+import hashlib
+import pytest
+from agentmx.autonomy import executor
+from agentmx.autonomy.step_cache import StepCache, source_hash
+from agentmx.core.artifacts import ArtifactManifest, read_artifacts
+from agentmx.core.cas import BlobStore
+from agentmx.core.config import Config
+from agentmx.memory import store as mem
+
+CALLS = []
+
+def _render(ctx, args):
+    # reads an input file and writes a report into the run workdir
+    CALLS.append(args)
+    with open(args["src"], "rb") as f:
+        body = f.read().upper()
+    out = args["src"] + ".up" if args.get("beside_input") else os.path.join(ctx.workdir, "out", "report.txt")
+    os.makedirs(os.path.join(ctx.workdir, "out"), exist_ok=True)
+    with open(out, "wb") as f:
+        f.write(body)
+    manifest = ArtifactManifest(ctx.workdir)
+    manifest.append([{"path": out, "type": "report", "sha256": hashlib.sha256(body).hexdigest(), "size": len(body)}])
+    manifest.close()
+    return {"ok": True, "path": out, "workdir": ctx.workdir, "lines": body.count(b"\n")}
+
+@pytest.fixture
+def cfg(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setitem(executor.ACTIONS, "render", _render)
+    monkeypatch.setitem(executor.CACHEABLE, "render", ())
+    CALLS.clear()
+    yield Config(raw={
+        "execution": {"working_dir": str(tmp_path / "work" / "{run_id}"), "kill_switch_file": str(tmp_path / "STOP")},
+        "artifacts": {"cas_dir": str(tmp_path / "cas")},
+        "autonomy": {"cache": {"max_entries": 2}},
+    })
+    mem.close()
+
+def _plan(src):
+    return [{"id": "render", "action": "render", "args": {"src": str(src)}}]
+
+def test_hit_links_outputs_into_the_new_run(cfg, tmp_path):
+    src = tmp_path / "in.txt"
+    src.write_text("a\nb\n")
+    first = executor.execute_steps(cfg, _plan(src), run_id="r1")
+    second = executor.execute_steps(cfg, _plan(src), run_id="r2")
+    assert len(CALLS) == 1
+    assert not first["render"].get("cached") and second["render"]["cached"]
+    assert second["summary"]["cached"] == 1
+    out = second["render"]["path"]
+    assert out == os.path.join(cfg.workdir_for("r2"), "out", "report.txt")
+    assert second["render"]["workdir"] == os.path.abspath(cfg.workdir_for("r2"))
+    assert second["render"]["lines"] == 2
+    with open(out) as f:
+        assert f.read() == "A\nB\n"
+    # the manifest and the memory store see the artifact as if it ran
+    assert [a["path"] for a in read_artifacts(cfg.workdir_for("r2"))] == [out]
+    assert [a["path"] for a in mem.list_artifacts(mem.connect(), "r2")] == [out]
+    stats = mem.metrics(mem.connect())["step_cache"]
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["stores"] == 1 and stats["entries"] == 1
+
+    # changed input content, or no cache, runs the step again
+    src.write_text("a\nb\nc\n")
+    assert not executor.execute_steps(cfg, _plan(src), run_id="r3")["render"].get("cached")
+    assert not executor.execute_steps(cfg, _plan(src), run_id="r4", use_cache=False)["render"].get("cached")
+    assert len(CALLS) == 3
+
+def test_lru_eviction_releases_blobs(cfg, tmp_path):
+    shas = []
+    for i in range(3):
+        src = tmp_path / f"in{i}.txt"
+        src.write_text(f"input {i}\n")
+        executor.execute_steps(cfg, _plan(src), run_id=f"r{i}")
+        shas.append(hashlib.sha256(f"INPUT {i}\n".encode()).hexdigest())
+        mem.forget_run_artifacts(mem.connect(), f"r{i}")
+    conn = mem.connect()
+    stats = mem.step_cache_stats(conn)
+    assert stats["entries"] == 2 and stats["evictions"] == 1
+    # only the evicted entry's output is left unreferenced
+    assert BlobStore(cfg.get("artifacts.cas_dir")).gc(conn, grace=0) == [shas[0]]
+    executor.execute_steps(cfg, _plan(tmp_path / "in2.txt"), run_id="again")
+    assert len(CALLS) == 3 and mem.step_cache_stats(conn)["hits"] == 1
+
+def test_missing_blob_drops_the_entry(cfg, tmp_path):
+    src = tmp_path / "in.txt"
+    src.write_text("x\n")
+    executor.execute_steps(cfg, _plan(src), run_id="r1")
+    blobs = BlobStore(cfg.get("artifacts.cas_dir"))
+    sha = hashlib.sha256(b"X\n").hexdigest()
+    os.chmod(blobs.blob_path(sha), 0o644)
+    os.remove(blobs.blob_path(sha))
+    res = executor.execute_steps(cfg, _plan(src), run_id="r2")
+    assert not res["render"].get("cached") and len(CALLS) == 2
+    assert mem.step_cache_stats(mem.connect())["entries"] == 1
+
+def test_outputs_outside_the_workdir_are_copies_and_blobs_are_verified(cfg, tmp_path):
+    src = tmp_path / "in.txt"
+    src.write_text("x\n")
+    plan = [{"id": "render", "action": "render", "args": {"src": str(src), "beside_input": True}}]
+    executor.execute_steps(cfg, plan, run_id="r1")
+    out = tmp_path / "in.txt.up"
+    out.unlink()
+    assert executor.execute_steps(cfg, plan, run_id="r2")["render"]["cached"]
+    assert out.read_text() == "X\n" and os.stat(out).st_nlink == 1 and os.access(out, os.W_OK)
+    # editing the output leaves the cache intact
+    out.write_text("user edit\n")
+    blob = BlobStore(cfg.get("artifacts.cas_dir")).blob_path(hashlib.sha256(b"X\n").hexdigest())
+    assert open(blob).read() == "X\n"
+    assert executor.execute_steps(cfg, plan, run_id="r3")["render"]["cached"]
+    assert out.read_text() == "X\n"
+    # a blob changed behind the store's back is not served
+    os.chmod(blob, 0o644)
+    with open(blob, "w") as f:
+        f.write("tampered\n")
+    assert not executor.execute_steps(cfg, plan, run_id="r4")["render"].get("cached")
+    assert len(CALLS) == 2 and out.read_text() == "X\n"
+
+def test_config_that_shapes_the_output_is_part_of_the_key(cfg, tmp_path, monkeypatch):
+    monkeypatch.setitem(executor.CACHE_CONFIG, "render", ("browser",))
+    src = tmp_path / "in.txt"
+    src.write_text("x\n")
+    executor.execute_steps(cfg, _plan(src), run_id="r1")
+    raw = dict(cfg.raw, api={"max_concurrent_runs": 2})
+    assert executor.execute_steps(Config(raw=raw), _plan(src), run_id="r2")["render"]["cached"]
+    raw["browser"] = {"async": {"enabled": True}}
+    assert not executor.execute_steps(Config(raw=raw), _plan(src), run_id="r3")["render"].get("cached")
+    assert len(CALLS) == 2
+
+def test_source_hash_follows_the_code(tmp_path, monkeypatch):
+    mod = tmp_path / "cache_probe_mod.py"
+    mod.write_text("X = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    before = source_hash(_render, ["cache_probe_mod"])
+    assert source_hash(_render, ["cache_probe_mod"]) == before
+    mod.write_text("X = 22\n")
+    assert source_hash(_render, ["cache_probe_mod"]) != before
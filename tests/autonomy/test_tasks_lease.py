@@ -0,0 +1,76 @@
+import threading
+import time
+from agentmx.autonomy import tasks as taskq
+
+def test_claim_is_exclusive_across_workers(tmp_path):
+    db = str(tmp_path / "tasks.db")
+    conn = taskq.connect(db)
+    ids = {taskq.enqueue(conn, "noop", {"i": i}) for i in range(40)}
+    claimed = []
+    lock = threading.Lock()
+
+    def worker(n):
+        c = taskq.connect(db)
+        while True:
+            t = taskq.claim_task(c, f"w{n}")
+            if not t:
+                break
+            with lock:
+                claimed.append(t[0])
+            taskq.mark_status(c, t[0], "completed")
+        c.close()
+
+    ts = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    assert sorted(claimed) == sorted(ids)
+    assert taskq.claim_task(conn, "w0") is None
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    db = str(tmp_path / "tasks.db")
+    conn = taskq.connect(db)
+    tid = taskq.enqueue(conn, "noop", {})
+    first = taskq.claim_task(conn, "dead-worker", lease_seconds=0.05)
+    assert first[0] == tid
+    assert taskq.claim_task(conn, "other", lease_seconds=60) is None
+    time.sleep(0.1)
+    again = taskq.claim_task(conn, "other", lease_seconds=60)
+    assert again is not None and again[0] == tid
+    assert taskq.heartbeat(conn, tid, "dead-worker") is False
+    assert taskq.heartbeat(conn, tid, "other") is True
+
+def test_lease_keeper_extends_lease(tmp_path):
+    db = str(tmp_path / "tasks.db")
+    conn = taskq.connect(db)
+    tid = taskq.enqueue(conn, "noop", {})
+    taskq.claim_task(conn, "w", lease_seconds=0.3)
+    with taskq.LeaseKeeper(db, tid, "w", lease_seconds=0.3):
+        time.sleep(0.5)
+        assert taskq.claim_task(conn, "thief", lease_seconds=60) is None
+    exp = conn.execute("SELECT lease_expires FROM tasks WHERE id=?", (tid,)).fetchone()[0]
+    assert exp > time.time()
+
+def test_repeatedly_expired_task_fails(tmp_path):
+    db = str(tmp_path / "tasks.db")
+    conn = taskq.connect(db)
+    tid = taskq.enqueue(conn, "noop", {})
+    taskq.claim_task(conn, "w", lease_seconds=0.01, max_attempts=1)
+    time.sleep(0.05)
+    assert taskq.reclaim_expired(conn, max_attempts=1) == 1
+    assert conn.execute("SELECT status FROM tasks WHERE id=?", (tid,)).fetchone()[0] == "failed"
+
+def test_lost_lease_cancels_the_work_and_blocks_its_status(tmp_path):
+    db = str(tmp_path / "tasks.db")
+    conn = taskq.connect(db)
+    tid = taskq.enqueue(conn, "noop", {})
+    taskq.claim_task(conn, "slow", lease_seconds=0.2)
+    with taskq.LeaseKeeper(db, tid, "slow", lease_seconds=0.2) as lease:
+        conn.execute("UPDATE tasks SET lease_owner='other' WHERE id=?", (tid,))
+        conn.commit()
+        assert lease.token.wait(2) and lease.token.reason == "lease_lost"
+    assert lease.lost
+    assert taskq.mark_status(conn, tid, "failed", owner="slow") is False
+    assert taskq.mark_status(conn, tid, "completed", owner="other") is True
+    assert conn.execute("SELECT status FROM tasks WHERE id=?", (tid,)).fetchone()[0] == "completed"
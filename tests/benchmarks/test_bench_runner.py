@@ -0,0 +1,42 @@
+import sys
+import pytest
+from benchmarks import bench_queue
+from benchmarks import run as bench_run
+from benchmarks.run import compare, direction, merge_median
+
+def _doc(**metrics):
+    return {"benchmarks": {"x": {"results": [{"size": 1024, **metrics}]}}}
+
+def test_direction_from_metric_names():
+    assert direction("audit.records_per_sec.none") == 1
+    assert direction("hashing.results[size=1024].pooled_mb_s") == 1
+    assert direction("store.results[runs=10000].median_us.get_run") == -1
+    assert direction("api.results.sse.p95_ms") == -1
+    assert direction("hashing.results[size=1024].files") == 0
+
+def test_compare_flags_regressions_in_both_directions():
+    base = _doc(ops_per_sec=1000, latency_ms=10.0, files=4)
+    rows = {r["metric"]: r for r in compare(_doc(ops_per_sec=700, latency_ms=10.5, files=9), base, 0.25)}
+    assert rows["x.results[size=1024].ops_per_sec"]["regressed"]
+    assert not rows["x.results[size=1024].latency_ms"]["regressed"]
+    assert "x.results[size=1024].files" not in rows
+    rows = {r["metric"]: r for r in compare(_doc(ops_per_sec=1300, latency_ms=20.0), base, 0.25)}
+    assert not rows["x.results[size=1024].ops_per_sec"]["regressed"]
+    assert rows["x.results[size=1024].latency_ms"]["regressed"]
+
+def test_merge_median_and_small_suite():
+    merged = merge_median([{"a": [1, {"b": 5}], "n": "x"}, {"a": [3, {"b": 1}], "n": "x"}, {"a": [2, {"b": 9}], "n": "x"}])
+    assert merged == {"a": [2, {"b": 5}], "n": "x"}
+    res = bench_queue.run(tasks=50)["results"]
+    assert res["enqueue_per_sec"] > 0 and res["claim_task_per_sec"] > 0
+
+def test_erroring_suite_fails_the_run(monkeypatch, tmp_path):
+    current = {"benchmarks": {"x": {"error": "RuntimeError: boom"}}}
+    rows = compare(current, _doc(ops_per_sec=1000), 0.25)
+    assert rows == [{"metric": "x", "baseline": None, "current": None, "change": None, "regressed": True,
+                     "error": "RuntimeError: boom"}]
+    monkeypatch.setitem(bench_run.SUITES, "broken", ("no_such_bench_module", {}, {}, False))
+    monkeypatch.setattr(sys, "argv", ["run", "--only", "broken", "--out", str(tmp_path / "out.json")])
+    with pytest.raises(SystemExit) as exc:
+        bench_run.main()
+    assert exc.value.code == 1
@@ -0,0 +1,113 @@
+import os
+import hashlib
+import json
+import threading
+from agentmx.core import hashing, runner as runner_mod
+from agentmx.core.artifacts import ArtifactManifest, read_artifacts
+from agentmx.core.config import Config
+from agentmx.core.runner import AgentRunner
+from agentmx.autonomy import evaluator
+from agentmx.memory import store as mem
+
+def _runner(tmp_path, monkeypatch, **extra):
+    monkeypatch.chdir(tmp_path)
+    raw = {
+        "execution": {"working_dir": str(tmp_path / "work" / "{run_id}"), "kill_switch_file": str(tmp_path / "STOP")},
+        "browser": {"downloads_dir": str(tmp_path / "work" / "{run_id}" / "browser")},
+    }
+    raw.update(extra)
+    return AgentRunner(Config(raw=raw), run_id="r1", net_enabled=False, allow_safety_edit=False)
+
+def test_add_artifacts_appends_and_batches_db_writes(tmp_path, monkeypatch):
+    r = _runner(tmp_path, monkeypatch, artifacts={"db_batch": 1000})
+    files = []
+    for i in range(300):
+        p = tmp_path / f"shot_{i}.png"
+        p.write_bytes(b"x" * i)
+        files.append(str(p))
+    calls = []
+    orig = mem.record_artifacts
+    monkeypatch.setattr(mem, "record_artifacts", lambda conn, rid, arts: (calls.append(len(arts)), orig(conn, rid, arts)))
+    r.add_artifact(files[0], "screenshot")
+    res = r.add_artifacts(files[1:], "screenshot")
+    assert len(res) == 299 and all("sha256" in m for m in res)
+    assert calls == [300]
+    arts = read_artifacts(r.workdir)
+    assert [a["name"] for a in arts] == [f"shot_{i}.png" for i in range(300)]
+    assert len(mem.list_artifacts(mem.connect(), "r1")) == 300
+    r.manifest.close()
+    mem.close()
+
+def test_small_artifacts_are_recorded_inline_and_blobs_stored_off_the_hash_pool(tmp_path, monkeypatch):
+    r = _runner(tmp_path, monkeypatch)
+    small = tmp_path / "small.txt"
+    small.write_bytes(b"x" * 1024)
+    meta = r.add_artifact(str(small))
+    assert meta["sha256"] == hashlib.sha256(b"x" * 1024).hexdigest()
+    assert [a["name"] for a in read_artifacts(r.workdir)] == ["small.txt"]
+
+    monkeypatch.setattr(runner_mod, "INLINE_THRESHOLD", 0)
+    monkeypatch.setattr(hashing, "INLINE_THRESHOLD", 0)
+    threads = []
+    store = r._store_blob
+    monkeypatch.setattr(r, "_store_blob", lambda m: (threads.append(threading.current_thread().name), store(m)))
+    for i in range(20):
+        p = tmp_path / f"big_{i}.bin"
+        p.write_bytes(bytes([i]) * 4096)
+        r.add_artifact(str(p))
+    r.flush_artifacts()
+    assert len(threads) == 20 and not any(t.startswith("agentmx-hash") for t in threads)
+    assert len(read_artifacts(r.workdir)) == 21
+    r.manifest.close()
+    mem.close()
+
+def test_artifacts_are_readable_once_the_status_is_terminal(tmp_path, monkeypatch):
+    r = _runner(tmp_path, monkeypatch, artifacts={"db_batch": 1000})
+    for i in range(5):
+        p = os.path.join(r.workdir, f"big_{i}.bin")
+        with open(p, "wb") as f:
+            f.write(os.urandom(hashing.INLINE_THRESHOLD + i))
+        r.add_artifact(p, "report")
+    seen = {}
+    set_status = r.set_status
+
+    def spy(status, extra=None):
+        if status in ("completed", "aborted", "failed"):
+            seen["db"] = len(mem.list_artifacts(mem.connect(), "r1"))
+            seen["manifest"] = len(read_artifacts(r.workdir))
+        set_status(status, extra)
+    monkeypatch.setattr(r, "set_status", spy)
+    assert r.execute("", timeout=0)
+    assert seen == {"db": 5, "manifest": 5}
+    mem.close()
+
+def test_reader_skips_torn_line_and_reads_legacy(tmp_path):
+    m = ArtifactManifest(str(tmp_path))
+    m.append([{"path": "/x/a.txt"}, {"path": "/x/b.txt"}])
+    m.close()
+    with open(m.path, "ab") as f:
+        f.write(b'{"path": "/x/c')
+    assert [a["path"] for a in read_artifacts(str(tmp_path))] == ["/x/a.txt", "/x/b.txt"]
+    legacy = tmp_path / "legacy"
+    legacy.mkdir()
+    (legacy / "artifacts.json").write_text(json.dumps([{"path": "/y/receipt.txt"}]))
+    assert read_artifacts(str(legacy)) == [{"path": "/y/receipt.txt"}]
+    assert read_artifacts(str(tmp_path / "missing")) == []
+
+def test_manifest_opens_on_first_append(tmp_path):
+    m = ArtifactManifest(str(tmp_path / "not-yet"))
+    m.append([])
+    m.close()
+    (tmp_path / "not-yet").mkdir()
+    m = ArtifactManifest(str(tmp_path / "not-yet"))
+    assert m._f is None and not os.path.exists(m.path)
+    m.append([{"path": "/x/a.txt"}])
+    m.close()
+    assert read_artifacts(str(tmp_path / "not-yet")) == [{"path": "/x/a.txt"}]
+
+def test_evaluator_reads_manifest(tmp_path):
+    m = ArtifactManifest(str(tmp_path))
+    m.append([{"path": "/d/notepad_output.txt"}, {"path": "/d/receipt.txt"}])
+    m.close()
+    res = evaluator.evaluate(str(tmp_path), {"expect_artifacts": ["notepad_output.txt", "receipt.txt"]})
+    assert res["score"] == 1.0
@@ -0,0 +1,116 @@
+import hashlib
+import os
+import stat
+from agentmx.core import cas
+from agentmx.core.cas import BlobStore
+from agentmx.core.config import Config
+from agentmx.core.runner import AgentRunner
+from agentmx.memory import store as mem
+
+def _runner(tmp_path, run_id):
+    raw = {
+        "execution": {"working_dir": str(tmp_path / "work" / "{run_id}"), "kill_switch_file": str(tmp_path / "STOP")},
+        "browser": {"downloads_dir": str(tmp_path / "work" / "{run_id}" / "browser")},
+        "artifacts": {"cas_dir": str(tmp_path / "cas")},
+    }
+    return AgentRunner(Config(raw=raw), run_id=run_id, net_enabled=False, allow_safety_edit=False)
+
+def test_identical_artifacts_share_one_blob(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    content = b"Receipt: OK"
+    sha = hashlib.sha256(content).hexdigest()
+    paths = []
+    for rid in ("r1", "r2"):
+        r = _runner(tmp_path, rid)
+        p = os.path.join(r.downloads_dir, "receipt.txt")
+        with open(p, "wb") as f:
+            f.write(content)
+        meta = r.add_artifact(p, "receipt")
+        r.flush_artifacts()
+        assert meta["cas"] is True
+        paths.append(p)
+    store = BlobStore(str(tmp_path / "cas"))
+    blob = store.blob_path(sha)
+    assert os.path.exists(blob)
+    assert len(os.listdir(os.path.dirname(blob))) == 1
+    assert not any(os.path.samefile(p, blob) for p in paths)
+    # rewriting one run's file in place leaves the blob and the other run alone
+    with open(paths[0], "wb") as f:
+        f.write(b"Receipt: CHANGED")
+    assert open(blob, "rb").read() == content and open(paths[1], "rb").read() == content
+    conn = mem.connect()
+    assert mem.blob_refcount(conn, sha) == 2
+    mem.forget_run_artifacts(conn, "r1")
+    assert store.gc(conn, grace=0) == []
+    mem.forget_run_artifacts(conn, "r2")
+    # unreferenced, but too recently put to be collected
+    assert store.gc(conn, grace=3600) == []
+    assert store.gc(conn, grace=0) == [sha]
+    assert not os.path.exists(blob)
+    mem.close()
+
+def _disk_bytes(*roots):
+    seen, total = set(), 0
+    for root in roots:
+        for d, _, names in os.walk(root):
+            for name in names:
+                st = os.stat(os.path.join(d, name))
+                if (st.st_dev, st.st_ino) not in seen:
+                    seen.add((st.st_dev, st.st_ino))
+                    total += st.st_blocks * 512
+    return total
+
+def test_finished_runs_store_identical_artifacts_once(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # no reflinks, so the sealed files are hardlinks on every filesystem
+    monkeypatch.setattr(cas, "_reflink", lambda src, dst: False)
+    body = os.urandom(1024 * 1024)
+    paths = []
+    for rid in ("r1", "r2", "r3", "edited"):
+        r = _runner(tmp_path, rid)
+        p = os.path.join(r.workdir, "report.bin")
+        with open(p, "wb") as f:
+            f.write(body)
+        r.add_artifact(p, "report")
+        r.flush_artifacts()
+        if rid == "edited":
+            with open(p, "ab") as f:
+                f.write(b"!")
+        assert r.execute("", timeout=0)
+        paths.append(p)
+    blob = BlobStore(str(tmp_path / "cas")).blob_path(hashlib.sha256(body).hexdigest())
+    assert all(os.path.samefile(p, blob) for p in paths[:3])
+    assert not stat.S_IMODE(os.stat(paths[0]).st_mode) & 0o222
+    # three runs and the blob share one copy; the edited file keeps its own
+    assert _disk_bytes(tmp_path / "work", tmp_path / "cas") < 2.2 * len(body)
+    assert open(paths[3], "rb").read() == body + b"!"
+    mem.close()
+
+def test_outside_files_are_copied_not_adopted(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    outside = tmp_path / "desktop.txt"
+    outside.write_text("hello")
+    r = _runner(tmp_path, "r1")
+    meta = r.add_artifact(str(outside), "note")
+    r.flush_artifacts()
+    blob = BlobStore(str(tmp_path / "cas")).blob_path(meta["sha256"])
+    assert open(blob).read() == "hello"
+    assert not os.path.samefile(str(outside), blob)
+    outside.write_text("changed")
+    assert open(blob).read() == "hello"
+    mem.close()
+
+def test_link_into_and_orphan_sweep(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = BlobStore(str(tmp_path / "cas"))
+    src = tmp_path / "a.bin"
+    src.write_bytes(b"abc")
+    sha = hashlib.sha256(b"abc").hexdigest()
+    store.put(str(src), sha)
+    method = store.link_into(sha, str(tmp_path / "out" / "a.bin"))
+    assert method in ("reflink", "copy")
+    assert (tmp_path / "out" / "a.bin").read_bytes() == b"abc"
+    conn = mem.connect()
+    assert store.gc(conn, grace=3600) == []
+    assert store.gc(conn, grace=0) == [sha]
+    mem.close()
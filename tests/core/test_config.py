@@ -0,0 +1,88 @@
+import dataclasses
+import os
+import pytest
+from agentmx.core.config import Config, ConfigError, ConfigWatcher, load_config
+
+def _write(path, text: str, mtime_ns: int = None):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def test_get_matches_nested_walk():
+    raw = {"a": {"b": {"c": 1}, "d": [1, 2]}, "e": None, "api": {"max_queued_runs": 3}}
+    cfg = Config(raw=raw)
+    assert cfg.get("a.b.c") == 1
+    assert cfg.get("a.b") == {"c": 1}
+    assert cfg.get("a.d") == [1, 2]
+    assert cfg.get("e", "x") is None
+    assert cfg.get("a.b.c.d", "dflt") == "dflt"
+    assert cfg.get("missing", 5) == 5
+    assert cfg.get("api.max_queued_runs") == 3
+    # the caller's dict is copied, so later mutation can't leak in
+    raw["a"]["b"]["c"] = 2
+    assert cfg.get("a.b.c") == 1
+
+def test_hot_attributes_and_frozen():
+    cfg = Config(raw={"approvals": {"api_key_required": False}, "execution": {"working_dir": "w/{run_id}"}})
+    assert cfg.api_key_required is False
+    assert cfg.workdir_for("r1") == "w/r1"
+    assert cfg.kill_switch_file == ".agentmx/STOP"
+    assert Config(raw={}).api_key_required is True
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        cfg.api_key_required = True
+
+def test_validation_reports_every_error():
+    with pytest.raises(ConfigError) as e:
+        Config(raw={
+            "api": {"max_concurrent_runs": 0, "max_queued_runs": "lots"},
+            "audit": {"durability": "sometimes"},
+            "execution": {"working_dir": "w/{run}"},
+            "autonomy": {"thresholds": {"x": "high"}, "workers": True},
+        })
+    msg = str(e.value)
+    for key in ("api.max_concurrent_runs", "api.max_queued_runs", "audit.durability",
+                "execution.working_dir", "autonomy.thresholds.x", "autonomy.workers"):
+        assert key in msg
+
+def test_load_config_fails_fast(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _write(tmp_path / "config.yaml", "api: [unclosed\n")
+    with pytest.raises(ConfigError):
+        load_config()
+    _write(tmp_path / "config.yaml", "artifacts:\n  db_batch: 0\n")
+    with pytest.raises(ConfigError):
+        load_config()
+    _write(tmp_path / "config.yaml", "artifacts:\n  db_batch: 8\n")
+    cfg = load_config()
+    assert cfg.get("artifacts.db_batch") == 8
+    assert cfg.path == str(tmp_path / "config.yaml")
+
+def test_watcher_swaps_and_keeps_old_on_error(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "config.yaml"
+    _write(path, "api:\n  max_queued_runs: 1\n", mtime_ns=1_000_000_000)
+    current = [load_config()]
+    w = ConfigWatcher(current.append, current=current[0], interval=0.01)
+    assert w.check() is False
+
+    _write(path, "api:\n  max_queued_runs: 7\n", mtime_ns=2_000_000_000)
+    assert w.check() is True
+    assert current[-1].get("api.max_queued_runs") == 7
+
+    _write(path, "api:\n  max_queued_runs: -1\n", mtime_ns=3_000_000_000)
+    assert w.check() is False
+    assert len(current) == 2
+    # not retried until the file changes again
+    assert w.check() is False
+
+    _write(path, "api:\n  max_queued_runs: 9\n", mtime_ns=4_000_000_000)
+    w.start()
+    try:
+        for _ in range(200):
+            if current[-1].get("api.max_queued_runs") == 9:
+                break
+            w._stop.wait(0.01)
+    finally:
+        w.stop()
+    assert current[-1].get("api.max_queued_runs") == 9
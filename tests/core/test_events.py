@@ -0,0 +1,46 @@
+import asyncio
+import threading
+from agentmx.core.events import Broadcaster
+
+def test_publish_fans_out_to_subscribers():
+    b = Broadcaster()
+
+    async def main():
+        s1 = b.subscribe("r1")
+        s2 = b.subscribe("r1")
+        other = b.subscribe("r2")
+        t = threading.Thread(target=lambda: [b.publish("r1", {"type": "audit", "seq": i, "line": str(i)}) for i in range(1, 4)])
+        t.start()
+        t.join()
+        got1 = [(await s1.get(1.0))["seq"] for _ in range(3)]
+        got2 = [(await s2.get(1.0))["seq"] for _ in range(3)]
+        assert got1 == got2 == [1, 2, 3]
+        assert await other.get(0.05) is None
+        for s in (s1, s2, other):
+            s.close()
+        assert not b._subs
+
+    asyncio.run(main())
+
+def test_slow_subscriber_overflows_instead_of_blocking():
+    b = Broadcaster()
+
+    async def main():
+        s = b.subscribe("r1", maxsize=2)
+        for i in range(5):
+            b.publish("r1", {"type": "audit", "seq": i, "line": ""})
+        await asyncio.sleep(0)
+        assert s.overflowed
+        assert s.queue.qsize() == 2
+        s.close()
+
+    asyncio.run(main())
+
+def test_active_producers_are_counted():
+    b = Broadcaster()
+    b.open("r1")
+    b.open("r1")
+    b.close("r1")
+    assert b.is_active("r1")
+    b.close("r1")
+    assert not b.is_active("r1")
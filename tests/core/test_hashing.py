@@ -0,0 +1,78 @@
+import hashlib
+import os
+import threading
+from agentmx.core import hashing
+from agentmx.core.hashing import Hasher, hash_file
+
+def _write(path, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+def test_hash_file_small_and_mmap(tmp_path, monkeypatch):
+    small = _write(tmp_path / "small.bin", b"abc" * 1000)
+    assert hash_file(small) == hashlib.sha256(b"abc" * 1000).hexdigest()
+    # force the mmap path with several windows
+    monkeypatch.setattr(hashing, "MMAP_THRESHOLD", 1024)
+    monkeypatch.setattr(hashing, "MMAP_WINDOW", 4096)
+    data = os.urandom(50_000)
+    big = _write(tmp_path / "big.bin", data)
+    assert hash_file(big) == hashlib.sha256(data).hexdigest()
+    empty = _write(tmp_path / "empty.bin", b"")
+    assert hash_file(empty) == hashlib.sha256(b"").hexdigest()
+
+def test_cache_hit_and_invalidation(tmp_path, monkeypatch):
+    calls = []
+    real = hashing.hash_file
+
+    def counting(path):
+        calls.append(path)
+        return real(path)
+
+    monkeypatch.setattr(hashing, "hash_file", counting)
+    h = Hasher(max_workers=2)
+    try:
+        p = _write(tmp_path / "a.txt", b"one")
+        assert h.hash(p) == hashlib.sha256(b"one").hexdigest()
+        assert h.hash(p) == hashlib.sha256(b"one").hexdigest()
+        assert len(calls) == 1 and h.hits == 1
+        _write(tmp_path / "a.txt", b"two!")
+        os.utime(p, ns=(0, 12345))
+        assert h.hash(p) == hashlib.sha256(b"two!").hexdigest()
+        assert len(calls) == 2
+        assert h.hash(str(tmp_path / "missing")) is None
+    finally:
+        h.shutdown()
+
+def test_concurrent_requests_share_one_hash(tmp_path, monkeypatch):
+    gate = threading.Event()
+    calls = []
+    real = hashing.hash_file
+
+    def slow(path):
+        calls.append(path)
+        gate.wait(5)
+        return real(path)
+
+    monkeypatch.setattr(hashing, "hash_file", slow)
+    monkeypatch.setattr(hashing, "INLINE_THRESHOLD", 0)
+    h = Hasher(max_workers=4)
+    try:
+        p = _write(tmp_path / "b.txt", b"shared")
+        futures = [h.submit(p) for _ in range(5)]
+        assert not futures[0].done()
+        gate.set()
+        assert {f.result(5) for f in futures} == {hashlib.sha256(b"shared").hexdigest()}
+        assert len(calls) == 1
+    finally:
+        h.shutdown()
+
+def test_prime_skips_rehash(tmp_path, monkeypatch):
+    monkeypatch.setattr(hashing, "hash_file", lambda path: (_ for _ in ()).throw(AssertionError("rehashed")))
+    h = Hasher(max_workers=1)
+    try:
+        p = _write(tmp_path / "c.txt", b"x")
+        h.prime(p, "f" * 64)
+        assert h.hash(p) == "f" * 64
+    finally:
+        h.shutdown()
@@ -0,0 +1,123 @@
+import json
+import threading
+from fastapi.testclient import TestClient
+from agentmx.core import spans
+from agentmx.core.config import Config
+from agentmx.core.hashing import Hasher
+from agentmx.core.runner import AgentRunner
+from agentmx.memory import store as mem
+from agentmx.ui import api
+
+def test_spans_feed_recorder_and_histograms():
+    spans.reset()
+    rec = spans.SpanRecorder("r", max_recorded=3)
+
+    @spans.timed("t.fn")
+    def fn(x):
+        return x * 2
+
+    with spans.span("t.outside"):
+        pass
+    token = rec.activate()
+    try:
+        with spans.span("t.block"):
+            assert fn(2) == 4
+        for _ in range(3):
+            fn(1)
+    finally:
+        spans.SpanRecorder.deactivate(token)
+    fn(1)
+    summary = rec.summary()
+    assert summary["t.fn"]["count"] == 4 and summary["t.block"]["count"] == 1
+    assert "t.outside" not in summary
+    d = rec.to_dict()
+    assert [s["name"] for s in d["spans"]] == ["t.fn", "t.block", "t.fn"]
+    assert d["dropped"] == 2
+    snap = spans.snapshot()
+    assert snap["t.fn"]["count"] == 5 and snap["t.outside"]["count"] == 1
+    assert sum(snap["t.fn"]["buckets"]) == 5
+
+def test_recorder_is_per_context():
+    rec = spans.SpanRecorder("r")
+    seen = []
+    token = rec.activate()
+    try:
+        t = threading.Thread(target=lambda: seen.append(spans.current()))
+        t.start()
+        t.join()
+    finally:
+        spans.SpanRecorder.deactivate(token)
+    assert seen == [None]
+    assert spans.current() is None
+
+def test_recorder_cap_holds_under_concurrent_adds():
+    rec = spans.SpanRecorder("r", max_recorded=100)
+    start = threading.Barrier(8)
+
+    def add():
+        start.wait()
+        for _ in range(500):
+            rec.add("step", 0.0, 0.001)
+    threads = [threading.Thread(target=add) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(rec.spans) == 100 and rec.dropped == 3900
+    assert rec.summary()["step"]["count"] == 4000
+
+def test_dead_threads_tables_are_folded_in():
+    spans.reset()
+
+    def work():
+        with spans.span("t.thread"):
+            pass
+    for _ in range(20):
+        t = threading.Thread(target=work)
+        t.start()
+        t.join()
+    spans._table()
+    with spans._LOCK:
+        live = len(spans._THREAD_TABLES)
+    assert live <= threading.active_count() + 1
+    assert spans.snapshot()["t.thread"]["count"] == 20
+
+def test_pool_hashes_count_towards_the_submitting_run(tmp_path):
+    p = tmp_path / "big.bin"
+    p.write_bytes(b"x" * (1 << 20))
+    rec = spans.SpanRecorder("r")
+    h = Hasher(max_workers=2)
+    token = rec.activate()
+    try:
+        h.hash(str(p))
+    finally:
+        spans.SpanRecorder.deactivate(token)
+        h.shutdown()
+    assert rec.summary()["artifact.hash"]["count"] == 1
+
+def test_run_timings_written_and_served(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("AGENTMX_API_KEY", "k")
+    cfg = Config(raw={
+        "execution": {"working_dir": str(tmp_path / "work" / "{run_id}"), "kill_switch_file": str(tmp_path / "STOP")},
+        "browser": {"downloads_dir": str(tmp_path / "work" / "{run_id}" / "browser")},
+    })
+    monkeypatch.setattr(api, "cfg", cfg)
+    runner = AgentRunner(cfg, "t1", net_enabled=False, allow_safety_edit=False)
+    note = tmp_path / "note.txt"
+    note.write_text("x")
+    runner.add_artifact(str(note))
+    assert runner.execute("noop", timeout=0)
+    with open(tmp_path / "work" / "t1" / "timings.json") as f:
+        data = json.load(f)
+    names = {s["name"] for s in data["spans"]}
+    assert {"run.init", "run.execute", "run.set_status", "audit.record", "store.record_run", "run.finalize"} <= names
+    assert mem.get_spans(mem.connect(), "t1")["run.execute"]["count"] == 1
+    c = TestClient(api.app)
+    r = c.get("/runs/t1/timings", headers={"X-API-Key": "k"})
+    assert r.status_code == 200 and r.json()["summary"]["run.execute"]["count"] == 1
+    assert c.get("/runs/nope/timings", headers={"X-API-Key": "k"}).status_code == 404
+    m = c.get("/metrics", headers={"X-API-Key": "k"}).json()
+    assert m["spans"]["run.execute"]["count"] >= 1
+    prom = c.get("/metrics/prometheus", headers={"X-API-Key": "k"}).text
+    assert 'agentmx_span_duration_seconds_count{span="run.execute"}' in prom
@@ -0,0 +1,87 @@
+import threading
+from agentmx.memory import store as mem
+
+def test_connect_reuses_per_thread_connection(tmp_path):
+    db = str(tmp_path / "runs.sqlite")
+    c1 = mem.connect(db)
+    c2 = mem.connect(db)
+    assert c1 is c2
+    other = []
+    t = threading.Thread(target=lambda: other.append(mem.connect(db)))
+    t.start()
+    t.join()
+    assert other and other[0] is not c1
+    mem.record_run(c1, "r1", "completed", 1.0, 1.0)
+    assert mem.get_run(mem.connect(db), "r1")["status"] == "completed"
+    mem.close(db)
+
+def test_schema_initialized_once(tmp_path, monkeypatch):
+    calls = []
+    orig = mem._init_schema
+    monkeypatch.setattr(mem, "_init_schema", lambda conn: (calls.append(1), orig(conn)))
+    db = str(tmp_path / "runs.sqlite")
+    for _ in range(5):
+        mem.connect(db)
+    ts = [threading.Thread(target=mem.connect, args=(db,)) for _ in range(3)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    assert len(calls) == 1
+    mem.close(db)
+
+def test_close_shuts_connections(tmp_path):
+    db = str(tmp_path / "runs.sqlite")
+    c1 = mem.connect(db)
+    mem.close(db)
+    try:
+        c1.execute("SELECT 1")
+        raised = False
+    except Exception:
+        raised = True
+    assert raised
+    c2 = mem.connect(db)
+    assert c2 is not c1
+    assert mem.list_runs(c2) == []
+    mem.close_all()
+
+def test_memory_db_is_shared_by_threads():
+    mem.close(":memory:")
+    mem.record_run(mem.connect(":memory:"), "r1", "completed", 1.0, 1.0)
+    seen = []
+    t = threading.Thread(target=lambda: seen.append(mem.get_run(mem.connect(":memory:"), "r1")))
+    t.start()
+    t.join()
+    assert seen[0]["status"] == "completed"
+    # the database outlives the threads that used it
+    assert mem.get_run(mem.connect(":memory:"), "r1") is not None
+    mem.close(":memory:")
+    assert mem.get_run(mem.connect(":memory:"), "r1") is None
+    mem.close(":memory:")
+
+def test_reused_thread_ident_closes_the_dead_threads_connection(tmp_path, monkeypatch):
+    db = str(tmp_path / "runs.sqlite")
+    mgr = mem.get_manager(db)
+    dead = []
+    t = threading.Thread(target=lambda: dead.append(mem.connect(db)))
+    t.start()
+    t.join()
+    # a new thread that got the dead one's ident while it is still listed
+    monkeypatch.setattr(mgr, "_prune", lambda: None)
+    reused = []
+
+    def worker():
+        with mgr._lock:
+            mgr._conns[threading.get_ident()] = mgr._conns.pop(t.ident)
+        reused.append(mem.connect(db))
+    w = threading.Thread(target=worker)
+    w.start()
+    w.join()
+    assert reused[0] is not dead[0]
+    try:
+        dead[0].execute("SELECT 1")
+        raised = False
+    except Exception:
+        raised = True
+    assert raised
+    mem.close(db)
@@ -0,0 +1,53 @@
+import sqlite3
+from agentmx.memory import store as mem
+from agentmx.memory import migrations
+
+def _plan(conn, sql, args=()):
+    return " ".join(r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, args).fetchall())
+
+def test_fresh_db_is_at_latest_version(tmp_path):
+    db = str(tmp_path / "runs.sqlite")
+    conn = mem.connect(db)
+    assert migrations.user_version(conn) == len(mem.MIGRATIONS)
+    assert "idx_runs_created_at" in _plan(conn, "SELECT id,status,duration,score,created_at FROM runs ORDER BY created_at DESC LIMIT 50")
+    assert "idx_artifacts_run_created_at" in _plan(conn, "SELECT name FROM artifacts WHERE run_id=? ORDER BY created_at", ("r",))
+    assert "idx_runs_status_created_at" in _plan(conn, "SELECT COUNT(1) FROM runs WHERE status='completed' AND created_at>=?", (0,))
+    mem.close(db)
+
+def test_legacy_db_is_migrated(tmp_path):
+    db = str(tmp_path / "runs.sqlite")
+    legacy = sqlite3.connect(db)
+    legacy.execute("CREATE TABLE runs (id TEXT PRIMARY KEY, status TEXT, duration REAL, score REAL, created_at REAL)")
+    legacy.execute("CREATE TABLE artifacts (run_id TEXT, name TEXT, size INTEGER, sha256 TEXT, mime TEXT)")
+    legacy.execute("ALTER TABLE artifacts ADD COLUMN path TEXT")
+    legacy.execute("ALTER TABLE artifacts ADD COLUMN created_at REAL")
+    legacy.execute("CREATE TABLE skills_learned (name TEXT, test_path TEXT, created_at REAL)")
+    legacy.execute("INSERT INTO runs VALUES('r1','completed',2.5,1.0,strftime('%s','now'))")
+    for size in (1, 2):
+        legacy.execute("INSERT INTO artifacts VALUES('r1','a.txt',?,'h','text/plain','/w/a.txt',1.0)", (size,))
+    legacy.commit()
+    legacy.close()
+
+    conn = mem.connect(db)
+    assert migrations.user_version(conn) == len(mem.MIGRATIONS)
+    run = mem.get_run(conn, "r1")
+    assert run["status"] == "completed"
+    assert isinstance(run["created_at"], float)
+    arts = mem.list_artifacts(conn, "r1")
+    assert len(arts) == 1 and arts[0]["size"] == 2
+    mem.close(db)
+
+def test_artifact_writes_are_idempotent(tmp_path):
+    db = str(tmp_path / "runs.sqlite")
+    conn = mem.connect(db)
+    mem.record_run(conn, "r1", "running", 0.0, 0.0)
+    created = mem.get_run(conn, "r1")["created_at"]
+    mem.record_run(conn, "r1", "completed", 3.0, 1.0)
+    assert mem.get_run(conn, "r1")["created_at"] == created
+    art = {"path": "/w/receipt.txt", "size": 5, "sha256": "x", "mime": "text/plain"}
+    mem.add_artifact(conn, "r1", art)
+    mem.commit(conn)
+    mem.record_artifacts(conn, "r1", [art, dict(art, size=6)])
+    arts = mem.list_artifacts(conn, "r1")
+    assert len(arts) == 1 and arts[0]["size"] == 6 and arts[0]["name"] == "receipt.txt"
+    mem.close(db)
@@ -0,0 +1,67 @@
+import random
+import sqlite3
+import time
+from agentmx.memory import store as mem
+from agentmx.memory import migrations
+
+def _scan(conn, granularity):
+    out = {}
+    for r in conn.execute("SELECT status, duration, score, created_at FROM runs").fetchall():
+        key = (int(r["created_at"] // granularity) * granularity, r["status"])
+        agg = out.setdefault(key, [0, 0.0])
+        agg[0] += 1
+        agg[1] += r["duration"] or 0
+    return out
+
+def _rolled(conn, granularity):
+    rows = conn.execute("SELECT bucket, status, runs, duration_sum FROM run_rollup WHERE granularity=?", (granularity,)).fetchall()
+    return {(r[0], r[1]): [r[2], r[3]] for r in rows}
+
+def test_rollup_tracks_inserts_updates_and_deletes(tmp_path):
+    db = str(tmp_path / "runs.sqlite")
+    conn = mem.connect(db)
+    rnd = random.Random(7)
+    now = time.time()
+    for i in range(200):
+        rid = f"r{i}"
+        mem.queue_run(conn, rid)
+        conn.execute("UPDATE runs SET created_at=? WHERE id=?", (now - rnd.uniform(0, 40 * 86400), rid))
+        mem.record_run(conn, rid, "running", 0.0, 0.0)
+        status = rnd.choice(["completed", "failed", "aborted"])
+        mem.record_run(conn, rid, status, rnd.uniform(0, 5000), rnd.choice([0.0, 0.1, 0.5, 0.9, 1.0]))
+    conn.execute("DELETE FROM runs WHERE id IN ('r1','r2','r3')")
+    conn.commit()
+    for g in mem.ROLLUP_GRANULARITIES:
+        scan, rolled = _scan(conn, g), _rolled(conn, g)
+        assert scan.keys() == rolled.keys()
+        for k in scan:
+            assert scan[k][0] == rolled[k][0]
+            assert abs(scan[k][1] - rolled[k][1]) < 1e-6
+    m = mem.metrics(conn)
+    cut7, cut30 = time.time() - 7 * 86400, time.time() - 30 * 86400
+    q = "SELECT COUNT(1) FROM runs WHERE status='completed' AND created_at>=?"
+    assert m["success_7d"] == conn.execute(q, (cut7,)).fetchone()[0]
+    assert m["success_30d"] == conn.execute(q, (cut30,)).fetchone()[0]
+    for days in (0.3, 1, 2.5, 13.7):
+        cut = time.time() - days * 86400
+        assert mem.success_since(conn, cut) == conn.execute(q, (cut,)).fetchone()[0]
+    avg = conn.execute("SELECT AVG(duration) FROM runs WHERE duration IS NOT NULL").fetchone()[0]
+    assert abs(m["avg_duration"] - avg) < 1e-6
+    assert sum(m["score_histogram"].values()) == 197
+    assert m["score_histogram"]["1.0"] == conn.execute("SELECT COUNT(1) FROM runs WHERE score=1.0").fetchone()[0]
+    mem.close(db)
+
+def test_rollup_is_backfilled_by_migration(tmp_path):
+    db = str(tmp_path / "runs.sqlite")
+    old = sqlite3.connect(db)
+    migrations.migrate(old, mem.MIGRATIONS[:4])
+    old.execute("INSERT INTO runs VALUES('a','completed',3.0,1.0,?)", (time.time(),))
+    old.execute("INSERT INTO runs VALUES('b','failed',4000.0,0.0,?)", (time.time(),))
+    old.commit()
+    old.close()
+    conn = mem.connect(db)
+    totals = mem.rollup_totals(conn)
+    assert totals["completed"]["runs"] == 1 and totals["completed"]["d1"] == 1
+    assert totals["failed"]["d7"] == 1 and totals["failed"]["s0"] == 1
+    assert mem.metrics(conn)["success_7d"] == 1
+    mem.close(db)
@@ -0,0 +1,54 @@
+import os
+from agentmx.safety.audit import AuditLog, AuditIndex
+
+def _write(tmp_path, n, **kw):
+    log = AuditLog(str(tmp_path), **kw)
+    for i in range(n):
+        log.record("step", {"i": i})
+    log.close()
+    return log.path
+
+def _line_starts(path):
+    starts, pos = [], 0
+    with open(path, "rb") as f:
+        for raw in f:
+            starts.append(pos)
+            pos += len(raw)
+    return starts
+
+def test_index_matches_line_offsets(tmp_path):
+    path = _write(tmp_path, 50, flush_bytes=500)
+    idx = AuditIndex(path)
+    starts = _line_starts(path)
+    assert idx.count() == 50
+    assert os.path.getsize(idx.idx_path) == 50 * 8
+    for seq in (1, 2, 25, 50):
+        assert idx.offset_of(seq) == starts[seq - 1]
+    assert idx.offset_of(51) == os.path.getsize(path)
+
+def test_lagging_index_is_scanned_and_repaired(tmp_path):
+    path = _write(tmp_path, 10)
+    idx = AuditIndex(path)
+    with open(idx.idx_path, "r+b") as f:
+        f.truncate(4 * 8)
+    with open(path, "ab") as f:
+        f.write(b'{"partial')
+    starts = _line_starts(path)
+    assert idx.count() == 10
+    assert idx.offset_of(8) == starts[7]
+    log = AuditLog(str(tmp_path))
+    assert log.seq == 10
+    assert os.path.getsize(idx.idx_path) == 10 * 8
+    log.record("more", {})
+    log.close()
+    assert idx.count() == 11
+    assert idx.offset_of(11) == _line_starts(path)[10]
+
+def test_legacy_log_without_index(tmp_path):
+    path = str(tmp_path / "audit.log")
+    with open(path, "w") as f:
+        for i in range(3):
+            f.write('{"event": "x"}\n')
+    idx = AuditIndex(path)
+    assert idx.count() == 3
+    assert idx.offset_of(3) == 30
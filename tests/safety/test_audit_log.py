@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import time
+import pytest
+from agentmx.safety import audit as audit_mod
+from agentmx.safety.audit import AuditLog
+
+def _lines(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().splitlines()
+
+def test_hash_covers_written_bytes_and_chain_verifies(tmp_path):
+    log = AuditLog(str(tmp_path))
+    log.record("a", {"x": 1})
+    log.record("b", {"y": "z"})
+    log.close()
+    lines = _lines(log.path)
+    assert len(lines) == 2
+    for line in lines:
+        rec = json.loads(line)
+        body = line[: line.rfind(', "hash": "')] + "}"
+        assert hashlib.sha256(body.encode()).hexdigest() == rec["hash"]
+        # Same digest the previous writer computed over the sorted record.
+        h = rec.pop("hash")
+        assert hashlib.sha256(json.dumps(rec, sort_keys=True).encode()).hexdigest() == h
+    assert audit_mod.verify(log.path) == 2
+
+def test_verify_detects_tampering(tmp_path):
+    log = AuditLog(str(tmp_path))
+    for i in range(3):
+        log.record("step", {"i": i})
+    log.close()
+    lines = _lines(log.path)
+    lines[1] = lines[1].replace('"i": 1', '"i": 7')
+    with open(log.path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    with pytest.raises(ValueError):
+        audit_mod.verify(log.path)
+
+def test_none_mode_buffers_until_size_or_flush(tmp_path):
+    log = AuditLog(str(tmp_path), durability="none", flush_bytes=10_000)
+    log.record("a", {})
+    time.sleep(0.3)
+    assert _lines(log.path) == []
+    log.flush()
+    assert len(_lines(log.path)) == 1
+    for i in range(200):
+        log.record("b", {"i": i})
+    assert len(_lines(log.path)) > 1
+    log.close()
+    assert len(_lines(log.path)) == 201
+    assert log.seq == 201
+
+def test_flush_mode_writes_within_interval(tmp_path):
+    log = AuditLog(str(tmp_path), durability="flush", flush_interval=0.05)
+    log.record("a", {})
+    deadline = time.time() + 2
+    while not _lines(log.path) and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(_lines(log.path)) == 1
+    log.close()
+
+def test_fsync_mode_and_reopen_continue_sequence(tmp_path):
+    log = AuditLog(str(tmp_path), durability="fsync", flush_bytes=1)
+    log.record("a", {})
+    assert len(_lines(log.path)) == 1
+    log.close()
+    again = AuditLog(str(tmp_path))
+    assert again.seq == 1
+    # the chain continues across the reopen
+    again.record("b", {})
+    again.close()
+    assert audit_mod.verify(log.path) == 2
+
+def test_second_writer_is_refused_and_leaves_the_tail_alone(tmp_path):
+    log = AuditLog(str(tmp_path), durability="none")
+    log.record("a", {})
+    log.flush()
+    # a record the live writer is in the middle of appending
+    with open(log.path, "ab") as f:
+        f.write(b'{"partial')
+    with pytest.raises(RuntimeError):
+        AuditLog(str(tmp_path))
+    assert open(log.path, "rb").read().endswith(b'{"partial')
+    log.close()
+    again = AuditLog(str(tmp_path))
+    assert again.seq == 1 and len(_lines(log.path)) == 1
+    again.close()
+
+def test_rejects_unknown_mode(tmp_path):
+    with pytest.raises(ValueError):
+        AuditLog(str(tmp_path), durability="sometimes")
+
+def test_stop_guard_flushes_before_raising(tmp_path):
+    from agentmx.safety.runner import StopFileGuard
+    stop = tmp_path / "STOP"
+    guard = StopFileGuard(str(stop))
+    log = AuditLog(str(tmp_path), durability="none")
+    guard.on_stop.append(log.flush)
+    log.record("a", {})
+    stop.write_text("")
+    with pytest.raises(StopFileGuard.Stopped):
+        guard.check()
+    assert len(_lines(log.path)) == 1
+    log.close()
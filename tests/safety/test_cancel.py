@@ -0,0 +1,139 @@
+import asyncio
+import threading
+import time
+import pytest
+from agentmx.safety import cancel
+from agentmx.safety.cancel import CancelToken, StopWatcher, Stopped
+from agentmx.safety.runner import StopFileGuard
+
+def _until(cond, timeout=3.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if cond():
+            return True
+        time.sleep(0.005)
+    return cond()
+
+def test_token_callbacks_children_and_close():
+    calls = []
+    root = CancelToken()
+    child = root.child()
+    grandchild = child.child()
+    detached = root.child()
+    detached.close()
+    remove = root.on_cancel(lambda: calls.append("removed"))
+    remove()
+    root.on_cancel(lambda: calls.append("root"))
+    assert root.cancel("because") is True
+    assert root.cancel("again") is False
+    assert calls == ["root"]
+    assert child.cancelled and grandchild.cancelled and grandchild.reason == "because"
+    assert not detached.cancelled
+    # registering on a cancelled token runs the callback immediately
+    root.on_cancel(lambda: calls.append("late"))
+    assert calls == ["root", "late"]
+    with pytest.raises(Stopped):
+        child.check()
+
+def test_sleep_wakes_on_cancel():
+    tok = CancelToken()
+    threading.Timer(0.05, tok.cancel).start()
+    t0 = time.monotonic()
+    with pytest.raises(Stopped):
+        tok.sleep(10)
+    assert time.monotonic() - t0 < 1.0
+    guard = StopFileGuard("unused", token=CancelToken())
+    guard.sleep(0.01)
+    flushed = []
+    guard.on_stop.append(lambda: flushed.append(1))
+    guard.token.cancel()
+    with pytest.raises(StopFileGuard.Stopped):
+        guard.sleep(10)
+    assert flushed == [1]
+
+def test_bind_task_cancels_from_another_thread():
+    tok = CancelToken()
+    loop = asyncio.new_event_loop()
+
+    async def blocked():
+        unbind = tok.bind_task(asyncio.current_task())
+        try:
+            await asyncio.sleep(10)
+        finally:
+            unbind()
+
+    threading.Timer(0.05, tok.cancel).start()
+    try:
+        with pytest.raises(asyncio.CancelledError):
+            loop.run_until_complete(blocked())
+    finally:
+        loop.close()
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_watcher_sees_create_and_delete(tmp_path, use_inotify):
+    w = StopWatcher(poll_interval=0.02, use_inotify=use_inotify)
+    events = []
+    try:
+        stop = tmp_path / "STOP"
+        w.watch(str(stop), events.append)
+        stop.write_text("x")
+        assert _until(lambda: events == [True])
+        stop.unlink()
+        assert _until(lambda: events == [True, False])
+        # a directory that doesn't exist yet is polled until it does
+        late = tmp_path / "later" / "STOP"
+        w.watch(str(late), events.append)
+        late.parent.mkdir()
+        late.write_text("x")
+        assert _until(lambda: events == [True, False, True])
+    finally:
+        w.close()
+
+def test_global_token_resets_after_stop_removed(tmp_path):
+    stop = tmp_path / "STOP"
+    first = cancel.global_token(str(stop))
+    run = cancel.run_token("cancel-test-run", stop_path=str(stop))
+    try:
+        stop.write_text("x")
+        assert _until(lambda: first.cancelled and run.cancelled)
+        stop.unlink()
+        assert _until(lambda: not cancel.global_token(str(stop)).cancelled)
+        assert cancel.global_token(str(stop)) is not first
+    finally:
+        cancel.release("cancel-test-run")
+
+def test_run_scope_cancel_and_release(tmp_path):
+    run_stop = tmp_path / "run" / cancel.RUN_STOP_FILE
+    run_stop.parent.mkdir()
+    a = cancel.run_token("cancel-a", stop_path=str(tmp_path / "STOP"), run_stop_file=str(run_stop))
+    b = cancel.run_token("cancel-b", stop_path=str(tmp_path / "STOP"))
+    try:
+        assert cancel.cancel_run("cancel-b") is True
+        assert b.cancelled and not a.cancelled
+        run_stop.write_text("x")
+        assert _until(lambda: a.cancelled)
+    finally:
+        cancel.release("cancel-a")
+        cancel.release("cancel-b")
+    assert cancel.cancel_run("cancel-a") is False
+
+def test_stop_latency_through_guard(tmp_path):
+    stop = tmp_path / "STOP"
+    tok = cancel.run_token("cancel-latency", stop_path=str(stop))
+    guard = StopFileGuard(str(stop), token=tok)
+    out = {}
+
+    def sleeper():
+        try:
+            guard.sleep(30)
+        except StopFileGuard.Stopped:
+            out["t"] = time.monotonic()
+
+    t = threading.Thread(target=sleeper)
+    t.start()
+    time.sleep(0.05)
+    t0 = time.monotonic()
+    stop.write_text("x")
+    t.join(5)
+    cancel.release("cancel-latency")
+    assert "t" in out and out["t"] - t0 < 0.5
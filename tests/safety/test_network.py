@@ -0,0 +1,156 @@
+import asyncio
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from agentmx.core.config import Config, ConfigError
+from agentmx.safety.network import NetworkPolicy, install, install_async, parse_pattern
+
+CONFIG_DENY = ["*.onion", "10.*.*.*", "192.168.*.*", "169.254.*.*"]
+
+def test_config_patterns():
+    p = NetworkPolicy(deny=CONFIG_DENY + ["fd00::/8", "evil.com", "ads*.example.*"])
+    assert p.denied_by("http://abc.onion/x") == "*.onion"
+    assert p.denied_by("http://10.1.2.3:8080/") == "10.*.*.*"
+    assert p.denied_by("https://192.168.0.1") == "192.168.*.*"
+    assert p.denied_by("http://[::ffff:169.254.169.254]/latest") == "169.254.*.*"
+    assert p.denied_by("http://[fd12::1]/") == "fd00::/8"
+    assert p.denied_by("https://EVIL.com./") == "evil.com"
+    assert p.denied_by("https://ads7.example.net/t.js") == "ads*.example.*"
+    for url in ("http://onion/", "http://11.0.0.1/", "http://a.evil.com", "https://example.com",
+                "data:text/html,<b>x</b>", "about:blank"):
+        assert not p.is_denied(url), url
+
+def test_default_deny_and_allow_list():
+    p = NetworkPolicy(deny=["*.internal"], allow=["*.example.com", "127.0.0.0/8", "ok.internal"], default="deny")
+    assert p.is_denied("https://example.org/")
+    assert p.denied_by("https://example.org/") == "default:deny"
+    assert not p.is_denied("https://cdn.example.com/a.js")
+    assert not p.is_denied("http://127.0.0.1:9/")
+    assert not p.is_denied("http://ok.internal/")
+    assert p.is_denied("http://db.internal/")
+
+def test_bad_patterns_fail_config_validation():
+    for bad in ("10.*.1.*", "10.1", "300.*.*.*", "a/b", ""):
+        with pytest.raises(ValueError):
+            parse_pattern(bad)
+    with pytest.raises(ConfigError):
+        Config(raw={"network": {"deny_patterns": ["10.*.1.*"]}})
+    with pytest.raises(ConfigError):
+        Config(raw={"network": {"default": "block"}})
+
+def test_many_rules_and_verdict_cache():
+    deny = [f"10.{i // 256}.{i % 256}.0/24" for i in range(20000)] + [f"*.bad{i}.test" for i in range(20000)]
+    p = NetworkPolicy(deny=deny)
+    assert p.denied_by("http://10.78.31.200/") == "10.78.31.0/24"
+    assert p.denied_by("http://x.y.bad19999.test/") == "*.bad19999.test"
+    assert not p.is_denied("http://bad19999.test/")
+    assert not p.is_denied("http://10.200.0.1/")
+    p.is_denied("http://x.y.bad19999.test/other")
+    assert p.stats()["cache_hits"] == 1
+
+def test_dns_pinning_checks_resolved_addresses_cached_for_ttl():
+    answers = {"rebind.test": ["93.184.216.34"]}
+    calls = []
+
+    def resolver(host):
+        calls.append(host)
+        return answers[host]
+
+    p = NetworkPolicy(deny=CONFIG_DENY, dns_pinning=True, dns_ttl=60, resolver=resolver)
+    assert not p.is_denied("http://rebind.test/")
+    # the name now points inside the network; the cached answer is used until dns_ttl
+    answers["rebind.test"] = ["10.0.0.5"]
+    assert not p.is_denied("http://rebind.test/again")
+    assert calls == ["rebind.test"]
+    fresh = NetworkPolicy(deny=CONFIG_DENY, dns_pinning=True, dns_ttl=0, resolver=resolver)
+    assert fresh.denied_by("http://rebind.test/") == "10.*.*.*"
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class FakeRoute:
+    # stands in for a Playwright route: continue_ really fetches the URL
+    def __init__(self, url):
+        self.request = type("Request", (), {"url": url})()
+        self.body = None
+        self.aborted = None
+
+    def continue_(self):
+        with urllib.request.urlopen(self.request.url, timeout=5) as r:
+            self.body = r.read()
+
+    def abort(self, code):
+        self.aborted = code
+
+class FakeContext:
+    def __init__(self):
+        self.routes = []
+
+    def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+def test_route_hook_against_local_server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{srv.server_address[1]}/page"
+    try:
+        ctx = FakeContext()
+        assert install(ctx, NetworkPolicy(deny=CONFIG_DENY))
+        route = FakeRoute(url)
+        ctx.routes[0][1](route)
+        assert route.body == b"ok" and route.aborted is None
+
+        ctx = FakeContext()
+        install(ctx, NetworkPolicy(deny=["127.*.*.*"]))
+        route = FakeRoute(url)
+        ctx.routes[0][1](route)
+        assert route.aborted == "blockedbyclient" and route.body is None
+    finally:
+        srv.shutdown()
+        srv.server_close()
+    # nothing to enforce, so requests aren't intercepted at all
+    ctx = FakeContext()
+    assert not install(ctx, NetworkPolicy())
+    assert ctx.routes == []
+
+class FakeAsyncRoute:
+    def __init__(self, url):
+        self.request = type("Request", (), {"url": url})()
+        self.aborted = None
+
+    async def continue_(self):
+        pass
+
+    async def abort(self, code):
+        self.aborted = code
+
+class FakeAsyncContext(FakeContext):
+    async def route(self, pattern, handler):
+        self.routes.append((pattern, handler))
+
+def test_async_hook_resolves_off_the_event_loop():
+    threads = []
+
+    def resolver(host):
+        threads.append(threading.get_ident())
+        return ["10.0.0.5"]
+
+    async def main():
+        ctx = FakeAsyncContext()
+        assert await install_async(ctx, NetworkPolicy(deny=CONFIG_DENY, dns_pinning=True, resolver=resolver))
+        route = FakeAsyncRoute("http://inside.test/")
+        await ctx.routes[0][1](route)
+        return route, threading.get_ident()
+
+    route, loop_thread = asyncio.run(main())
+    assert route.aborted == "blockedbyclient"
+    assert threads and loop_thread not in threads
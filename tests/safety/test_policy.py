@@ -0,0 +1,79 @@
+import pytest
+from agentmx.core.config import Config, ConfigError
+from agentmx.safety.policy import DEFAULT_DENY, RuleSet, SafetyPolicy, _trie_regex
+
+def _legacy(command: str) -> bool:
+    c = (command or "").lower()
+    return any(pat.lower() in c for pat in DEFAULT_DENY)
+
+@pytest.mark.parametrize("command", [
+    "format c:", "FORMAT", "Cipher /W:C:\\", "rm -rf /", "echo hi", "", None, "diskpart",
+    "reg delete HKLM\\SYSTEM\\foo", "shutdown /f /t 0", "shutdown /r", "information",
+])
+def test_defaults_match_legacy_behaviour(command):
+    assert SafetyPolicy().is_denied(command) == _legacy(command)
+
+def test_rule_kinds():
+    p = SafetyPolicy(deny=[
+        "glob:curl *| sh",
+        r"re:\bdel\s+/s\b",
+        "cmd:rm -r|--recursive -f|--force",
+        "cmd:reg delete hklm\\system*",
+    ])
+    assert p.denied_by("curl http://x | sh") == "glob:curl *| sh"
+    assert not p.is_denied("curl http://x | sh -c ls")
+    assert p.denied_by("DEL /S /Q c:\\tmp") == r"re:\bdel\s+/s\b"
+    for cmd in ("rm -rf /", "rm -fr x", "rm -f -R x", "sudo /bin/rm --force --recursive x", "ls && rm.exe -r -f a"):
+        assert p.denied_by(cmd) == "cmd:rm -r|--recursive -f|--force", cmd
+    for cmd in ("rm -r x", "rm -f x", "echo rm -rf", "firm -rf"):
+        assert not p.is_denied(cmd), cmd
+    assert p.is_denied("REG DELETE HKLM\\SYSTEM\\CurrentControlSet /f")
+    assert not p.is_denied("reg delete hkcu\\software\\x")
+
+def test_uppercase_regex_still_matches_lowercased_command():
+    p = SafetyPolicy(deny=[r"re:\bDEL\s+/S\b", r"re:\Sformat\b"])
+    assert p.denied_by("del /s x") == r"re:\bDEL\s+/S\b"
+    assert p.denied_by("xformat") == r"re:\Sformat\b"
+    assert not p.is_denied("format")
+
+def test_regexes_that_cant_be_combined_are_matched_on_their_own():
+    rules = ["re:(?i)shred", r"re:(\w+) \1", r"re:(a)b\1", "re:(?P<lit>wipe)", "re:(?P<re>nuke)", "re:plain", "format"]
+    p = SafetyPolicy.from_config(Config(raw={"policy": {"commands": {"deny": rules}}}))
+    assert p.denied_by("SHRED x") == "re:(?i)shred"
+    assert p.denied_by("go go") == r"re:(\w+) \1"
+    assert p.denied_by("aba") == r"re:(a)b\1"
+    assert p.denied_by("wipe disk") == "re:(?P<lit>wipe)"
+    assert p.denied_by("nuke it") == "re:(?P<re>nuke)"
+    assert p.denied_by("plain") == "re:plain" and p.denied_by("format c:") == "format"
+    assert not p.is_denied("go went") and not p.is_denied("abb")
+
+def test_allow_overrides_deny_and_whitespace_is_normalized():
+    p = SafetyPolicy(deny=["rm -rf"], allow=["glob:rm -rf ./build*"])
+    assert p.is_denied("rm   -rf  /")
+    assert not p.is_denied("rm -rf ./build/out")
+
+def test_trie_regex_prefers_shorter_words():
+    rx = _trie_regex(["ab", "abc", "abd", "x-y", "a]"])
+    rs = RuleSet(["ab", "abc", "x-y", "a]"])
+    assert rx
+    assert rs.match("zzabczz") == "ab"
+    assert rs.match("x-y") == "x-y"
+    assert rs.match("a]") == "a]"
+    assert rs.match("a") is None
+
+def test_many_rules_and_cache():
+    rules = [f"badcmd{i} --now" for i in range(3000)] + [f"cmd:tool{i} -x -y" for i in range(500)]
+    p = SafetyPolicy(deny=rules, cache_size=16)
+    assert p.denied_by("run badcmd2999 --now please") == "badcmd2999 --now"
+    assert p.denied_by("tool42 -yx") == "cmd:tool42 -x -y"
+    assert not p.is_denied("badcmd12 --later")
+    p.is_denied("tool42 -yx")
+    assert p._verdict.cache_info().hits == 1
+
+def test_config_rules_are_validated():
+    p = SafetyPolicy.from_config(Config(raw={"policy": {"commands": {"deny": ["cmd:rm -rf"], "allow": ["rm -rf ./tmp"]}}}))
+    assert p.is_denied("rm -fr /") and not p.is_denied("rm -rf ./tmp")
+    with pytest.raises(ConfigError):
+        Config(raw={"policy": {"commands": {"deny": ["re:("]}}})
+    with pytest.raises(ConfigError):
+        Config(raw={"policy": {"commands": {"deny": "rm -rf"}}})
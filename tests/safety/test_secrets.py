@@ -0,0 +1,82 @@
+import re
+from fastapi.testclient import TestClient
+from agentmx.core.config import Config
+from agentmx.memory import store as mem
+from agentmx.safety import audit as audit_mod
+from agentmx.safety.audit import AuditLog
+from agentmx.safety.secrets import REDACTOR, Redactor, mask
+from agentmx.ui import api
+
+H = {"X-API-Key": "k"}
+
+def test_single_pass_masks_only_the_secret():
+    assert mask("curl api_key=abc123 -H token = t.o-k") == "curl api_key=**** -H token = ****"
+    # the old per-pattern str.replace pass rewrote the whole string per match
+    assert mask("token=abc token=abc") == "token=**** token=****"
+    # one secret containing another's keyword is still masked once
+    assert mask("API-KEY=token=xyz") == "API-KEY=****=xyz"
+    assert mask("no secrets here\nor here") == "no secrets here\nor here"
+    assert mask(None) == ""
+    assert REDACTOR.redact(b"x token=abcd", keep_length=True) == b"x token=****"
+    assert REDACTOR.redact("token=abcdefgh", keep_length=True) == "token=********"
+
+def test_custom_patterns_without_triggers():
+    r = Redactor([re.compile(r"(?i)password:\s*(\S+)"), r"sk-[A-Za-z0-9]{8,}"], triggers=None)
+    assert r.redact("Password: hunter2 and sk-ABCDEFGH123") == "Password: **** and ****"
+
+def test_stream_catches_secrets_split_across_chunks():
+    text = "start\n" + "filler line\n" * 50 + "use api_key=SPLITSECRET now\n" + "x" * 100 + " token=tail"
+    expected = mask(text)
+    for size in (1, 3, 7, 64, 1000):
+        s = REDACTOR.stream()
+        out = "".join(s.feed(text[i:i + size]) for i in range(0, len(text), size)) + s.close()
+        assert out == expected, size
+        assert "SPLITSECRET" not in out
+
+def test_stream_cuts_long_lines_outside_matches():
+    text = "a" * 500 + " token=" + "s" * 40 + " " + "b" * 500
+    s = REDACTOR.stream(max_line=100)
+    pieces = [s.feed(text[i:i + 10]) for i in range(0, len(text), 10)] + [s.close()]
+    assert "".join(pieces) == mask(text)
+    assert all(len(p) < 200 for p in pieces)
+
+def test_audit_records_are_redacted_before_hashing(tmp_path):
+    log = AuditLog(str(tmp_path))
+    log.record("cmd", {"argv": "deploy --token=hunter2", "nested": {"k": "api_key = s3cret"}})
+    log.close()
+    raw = open(log.path, encoding="utf-8").read()
+    assert "hunter2" not in raw and "s3cret" not in raw
+    assert "token=****" in raw
+    assert audit_mod.verify(log.path) == 1
+
+def test_logs_endpoints_redact_older_unmasked_logs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("AGENTMX_API_KEY", "k")
+    monkeypatch.setattr(api, "cfg", Config(raw={"execution": {"working_dir": str(tmp_path / "work" / "{run_id}")}}))
+    wd = tmp_path / "work" / "old"
+    wd.mkdir(parents=True)
+    log = AuditLog(str(wd), redactor=None)
+    for i in range(50):
+        log.record("step", {"i": i, "cmd": f"login token=leak{i}"})
+    log.close()
+    mem.record_run(mem.connect(), "old", "completed", 1.0, 1.0)
+    c = TestClient(api.app)
+    try:
+        full = c.get("/runs/old/logs", headers=H).text
+        assert "leak" not in full and full.count("token=****") == 50
+        assert "leak" not in c.get("/runs/old/logs?event=step", headers=H).text
+        r = c.get("/runs/old/logs", headers={**H, "Range": "bytes=10-2000"})
+        assert r.status_code == 206 and len(r.content) == 1991
+        assert b"leak" not in r.content
+        # ranges starting after "token=" or ending inside the secret
+        with open(log.path, "rb") as f:
+            masked = REDACTOR.redact(f.read(), keep_length=True)
+        at = masked.index(b"token=", 1000) + len(b"token=")
+        for first, last in ((at, at + 200), (at + 2, at + 3), (at - 40, at + 1)):
+            r = c.get("/runs/old/logs", headers={**H, "Range": f"bytes={first}-{last}"})
+            assert r.status_code == 206 and r.content == masked[first:last + 1]
+        with c.stream("GET", "/runs/old/logs/stream", headers={**H, "Last-Event-ID": "0"}) as s:
+            body = "".join(s.iter_text())
+        assert "leak" not in body and body.count("token=****") == 50
+    finally:
+        mem.close()
@@ -0,0 +1,143 @@
+import asyncio
+import os
+import threading
+import pytest
+from agentmx.safety.runner import StopFileGuard
+from agentmx.skills.browser.async_engine import AsyncBrowserEngine, AsyncUploadReceiptSkill
+
+class FakeDownload:
+    suggested_filename = "receipt.txt"
+
+    async def save_as(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Receipt: OK")
+
+class FakeExpect:
+    def __init__(self):
+        fut = asyncio.get_running_loop().create_future()
+        fut.set_result(FakeDownload())
+        self.value = fut
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+class FakePage:
+    def __init__(self, browser):
+        self.browser = browser
+
+    async def goto(self, url):
+        self.browser.visited.append(url)
+
+    async def set_input_files(self, selector, path):
+        assert os.path.exists(path)
+
+    def expect_download(self):
+        return FakeExpect()
+
+    async def click(self, selector):
+        b = self.browser
+        b.active += 1
+        b.peak = max(b.peak, b.active)
+        b.threads.add(threading.get_ident())
+        try:
+            await asyncio.sleep(b.delay)
+        finally:
+            b.active -= 1
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    async def new_page(self):
+        return FakePage(self.browser)
+
+    async def close(self):
+        self.closed = True
+
+class FakeBrowser:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.threads = set()
+        self.visited = []
+        self.contexts = []
+
+    def is_connected(self):
+        return True
+
+    async def new_context(self, **opts):
+        ctx = FakeContext(self)
+        self.contexts.append(ctx)
+        return ctx
+
+    async def close(self):
+        pass
+
+def _engine(browser, **kw):
+    launches = []
+
+    async def launcher():
+        launches.append(1)
+        return browser
+
+    engine = AsyncBrowserEngine(launcher=launcher, **kw)
+    return engine, launches
+
+def _src(tmp_path):
+    p = tmp_path / "note.txt"
+    p.write_text("hello")
+    return str(p)
+
+def test_many_pages_share_one_loop_and_browser(tmp_path):
+    browser = FakeBrowser(delay=0.1)
+    engine, launches = _engine(browser, max_pages=8)
+    try:
+        results = engine.upload_many([_src(tmp_path)] * 20, str(tmp_path / "dl"))
+        assert len(launches) == 1
+        assert browser.peak == 8
+        assert len(browser.threads) == 1
+        paths = [r["path"] for r in results]
+        assert len(set(paths)) == 20
+        assert all(os.path.exists(p) for p in paths)
+        assert all(c.closed for c in browser.contexts)
+    finally:
+        engine.close()
+
+def test_sync_facade_skill(tmp_path):
+    browser = FakeBrowser(delay=0)
+    engine, _ = _engine(browser)
+    try:
+        res = AsyncUploadReceiptSkill(str(tmp_path / "dl"), engine).run(_src(tmp_path))
+        assert res["type"] == "receipt" and res["size"] == len("Receipt: OK")
+        assert browser.visited[0].startswith("data:text/html,")
+    finally:
+        engine.close()
+
+def test_page_timeout(tmp_path):
+    browser = FakeBrowser(delay=5)
+    engine, _ = _engine(browser, page_timeout=0.1)
+    try:
+        with pytest.raises(TimeoutError):
+            engine.upload(_src(tmp_path), str(tmp_path / "dl"))
+        assert browser.contexts[0].closed
+    finally:
+        engine.close()
+
+def test_kill_switch_cancels_in_flight_pages(tmp_path):
+    browser = FakeBrowser(delay=5)
+    stop = tmp_path / "STOP"
+    engine, _ = _engine(browser, stop_file=str(stop))
+    try:
+        threading.Timer(0.1, stop.write_text, args=("stop",)).start()
+        results = engine.upload_many([_src(tmp_path)] * 4, str(tmp_path / "dl"))
+        assert all(isinstance(r, StopFileGuard.Stopped) for r in results)
+        assert all(c.closed for c in browser.contexts)
+        with pytest.raises(StopFileGuard.Stopped):
+            engine.upload(_src(tmp_path), str(tmp_path / "dl"))
+    finally:
+        engine.close()
@@ -0,0 +1,154 @@
+import threading
+import time
+import pytest
+from agentmx.core.config import Config
+from agentmx.safety.cancel import CancelToken, Stopped
+from agentmx.skills.browser.pool import BrowserPool, pool_size
+
+class FakeContext:
+    def __init__(self, browser, options):
+        self.browser = browser
+        self.options = options
+        self.closed = False
+        self.thread = threading.get_ident()
+
+    def close(self):
+        self.closed = True
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+        self.closed = False
+
+    def is_connected(self):
+        return self.connected and not self.closed
+
+    def new_context(self, **options):
+        ctx = FakeContext(self, options)
+        self.contexts.append(ctx)
+        return ctx
+
+    def close(self):
+        self.closed = True
+
+class Launcher:
+    def __init__(self):
+        self.browsers = []
+
+    def __call__(self):
+        b = FakeBrowser()
+        self.browsers.append(b)
+        return b
+
+def test_reuses_browser_with_fresh_context_per_run():
+    launcher = Launcher()
+    pool = BrowserPool(size=1, recycle_after=0, launcher=launcher)
+    try:
+        seen = [pool.run(lambda ctx: ctx) for _ in range(5)]
+        assert len(launcher.browsers) == 1
+        assert len({id(c) for c in seen}) == 5
+        assert all(c.closed for c in seen)
+        assert seen[0].options == {"accept_downloads": True}
+        # every job runs on the browser's own thread
+        assert len({c.thread for c in seen}) == 1
+        assert seen[0].thread != threading.get_ident()
+        assert pool.stats()["contexts"] == 5
+    finally:
+        pool.shutdown()
+    assert launcher.browsers[0].closed
+
+def test_recycles_after_n_contexts():
+    launcher = Launcher()
+    pool = BrowserPool(size=1, recycle_after=3, launcher=launcher)
+    try:
+        for _ in range(7):
+            pool.run(lambda ctx: None)
+        assert len(launcher.browsers) == 3
+        assert launcher.browsers[0].closed and launcher.browsers[1].closed
+        assert pool.stats()["recycles"] == 2
+    finally:
+        pool.shutdown()
+
+def test_relaunches_unhealthy_browser_and_survives_job_errors():
+    launcher = Launcher()
+    pool = BrowserPool(size=1, recycle_after=0, launcher=launcher)
+    try:
+        assert pool.warm_up()
+        assert len(launcher.browsers) == 1
+        with pytest.raises(ValueError):
+            pool.run(lambda ctx: (_ for _ in ()).throw(ValueError("boom")))
+        assert launcher.browsers[0].contexts[-1].closed
+        launcher.browsers[0].connected = False
+        ctx = pool.run(lambda ctx: ctx)
+        assert len(launcher.browsers) == 2
+        assert ctx.browser is launcher.browsers[1]
+    finally:
+        pool.shutdown()
+
+def test_pool_size_bounds_concurrency():
+    launcher = Launcher()
+    pool = BrowserPool(size=2, recycle_after=0, launcher=launcher)
+    active = []
+    peak = []
+    lock = threading.Lock()
+    gate = threading.Barrier(2, timeout=5)
+
+    def job(ctx):
+        with lock:
+            active.append(1)
+            peak.append(len(active))
+        try:
+            gate.wait()
+        except threading.BrokenBarrierError:
+            pass
+        with lock:
+            active.pop()
+
+    try:
+        threads = [threading.Thread(target=pool.run, args=(job,)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10)
+        assert max(peak) == 2
+        assert len(launcher.browsers) == 2
+    finally:
+        pool.shutdown()
+
+def test_run_times_out_when_all_browsers_are_busy():
+    pool = BrowserPool(size=1, recycle_after=0, launcher=Launcher())
+    busy = threading.Event()
+    release = threading.Event()
+
+    def hold(ctx):
+        busy.set()
+        release.wait(5)
+
+    holder = threading.Thread(target=pool.run, args=(hold,))
+    holder.start()
+    try:
+        assert busy.wait(5)
+        with pytest.raises(TimeoutError):
+            pool.run(lambda ctx: None, timeout=0.05)
+        pool.acquire_timeout = 0.05
+        with pytest.raises(TimeoutError):
+            pool.run(lambda ctx: None)
+        # a cancelled run stops waiting for a slot
+        pool.acquire_timeout = 30
+        token = CancelToken()
+        threading.Timer(0.2, token.cancel).start()
+        t0 = time.monotonic()
+        with pytest.raises(Stopped):
+            pool.run(lambda ctx: None, token=token)
+        assert time.monotonic() - t0 < 2
+    finally:
+        release.set()
+        holder.join(5)
+        pool.shutdown()
+
+def test_pool_size_defaults_to_run_concurrency():
+    assert pool_size(Config(raw={"api": {"max_concurrent_runs": 4}})) == 4
+    assert pool_size(Config(raw={"api": {"max_concurrent_runs": 2}, "autonomy": {"workers": 3}})) == 3
+    assert pool_size(Config(raw={"api": {"max_concurrent_runs": 4}, "browser": {"pool": {"size": 2}}})) == 2
+    assert pool_size(Config(raw={})) == 1
@@ -0,0 +1,116 @@
+import json
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from agentmx import cli
+
+# Modules (and their submodules) `agentmx submit` / `--help` must not pay for.
+HEAVY = ("loguru", "yaml", "sqlite3", "fastapi", "starlette", "uvicorn", "playwright", "pywinauto",
+         "agentmx.core", "agentmx.memory", "agentmx.autonomy", "agentmx.skills", "agentmx.ui", "agentmx.safety")
+
+_LOADED = """
+import json, sys
+sys.argv = ["agentmx"] + sys.argv[1:]
+import {module}
+if sys.argv[1:]:
+    try:
+        {module}.main()
+    except SystemExit:
+        pass
+print("\\n" + json.dumps(sorted(sys.modules)))
+"""
+
+def _loaded(module: str, *argv):
+    out = subprocess.run([sys.executable, "-c", _LOADED.format(module=module), *argv],
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.splitlines()[-1])
+
+def _heavy(modules):
+    return [m for m in modules if any(m == h or m.startswith(h + ".") for h in HEAVY)]
+
+@pytest.mark.parametrize("module,argv", [("agentmx.cli", ()), ("agentmx.cli", ("--help",)),
+                                         ("agentmx.cli", ("submit", "--help")), ("agentmx.client", ())])
+def test_startup_imports_stay_light(module, argv):
+    loaded = _loaded(module, *argv)
+    assert module in loaded
+    heavy = _heavy(loaded)
+    assert not heavy, f"{module} {' '.join(argv)} imports {heavy} at startup"
+
+class _FakeApi(BaseHTTPRequestHandler):
+    state = {}
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        s = self.state
+        s["keys"].append(self.headers.get("X-API-Key"))
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        s["tasks"].append(body["task"])
+        if len(s["tasks"]) == 1:
+            return self._send(429, {"detail": "run queue full"}, {"Retry-After": "0"})
+        self._send(200, {"accepted": True, "run_id": "r1", "task": body["task"]})
+
+    def do_GET(self):
+        s = self.state
+        if self.path == "/runs/r1/status":
+            return self._send(200, {"run_id": "r1", "status": "completed" if s["streamed"] >= 3 else "running"})
+        if self.path == "/runs/r1/logs/stream":
+            after = int(self.headers.get("Last-Event-ID"))
+            s["resumes"].append(after)
+            # the first connection drops after two records
+            seqs = [1, 2] if after == 0 else [3]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            self.wfile.write(b"event: ping\ndata: {}\n\n")
+            for seq in seqs:
+                self.wfile.write(f"id: {seq}\ndata: {json.dumps({'seq': seq})}\n\n".encode())
+                s["streamed"] = seq
+            return
+        self._send(404, {"detail": "not found"})
+
+@pytest.fixture
+def fake_api(monkeypatch):
+    _FakeApi.state = {"tasks": [], "keys": [], "resumes": [], "streamed": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _FakeApi)
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    monkeypatch.setenv("AGENTMX_API_KEY", "k")
+    monkeypatch.setenv("AGENTMX_API_URL", f"http://127.0.0.1:{server.server_port}")
+    yield _FakeApi.state
+    server.shutdown()
+    server.server_close()
+
+def _main(monkeypatch, *argv):
+    monkeypatch.setattr(sys, "argv", ["agentmx", *argv])
+    with pytest.raises(SystemExit) as e:
+        cli.main()
+    return e.value.code
+
+def test_submit_streams_log_and_exits_with_run_status(fake_api, monkeypatch, capsys):
+    assert _main(monkeypatch, "run", "--via-api", "do it") == 0
+    out = capsys.readouterr()
+    assert [json.loads(line)["seq"] for line in out.out.splitlines()] == [1, 2, 3]
+    assert '"status": "completed"' in out.err
+    assert fake_api["tasks"] == ["do it", "do it"]
+    assert fake_api["keys"] == ["k", "k"]
+    assert fake_api["resumes"] == [0, 2]
+
+def test_submit_no_follow_and_unreachable(fake_api, monkeypatch, capsys):
+    assert _main(monkeypatch, "submit", "--no-follow", "x") == 0
+    assert capsys.readouterr().out.strip() == "r1"
+    assert fake_api["resumes"] == []
+    assert _main(monkeypatch, "submit", "--api-url", "http://127.0.0.1:1", "x") == 2
+    assert "cannot reach" in capsys.readouterr().err